@@ -0,0 +1,123 @@
+"""Add normalized analysis fact tables
+
+Revision ID: b7d2e4f1a6c3
+Revises: 9a872a660cf0
+Create Date: 2026-10-18 10:12:44.518203
+
+"""
+from typing import Sequence, Union
+from uuid import uuid4
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f1a6c3'
+down_revision: Union[str, None] = '9a872a660cf0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def _fact_table(name, *columns, indexes=()):
+    op.create_table(name,
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('analysis_id', sa.String(length=36), nullable=False),
+        sa.Column('patient_id', sa.String(length=255), nullable=False),
+        sa.Column('analysis_timestamp', sa.DateTime(timezone=True), nullable=False),
+        *columns,
+        sa.ForeignKeyConstraint(['analysis_id'], ['analysis_history.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f(f'ix_{name}_analysis_id'), name, ['analysis_id'], unique=False)
+    for index_name, index_columns in indexes:
+        op.create_index(index_name, name, index_columns, unique=False)
+
+
+def upgrade() -> None:
+    _fact_table('analysis_alerts',
+        sa.Column('severity', sa.String(length=20), nullable=False),
+        sa.Column('alert_type', sa.String(length=50), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('rule_id', sa.String(length=100), nullable=True),
+        indexes=[
+            ('idx_analysis_alert_severity_timestamp', ['severity', 'analysis_timestamp']),
+            ('idx_analysis_alert_patient_timestamp', ['patient_id', 'analysis_timestamp']),
+        ],
+    )
+    _fact_table('analysis_risk_scores',
+        sa.Column('score_name', sa.String(length=100), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        indexes=[
+            ('idx_analysis_risk_patient_name_timestamp', ['patient_id', 'score_name', 'analysis_timestamp']),
+        ],
+    )
+    _fact_table('analysis_anomalies',
+        sa.Column('anomaly_type', sa.String(length=100), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('severity', sa.String(length=20), nullable=True),
+        indexes=[
+            ('idx_analysis_anomaly_patient_timestamp', ['patient_id', 'analysis_timestamp']),
+            ('idx_analysis_anomaly_type_timestamp', ['anomaly_type', 'analysis_timestamp']),
+        ],
+    )
+    _backfill_facts()
+
+
+def _backfill_facts() -> None:
+    """Populate the fact tables from existing analysis_history blobs, in batches."""
+    from backend.database.analysis_facts import extract_analysis_facts
+    from backend.database.models import CompactJSON
+
+    history = sa.table('analysis_history',
+        sa.column('id', sa.String), sa.column('patient_id', sa.String),
+        sa.column('analysis_timestamp', sa.DateTime(timezone=True)),
+        sa.column('analysis_data', CompactJSON), sa.column('risk_scores', sa.JSON), sa.column('alerts', sa.JSON),
+    )
+    targets = {
+        'alerts': sa.table('analysis_alerts', *(sa.column(name) for name in (
+            'id', 'analysis_id', 'patient_id', 'analysis_timestamp', 'severity', 'alert_type', 'message', 'rule_id'))),
+        'risk_scores': sa.table('analysis_risk_scores', *(sa.column(name) for name in (
+            'id', 'analysis_id', 'patient_id', 'analysis_timestamp', 'score_name', 'score'))),
+        'anomalies': sa.table('analysis_anomalies', *(sa.column(name) for name in (
+            'id', 'analysis_id', 'patient_id', 'analysis_timestamp', 'anomaly_type', 'score', 'severity'))),
+    }
+
+    conn = op.get_bind()
+    last_id = ''
+    while True:
+        rows = conn.execute(
+            sa.select(history).where(history.c.id > last_id).order_by(history.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        pending = {name: [] for name in targets}
+        for row in rows:
+            facts = extract_analysis_facts(row.analysis_data, risk_scores=row.risk_scores, alerts=row.alerts)
+            keys = {'analysis_id': row.id, 'patient_id': row.patient_id, 'analysis_timestamp': row.analysis_timestamp}
+            for name, facts_of_kind in facts._asdict().items():
+                # Later revisions add columns; only fill the ones this revision creates
+                columns = targets[name].c
+                pending[name].extend(
+                    {'id': str(uuid4()), **keys, **{k: v for k, v in fact.items() if k in columns}}
+                    for fact in facts_of_kind
+                )
+        for name, values in pending.items():
+            if values:
+                conn.execute(targets[name].insert(), values)
+
+
+def downgrade() -> None:
+    for name, indexes in (
+        ('analysis_anomalies', ['idx_analysis_anomaly_type_timestamp', 'idx_analysis_anomaly_patient_timestamp']),
+        ('analysis_risk_scores', ['idx_analysis_risk_patient_name_timestamp']),
+        ('analysis_alerts', ['idx_analysis_alert_patient_timestamp', 'idx_analysis_alert_severity_timestamp']),
+    ):
+        for index_name in indexes:
+            op.drop_index(index_name, table_name=name)
+        op.drop_index(op.f(f'ix_{name}_analysis_id'), table_name=name)
+        op.drop_table(name)
@@ -0,0 +1,39 @@
+"""Add materialized FHIR resources for OCR documents
+
+Revision ID: c4e9a2d7b815
+Revises: b7d2e4f1a6c3
+Create Date: 2026-10-18 14:03:27.904511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9a2d7b815'
+down_revision: Union[str, None] = 'b7d2e4f1a6c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # No backfill: documents without current resources are mapped on first read
+    op.create_table('document_fhir_resources',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('document_id', sa.String(length=36), nullable=False),
+        sa.Column('patient_id', sa.String(length=255), nullable=False),
+        sa.Column('mapper_version', sa.String(length=20), nullable=False),
+        sa.Column('resources', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'mapper_version', name='uq_document_fhir_version')
+    )
+    op.create_index('idx_document_fhir_patient_version', 'document_fhir_resources', ['patient_id', 'mapper_version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_document_fhir_patient_version', table_name='document_fhir_resources')
+    op.drop_table('document_fhir_resources')
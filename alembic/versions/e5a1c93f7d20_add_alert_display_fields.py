@@ -0,0 +1,68 @@
+"""Add alert display fields to analysis_alerts
+
+Revision ID: e5a1c93f7d20
+Revises: c4e9a2d7b815
+Create Date: 2026-10-18 23:05:12.417388
+
+"""
+from typing import Sequence, Union
+from uuid import uuid4
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c93f7d20'
+down_revision: Union[str, None] = 'c4e9a2d7b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    op.add_column('analysis_alerts', sa.Column('title', sa.String(length=255), nullable=True))
+    op.add_column('analysis_alerts', sa.Column('patient_name', sa.String(length=255), nullable=True))
+    op.add_column('analysis_alerts', sa.Column('raised_at', sa.String(length=64), nullable=True))
+    _rebuild_alerts()
+
+
+def _rebuild_alerts() -> None:
+    """Re-extract alert rows from analysis_history so existing rows get the new fields."""
+    from backend.database.analysis_facts import extract_analysis_facts
+    from backend.database.models import CompactJSON
+
+    history = sa.table('analysis_history',
+        sa.column('id', sa.String), sa.column('patient_id', sa.String),
+        sa.column('analysis_timestamp', sa.DateTime(timezone=True)),
+        sa.column('analysis_data', CompactJSON), sa.column('alerts', sa.JSON),
+    )
+    alerts = sa.table('analysis_alerts', *(sa.column(name) for name in (
+        'id', 'analysis_id', 'patient_id', 'analysis_timestamp', 'severity', 'alert_type', 'title',
+        'message', 'rule_id', 'patient_name', 'raised_at')))
+
+    conn = op.get_bind()
+    last_id = ''
+    while True:
+        rows = conn.execute(
+            sa.select(history).where(history.c.id > last_id).order_by(history.c.id).limit(BACKFILL_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        values = []
+        for row in rows:
+            facts = extract_analysis_facts(row.analysis_data, risk_scores={}, alerts=row.alerts)
+            keys = {'analysis_id': row.id, 'patient_id': row.patient_id, 'analysis_timestamp': row.analysis_timestamp}
+            values.extend({'id': str(uuid4()), **keys, **fact} for fact in facts.alerts)
+        conn.execute(alerts.delete().where(alerts.c.analysis_id.in_([row.id for row in rows])))
+        if values:
+            conn.execute(alerts.insert(), values)
+
+
+def downgrade() -> None:
+    op.drop_column('analysis_alerts', 'raised_at')
+    op.drop_column('analysis_alerts', 'patient_name')
+    op.drop_column('analysis_alerts', 'title')
@@ -0,0 +1,235 @@
+"""
+Declarative alert rule engine.
+
+Alert rules are loaded from a JSON rules file (``backend/config/alert_rules.json``
+by default, or ``ALERT_RULES_PATH``) and compiled once:
+
+- condition rules: every term of every rule goes into one multi-pattern regex,
+  so each condition code is scanned once regardless of the number of rules
+- lab rules: interpretation keywords are compiled the same way
+- threshold rules: a table keyed by observation code, so each observation only
+  checks the thresholds defined for its code
+
+Rules are grouped by the patient section they read. For a known patient, a
+group is re-evaluated only when its section changed since the last run.
+Per-rule hit counts and evaluation timings are kept for tuning alert fatigue.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from backend.utils.event_history import RunningStat
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = Path(__file__).parent / "config" / "alert_rules.json"
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """A single alert rule from the rules file."""
+
+    id: str
+    kind: str  # "condition", "lab" or "threshold"
+    severity: str
+    message: str
+    recommendation: str
+    terms: Tuple[str, ...] = ()
+    codes: Tuple[str, ...] = ()
+    above: Optional[float] = None
+    below: Optional[float] = None
+
+    def render(self, alert_type: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "severity": self.severity,
+            "type": alert_type,
+            "message": self.message.format(**values),
+            "recommendation": self.recommendation.format(**values),
+            "rule_id": self.id,
+        }
+
+
+class _TermMatcher:
+    """One compiled alternation of case-folded substrings, mapped back to rule IDs."""
+
+    def __init__(self, rules: Sequence[AlertRule]) -> None:
+        owners: Dict[str, set] = {}
+        for rule in rules:
+            for term in rule.terms:
+                owners.setdefault(term.lower(), set()).add(rule.id)
+
+        # A matched term implies every term it contains also matched
+        self._rules_for: Dict[str, FrozenSet[str]] = {
+            term: frozenset().union(*(owners[other] for other in owners if other in term))
+            for term in owners
+        }
+        self._order = {rule.id: index for index, rule in enumerate(rules)}
+        self._pattern = (
+            re.compile(
+                "(?=({}))".format(
+                    "|".join(re.escape(term) for term in sorted(owners, key=len, reverse=True))
+                )
+            )
+            if owners
+            else None
+        )
+
+    def match(self, text: str) -> List[str]:
+        """Rule IDs whose terms occur in ``text`` (case-insensitive), in rule order"""
+        if self._pattern is None or not text:
+            return []
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found.update(self._rules_for[match.group(1)])
+        return sorted(found, key=self._order.__getitem__)
+
+
+class AlertRuleEngine:
+    """Compiled alert rules evaluated in one pass per patient section."""
+
+    def __init__(self, rules: Iterable[AlertRule], patient_cache_size: int = 1024) -> None:
+        self.rules: Dict[str, AlertRule] = {rule.id: rule for rule in rules}
+        by_kind: Dict[str, List[AlertRule]] = {"condition": [], "lab": [], "threshold": []}
+        for rule in self.rules.values():
+            by_kind.setdefault(rule.kind, []).append(rule)
+
+        self._condition_matcher = _TermMatcher(by_kind["condition"])
+        self._interpretation_matcher = _TermMatcher(by_kind["lab"])
+        self._thresholds: Dict[str, List[AlertRule]] = {}
+        for rule in by_kind["threshold"]:
+            for code in rule.codes:
+                self._thresholds.setdefault(code.lower(), []).append(rule)
+
+        self.patient_cache_size = patient_cache_size
+        # patient ID -> section -> (fingerprint, alerts)
+        self._patient_sections: "OrderedDict[str, Dict[str, Tuple[Any, List[Dict[str, Any]]]]]" = OrderedDict()
+        self.hits: Counter = Counter()
+        self.timing = RunningStat()
+        self.stats = {"evaluations": 0, "sections_evaluated": 0, "sections_reused": 0}
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "AlertRuleEngine":
+        """Load and compile the rules file (``ALERT_RULES_PATH`` or the bundled default)"""
+        path = path or os.getenv("ALERT_RULES_PATH") or str(DEFAULT_RULES_PATH)
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls.from_dict(json.load(handle))
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "AlertRuleEngine":
+        rules: List[AlertRule] = []
+        for kind, key in (("condition", "condition_rules"), ("lab", "lab_rules"), ("threshold", "threshold_rules")):
+            for entry in config.get(key) or []:
+                if kind == "threshold" and entry.get("above") is None and entry.get("below") is None:
+                    raise ValueError(f"Threshold rule {entry.get('id')} needs 'above' or 'below'")
+                rules.append(
+                    AlertRule(
+                        id=entry["id"],
+                        kind=kind,
+                        severity=entry.get("severity", "medium"),
+                        message=entry["message"],
+                        recommendation=entry.get("recommendation", ""),
+                        terms=tuple(entry.get("terms") or entry.get("interpretations") or ()),
+                        codes=tuple(entry.get("codes") or ()),
+                        above=entry.get("above"),
+                        below=entry.get("below"),
+                    )
+                )
+        return cls(rules)
+
+    def evaluate(self, patient_data: Dict[str, Any], patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Alerts for a patient: condition alerts, then lab alerts.
+
+        With a ``patient_id``, sections unchanged since the previous evaluation
+        of that patient reuse their earlier alerts.
+        """
+        started = time.perf_counter()
+        conditions = patient_data.get("conditions") or []
+        observations = patient_data.get("observations") or []
+
+        previous = self._patient_sections.get(patient_id) if patient_id else None
+        sections: Dict[str, Tuple[Any, List[Dict[str, Any]]]] = {}
+        alerts: List[Dict[str, Any]] = []
+        for section, items, fingerprint_of, evaluate in (
+            ("conditions", conditions, _condition_fingerprint, self._evaluate_conditions),
+            ("observations", observations, _observation_fingerprint, self._evaluate_observations),
+        ):
+            fingerprint = tuple(fingerprint_of(item) for item in items) if patient_id else None
+            if previous and previous.get(section, (None,))[0] == fingerprint:
+                section_alerts = previous[section][1]
+                self.stats["sections_reused"] += 1
+            else:
+                section_alerts = evaluate(items)
+                self.stats["sections_evaluated"] += 1
+            sections[section] = (fingerprint, section_alerts)
+            alerts.extend(dict(alert) for alert in section_alerts)
+
+        if patient_id:
+            self._patient_sections[patient_id] = sections
+            self._patient_sections.move_to_end(patient_id)
+            while len(self._patient_sections) > self.patient_cache_size:
+                self._patient_sections.popitem(last=False)
+
+        for alert in alerts:
+            self.hits[alert["rule_id"]] += 1
+        self.stats["evaluations"] += 1
+        self.timing.add((time.perf_counter() - started) * 1000)
+        return alerts
+
+    def _evaluate_conditions(self, conditions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        alerts = []
+        for condition in conditions:
+            code = condition.get("code") or ""
+            for rule_id in self._condition_matcher.match(code):
+                alerts.append(self.rules[rule_id].render("condition", {"code": condition.get("code")}))
+        return alerts
+
+    def _evaluate_observations(self, observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        alerts = []
+        for obs in observations:
+            values = {"code": obs.get("code"), "value": obs.get("value"), "unit": obs.get("unit")}
+            for rule_id in self._interpretation_matcher.match(obs.get("interpretation") or ""):
+                alerts.append(self.rules[rule_id].render("lab", values))
+
+            thresholds = self._thresholds.get(str(obs.get("code") or "").lower())
+            if not thresholds:
+                continue
+            try:
+                value = float(obs.get("value"))
+            except (TypeError, ValueError):
+                continue
+            for rule in thresholds:
+                if (rule.above is not None and value > rule.above) or (
+                    rule.below is not None and value < rule.below
+                ):
+                    alerts.append(rule.render("lab", values))
+        return alerts
+
+    def forget(self, patient_id: str) -> None:
+        """Drop remembered sections for a patient"""
+        self._patient_sections.pop(patient_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-rule hit counts and evaluation timings (milliseconds)"""
+        return {
+            **self.stats,
+            "rules": len(self.rules),
+            "rule_hits": {rule_id: self.hits.get(rule_id, 0) for rule_id in self.rules},
+            "evaluation_ms": self.timing.summary(),
+            "tracked_patients": len(self._patient_sections),
+        }
+
+
+def _condition_fingerprint(condition: Dict[str, Any]) -> Any:
+    return condition.get("code")
+
+
+def _observation_fingerprint(obs: Dict[str, Any]) -> Any:
+    return (obs.get("code"), obs.get("value"), obs.get("unit"), obs.get("interpretation"))
@@ -1,44 +1,25 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from .alert_rules import AlertRuleEngine
 
 
 class AlertService:
     """Service responsible for identifying alerts and severity."""
 
+    def __init__(self, engine: Optional[AlertRuleEngine] = None, rules_path: Optional[str] = None) -> None:
+        # Rules come from backend/config/alert_rules.json unless overridden
+        self.engine = engine or AlertRuleEngine.from_file(rules_path)
+
     async def identify_alerts(self, patient_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Identify clinical alerts and red flags."""
 
-        alerts: List[Dict[str, Any]] = []
-
-        # Check for high-risk conditions
-        critical_conditions = ["mi", "stroke", "sepsis", "acute_mi", "pulmonary_embolism"]
-        for condition in patient_data.get("conditions", []):
-            code = condition.get("code", "").lower()
-            if any(risk in code for risk in critical_conditions):
-                alerts.append(
-                    {
-                        "severity": "critical",
-                        "type": "condition",
-                        "message": f"Critical condition identified: {condition.get('code')}",
-                        "recommendation": "Immediate clinical review required",
-                    }
-                )
-
-        # Check lab values
-        for obs in patient_data.get("observations", []):
-            value = obs.get("value")
-            interp = obs.get("interpretation", "").lower()
-
-            if "high" in interp or "critical" in interp:
-                alerts.append(
-                    {
-                        "severity": "high",
-                        "type": "lab",
-                        "message": f"Abnormal lab value: {obs.get('code')} = {value} {obs.get('unit')}",
-                        "recommendation": f"Review {obs.get('code')} and consider intervention",
-                    }
-                )
-
-        return alerts
+        patient_id = (patient_data.get("patient") or {}).get("id")
+        return self.engine.evaluate(patient_data, patient_id=patient_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Rule hit counts and evaluation timings."""
+
+        return self.engine.get_stats()
 
     @staticmethod
     def highest_alert_severity(alerts: List[Dict[str, Any]]) -> str:
@@ -0,0 +1,192 @@
+"""In-memory store for recent patient analyses.
+
+Each patient's analyses live in a bounded ring buffer, and every entry is also
+kept in one global index ordered by analysis time. Timestamps are parsed once,
+on insert, into epoch seconds. Counts and durations used by the statistics
+endpoint are maintained as entries come and go, so recent-N queries (dashboard,
+alert feeds) and stats cost O(k) instead of a scan and sort of the whole history.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Entries without a parseable timestamp sort before everything and never expire
+_UNTIMED = -math.inf
+
+
+class _Entry(NamedTuple):
+    epoch: float
+    seq: int
+    patient_id: str
+    analysis: Dict[str, Any]
+    completed: bool
+    duration: float
+
+    @property
+    def key(self) -> Tuple[float, int]:
+        return (self.epoch, self.seq)
+
+
+def parse_analysis_timestamp(analysis: Dict[str, Any]) -> Optional[datetime]:
+    """Timestamp of an analysis result (naive values are treated as UTC)."""
+
+    timestamp_value = analysis.get("analysis_timestamp") or analysis.get("timestamp")
+    if not timestamp_value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp_value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+class AnalysisHistoryStore:
+    """Per-patient ring buffers plus a global time-ordered index."""
+
+    def __init__(self, limit: Optional[int] = None, ttl_seconds: Optional[int] = None) -> None:
+        self.limit = limit if limit and limit > 0 else None
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+
+        self._buckets: Dict[str, Deque[_Entry]] = {}
+        self._index: List[Tuple[float, int]] = []
+        self._entries: Dict[int, _Entry] = {}
+        self._sequence = itertools.count()
+        self._untimed = 0
+
+        self._completed = 0
+        self._duration_total = 0.0
+
+    def add(self, analysis: Dict[str, Any], patient_id: Optional[str] = None) -> int:
+        """
+        Store an analysis, evicting the patient's oldest entry when at the limit.
+
+        Returns the number of entries evicted.
+        """
+
+        patient_id = patient_id or analysis.get("patient_id") or "unknown"
+        parsed = parse_analysis_timestamp(analysis)
+        entry = _Entry(
+            parsed.timestamp() if parsed else _UNTIMED,
+            next(self._sequence),
+            patient_id,
+            analysis,
+            analysis.get("status") == "completed",
+            analysis.get("analysis_duration_seconds") or 0,
+        )
+
+        bucket = self._buckets.setdefault(patient_id, deque())
+        removed = 0
+        while self.limit is not None and len(bucket) >= self.limit:
+            self._unindex(bucket.popleft())
+            removed += 1
+
+        bucket.append(entry)
+        if entry.epoch == _UNTIMED:
+            self._untimed += 1
+            # Untimed entries stay in insertion order at the front of the index
+            self._index.insert(self._untimed - 1, entry.key)
+        elif not self._index or self._index[-1] < entry.key:
+            self._index.append(entry.key)
+        else:
+            insort(self._index, entry.key)
+        self._entries[entry.seq] = entry
+        self._count(entry, 1)
+        return removed
+
+    def prune_expired(self, now: Optional[float] = None) -> int:
+        """Drop entries older than the TTL (the expired range is a prefix of the index)."""
+
+        if self.ttl_seconds is None:
+            return 0
+
+        cutoff = (time.time() if now is None else now) - self.ttl_seconds
+        end = bisect_left(self._index, (cutoff, -1), lo=self._untimed)
+        expired = self._index[self._untimed:end]
+        if not expired:
+            return 0
+
+        del self._index[self._untimed:end]
+        for _, seq in expired:
+            entry = self._entries.pop(seq)
+            self._count(entry, -1)
+            bucket = self._buckets[entry.patient_id]
+            if bucket[0] is entry:
+                bucket.popleft()
+            else:
+                bucket.remove(entry)
+            if not bucket:
+                del self._buckets[entry.patient_id]
+        return len(expired)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._index.clear()
+        self._entries.clear()
+        self._untimed = 0
+        self._completed = 0
+        self._duration_total = 0.0
+
+    def latest(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        bucket = self._buckets.get(patient_id)
+        return bucket[-1].analysis if bucket else None
+
+    def for_patient(self, patient_id: str) -> List[Dict[str, Any]]:
+        """A patient's analyses in insertion order"""
+
+        return [entry.analysis for entry in self._buckets.get(patient_id, ())]
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every stored analysis, oldest first"""
+
+        return [self._entries[seq].analysis for _, seq in self._index]
+
+    def iter_recent(self, patient_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Analyses newest first, lazily (stop early for recent-N queries)"""
+
+        if patient_id is not None:
+            for entry in reversed(self._buckets.get(patient_id, ())):
+                yield entry.analysis
+            return
+        for _, seq in reversed(self._index):
+            entry = self._entries.get(seq)
+            if entry is not None:
+                yield entry.analysis
+
+    def recent(self, limit: int, patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return list(itertools.islice(self.iter_recent(patient_id), limit))
+
+    def as_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        return {patient_id: self.for_patient(patient_id) for patient_id in self._buckets}
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = len(self._entries)
+        return {
+            "total_analyses": total,
+            "successful_analyses": self._completed,
+            "average_analysis_time": self._duration_total / max(total, 1),
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _unindex(self, entry: _Entry) -> None:
+        position = bisect_left(self._index, entry.key)
+        del self._index[position]
+        if entry.epoch == _UNTIMED:
+            self._untimed -= 1
+        del self._entries[entry.seq]
+        self._count(entry, -1)
+
+    def _count(self, entry: _Entry, sign: int) -> None:
+        # Uses the values captured on insert, so later edits to the dict cannot skew totals
+        self._completed += sign * entry.completed
+        self._duration_total += sign * entry.duration
@@ -4,11 +4,18 @@ Implements step-by-step reasoning for complex medical queries
 Provides transparent chain-of-thought for clinical decision support
 """
 
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Any
 import json
 from datetime import datetime
 
+from backend.utils.event_history import EventHistory
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,15 +26,39 @@ class AoTReasoner:
     Ensures transparent, explainable AI decision-making
     """
     
-    def __init__(self, reasoning_depth: int = 3):
+    def __init__(
+        self,
+        reasoning_depth: int = 3,
+        cache_size: Optional[int] = None,
+        cache_ttl_seconds: Optional[float] = None
+    ):
         """
         Initialize AoT Reasoner
         
         Args:
             reasoning_depth: Number of reasoning steps to generate
+            cache_size: Maximum cached chains, path sets and reasoning steps
+            cache_ttl_seconds: Lifetime of cached reasoning
         """
         self.reasoning_depth = reasoning_depth
-        self.reasoning_chains: List[Dict] = []
+        self.cache_size = cache_size or int(os.getenv("AOT_CACHE_SIZE", "512"))
+        self.cache_ttl_seconds = cache_ttl_seconds or float(os.getenv("AOT_CACHE_TTL_SECONDS", "600"))
+        self._chain_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._step_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight_steps: Dict[str, asyncio.Task] = {}
+        self.cache_stats = {
+            "chain_hits": 0,
+            "chain_misses": 0,
+            "step_hits": 0,
+            "step_misses": 0,
+            "paths_cancelled": 0,
+        }
+        self.reasoning_chains = EventHistory(
+            "aot_reasoning_chains",
+            maxlen=int(os.getenv("EVENT_HISTORY_LIMIT", "1000")),
+            metrics={"chain_length": lambda r: r["chain"].count("\n") + 1},
+            categories={"query_type": lambda r: r.get("query_type")},
+        )
         self.reasoning_templates = self._initialize_templates()
         
         logger.info(f"AoT Reasoner initialized with depth: {reasoning_depth}")
@@ -91,6 +122,15 @@ class AoTReasoner:
         """
         logger.info(f"Generating reasoning chain for: {question[:50]}...")
         
+        context_fp = self._fingerprint(context)
+        rag_fp = self._fingerprint(rag_results)
+        cache_key = self._fingerprint(["chain", question, context_fp, rag_fp, self.reasoning_depth])
+        cached = self._cache_get(self._chain_cache, cache_key)
+        if cached is not None:
+            self.cache_stats["chain_hits"] += 1
+            return cached
+        self.cache_stats["chain_misses"] += 1
+        
         try:
             # 1. Determine query type
             query_type = await self._classify_query(question)
@@ -104,7 +144,8 @@ class AoTReasoner:
                 question=question,
                 template=template,
                 context=context,
-                rag_results=rag_results
+                rag_results=rag_results,
+                memo_scope=f"{context_fp}:{rag_fp}"
             )
             
             # 4. Format reasoning chain
@@ -120,6 +161,7 @@ class AoTReasoner:
                 "rag_results_provided": bool(rag_results)
             })
             
+            self._cache_put(self._chain_cache, cache_key, chain)
             return chain
         
         except Exception as e:
@@ -149,41 +191,84 @@ class AoTReasoner:
         question: str,
         template: List[str],
         context: Optional[Dict],
-        rag_results: Optional[Dict]
+        rag_results: Optional[Dict],
+        memo_scope: Optional[str] = None
     ) -> List[Dict]:
         """
         Generate detailed reasoning for each step
         
+        Steps are independent, so they run concurrently. When ``memo_scope``
+        (a context/knowledge fingerprint) is given, each atomic step is
+        memoized and shared with any other chain or path over the same context.
+        
         Args:
             question: Original question
             template: Reasoning steps template
             context: Patient context
             rag_results: Retrieved knowledge
+            memo_scope: Fingerprint of context and knowledge for step memoization
             
         Returns:
             List of detailed reasoning steps
         """
-        steps = []
-        
-        for i, step_template in enumerate(template[:self.reasoning_depth], 1):
-            step = {
-                "step_number": i,
-                "description": step_template,
-                "reasoning": await self._reason_about_step(
+        async def build_step(i: int, step_template: str) -> Dict:
+            reasoning = await self._memoized_step(
+                memo_scope,
+                ["reason", i, step_template],
+                lambda: self._reason_about_step(
                     step_num=i,
                     step_template=step_template,
                     question=question,
                     context=context,
                     rag_results=rag_results
                 ),
-                "key_finding": await self._extract_key_finding(
-                    step_num=i,
-                    context=context
-                )
+            )
+            key_finding = await self._memoized_step(
+                memo_scope,
+                ["finding", i],
+                lambda: self._extract_key_finding(step_num=i, context=context),
+            )
+            return {
+                "step_number": i,
+                "description": step_template,
+                "reasoning": reasoning,
+                "key_finding": key_finding
             }
-            steps.append(step)
         
-        return steps
+        return list(await asyncio.gather(
+            *(build_step(i, step_template) for i, step_template in enumerate(template[:self.reasoning_depth], 1))
+        ))
+    
+    async def _memoized_step(
+        self,
+        memo_scope: Optional[str],
+        key_parts: List[Any],
+        factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run an atomic step once per scope, sharing in-flight work between concurrent paths"""
+        if memo_scope is None:
+            return await factory()
+        
+        key = self._fingerprint([memo_scope, *key_parts])
+        cached = self._cache_get(self._step_cache, key)
+        if cached is not None:
+            self.cache_stats["step_hits"] += 1
+            return cached
+        
+        inflight = self._inflight_steps.get(key)
+        if inflight is not None:
+            self.cache_stats["step_hits"] += 1
+            return await asyncio.shield(inflight)
+        
+        self.cache_stats["step_misses"] += 1
+        task = asyncio.ensure_future(factory())
+        self._inflight_steps[key] = task
+        try:
+            result = await asyncio.shield(task)
+            self._cache_put(self._step_cache, key, result)
+            return result
+        finally:
+            self._inflight_steps.pop(key, None)
     
     async def _reason_about_step(
         self,
@@ -235,38 +320,70 @@ class AoTReasoner:
     async def get_multi_path_reasoning(
         self,
         question: str,
-        num_paths: int = 3
+        num_paths: int = 3,
+        context: Optional[Dict] = None,
+        confidence_threshold: Optional[float] = None
     ) -> List[Dict]:
         """
         Generate multiple reasoning paths for comparative analysis
         Useful for complex diagnostic decisions
         
+        Paths run concurrently. With a ``confidence_threshold``, the first
+        path to reach it ends the search and unfinished paths are cancelled.
+        
         Args:
             question: Medical question
             num_paths: Number of alternative reasoning paths
+            context: Patient clinical context
+            confidence_threshold: Stop once a path reaches this confidence
             
         Returns:
             List of alternative reasoning paths
         """
         logger.info(f"Generating {num_paths} alternative reasoning paths")
         
-        paths = []
-        for i in range(num_paths):
+        cache_key = self._fingerprint(
+            ["paths", question, num_paths, self._fingerprint(context), confidence_threshold]
+        )
+        cached = self._cache_get(self._chain_cache, cache_key)
+        if cached is not None:
+            self.cache_stats["chain_hits"] += 1
+            return [dict(path) for path in cached]
+        
+        async def generate_path(i: int) -> Dict:
             # Generate variations based on hypothesis
             hypothesis = await self._generate_hypothesis(question, i)
-            
-            path = {
+            return {
                 "path_id": i + 1,
                 "hypothesis": hypothesis,
                 "reasoning": await self.generate_reasoning_chain(
                     f"{question} (considering {hypothesis})",
-                    context=None
+                    context=context
                 ),
                 "confidence": 0.7 + (i * 0.05)  # Hypothetical
             }
-            paths.append(path)
         
-        return paths
+        tasks = [asyncio.ensure_future(generate_path(i)) for i in range(num_paths)]
+        if confidence_threshold is None:
+            paths = list(await asyncio.gather(*tasks))
+        else:
+            paths = []
+            try:
+                for next_path in asyncio.as_completed(tasks):
+                    path = await next_path
+                    paths.append(path)
+                    if path["confidence"] >= confidence_threshold:
+                        break
+            finally:
+                pending = [task for task in tasks if not task.done()]
+                for task in pending:
+                    task.cancel()
+                self.cache_stats["paths_cancelled"] += len(pending)
+                await asyncio.gather(*pending, return_exceptions=True)
+            paths.sort(key=lambda path: path["path_id"])
+        
+        self._cache_put(self._chain_cache, cache_key, paths)
+        return [dict(path) for path in paths]
     
     async def _generate_hypothesis(self, question: str, variant: int) -> str:
         """Generate alternative hypothesis"""
@@ -304,13 +421,45 @@ class AoTReasoner:
         
         return validation
     
+    @staticmethod
+    def _fingerprint(value: Any) -> str:
+        """Stable fingerprint of a question, patient context or retrieval result"""
+        payload = json.dumps(value, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _cache_get(self, cache: "OrderedDict[str, tuple]", key: str) -> Any:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.cache_ttl_seconds:
+            cache.pop(key, None)
+            return None
+        cache.move_to_end(key)
+        return value
+    
+    def _cache_put(self, cache: "OrderedDict[str, tuple]", key: str, value: Any) -> None:
+        cache[key] = (time.monotonic(), value)
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+    
+    def clear_cache(self) -> None:
+        """Drop cached chains, paths and steps (e.g. after patient data changes)"""
+        self._chain_cache.clear()
+        self._step_cache.clear()
+    
     def get_stats(self) -> Dict:
         """Get AoT reasoner statistics"""
         return {
-            "total_reasoning_chains": len(self.reasoning_chains),
+            "total_reasoning_chains": self.reasoning_chains.total,
             "reasoning_depth": self.reasoning_depth,
             "query_types_handled": len(self.reasoning_templates),
-            "average_chain_length": sum(
-                len(r["chain"].split("\n")) for r in self.reasoning_chains
-            ) / max(len(self.reasoning_chains), 1)
+            "average_chain_length": self.reasoning_chains.metric("chain_length").mean,
+            "history": self.reasoning_chains.get_stats(),
+            "cache": {
+                **self.cache_stats,
+                "cached_chains": len(self._chain_cache),
+                "cached_steps": len(self._step_cache),
+            }
         }
@@ -286,56 +286,10 @@ async def get_anomaly_timeline(
             patient_id=patient_id,
             days=days
         )
-        # Get analysis history for the patient
-        history = await db_service.get_analysis_history(patient_id, limit=1000)
-        
-        # Filter to requested time range
+        # Anomalies are stored as indexed fact rows, so filtering and grouping
+        # happen in SQL rather than by parsing every analysis blob
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        timeline_data = []
-        
-        for analysis in history:
-            try:
-                timestamp_str = analysis['analysis_timestamp'].replace('Z', '+00:00')
-                timestamp = datetime.fromisoformat(timestamp_str)
-                # Ensure timestamp is timezone-aware
-                if timestamp.tzinfo is None:
-                    timestamp = timestamp.replace(tzinfo=timezone.utc)
-                if timestamp < cutoff_date:
-                    continue
-                
-                # Extract anomaly data from analysis_data
-                analysis_data = analysis.get('analysis_data') or {}
-                gnn_anomaly = analysis_data.get('gnn_anomaly_detection', {})
-                
-                if gnn_anomaly and gnn_anomaly.get('anomalies'):
-                    anomalies = gnn_anomaly.get('anomalies', [])
-                    anomaly_type_counts = gnn_anomaly.get('anomaly_type_counts', {})
-                    
-                    timeline_data.append({
-                        'timestamp': timestamp.isoformat(),
-                        'anomaly_count': len(anomalies),
-                        'anomaly_type_counts': anomaly_type_counts,
-                        'anomalies': [
-                            {
-                                'type': a.get('anomaly_type', 'unknown'),
-                                'score': a.get('anomaly_score', 0.0),
-                                'severity': a.get('severity', 'low'),
-                            }
-                            for a in anomalies
-                        ],
-                    })
-            except Exception as e:
-                log_structured(
-                    level="warning",
-                    message="Failed to parse analysis entry (skipping)",
-                    correlation_id=correlation_id,
-                    request=request,
-                    error=str(e)
-                )
-                continue
-        
-        # Sort by timestamp
-        timeline_data.sort(key=lambda x: x['timestamp'])
+        timeline_data = await db_service.get_anomaly_timeline(patient_id, since=cutoff_date)
         
         log_structured(
             level="info",
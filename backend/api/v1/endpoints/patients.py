@@ -473,7 +473,7 @@ async def get_alerts(
         )
         
         roster_lookup = {p["patient_id"]: p.get("name") for p in _dashboard_patient_list()}
-        alerts = patient_analyzer.collect_recent_alerts(
+        alerts = await patient_analyzer.get_recent_alerts(
             limit,
             patient_id=auth.patient,
             roster_lookup=roster_lookup,
@@ -13,6 +13,7 @@ from backend.di import (
     get_optional_rag_fusion,
     get_optional_s_lora_manager,
     get_optional_mlc_learning,
+    get_optional_patient_analyzer,
     get_audit_service,
     get_analysis_job_manager,
     get_patient_analyzer,
@@ -30,7 +31,8 @@ from backend.audit_service import AuditService
 from backend.utils.error_responses import create_http_exception, get_correlation_id
 from backend.utils.logging_utils import log_structured, log_service_error
 from backend.utils.service_error_handler import ServiceErrorHandler
-from backend.middleware.performance_monitoring import get_performance_metrics
+from backend.middleware.performance_monitoring import get_performance_metrics as get_request_metrics
+from backend.database.connection import get_pool_stats
 from datetime import datetime, timezone
 import logging
 import asyncio
@@ -244,6 +246,7 @@ async def get_system_stats(
     rag_fusion: Optional[RAGFusion] = Depends(get_optional_rag_fusion),
     s_lora_manager: Optional[SLoRAManager] = Depends(get_optional_s_lora_manager),
     mlc_learning: Optional[MLCLearning] = Depends(get_optional_mlc_learning),
+    patient_analyzer: Optional[PatientAnalyzer] = Depends(get_optional_patient_analyzer),
     audit_service: AuditService = Depends(get_audit_service),
 ) -> StatsResponse:
     """
@@ -265,6 +268,11 @@ async def get_system_stats(
             "s_lora": s_lora_manager.get_stats() if s_lora_manager else None,
             "mlc": mlc_learning.get_stats() if mlc_learning else None,
             "rl": mlc_learning.get_rl_stats() if mlc_learning else None,
+            "alerts": (
+                patient_analyzer.alert_service.get_stats()
+                if patient_analyzer and patient_analyzer.alert_service
+                else None
+            ),
         }
         
         log_structured(
@@ -311,8 +319,9 @@ async def get_performance_metrics(
             request=request
         )
         
-        metrics = get_performance_metrics()
+        metrics = get_request_metrics()
         performance_stats = metrics.get_stats()
+        performance_stats["database_pool"] = get_pool_stats()
         
         log_structured(
             level="info",
@@ -4,10 +4,9 @@ FastAPI middleware for automatic request/response audit logging.
 """
 
 import time
-from typing import Callable, Optional
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import uuid
 
 from .audit_logger import get_audit_logger
@@ -19,7 +18,7 @@ from .audit_events import (
 )
 
 
-class AuditMiddleware(BaseHTTPMiddleware):
+class AuditMiddleware:
     """
     Middleware to automatically log API requests for audit purposes.
     
@@ -47,19 +46,23 @@ class AuditMiddleware(BaseHTTPMiddleware):
         "/api/v1/fhir",
     }
     
-    def __init__(self, app, enabled: bool = True, log_all_requests: bool = False):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, enabled: bool = True, log_all_requests: bool = False):
+        self.app = app
         self.enabled = enabled
         self.log_all_requests = log_all_requests
         self.audit = get_audit_logger()
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        if not self.enabled:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Skip excluded paths
-        if request.url.path in self.EXCLUDED_PATHS:
-            return await call_next(request)
+        if scope["path"] in self.EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
         
         # Generate request ID
         request_id = str(uuid.uuid4())
@@ -77,10 +80,17 @@ class AuditMiddleware(BaseHTTPMiddleware):
         
         # Track timing
         start_time = time.time()
+        status_code = 500
+        
+        async def send_capturing_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
         # Process request
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_capturing_status)
         except Exception as e:
             # Log error
             self._log_error(request, actor, str(e), request_id, ip_address)
@@ -92,14 +102,14 @@ class AuditMiddleware(BaseHTTPMiddleware):
         should_log = (
             self.log_all_requests or
             is_sensitive or
-            response.status_code >= 400 or
+            status_code >= 400 or
             request.method in ("POST", "PUT", "DELETE", "PATCH")
         )
         
         if should_log:
             self._log_request(
                 request=request,
-                response=response,
+                status_code=status_code,
                 actor=actor,
                 request_id=request_id,
                 ip_address=ip_address,
@@ -107,8 +117,6 @@ class AuditMiddleware(BaseHTTPMiddleware):
                 duration_ms=duration_ms,
                 is_sensitive=is_sensitive,
             )
-        
-        return response
     
     def _extract_actor(self, request: Request) -> str:
         """Extract actor (user ID) from request token."""
@@ -146,7 +154,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
     def _log_request(
         self,
         request: Request,
-        response: Response,
+        status_code: int,
         actor: str,
         request_id: str,
         ip_address: str,
@@ -156,15 +164,15 @@ class AuditMiddleware(BaseHTTPMiddleware):
     ) -> None:
         """Log an API request."""
         # Determine event type based on response status
-        if response.status_code == 401:
+        if status_code == 401:
             event_type = AuditEventType.LOGIN_FAILURE
             category = AuditEventCategory.AUTHENTICATION
             severity = AuditSeverity.WARNING
-        elif response.status_code == 403:
+        elif status_code == 403:
             event_type = AuditEventType.ACCESS_DENIED
             category = AuditEventCategory.AUTHORIZATION
             severity = AuditSeverity.WARNING
-        elif response.status_code >= 500:
+        elif status_code >= 500:
             event_type = AuditEventType.ERROR
             category = AuditEventCategory.SYSTEM
             severity = AuditSeverity.ERROR
@@ -186,7 +194,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
             severity=severity,
             actor=actor,
             action=f"{request.method} {request.url.path}",
-            outcome="success" if response.status_code < 400 else "failure",
+            outcome="success" if status_code < 400 else "failure",
             resource=request.url.path,
             patient_id=patient_id,
             request_id=request_id,
@@ -195,7 +203,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
             details={
                 "method": request.method,
                 "path": request.url.path,
-                "status_code": response.status_code,
+                "status_code": status_code,
                 "duration_ms": round(duration_ms, 2),
                 "query_params": dict(request.query_params),
             }
@@ -6,7 +6,8 @@ Provides database connection management, models, and services.
 
 from .connection import get_db_session, get_redis_client, init_database, close_database
 from .models import (
-    Base, AnalysisHistory, Document, OCRExtraction, UserSession, AuditLog, Consent, TwoFactorAuth,
+    Base, AnalysisHistory, AnalysisAlert, AnalysisRiskScore, AnalysisAnomaly,
+    Document, OCRExtraction, DocumentFHIRResources, UserSession, AuditLog, Consent, TwoFactorAuth,
     PatientMedication, CareTeamMember, PatientProfile
 )
 from .service import DatabaseService
@@ -19,8 +20,12 @@ __all__ = [
     "DatabaseService",
     "Base",
     "AnalysisHistory",
+    "AnalysisAlert",
+    "AnalysisRiskScore",
+    "AnalysisAnomaly",
     "Document",
     "OCRExtraction",
+    "DocumentFHIRResources",
     "UserSession",
     "AuditLog",
     "Consent",
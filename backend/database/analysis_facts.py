@@ -0,0 +1,106 @@
+"""
+Extraction of queryable facts from analysis results.
+
+An analysis is stored whole in ``analysis_history`` and, alongside it, as one
+row per alert, numeric risk score and detected anomaly. The fact tables carry
+the patient ID and analysis timestamp so common questions ("critical alerts in
+the last 24h", "risk trend for patient X") are answered by indexed SQL instead
+of loading and parsing every JSON blob.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+
+class AnalysisFacts(NamedTuple):
+    alerts: List[Dict[str, Any]]
+    risk_scores: List[Dict[str, Any]]
+    anomalies: List[Dict[str, Any]]
+
+
+def _text(value: Any, length: int) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value)[:length]
+
+
+def alert_fields(alert: Any) -> Dict[str, Any]:
+    """
+    Display fields of one alert, shared by the alert fact rows and the
+    in-memory alert feed so both report the same title, summary and time.
+    """
+    normalized = alert if isinstance(alert, dict) else {"summary": str(alert)}
+    return {
+        "id": normalized.get("id"),
+        "title": normalized.get("title") or normalized.get("type") or "Clinical Alert",
+        "summary": normalized.get("summary")
+        or normalized.get("description")
+        or normalized.get("message")
+        or str(alert),
+        "severity": (normalized.get("severity") or "").lower(),
+        "timestamp": normalized.get("timestamp") or normalized.get("created_at"),
+    }
+
+
+def analysis_patient_name(analysis: Dict[str, Any]) -> Optional[str]:
+    """Patient name recorded in an analysis result, if any."""
+    summary = analysis.get("summary")
+    if isinstance(summary, dict) and summary.get("patient_name"):
+        return summary["patient_name"]
+    patient = (analysis.get("patient_data") or {}).get("patient")
+    return patient.get("name") if isinstance(patient, dict) else None
+
+
+def extract_analysis_facts(
+    analysis: Optional[Dict[str, Any]],
+    risk_scores: Optional[Dict[str, Any]] = None,
+    alerts: Optional[Iterable[Any]] = None,
+) -> AnalysisFacts:
+    """
+    Fact rows (without IDs or keys) for an analysis result.
+
+    ``risk_scores`` and ``alerts`` default to the values inside ``analysis``;
+    they are passed separately because ``analysis_history`` stores them in
+    their own columns.
+    """
+    analysis = analysis or {}
+
+    alert_rows = []
+    patient_name = _text(analysis_patient_name(analysis), 255)
+    for alert in alerts if alerts is not None else analysis.get("alerts") or []:
+        normalized = alert if isinstance(alert, dict) else {}
+        fields = alert_fields(alert)
+        alert_rows.append(
+            {
+                "severity": _text(fields["severity"], 20) or "info",
+                "alert_type": _text(normalized.get("type") or normalized.get("title"), 50),
+                "title": _text(fields["title"], 255),
+                "message": _text(fields["summary"], 2000),
+                "rule_id": _text(normalized.get("rule_id"), 100),
+                "patient_name": patient_name,
+                "raised_at": _text(fields["timestamp"], 64),
+            }
+        )
+
+    score_rows = []
+    scores = risk_scores if risk_scores is not None else analysis.get("risk_scores") or {}
+    for name, value in scores.items():
+        # Flags such as ``polypharmacy`` are booleans, not scores
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        score_rows.append({"score_name": _text(name, 100), "score": float(value)})
+
+    anomaly_rows = []
+    detection = analysis.get("gnn_anomaly_detection") or {}
+    for anomaly in detection.get("anomalies") or []:
+        if not isinstance(anomaly, dict):
+            continue
+        score = anomaly.get("anomaly_score")
+        anomaly_rows.append(
+            {
+                "anomaly_type": _text(anomaly.get("anomaly_type"), 100) or "unknown",
+                "score": float(score) if isinstance(score, (int, float)) else None,
+                "severity": _text(anomaly.get("severity"), 20),
+            }
+        )
+
+    return AnalysisFacts(alert_rows, score_rows, anomaly_rows)
@@ -4,7 +4,7 @@ Database connection management for PostgreSQL and Redis.
 
 import os
 import logging
-from typing import AsyncGenerator, Optional
+from typing import Any, AsyncGenerator, Dict, Optional
 from contextlib import asynccontextmanager
 
 from sqlalchemy.ext.asyncio import (
@@ -15,6 +15,11 @@ from sqlalchemy.ext.asyncio import (
 )
 import redis.asyncio as redis
 
+from backend.utils.performance_optimization import optimize_connection_pool
+from backend.utils.serialization import json_serializer, loads_json
+
+from .pool import MonitoredQueuePool, PoolSizer, enable_sqlite_wal
+
 logger = logging.getLogger(__name__)
 
 # Global engine and session factory
@@ -22,6 +27,14 @@ _engine: Optional[AsyncEngine] = None
 _session_factory: Optional[async_sessionmaker[AsyncSession]] = None
 _redis_client: Optional[redis.Redis] = None
 
+# Let the pool grow its overflow when checkouts wait longer than the target
+POOL_AUTOSIZE = os.getenv("DB_POOL_AUTOSIZE", "true").lower() == "true"
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
 
 def get_database_url() -> str:
     """Get database URL from environment or use default."""
@@ -71,14 +84,45 @@ async def init_database() -> None:
             "command_timeout": 30,
         }
     
+    pool_options = optimize_connection_pool(
+        pool_size=_env_int("DB_POOL_SIZE"),
+        max_overflow=_env_int("DB_MAX_OVERFLOW"),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        database_url=db_url,
+    )
+    overflow_limit = pool_options.pop("overflow_limit")
+    
+    file_backed = ":memory:" not in db_url
+    if file_backed:
+        pool_options["poolclass"] = MonitoredQueuePool
+    else:
+        # In-memory SQLite keeps its default pool: every new connection is a new database
+        for option in ("pool_size", "max_overflow", "pool_timeout"):
+            pool_options.pop(option)
+    
     _engine = create_async_engine(
         db_url,
         echo=os.getenv("DEBUG", "False").lower() == "true",
-        pool_pre_ping=True,  # Verify connections before using
-        pool_size=10,
-        max_overflow=20,
-        pool_recycle=3600,  # Recycle connections after 1 hour
         connect_args=connect_args,
+        # orjson for the JSON columns (analysis blobs); stored format is unchanged
+        json_serializer=json_serializer,
+        json_deserializer=loads_json,
+        **pool_options,
+    )
+    
+    if "sqlite" in db_url.lower() and file_backed:
+        enable_sqlite_wal(_engine.sync_engine)
+    
+    pool = _engine.sync_engine.pool
+    if isinstance(pool, MonitoredQueuePool) and overflow_limit > 0 and POOL_AUTOSIZE:
+        pool.sizer = PoolSizer(
+            min_overflow=min(pool_options["max_overflow"], overflow_limit),
+            max_overflow=overflow_limit,
+            target_wait_seconds=float(os.getenv("DB_POOL_TARGET_WAIT_MS", "50")) / 1000,
+        )
+    logger.info(
+        "Database pool: size=%s max_overflow=%s (limit %s)",
+        pool_options.get("pool_size"), pool_options.get("max_overflow"), overflow_limit,
     )
     
     _session_factory = async_sessionmaker(
@@ -106,69 +150,13 @@ async def init_database() -> None:
     
     # Run Alembic migrations to ensure database schema is up to date
     # This ensures Alembic knows about the database state and prevents
-    # "Target database is not up to date" errors when autogenerating migrations
+    # "Target database is not up to date" errors when autogenerating migrations.
+    # Migrations run on the async engine; with several workers one migrates
+    # under an advisory lock and the others wait for the schema to reach head.
     try:
-        from alembic.config import Config
-        from alembic import script
-        from alembic import command
-        
-        # Get sync engine for Alembic (Alembic doesn't support async directly)
-        db_url_sync = db_url
-        if db_url_sync.startswith("sqlite+aiosqlite:///"):
-            db_url_sync = db_url_sync.replace("sqlite+aiosqlite:///", "sqlite:///", 1)
-        elif db_url_sync.startswith("postgresql+asyncpg://"):
-            db_url_sync = db_url_sync.replace("postgresql+asyncpg://", "postgresql://", 1)
-        
-        # Create Alembic config
-        import pathlib
-        project_root = pathlib.Path(__file__).parent.parent.parent
-        alembic_cfg = Config(str(project_root / "alembic.ini"))
-        alembic_cfg.set_main_option("sqlalchemy.url", db_url_sync)
+        from .migrations import migrate_database
         
-        # Check if alembic_version table exists
-        from sqlalchemy import create_engine, inspect, text
-        sync_engine = create_engine(db_url_sync)
-        
-        with sync_engine.connect() as conn:
-            inspector = inspect(sync_engine)
-            tables = inspector.get_table_names()
-            
-            if "alembic_version" not in tables:
-                # Database exists but Alembic hasn't been initialized
-                # Check if we have existing tables that match our models
-                expected_tables = ["analysis_history", "documents", "ocr_extractions", 
-                                 "user_sessions", "audit_logs", "users"]
-                has_existing_tables = any(table in tables for table in expected_tables)
-                
-                if has_existing_tables:
-                    # Stamp database with current head revision
-                    logger.info("Stamping database with current Alembic version...")
-                    command.stamp(alembic_cfg, "head")
-                    logger.info("✓ Database stamped with Alembic version")
-                else:
-                    # No existing tables, run migrations from scratch
-                    logger.info("Running Alembic migrations...")
-                    command.upgrade(alembic_cfg, "head")
-                    logger.info("✓ Database migrations applied")
-            else:
-                # Alembic is initialized, check if we need to upgrade
-                with conn.begin():
-                    result = conn.execute(text("SELECT version_num FROM alembic_version"))
-                    current_version = result.scalar()
-                    logger.info(f"Current Alembic version: {current_version}")
-                    
-                    # Get head revision
-                    script_dir = script.ScriptDirectory.from_config(alembic_cfg)
-                    head_revision = script_dir.get_current_head()
-                    
-                    if current_version != head_revision:
-                        logger.info(f"Upgrading database from {current_version} to {head_revision}...")
-                        command.upgrade(alembic_cfg, "head")
-                        logger.info("✓ Database upgraded to latest version")
-                    else:
-                        logger.info("✓ Database is up to date")
-        
-        sync_engine.dispose()
+        schema_ready = await migrate_database(_engine)
         
     except Exception as e:
         logger.warning(f"Failed to run Alembic migrations: {e}. Falling back to create_all().")
@@ -177,6 +165,13 @@ async def init_database() -> None:
         async with _engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
         logger.warning("✓ Database tables created using create_all() (Alembic not available)")
+        schema_ready = True
+    
+    # A worker that gave up waiting for another worker's migration must not
+    # serve requests against the old schema; failing startup lets the process
+    # manager restart it
+    if not schema_ready:
+        raise RuntimeError("Database schema is not at the current migration head")
     
     logger.info("✓ Database initialized successfully")
 
@@ -211,6 +206,16 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_pool_stats() -> Optional[Dict[str, Any]]:
+    """Live connection pool telemetry, or None before initialization."""
+    if _engine is None:
+        return None
+    pool = _engine.sync_engine.pool
+    if isinstance(pool, MonitoredQueuePool):
+        return pool.get_stats()
+    return {"status": pool.status()}
+
+
 def get_redis_client() -> Optional[redis.Redis]:
     """Get Redis client instance."""
     return _redis_client
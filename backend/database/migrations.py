@@ -0,0 +1,169 @@
+"""
+Schema migrations for the application database.
+
+Alembic runs on the application's async engine through ``run_sync``, so the
+DDL goes through the async driver instead of a second, blocking engine.
+
+When several workers start at once, each one tries to take a PostgreSQL
+advisory lock. The worker that gets it migrates. The others poll
+``alembic_version`` with ``asyncio.sleep`` until the schema reaches head.
+
+Deploys that prefer a separate step can run the one-shot command once:
+
+    python -m backend.database.migrations
+
+They then set ``DB_MIGRATE_ON_STARTUP=false`` so workers only wait for the
+schema.
+"""
+
+import asyncio
+import logging
+import os
+import pathlib
+import time
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.parent
+
+# Key for pg_try_advisory_xact_lock. It must be the same in every worker.
+MIGRATION_LOCK_ID = int(os.getenv("DB_MIGRATION_LOCK_ID", "724033101"))
+MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+SCHEMA_WAIT_TIMEOUT_SECONDS = float(os.getenv("DB_SCHEMA_WAIT_TIMEOUT", "120"))
+SCHEMA_POLL_INTERVAL_SECONDS = 0.5
+
+# Tables that mean an existing database predates Alembic and only needs a stamp
+_LEGACY_TABLES = ("analysis_history", "documents", "ocr_extractions", "user_sessions", "audit_logs", "users")
+
+_schema_ready = False
+
+
+def is_schema_ready() -> bool:
+    """Whether this process has seen the database schema at the head revision."""
+    return _schema_ready
+
+
+def alembic_config() -> Config:
+    """Alembic config that does not depend on the working directory."""
+    config = Config(str(PROJECT_ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(PROJECT_ROOT / "alembic"))
+    # Keep the application's logging setup; env.py would otherwise reapply alembic.ini's
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def head_revision(config: Optional[Config] = None) -> Optional[str]:
+    return ScriptDirectory.from_config(config or alembic_config()).get_current_head()
+
+
+def _current_revision(connection: Connection) -> Optional[str]:
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def _upgrade(connection: Connection, config: Config) -> None:
+    """Bring the schema to head on ``connection`` (runs inside ``run_sync``)."""
+    config.attributes["connection"] = connection
+    tables = inspect(connection).get_table_names()
+
+    if "alembic_version" not in tables and any(table in tables for table in _LEGACY_TABLES):
+        logger.info("Stamping existing database with current Alembic version...")
+        command.stamp(config, "head")
+        return
+
+    current = _current_revision(connection)
+    head = head_revision(config)
+    if current == head:
+        logger.info("✓ Database is up to date")
+        return
+
+    logger.info(f"Upgrading database from {current} to {head}...")
+    command.upgrade(config, "head")
+    logger.info("✓ Database migrations applied")
+
+
+async def _wait_for_head(engine: AsyncEngine, head: Optional[str], timeout: float) -> bool:
+    """Poll ``alembic_version`` until another process has migrated to ``head``."""
+    deadline = time.monotonic() + timeout
+    while True:
+        async with engine.connect() as conn:
+            if await conn.run_sync(_current_revision) == head:
+                return True
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(SCHEMA_POLL_INTERVAL_SECONDS)
+
+
+async def migrate_database(
+    engine: AsyncEngine,
+    migrate: bool = MIGRATE_ON_STARTUP,
+    timeout: float = SCHEMA_WAIT_TIMEOUT_SECONDS,
+) -> bool:
+    """
+    Migrate the schema to head, or wait for another worker to do it.
+
+    Args:
+        engine: The application's async engine
+        migrate: Whether this process may run migrations (otherwise it only waits)
+        timeout: Seconds to wait for another worker's migration
+
+    Returns:
+        True once the schema is at head. False if the wait timed out.
+    """
+    global _schema_ready
+
+    config = alembic_config()
+    head = head_revision(config)
+
+    async with engine.connect() as conn:
+        if await conn.run_sync(_current_revision) == head:
+            _schema_ready = True
+            return True
+
+    if migrate:
+        async with engine.begin() as conn:
+            acquired = True
+            if engine.dialect.name == "postgresql":
+                # Transaction-scoped: released on commit or rollback, even if the upgrade fails
+                result = await conn.execute(
+                    text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                    {"lock_id": MIGRATION_LOCK_ID},
+                )
+                acquired = bool(result.scalar())
+            # SQLite is a single-host development database and is not locked
+            if acquired:
+                await conn.run_sync(_upgrade, config)
+        if acquired:
+            _schema_ready = True
+            return True
+        logger.info("Another worker is migrating the database; waiting for it to finish...")
+
+    _schema_ready = await _wait_for_head(engine, head, timeout)
+    if not _schema_ready:
+        logger.warning(f"Database schema did not reach {head} within {timeout:.0f}s")
+    return _schema_ready
+
+
+async def _main() -> None:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from .connection import get_database_url
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_async_engine(get_database_url())
+    try:
+        await migrate_database(engine, migrate=True)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -16,18 +16,52 @@ from sqlalchemy import (
     ForeignKey,
     JSON,
     Index,
+    UniqueConstraint,
 )
+from sqlalchemy.types import TypeDecorator
 # UUID, JSONB, INET imported but not used - keeping for future PostgreSQL-specific features
 # from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 
+from backend.utils.serialization import CODEC_JSON, FORMAT_VERSION, decode_value, encode_value
+
 Base = declarative_base()
 
 # Use JSONB for PostgreSQL, JSON for SQLite
 # We'll use JSON for compatibility - PostgreSQL will handle it efficiently
 JSONColumn = JSON
 
+_COMPACT_PREFIX = f"v{FORMAT_VERSION}:"
+_COMPACT_JSON_PREFIX = f"{_COMPACT_PREFIX}{CODEC_JSON}:"
+
+
+class CompactJSON(TypeDecorator):
+    """
+    JSON column that stores large values in the compact serialization format.
+
+    Values below the compression threshold are stored as plain JSON. Larger
+    values are stored as a JSON string holding ``encode_value`` output, so the
+    column type (and existing rows) stay valid JSON on every dialect. Rows
+    written before this type existed read back unchanged.
+    """
+
+    impl = JSON
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        encoded = encode_value(value)
+        if encoded.startswith(_COMPACT_JSON_PREFIX):
+            return value
+        return encoded
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str) and value.startswith(_COMPACT_PREFIX):
+            return decode_value(value)
+        return value
+
 
 class AnalysisHistory(Base):
     """Store patient analysis history."""
@@ -37,7 +71,7 @@ class AnalysisHistory(Base):
     id = Column(String(36), primary_key=True)
     patient_id = Column(String(255), nullable=False, index=True)
     analysis_timestamp = Column(DateTime(timezone=True), nullable=False, index=True)
-    analysis_data = Column(JSONColumn())  # Full analysis result
+    analysis_data = Column(CompactJSON())  # Full analysis result
     risk_scores = Column(JSONColumn())
     alerts = Column(JSONColumn())
     recommendations = Column(JSONColumn())
@@ -50,6 +84,71 @@ class AnalysisHistory(Base):
     )
 
 
+class AnalysisAlert(Base):
+    """One alert raised by an analysis (normalized from analysis_history.alerts)."""
+    
+    __tablename__ = "analysis_alerts"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    analysis_id = Column(
+        String(36), ForeignKey("analysis_history.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    patient_id = Column(String(255), nullable=False)
+    analysis_timestamp = Column(DateTime(timezone=True), nullable=False)
+    severity = Column(String(20), nullable=False)  # 'critical', 'high', 'medium', 'low', 'info'
+    alert_type = Column(String(50))
+    title = Column(String(255))
+    message = Column(Text)
+    rule_id = Column(String(100))
+    patient_name = Column(String(255))
+    raised_at = Column(String(64))  # The alert's own timestamp, as reported
+    
+    __table_args__ = (
+        Index("idx_analysis_alert_severity_timestamp", "severity", "analysis_timestamp"),
+        Index("idx_analysis_alert_patient_timestamp", "patient_id", "analysis_timestamp"),
+    )
+
+
+class AnalysisRiskScore(Base):
+    """One numeric risk score produced by an analysis."""
+    
+    __tablename__ = "analysis_risk_scores"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    analysis_id = Column(
+        String(36), ForeignKey("analysis_history.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    patient_id = Column(String(255), nullable=False)
+    analysis_timestamp = Column(DateTime(timezone=True), nullable=False)
+    score_name = Column(String(100), nullable=False)  # e.g. 'cardiovascular_risk'
+    score = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index("idx_analysis_risk_patient_name_timestamp", "patient_id", "score_name", "analysis_timestamp"),
+    )
+
+
+class AnalysisAnomaly(Base):
+    """One anomaly detected by the GNN anomaly detector during an analysis."""
+    
+    __tablename__ = "analysis_anomalies"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    analysis_id = Column(
+        String(36), ForeignKey("analysis_history.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    patient_id = Column(String(255), nullable=False)
+    analysis_timestamp = Column(DateTime(timezone=True), nullable=False)
+    anomaly_type = Column(String(100), nullable=False)
+    score = Column(Float)
+    severity = Column(String(20))
+    
+    __table_args__ = (
+        Index("idx_analysis_anomaly_patient_timestamp", "patient_id", "analysis_timestamp"),
+        Index("idx_analysis_anomaly_type_timestamp", "anomaly_type", "analysis_timestamp"),
+    )
+
+
 class Document(Base):
     """Store uploaded documents (for future OCR integration)."""
     
@@ -90,6 +189,24 @@ class OCRExtraction(Base):
     document = relationship("Document", back_populates="ocr_extractions")
 
 
+class DocumentFHIRResources(Base):
+    """FHIR resources mapped from a document's parsed OCR data, per mapper version."""
+    
+    __tablename__ = "document_fhir_resources"
+    
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    document_id = Column(String(36), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    patient_id = Column(String(255), nullable=False)
+    mapper_version = Column(String(20), nullable=False)
+    resources = Column(JSONColumn())  # {'observations': [...], 'medication_statements': [...], 'conditions': [...]}
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        UniqueConstraint("document_id", "mapper_version", name="uq_document_fhir_version"),
+        Index("idx_document_fhir_patient_version", "patient_id", "mapper_version"),
+    )
+
+
 class User(Base):
     """Store user account information with authentication credentials."""
     
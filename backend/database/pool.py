@@ -0,0 +1,207 @@
+"""
+Connection pool telemetry and adaptive overflow sizing.
+
+``MonitoredQueuePool`` is the engine's queue pool with instrumentation. It
+records how long each checkout waited, how often the pool had to open
+overflow connections, and how often a checkout timed out. A ``PoolSizer``
+can be attached to raise or lower the overflow limit from the observed
+waits, within the worker's share of the server's connection budget (see
+``optimize_connection_pool``).
+
+SQLite connections are switched to WAL with a busy timeout, so readers do not
+block the single writer.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from backend.utils.event_history import Histogram, RunningStat
+
+logger = logging.getLogger(__name__)
+
+# Checkout waits are mostly sub-millisecond; the low buckets separate "idle
+# connection available" from "waited for another request to return one"
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=10000",
+)
+
+
+class PoolTelemetry:
+    """Counters and wait-time distribution for one pool."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.overflow_events = 0
+        self.timeouts = 0
+        self.resizes = 0
+        self.wait = RunningStat()
+        self.wait_histogram = Histogram(POOL_WAIT_BUCKETS)
+
+    def record_checkout(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.wait.add(wait_seconds)
+        self.wait_histogram.observe(wait_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+            "resizes": self.resizes,
+            "wait_seconds": self.wait.summary(),
+            "wait_histogram": self.wait_histogram.summary(),
+        }
+
+
+class PoolSizer:
+    """
+    Adaptive overflow policy evaluated over windows of checkouts.
+
+    The limit grows by ``step`` when more than ``slow_fraction`` of a window's
+    checkouts waited longer than ``target_wait_seconds`` or any timed out. It
+    shrinks by ``step`` when no checkout was slow and the window's peak overflow
+    left more than ``step`` connections unused.
+    """
+
+    def __init__(
+        self,
+        min_overflow: int,
+        max_overflow: int,
+        target_wait_seconds: float = 0.05,
+        window: int = 200,
+        slow_fraction: float = 0.05,
+        step: Optional[int] = None,
+    ) -> None:
+        self.min_overflow = max(min_overflow, 0)
+        self.max_overflow = max(max_overflow, self.min_overflow)
+        self.target_wait_seconds = target_wait_seconds
+        self.window = max(window, 1)
+        self.slow_fraction = slow_fraction
+        self.step = step or max(math.ceil((self.max_overflow - self.min_overflow) / 4), 1)
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._observed = 0
+        self._slow = 0
+        self._timeouts = 0
+        self._peak_overflow = 0
+
+    def observe(self, wait_seconds: Optional[float], overflow_in_use: int) -> None:
+        """Record a checkout (``wait_seconds`` None for a timeout)."""
+        self._observed += 1
+        if wait_seconds is None:
+            self._timeouts += 1
+        elif wait_seconds > self.target_wait_seconds:
+            self._slow += 1
+        self._peak_overflow = max(self._peak_overflow, overflow_in_use)
+
+    def evaluate(self, current: int) -> Optional[int]:
+        """New overflow limit once a window is complete, or None to keep ``current``."""
+        if self._observed < self.window:
+            return None
+
+        slow, timeouts, peak = self._slow, self._timeouts, self._peak_overflow
+        observed = self._observed
+        self._reset_window()
+
+        if timeouts or slow > observed * self.slow_fraction:
+            proposed = min(current + self.step, self.max_overflow)
+        elif slow == 0 and current - peak > self.step:
+            proposed = max(current - self.step, self.min_overflow)
+        else:
+            return None
+        return proposed if proposed != current else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "min_overflow": self.min_overflow,
+            "max_overflow": self.max_overflow,
+            "target_wait_seconds": self.target_wait_seconds,
+            "window": self.window,
+        }
+
+
+class MonitoredQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout telemetry and applies a ``PoolSizer``."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.telemetry = PoolTelemetry()
+        self.sizer: Optional[PoolSizer] = None
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.telemetry.timeouts += 1
+            self._observe(None)
+            raise
+        wait_seconds = time.perf_counter() - started
+        self.telemetry.record_checkout(wait_seconds)
+        self._observe(wait_seconds)
+        return record
+
+    def _inc_overflow(self) -> bool:
+        created = super()._inc_overflow()
+        # The counter starts at -pool_size, so positive values are connections beyond the pool
+        if created and self._overflow > 0:
+            self.telemetry.overflow_events += 1
+        return created
+
+    def _observe(self, wait_seconds: Optional[float]) -> None:
+        if self.sizer is None:
+            return
+        self.sizer.observe(wait_seconds, max(self._overflow, 0))
+        proposed = self.sizer.evaluate(self._max_overflow)
+        if proposed is not None:
+            self.set_max_overflow(proposed)
+
+    def set_max_overflow(self, max_overflow: int) -> None:
+        with self._overflow_lock:
+            previous, self._max_overflow = self._max_overflow, max_overflow
+        self.telemetry.resizes += 1
+        logger.info("Database pool overflow limit %d -> %d", previous, max_overflow)
+
+    def recreate(self) -> "MonitoredQueuePool":
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        pool.sizer = self.sizer
+        return pool
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_seconds": self.timeout(),
+        }
+        stats.update(self.telemetry.get_stats())
+        if self.sizer is not None:
+            stats["sizer"] = self.sizer.get_stats()
+        return stats
+
+
+def enable_sqlite_wal(engine: Engine) -> None:
+    """Apply ``SQLITE_PRAGMAS`` to every new connection of a file-backed SQLite engine."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -4,17 +4,36 @@ Database service layer for Healthcare AI Assistant.
 Provides high-level database operations with Redis caching.
 """
 
-import json
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from uuid import uuid4
 
-from sqlalchemy import select, desc, delete
+from sqlalchemy import and_, select, desc, delete, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .connection import get_db_session, get_redis_client
-from .models import AnalysisHistory, Document, OCRExtraction, UserSession, AuditLog, User
+from .analysis_facts import extract_analysis_facts
+from .models import (
+    AnalysisAlert,
+    AnalysisAnomaly,
+    AnalysisHistory,
+    AnalysisRiskScore,
+    AuditLog,
+    Document,
+    DocumentFHIRResources,
+    OCRExtraction,
+    User,
+    UserSession,
+)
+from backend.utils.cache_utils import (
+    batch_invalidate_cache,
+    get_cache_metrics,
+    get_versioned,
+    invalidate_patient_cache,
+    set_versioned,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -35,12 +54,13 @@ class DatabaseService:
         user_id: Optional[str] = None,
         correlation_id: Optional[str] = None,
     ) -> str:
-        """Save analysis to database."""
+        """Save analysis to database, with its alerts, risk scores and anomalies as fact rows."""
+        analysis_timestamp = datetime.now(timezone.utc)
         async with get_db_session() as session:
             analysis = AnalysisHistory(
                 id=str(uuid4()),
                 patient_id=patient_id,
-                analysis_timestamp=datetime.now(timezone.utc),
+                analysis_timestamp=analysis_timestamp,
                 analysis_data=analysis_data.get("analysis_data"),
                 risk_scores=analysis_data.get("risk_scores"),
                 alerts=analysis_data.get("alerts"),
@@ -49,19 +69,27 @@ class DatabaseService:
                 correlation_id=correlation_id,
             )
             session.add(analysis)
+            
+            facts = extract_analysis_facts(
+                analysis_data.get("analysis_data"),
+                risk_scores=analysis_data.get("risk_scores"),
+                alerts=analysis_data.get("alerts"),
+            )
+            keys = {
+                "analysis_id": analysis.id,
+                "patient_id": patient_id,
+                "analysis_timestamp": analysis_timestamp,
+            }
+            session.add_all(
+                [AnalysisAlert(**keys, **fact) for fact in facts.alerts]
+                + [AnalysisRiskScore(**keys, **fact) for fact in facts.risk_scores]
+                + [AnalysisAnomaly(**keys, **fact) for fact in facts.anomalies]
+            )
             await session.flush()
             analysis_id = analysis.id
             
-            # Invalidate cache (batch operation for efficiency)
-            if self.redis_client:
-                from backend.utils.cache_utils import batch_invalidate_cache
-                await batch_invalidate_cache(
-                    self.redis_client,
-                    [
-                        f"patient:analysis:{patient_id}:latest",
-                        f"patient:summary:{patient_id}",
-                    ]
-                )
+            # Invalidate every cached entry for the patient (O(1) version bump)
+            await invalidate_patient_cache(self.redis_client, patient_id)
             
             return analysis_id
     
@@ -74,15 +102,15 @@ class DatabaseService:
         Returns analysis in the same format as in-memory storage for compatibility.
         """
         # Try cache first
+        cache_key = f"patient:analysis:{patient_id}:latest"
+        cache_version = None
         if self.redis_client:
-            cached = await self.redis_client.get(f"patient:analysis:{patient_id}:latest")
+            cached, cache_version = await get_versioned(self.redis_client, patient_id, cache_key)
             if cached:
-                from backend.utils.cache_utils import get_cache_metrics
                 get_cache_metrics().record_hit()
-                return json.loads(cached)
+                return cached
         
         # Record cache miss
-        from backend.utils.cache_utils import get_cache_metrics
         get_cache_metrics().record_miss()
         
         # Query database
@@ -127,12 +155,15 @@ class DatabaseService:
                 "correlation_id": analysis.correlation_id or nested_analysis.get("correlation_id"),
             }
             
-            # Cache result
+            # Cache result under the version observed before the query
             if self.redis_client:
-                await self.redis_client.setex(
-                    f"patient:analysis:{patient_id}:latest",
+                await set_versioned(
+                    self.redis_client,
+                    patient_id,
+                    cache_key,
+                    data,
                     self.cache_ttl,
-                    json.dumps(data, default=str),
+                    version=cache_version,
                 )
                 logger.debug(f"Cached analysis for patient {patient_id}")
             
@@ -165,6 +196,139 @@ class DatabaseService:
                 for analysis in analyses
             ]
     
+    # ==================== Analysis Facts ====================
+    
+    async def get_recent_alerts(
+        self,
+        limit: int = 25,
+        patient_id: Optional[str] = None,
+        severities: Optional[Sequence[str]] = ("critical", "high"),
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Most recent alerts, newest first, filtered in SQL."""
+        query = select(AnalysisAlert).order_by(desc(AnalysisAlert.analysis_timestamp)).limit(limit)
+        if patient_id:
+            query = query.where(AnalysisAlert.patient_id == patient_id)
+        if severities:
+            query = query.where(AnalysisAlert.severity.in_(list(severities)))
+        if since:
+            query = query.where(AnalysisAlert.analysis_timestamp >= since)
+        
+        async with get_db_session() as session:
+            result = await session.execute(query)
+            return [
+                {
+                    "id": alert.id,
+                    "analysis_id": alert.analysis_id,
+                    "patient_id": alert.patient_id,
+                    "timestamp": alert.analysis_timestamp.isoformat(),
+                    "severity": alert.severity,
+                    "type": alert.alert_type,
+                    "title": alert.title,
+                    "message": alert.message,
+                    "rule_id": alert.rule_id,
+                    "patient_name": alert.patient_name,
+                    "raised_at": alert.raised_at,
+                }
+                for alert in result.scalars().all()
+            ]
+    
+    async def get_patients_with_alerts(
+        self,
+        severity: str = "critical",
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Patients with alerts of a severity (e.g. critical in the last 24h), most recent first."""
+        latest = func.max(AnalysisAlert.analysis_timestamp)
+        query = (
+            select(AnalysisAlert.patient_id, func.count().label("alert_count"), latest.label("latest"))
+            .where(AnalysisAlert.severity == severity)
+            .group_by(AnalysisAlert.patient_id)
+            .order_by(desc(latest))
+        )
+        if since:
+            query = query.where(AnalysisAlert.analysis_timestamp >= since)
+        
+        async with get_db_session() as session:
+            result = await session.execute(query)
+            return [
+                {
+                    "patient_id": row.patient_id,
+                    "alert_count": row.alert_count,
+                    "latest_alert_at": _isoformat(row.latest),
+                }
+                for row in result.all()
+            ]
+    
+    async def get_risk_score_trend(
+        self,
+        patient_id: str,
+        score_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Risk scores for a patient over time, oldest first."""
+        query = (
+            select(AnalysisRiskScore)
+            .where(AnalysisRiskScore.patient_id == patient_id)
+            .order_by(AnalysisRiskScore.analysis_timestamp, AnalysisRiskScore.score_name)
+        )
+        if score_name:
+            query = query.where(AnalysisRiskScore.score_name == score_name)
+        if since:
+            query = query.where(AnalysisRiskScore.analysis_timestamp >= since)
+        
+        async with get_db_session() as session:
+            result = await session.execute(query)
+            return [
+                {
+                    "timestamp": row.analysis_timestamp.isoformat(),
+                    "score_name": row.score_name,
+                    "score": row.score,
+                }
+                for row in result.scalars().all()
+            ]
+    
+    async def get_anomaly_timeline(
+        self,
+        patient_id: str,
+        since: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Anomalies for a patient grouped per analysis, oldest first."""
+        query = (
+            select(AnalysisAnomaly)
+            .where(AnalysisAnomaly.patient_id == patient_id)
+            .order_by(AnalysisAnomaly.analysis_timestamp, AnalysisAnomaly.analysis_id)
+        )
+        if since:
+            query = query.where(AnalysisAnomaly.analysis_timestamp >= since)
+        
+        timeline: List[Dict[str, Any]] = []
+        async with get_db_session() as session:
+            result = await session.execute(query)
+            for anomaly in result.scalars().all():
+                if not timeline or timeline[-1]["analysis_id"] != anomaly.analysis_id:
+                    timeline.append(
+                        {
+                            "analysis_id": anomaly.analysis_id,
+                            "timestamp": anomaly.analysis_timestamp.isoformat(),
+                            "anomaly_count": 0,
+                            "anomaly_type_counts": {},
+                            "anomalies": [],
+                        }
+                    )
+                point = timeline[-1]
+                point["anomaly_count"] += 1
+                counts = point["anomaly_type_counts"]
+                counts[anomaly.anomaly_type] = counts.get(anomaly.anomaly_type, 0) + 1
+                point["anomalies"].append(
+                    {
+                        "type": anomaly.anomaly_type,
+                        "score": anomaly.score if anomaly.score is not None else 0.0,
+                        "severity": anomaly.severity or "low",
+                    }
+                )
+        return timeline
+    
     async def cleanup_old_analyses(
         self,
         patient_id: Optional[str] = None,
@@ -180,6 +344,14 @@ class DatabaseService:
             if patient_id:
                 query = query.where(AnalysisHistory.patient_id == patient_id)
             
+            # Fact rows share the analysis timestamp; delete them explicitly since
+            # SQLite does not enforce ON DELETE CASCADE by default
+            for fact_model in (AnalysisAlert, AnalysisRiskScore, AnalysisAnomaly):
+                fact_query = delete(fact_model).where(fact_model.analysis_timestamp < cutoff)
+                if patient_id:
+                    fact_query = fact_query.where(fact_model.patient_id == patient_id)
+                await session.execute(fact_query)
+            
             result = await session.execute(query)
             await session.commit()
             return result.rowcount
@@ -196,10 +368,12 @@ class DatabaseService:
         if not self.redis_client:
             return
         
-        await self.redis_client.setex(
+        await set_versioned(
+            self.redis_client,
+            patient_id,
             f"patient:summary:{patient_id}",
+            summary,
             ttl,
-            json.dumps(summary, default=str),
         )
     
     async def get_cached_summary(
@@ -210,32 +384,27 @@ class DatabaseService:
         if not self.redis_client:
             return None
         
-        cached = await self.redis_client.get(f"patient:summary:{patient_id}")
+        cached, _ = await get_versioned(
+            self.redis_client, patient_id, f"patient:summary:{patient_id}"
+        )
         if cached:
-            from backend.utils.cache_utils import get_cache_metrics
             get_cache_metrics().record_hit()
-            return json.loads(cached)
+            return cached
         
         # Record cache miss
-        from backend.utils.cache_utils import get_cache_metrics
         get_cache_metrics().record_miss()
         return None
     
+    async def invalidate_patient_cache(self, patient_id: str) -> None:
+        """Invalidate all cached entries for one patient without touching other keys."""
+        await invalidate_patient_cache(self.redis_client, patient_id)
+    
     async def clear_cache(self, pattern: Optional[str] = None) -> int:
-        """Clear cache entries matching pattern."""
+        """Clear cache entries matching pattern (incremental SCAN + UNLINK)."""
         if not self.redis_client:
             return 0
         
-        if pattern:
-            keys = await self.redis_client.keys(pattern)
-            if keys:
-                return await self.redis_client.delete(*keys)
-        else:
-            # Clear all cache keys (be careful!)
-            keys = await self.redis_client.keys("patient:*")
-            if keys:
-                return await self.redis_client.delete(*keys)
-        return 0
+        return await batch_invalidate_cache(self.redis_client, [pattern or "patient:*"])
     
     # ==================== Audit Logging ====================
     
@@ -401,6 +570,21 @@ class DatabaseService:
             await session.flush()
             return extraction.id
     
+    async def save_document_fhir_resources(
+        self,
+        document_id: str,
+        patient_id: str,
+        resources: Dict[str, Any],
+        mapper_version: Optional[str] = None,
+    ) -> None:
+        """Store a document's mapped FHIR resources, replacing any earlier mapping."""
+        from backend.ocr.fhir_mapper import MAPPER_VERSION
+        
+        async with get_db_session() as session:
+            await self._replace_document_fhir_resources(
+                session, document_id, patient_id, resources, mapper_version or MAPPER_VERSION
+            )
+    
     async def get_ocr_fhir_resources_for_patient(
         self,
         patient_id: str,
@@ -408,60 +592,118 @@ class DatabaseService:
         """
         Get all FHIR resources extracted from OCR documents for a patient.
         
-        Converts parsed_data from documents to FHIR resources on-the-fly.
+        Resources are mapped once per document and mapper version, when OCR
+        finishes or the document is linked, and are read here with one indexed
+        query. Documents without a mapping for the current mapper version and
+        patient (older versions, documents processed before materialization)
+        are mapped now and stored.
         
         Returns a dictionary with keys: 'observations', 'medication_statements', 'conditions'
         containing lists of FHIR resources.
         """
+        from backend.ocr.fhir_mapper import MAPPER_VERSION
+        
         async with get_db_session() as session:
-            # Get all processed documents for this patient with parsed data
             result = await session.execute(
-                select(Document)
+                select(Document.id, DocumentFHIRResources.resources)
+                .outerjoin(
+                    DocumentFHIRResources,
+                    and_(
+                        DocumentFHIRResources.document_id == Document.id,
+                        DocumentFHIRResources.mapper_version == MAPPER_VERSION,
+                        DocumentFHIRResources.patient_id == Document.patient_id,
+                    ),
+                )
                 .where(Document.patient_id == patient_id)
                 .where(Document.extracted_data.isnot(None))
                 .order_by(desc(Document.processed_at))
             )
-            documents = result.scalars().all()
-            
-            if not documents:
-                return {
-                    "observations": [],
-                    "medication_statements": [],
-                    "conditions": [],
-                }
-            
-            # Import FHIR mapper to convert parsed_data to FHIR
-            from backend.ocr.fhir_mapper import FHIRMapper
-            fhir_mapper = FHIRMapper()
+            rows = result.all()
             
-            # Collect FHIR resources from all documents
-            observations = []
-            medication_statements = []
-            conditions = []
+            missing = [document_id for document_id, resources in rows if resources is None]
+            if missing:
+                mapped = await self._map_document_fhir_resources(session, missing, patient_id)
+                rows = [
+                    (document_id, resources if resources is not None else mapped.get(document_id))
+                    for document_id, resources in rows
+                ]
             
-            for doc in documents:
-                extracted_data = doc.extracted_data or {}
-                
-                # Convert parsed_data to FHIR resources
-                try:
-                    fhir_resources = fhir_mapper.map_parsed_data_to_fhir(
-                        parsed_data=extracted_data,
-                        patient_id=patient_id,
-                        document_id=doc.id,
-                    )
-                    
-                    observations.extend(fhir_resources.get("observations", []))
-                    medication_statements.extend(fhir_resources.get("medication_statements", []))
-                    conditions.extend(fhir_resources.get("conditions", []))
-                except Exception as e:
-                    logger.warning(
-                        "Failed to convert OCR data to FHIR for document %s: %s", doc.id, str(e)
-                    )
-                    continue
-            
-            return {
-                "observations": observations,
-                "medication_statements": medication_statements,
-                "conditions": conditions,
+            combined: Dict[str, List[Dict[str, Any]]] = {
+                "observations": [],
+                "medication_statements": [],
+                "conditions": [],
             }
+            for _, resources in rows:
+                for key, items in combined.items():
+                    items.extend((resources or {}).get(key) or [])
+            return combined
+    
+    async def _map_document_fhir_resources(
+        self,
+        session: AsyncSession,
+        document_ids: List[str],
+        patient_id: str,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Map and store resources for documents lacking a current mapping."""
+        from backend.ocr.fhir_mapper import FHIRMapper, MAPPER_VERSION
+        
+        result = await session.execute(
+            select(Document.id, Document.extracted_data).where(Document.id.in_(document_ids))
+        )
+        fhir_mapper = FHIRMapper()
+        
+        mapped = {}
+        for document_id, extracted_data in result.all():
+            try:
+                resources = fhir_mapper.map_parsed_data_to_fhir(
+                    parsed_data=extracted_data or {},
+                    patient_id=patient_id,
+                    document_id=document_id,
+                )
+            except Exception as e:
+                logger.warning(
+                    "Failed to convert OCR data to FHIR for document %s: %s", document_id, str(e)
+                )
+                continue
+            try:
+                async with session.begin_nested():
+                    await self._replace_document_fhir_resources(
+                        session, document_id, patient_id, resources, MAPPER_VERSION
+                    )
+            except IntegrityError:
+                # A concurrent reader stored the same mapping first
+                logger.debug("FHIR resources for document %s already stored", document_id)
+            mapped[document_id] = resources
+        
+        logger.info("Mapped OCR FHIR resources for %d document(s) of patient %s", len(mapped), patient_id)
+        return mapped
+    
+    @staticmethod
+    async def _replace_document_fhir_resources(
+        session: AsyncSession,
+        document_id: str,
+        patient_id: str,
+        resources: Dict[str, Any],
+        mapper_version: str,
+    ) -> None:
+        # One mapping per document: older versions and other patients' mappings are dropped
+        await session.execute(
+            delete(DocumentFHIRResources).where(DocumentFHIRResources.document_id == document_id)
+        )
+        session.add(
+            DocumentFHIRResources(
+                id=str(uuid4()),
+                document_id=document_id,
+                patient_id=patient_id,
+                mapper_version=mapper_version,
+                resources=resources,
+            )
+        )
+        await session.flush()
+
 
+def _isoformat(value: Any) -> Optional[str]:
+    # Aggregates over DateTime columns come back as strings on SQLite
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, datetime) else str(value)
@@ -13,6 +13,7 @@ from .deps import (
     get_optional_audit_service,
     get_optional_rag_fusion,
     get_optional_s_lora_manager,
+    get_optional_patient_analyzer,
     get_notifier,
     get_patient_analyzer,
     get_patient_summary_cache,
@@ -26,6 +27,7 @@ __all__ = [
     "get_database_service",
     "get_fhir_connector",
     "get_patient_analyzer",
+    "get_optional_patient_analyzer",
     "get_llm_engine",
     "get_optional_llm_engine",
     "get_rag_fusion",
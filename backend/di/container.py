@@ -7,10 +7,12 @@ from backend.audit_service import AuditService
 from backend.fhir_http_client import FhirHttpClient
 from backend.fhir_resource_service import FhirResourceService
 from backend.llm_engine import LLMEngine
+from backend.llm.providers import close_shared_llm_http_client
 from backend.rag_fusion import RAGFusion
 from backend.s_lora_manager import SLoRAManager
 from backend.mlc_learning import MLCLearning
 from backend.aot_reasoner import AoTReasoner
+from backend.explainability import load_explainer
 from backend.notifier import Notifier
 from backend.patient_analyzer import PatientAnalyzer
 from backend.analysis_cache import AnalysisJobManager
@@ -108,6 +110,14 @@ class ServiceContainer:
         logger.info("Loading Notifier...")
         self.notifier = Notifier()
 
+        logger.info("Loading baseline risk explainer...")
+        await asyncio.to_thread(
+            load_explainer,
+            model_path=os.getenv(
+                "EXPLAINABILITY_MODEL_PATH", "./models/explainability/baseline_risk.npz"
+            ),
+        )
+
         logger.info("Initializing Patient Analyzer...")
         self.patient_analyzer = PatientAnalyzer(
             fhir_connector=self.fhir_connector,
@@ -152,4 +162,11 @@ class ServiceContainer:
                 await self.fhir_client.session.aclose()
             self.fhir_client.session = None
 
+        if self.llm_engine:
+            await self.llm_engine.aclose()
+        await close_shared_llm_http_client()
+
+        if self.mlc_learning:
+            await self.mlc_learning.aclose()
+
         await close_shared_async_client()
@@ -43,6 +43,15 @@ def get_patient_analyzer(
     return analyzer
 
 
+def get_optional_patient_analyzer(request: Request) -> Optional[PatientAnalyzer]:
+    """Return the patient analyzer if available without raising."""
+
+    container = getattr(request.app.state, "container", None)
+    if not container:
+        return None
+    return container.patient_analyzer
+
+
 def get_llm_engine(container: ServiceContainer = Depends(get_container)) -> LLMEngine:
     engine = container.llm_engine
     if engine is None:
@@ -189,6 +189,10 @@ class DocumentService:
             },
         )
         
+        # Map to FHIR once, so patient analyses read stored resources
+        if document.get("patient_id"):
+            await self._try_materialize_fhir_resources(document_id, document["patient_id"], parsed_data)
+        
         logger.info(
             "OCR processing complete for document %s (confidence: %.2f%%)",
             document_id,
@@ -225,6 +229,11 @@ class DocumentService:
             {"patient_id": patient_id},
         )
         
+        # Resources reference the patient, so map (or re-map) for the new link
+        document = await self.database_service.get_document(document_id)
+        if document and document.get("extracted_data"):
+            await self._try_materialize_fhir_resources(document_id, patient_id, document["extracted_data"])
+        
         logger.info("Document %s linked to patient %s", document_id, patient_id)
         
         return {
@@ -268,11 +277,7 @@ class DocumentService:
             raise ValueError("Document has not been processed with OCR yet")
         
         # Convert to FHIR
-        fhir_resources = self.fhir_mapper.map_parsed_data_to_fhir(
-            parsed_data=parsed_data,
-            patient_id=patient_id,
-            document_id=document_id,
-        )
+        fhir_resources = await self._materialize_fhir_resources(document_id, patient_id, parsed_data)
         
         # Update document with FHIR resource IDs
         fhir_resource_ids = {
@@ -300,6 +305,45 @@ class DocumentService:
             "resource_ids": fhir_resource_ids,
         }
     
+    async def _materialize_fhir_resources(
+        self,
+        document_id: str,
+        patient_id: str,
+        parsed_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Map parsed data to FHIR resources and store them under the mapper version."""
+        fhir_resources = self.fhir_mapper.map_parsed_data_to_fhir(
+            parsed_data=parsed_data,
+            patient_id=patient_id,
+            document_id=document_id,
+        )
+        await self.database_service.save_document_fhir_resources(
+            document_id,
+            patient_id,
+            fhir_resources,
+            mapper_version=self.fhir_mapper.version,
+        )
+        return fhir_resources
+    
+    async def _try_materialize_fhir_resources(
+        self,
+        document_id: str,
+        patient_id: str,
+        parsed_data: Dict[str, Any],
+    ) -> None:
+        """
+        Materialize resources without failing the caller.
+        
+        The OCR result or patient link is already saved, and patient reads
+        map documents that have no stored mapping.
+        """
+        try:
+            await self._materialize_fhir_resources(document_id, patient_id, parsed_data)
+        except Exception as e:
+            logger.warning(
+                "Failed to store FHIR resources for document %s: %s", document_id, str(e)
+            )
+    
     async def _prepare_image(self, file_path: str) -> str:
         """
         Convert file to image if needed (PDF -> image).
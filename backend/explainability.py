@@ -4,24 +4,30 @@ The module extracts structured features from normalized FHIR data, trains a
 lightweight baseline model on synthetic samples, and surfaces SHAP values for
 per-patient explanations. The synthetic dataset keeps the workflow
 demonstrative while avoiding coupling to clinical data.
+
+For a linear model, SHAP values (interventional, log-odds space) are
+``coef * (x - mean(background))``, so explanations for any number of patients
+are one matrix expression. The fitted coefficients and background mean are
+persisted to disk and loaded at startup, and explanations are cached per
+feature vector.
 """
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
 from datetime import date
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-import shap
 from sklearn.linear_model import LogisticRegression
 
-FeatureVector = Tuple[np.ndarray, List[str]]
-
+logger = logging.getLogger(__name__)
 
-_BASELINE_MODEL: LogisticRegression | None = None
-_MODEL_FEATURES: List[str] | None = None
-_BACKGROUND: np.ndarray | None = None
-_EXPLAINER: shap.Explainer | None = None
+FeatureVector = Tuple[np.ndarray, List[str]]
 
 
 def _calculate_age(birth_date: Any) -> int:
@@ -109,75 +115,192 @@ def _generate_synthetic_dataset(feature_names: List[str], n_samples: int = 400)
     """Generate a synthetic dataset aligned with the expected feature order."""
 
     rng = np.random.default_rng(seed=42)
-    X = np.zeros((n_samples, len(feature_names)), dtype=float)
-    y = np.zeros(n_samples, dtype=int)
-
-    for idx in range(n_samples):
-        age = rng.integers(20, 90)
-        num_conditions = max(rng.poisson(2), 0)
-        num_medications = max(rng.poisson(5), 0)
-        num_observations = max(rng.poisson(10), 0)
-        num_encounters = max(rng.poisson(3), 0)
-
-        has_diabetes = rng.random() < 0.25
-        has_hypertension = rng.random() < 0.35
-        has_smoking_history = rng.random() < 0.2
-
-        feature_row = {
-            "age": float(age),
-            "number_of_conditions": float(num_conditions),
-            "number_of_medications": float(num_medications),
-            "number_of_observations": float(num_observations),
-            "number_of_encounters": float(num_encounters),
-            "has_diabetes": float(has_diabetes),
-            "has_hypertension": float(has_hypertension),
-            "has_smoking_history": float(has_smoking_history),
-        }
-
-        logit = (
-            0.03 * age
-            + 0.06 * num_conditions
-            + 0.05 * num_medications
-            + 0.04 * num_observations
-            + 0.05 * num_encounters
-            + (0.6 if has_diabetes else 0.0)
-            + (0.5 if has_hypertension else 0.0)
-            + (0.4 if has_smoking_history else 0.0)
-            - 6.0
-        )
-
-        prob = 1.0 / (1.0 + np.exp(-logit))
-        label = rng.binomial(1, prob)
-
-        X[idx] = [feature_row[name] for name in feature_names]
-        y[idx] = label
-
-    return X, y
-
-
-def _ensure_model(feature_names: List[str]) -> Tuple[LogisticRegression, shap.Explainer, np.ndarray]:
-    """Train or return a cached baseline model and SHAP explainer."""
+    columns = {
+        "age": rng.integers(20, 90, size=n_samples).astype(float),
+        "number_of_conditions": rng.poisson(2, size=n_samples).astype(float),
+        "number_of_medications": rng.poisson(5, size=n_samples).astype(float),
+        "number_of_observations": rng.poisson(10, size=n_samples).astype(float),
+        "number_of_encounters": rng.poisson(3, size=n_samples).astype(float),
+        "has_diabetes": (rng.random(n_samples) < 0.25).astype(float),
+        "has_hypertension": (rng.random(n_samples) < 0.35).astype(float),
+        "has_smoking_history": (rng.random(n_samples) < 0.2).astype(float),
+    }
 
-    global _BASELINE_MODEL, _MODEL_FEATURES, _BACKGROUND, _EXPLAINER
+    logit = (
+        0.03 * columns["age"]
+        + 0.06 * columns["number_of_conditions"]
+        + 0.05 * columns["number_of_medications"]
+        + 0.04 * columns["number_of_observations"]
+        + 0.05 * columns["number_of_encounters"]
+        + 0.6 * columns["has_diabetes"]
+        + 0.5 * columns["has_hypertension"]
+        + 0.4 * columns["has_smoking_history"]
+        - 6.0
+    )
+    prob = 1.0 / (1.0 + np.exp(-logit))
+    y = rng.binomial(1, prob).astype(int)
 
-    if _BASELINE_MODEL is not None and _MODEL_FEATURES == feature_names:
-        assert _EXPLAINER is not None
-        assert _BACKGROUND is not None
-        return _BASELINE_MODEL, _EXPLAINER, _BACKGROUND
+    X = np.column_stack([columns[name] for name in feature_names])
+    return X, y
 
-    X, y = _generate_synthetic_dataset(feature_names)
-    model = LogisticRegression(max_iter=500)
-    model.fit(X, y)
 
-    background = X[: min(len(X), 50)]
-    explainer = shap.Explainer(model, background, feature_names=feature_names)
+class BaselineRiskExplainer:
+    """Logistic-regression risk model with closed-form linear SHAP explanations."""
+
+    model_type = "logistic_regression"
+
+    def __init__(
+        self,
+        feature_names: Sequence[str],
+        coef: np.ndarray,
+        intercept: float,
+        background_mean: np.ndarray,
+    ) -> None:
+        self.feature_names = list(feature_names)
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = float(intercept)
+        self.background_mean = np.asarray(background_mean, dtype=float)
+        self.base_value = float(self.intercept + self.coef @ self.background_mean)
+
+    @classmethod
+    def train(cls, feature_names: Sequence[str]) -> "BaselineRiskExplainer":
+        """Fit the baseline model on the synthetic dataset"""
+
+        X, y = _generate_synthetic_dataset(list(feature_names))
+        model = LogisticRegression(max_iter=500)
+        model.fit(X, y)
+
+        background = X[: min(len(X), 50)]
+        return cls(feature_names, model.coef_[0], model.intercept_[0], background.mean(axis=0))
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """SHAP values and positive-class probabilities for each row of ``X``"""
+
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        shap_values = (X - self.background_mean) * self.coef
+        probabilities = 1.0 / (1.0 + np.exp(-(X @ self.coef + self.intercept)))
+        return shap_values, probabilities
+
+    def save(self, path: str) -> None:
+        """Persist the fitted parameters (no pickling)"""
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as handle:
+            np.savez(
+                handle,
+                feature_names=np.array(self.feature_names),
+                coef=self.coef,
+                intercept=np.array(self.intercept),
+                background_mean=self.background_mean,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BaselineRiskExplainer":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                [str(name) for name in data["feature_names"]],
+                data["coef"],
+                float(data["intercept"]),
+                data["background_mean"],
+            )
+
+
+_EXPLAINER: Optional[BaselineRiskExplainer] = None
+_EXPLAINER_LOCK = threading.Lock()
+_EXPLANATION_CACHE: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+_CACHE_SIZE = int(os.getenv("EXPLAINABILITY_CACHE_SIZE", "4096"))
+
+
+def load_explainer(
+    feature_names: Optional[List[str]] = None, model_path: Optional[str] = None
+) -> BaselineRiskExplainer:
+    """Load the persisted baseline model, training and saving it if needed.
+
+    Called at application startup; later calls return the loaded instance.
+    Without a ``model_path`` the model is trained in memory only.
+    """
 
-    _BASELINE_MODEL = model
-    _MODEL_FEATURES = list(feature_names)
-    _BACKGROUND = background
-    _EXPLAINER = explainer
+    global _EXPLAINER
+
+    if feature_names is None:
+        feature_names = extract_features({})[1]
+
+    with _EXPLAINER_LOCK:
+        if _EXPLAINER is not None and _EXPLAINER.feature_names == feature_names:
+            return _EXPLAINER
+
+        explainer: Optional[BaselineRiskExplainer] = None
+        if model_path and os.path.exists(model_path):
+            try:
+                explainer = BaselineRiskExplainer.load(model_path)
+                if explainer.feature_names != feature_names:
+                    logger.info("Persisted risk model has different features; retraining")
+                    explainer = None
+            except (OSError, KeyError, ValueError) as exc:
+                logger.warning("Could not load risk model from %s: %s", model_path, exc)
+                explainer = None
+
+        if explainer is None:
+            explainer = BaselineRiskExplainer.train(feature_names)
+            if model_path:
+                try:
+                    explainer.save(model_path)
+                    logger.info("Saved baseline risk model to %s", model_path)
+                except OSError as exc:
+                    logger.warning("Could not save risk model to %s: %s", model_path, exc)
+
+        _EXPLAINER = explainer
+        _EXPLANATION_CACHE.clear()
+        return explainer
+
+
+def explain_risk_batch(patient_analyses: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Compute SHAP explanations for many patients in one vectorized pass.
+
+    Explanations are cached per feature vector, so unchanged patients and
+    patients with identical features are not recomputed.
+    """
 
-    return model, explainer, background
+    if not patient_analyses:
+        return []
+
+    extracted = [extract_features(analysis) for analysis in patient_analyses]
+    feature_names = extracted[0][1]
+    explainer = load_explainer(feature_names)
+
+    results: List[Optional[Dict[str, Any]]] = []
+    misses: Dict[bytes, List[int]] = {}
+    for index, (features, _names) in enumerate(extracted):
+        key = hashlib.blake2b(features.tobytes(), digest_size=16).digest()
+        cached = _EXPLANATION_CACHE.get(key)
+        if cached is not None:
+            _EXPLANATION_CACHE.move_to_end(key)
+            results.append(dict(cached))
+        else:
+            results.append(None)
+            misses.setdefault(key, []).append(index)
+
+    if misses:
+        keys = list(misses)
+        X = np.stack([extracted[misses[key][0]][0] for key in keys])
+        shap_values, probabilities = explainer.explain(X)
+        for row, key in enumerate(keys):
+            explanation = {
+                "feature_names": list(feature_names),
+                "shap_values": shap_values[row].tolist(),
+                "base_value": explainer.base_value,
+                "risk_score": float(probabilities[row]),
+                "model_type": explainer.model_type,
+            }
+            _EXPLANATION_CACHE[key] = explanation
+            for index in misses[key]:
+                results[index] = dict(explanation)
+        while len(_EXPLANATION_CACHE) > _CACHE_SIZE:
+            _EXPLANATION_CACHE.popitem(last=False)
+
+    return results  # type: ignore[return-value]
 
 
 def explain_risk(patient_analysis: Dict[str, Any]) -> Dict[str, Any]:
@@ -187,21 +310,7 @@ def explain_risk(patient_analysis: Dict[str, Any]) -> Dict[str, Any]:
     value, and the model's predicted probability for the positive class.
     """
 
-    features, feature_names = extract_features(patient_analysis)
-    model, explainer, _background = _ensure_model(feature_names)
-
-    shap_result = explainer(np.array([features]))
-    contributions = [float(value) for value in shap_result.values[0]]
-    base_value = float(shap_result.base_values[0])
-    risk_score = float(model.predict_proba([features])[0][1])
-
-    return {
-        "feature_names": feature_names,
-        "shap_values": contributions,
-        "base_value": base_value,
-        "risk_score": risk_score,
-        "model_type": "logistic_regression",
-    }
+    return explain_risk_batch([patient_analysis])[0]
 
 
 def compute_risk_shap(patient_data: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
@@ -212,4 +321,11 @@ def compute_risk_shap(patient_data: Dict[str, Any]) -> Dict[str, Dict[str, float
     return {"baseline_risk": shap_mapping}
 
 
-__all__ = ["extract_features", "explain_risk", "compute_risk_shap"]
+__all__ = [
+    "BaselineRiskExplainer",
+    "extract_features",
+    "explain_risk",
+    "explain_risk_batch",
+    "compute_risk_shap",
+    "load_explainer",
+]
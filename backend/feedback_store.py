@@ -0,0 +1,251 @@
+"""
+Feedback Store
+Durable, append-only log of clinician feedback for MLC learning.
+
+Events are buffered and written in batches to JSON Lines segment files by a
+single background writer thread, so the request path never blocks on disk.
+Compaction periodically folds sealed segments into a snapshot of the learned
+state; startup replay then reads one snapshot plus the few segments written
+since, streaming them line by line instead of loading the full history.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = "snapshot.json"
+_SEGMENT_RE = re.compile(r"^segment-(\d+)\.jsonl$")
+
+
+class FeedbackStore:
+    """
+    Append-only segment log with batched writes, compaction and streaming replay.
+
+    Usage:
+        store = FeedbackStore("./data/feedback", snapshot_provider=learner.export_state)
+        snapshot = store.load_snapshot()      # learned state as of last compaction
+        for event in store.replay():          # events recorded since then
+            learner.apply(event)
+        store.append(event)                   # buffered, written in batches
+        await store.close()                   # flush on shutdown
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        segment_max_bytes: Optional[int] = None,
+        compact_after_segments: Optional[int] = None,
+        snapshot_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Initialize the feedback store
+
+        Args:
+            directory: Directory holding segment files and the snapshot
+            batch_size: Buffered events that trigger an immediate write
+            flush_interval_seconds: Maximum time an event waits in the buffer
+            segment_max_bytes: Size at which the active segment is sealed
+            compact_after_segments: Sealed segments that trigger compaction
+            snapshot_provider: Returns the learned state to store when compacting
+        """
+        self.directory = directory
+        self.batch_size = batch_size or int(os.getenv("MLC_FEEDBACK_BATCH_SIZE", "50"))
+        self.flush_interval_seconds = flush_interval_seconds or float(
+            os.getenv("MLC_FEEDBACK_FLUSH_INTERVAL_SECONDS", "1.0")
+        )
+        self.segment_max_bytes = segment_max_bytes or int(
+            os.getenv("MLC_FEEDBACK_SEGMENT_MAX_BYTES", str(4 * 1024 * 1024))
+        )
+        self.compact_after_segments = compact_after_segments or int(
+            os.getenv("MLC_FEEDBACK_COMPACT_AFTER_SEGMENTS", "8")
+        )
+        self.snapshot_provider = snapshot_provider
+
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.load_snapshot()
+        segments = self._segments()
+        self._through_segment = snapshot.get("through_segment", 0) if snapshot else 0
+        self._segment_index = max(
+            [index for index, _ in segments] + [self._through_segment + 1]
+        )
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # One writer thread keeps batches, seals and compactions in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feedback-store")
+        self.stats = {
+            "appended": 0,
+            "written": 0,
+            "flushes": 0,
+            "compactions": 0,
+            "replayed": 0,
+            "write_errors": 0,
+        }
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"segment-{index:06d}.jsonl")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def load_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Snapshot written by the last compaction, if any"""
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as exc:
+            logger.error("Unreadable feedback snapshot %s: %s", self.snapshot_path, exc)
+            return None
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Stream events recorded after the snapshot, oldest first"""
+        for index, path in self._segments():
+            if index <= self._through_segment:
+                continue
+            with open(path, "r", encoding="utf-8") as handle:
+                for line_number, line in enumerate(handle, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # A crash mid-write can leave a truncated final line
+                        logger.warning("Skipping corrupt feedback record %s:%d", path, line_number)
+                        continue
+                    self.stats["replayed"] += 1
+                    yield event
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Buffer an event; it is written with the next batch"""
+        self._buffer.append(event)
+        self.stats["appended"] += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, sync callers): write batches inline
+            if len(self._buffer) >= self.batch_size:
+                self._executor.submit(self._write_batch, self._take_buffer()).result()
+            return
+
+        if len(self._buffer) >= self.batch_size:
+            loop.create_task(self.flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                self.flush_interval_seconds, lambda: loop.create_task(self.flush())
+            )
+
+    def _take_buffer(self) -> List[Dict[str, Any]]:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    async def flush(self) -> None:
+        """Write buffered events, compacting when enough segments are sealed"""
+        batch = self._take_buffer()
+        loop = asyncio.get_running_loop()
+        if batch:
+            await loop.run_in_executor(self._executor, self._write_batch, batch)
+
+        sealed = self._segment_index - self._through_segment - 1
+        if self.snapshot_provider is not None and sealed >= self.compact_after_segments:
+            await self.compact()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        path = self._segment_path(self._segment_index)
+        try:
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+                self._segment_index += 1
+                path = self._segment_path(self._segment_index)
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write("".join(json.dumps(event, default=str) + "\n" for event in batch))
+            self.stats["written"] += len(batch)
+            self.stats["flushes"] += 1
+        except OSError as exc:
+            self.stats["write_errors"] += 1
+            logger.error("Failed to write %d feedback events to %s: %s", len(batch), path, exc)
+
+    async def compact(self) -> None:
+        """
+        Replace all written segments with a snapshot of the learned state.
+
+        The buffer and the state are captured together without yielding to the
+        event loop, so the snapshot covers exactly the events in sealed segments.
+        """
+        if self.snapshot_provider is None:
+            return
+        batch = self._take_buffer()
+        state = self.snapshot_provider()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._write_snapshot, batch, state)
+
+    def _write_snapshot(self, batch: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        if batch:
+            self._write_batch(batch)
+        through = self._segment_index
+        snapshot = {
+            "version": 1,
+            "through_segment": through,
+            "created_at": datetime.now().isoformat(),
+            "state": state,
+        }
+        temporary = self.snapshot_path + ".tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as handle:
+                json.dump(snapshot, handle, default=str)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, self.snapshot_path)
+        except OSError as exc:
+            self.stats["write_errors"] += 1
+            logger.error("Failed to write feedback snapshot: %s", exc)
+            return
+
+        self._through_segment = through
+        self._segment_index = through + 1
+        for index, path in self._segments():
+            if index <= through:
+                try:
+                    os.remove(path)
+                except OSError as exc:
+                    logger.warning("Failed to remove compacted segment %s: %s", path, exc)
+        self.stats["compactions"] += 1
+        logger.info("Compacted feedback log through segment %d", through)
+
+    async def close(self) -> None:
+        """Flush buffered events and stop the writer thread"""
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get feedback store statistics"""
+        return {
+            **self.stats,
+            "buffered": len(self._buffer),
+            "active_segment": self._segment_index,
+            "snapshot_through_segment": self._through_segment,
+        }
@@ -0,0 +1,25 @@
+"""
+LLM provider and support module.
+"""
+
+from .providers import (
+    AnthropicProvider,
+    LLMProvider,
+    LLMProviderError,
+    MockLLMProvider,
+    OpenAIProvider,
+    close_shared_llm_http_client,
+    create_provider,
+    get_shared_llm_http_client,
+)
+
+__all__ = [
+    'AnthropicProvider',
+    'LLMProvider',
+    'LLMProviderError',
+    'MockLLMProvider',
+    'OpenAIProvider',
+    'close_shared_llm_http_client',
+    'create_provider',
+    'get_shared_llm_http_client',
+]
@@ -0,0 +1,362 @@
+"""
+LLM Provider Layer
+Native async clients for the LLM backends used by ``LLMEngine``.
+
+All external providers share one pooled ``httpx.AsyncClient`` so TLS
+connections are reused across calls, and every provider enforces its own
+concurrency limit and timeout so a slow backend cannot starve the event loop.
+"""
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+_shared_llm_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_llm_http_client() -> httpx.AsyncClient:
+    """Return the pooled ``httpx.AsyncClient`` shared by all LLM providers."""
+
+    global _shared_llm_http_client
+    if _shared_llm_http_client is None or _shared_llm_http_client.is_closed:
+        _shared_llm_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(float(os.getenv("LLM_TIMEOUT_SECONDS", "30")), connect=5.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _shared_llm_http_client
+
+
+async def close_shared_llm_http_client() -> None:
+    """Close the shared LLM ``httpx.AsyncClient`` if it was created."""
+
+    global _shared_llm_http_client
+    if _shared_llm_http_client and not _shared_llm_http_client.is_closed:
+        await _shared_llm_http_client.aclose()
+    _shared_llm_http_client = None
+
+
+class LLMProviderError(Exception):
+    """Raised when a provider call fails or exceeds its timeout."""
+
+    def __init__(self, message: str, *, provider: str = "") -> None:
+        super().__init__(message)
+        self.message = message
+        self.provider = provider
+
+
+class LLMProvider(ABC):
+    """
+    Base class for async LLM providers.
+
+    Subclasses implement ``_complete`` and ``_stream``; the public
+    ``complete`` and ``stream`` methods add the concurrency limit and timeout.
+    """
+
+    name: str = "base"
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        max_concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        temperature: float = 0.2,  # Lower for medical accuracy
+        max_tokens: int = 2000,
+    ) -> None:
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency or int(
+            os.getenv(f"LLM_{self.name.upper()}_MAX_CONCURRENCY", os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        )
+        self.timeout_seconds = timeout_seconds or float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"calls": 0, "streams": 0, "timeouts": 0, "errors": 0, "in_flight": 0}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Return the concurrency semaphore bound to the running event loop."""
+
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def complete(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        """
+        Run a single completion.
+
+        Returns:
+            Dict with ``content``, ``usage`` (prompt/completion tokens) and ``confidence``
+        """
+        async with self._get_semaphore():
+            self.stats["calls"] += 1
+            self.stats["in_flight"] += 1
+            try:
+                return await asyncio.wait_for(
+                    self._complete(system_prompt, user_prompt),
+                    timeout=self.timeout_seconds,
+                )
+            except asyncio.TimeoutError as exc:
+                self.stats["timeouts"] += 1
+                raise LLMProviderError(
+                    f"{self.name} call timed out after {self.timeout_seconds}s",
+                    provider=self.name,
+                ) from exc
+            except LLMProviderError:
+                self.stats["errors"] += 1
+                raise
+            except Exception as exc:
+                self.stats["errors"] += 1
+                raise LLMProviderError(str(exc), provider=self.name) from exc
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """
+        Stream completion text as it is generated.
+
+        The timeout applies to the wait for each chunk rather than the whole
+        response, so long answers are not cut off while tokens keep arriving.
+        """
+        async with self._get_semaphore():
+            self.stats["streams"] += 1
+            self.stats["in_flight"] += 1
+            iterator = self._stream(system_prompt, user_prompt).__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            iterator.__anext__(), timeout=self.timeout_seconds
+                        )
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError as exc:
+                        self.stats["timeouts"] += 1
+                        raise LLMProviderError(
+                            f"{self.name} stream stalled for {self.timeout_seconds}s",
+                            provider=self.name,
+                        ) from exc
+                    if chunk:
+                        yield chunk
+            finally:
+                self.stats["in_flight"] -= 1
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+
+    @abstractmethod
+    async def _complete(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        """Provider-specific completion call."""
+
+    @abstractmethod
+    def _stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """Provider-specific streaming call."""
+
+    async def aclose(self) -> None:
+        """Release provider resources (the shared HTTP client is closed separately)."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get provider call statistics"""
+        return {
+            "provider": self.name,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            **self.stats,
+        }
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions via ``openai.AsyncOpenAI``."""
+
+    name = "openai"
+
+    def __init__(self, model_name: str, api_key: str = "", **kwargs: Any) -> None:
+        super().__init__(model_name, **kwargs)
+        self.api_key = api_key
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(
+                api_key=self.api_key or os.getenv("OPENAI_API_KEY", ""),
+                http_client=get_shared_llm_http_client(),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            )
+        return self._client
+
+    def _messages(self, system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    async def _complete(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        response = await self._get_client().chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(system_prompt, user_prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=0.95,
+        )
+        return {
+            "content": response.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens,
+            },
+            "confidence": 0.95,
+        }
+
+    async def _stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        stream = await self._get_client().chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(system_prompt, user_prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=0.95,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic messages API via ``anthropic.AsyncAnthropic``."""
+
+    name = "anthropic"
+
+    def __init__(self, model_name: str, api_key: str = "", **kwargs: Any) -> None:
+        super().__init__(model_name, **kwargs)
+        self.api_key = api_key
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from anthropic import AsyncAnthropic
+
+            self._client = AsyncAnthropic(
+                api_key=self.api_key or os.getenv("ANTHROPIC_API_KEY", ""),
+                http_client=get_shared_llm_http_client(),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            )
+        return self._client
+
+    async def _complete(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        response = await self._get_client().messages.create(
+            model=self.model_name,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": user_prompt}],
+            system=system_prompt,
+        )
+        return {
+            "content": response.content[0].text,
+            "usage": {
+                "prompt_tokens": response.usage.input_tokens,
+                "completion_tokens": response.usage.output_tokens,
+            },
+            "confidence": 0.95,
+        }
+
+    async def _stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        stream = await self._get_client().messages.create(
+            model=self.model_name,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            messages=[{"role": "user", "content": user_prompt}],
+            system=system_prompt,
+            stream=True,
+        )
+        async for event in stream:
+            if getattr(event, "type", None) == "content_block_delta":
+                text = getattr(event.delta, "text", None)
+                if text:
+                    yield text
+
+
+class MockLLMProvider(LLMProvider):
+    """
+    Local provider returning canned text without any network access.
+
+    Used for local models until a runtime is wired in, when an SDK is not
+    installed, and in tests (set ``LLM_MODEL=mock``).
+    """
+
+    name = "mock"
+
+    DEFAULT_RESPONSE = "This is a demo response. Please configure a proper LLM provider."
+
+    def __init__(
+        self,
+        model_name: str = "mock",
+        *,
+        response: Optional[str] = None,
+        latency_seconds: float = 0.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(model_name, **kwargs)
+        self.response = response or self.DEFAULT_RESPONSE
+        self.latency_seconds = latency_seconds
+        self.calls: List[Dict[str, str]] = []
+
+    async def _complete(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        self.calls.append({"system_prompt": system_prompt, "user_prompt": user_prompt})
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return {
+            "content": self.response,
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+            "confidence": 0.5,
+        }
+
+    async def _stream(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        self.calls.append({"system_prompt": system_prompt, "user_prompt": user_prompt})
+        words = self.response.split(" ")
+        for index, word in enumerate(words):
+            if self.latency_seconds:
+                await asyncio.sleep(self.latency_seconds / max(len(words), 1))
+            yield word if index == 0 else f" {word}"
+
+
+def create_provider(provider: str, model_name: str, api_key: str = "", **kwargs: Any) -> LLMProvider:
+    """
+    Build the provider for a detected provider name.
+
+    Falls back to ``MockLLMProvider`` when the provider SDK is not installed
+    or the provider runs locally.
+    """
+    if provider == "openai":
+        try:
+            import openai  # noqa: F401
+
+            return OpenAIProvider(model_name, api_key=api_key, **kwargs)
+        except ImportError:
+            logger.warning("OpenAI library not installed")
+    elif provider == "anthropic":
+        try:
+            import anthropic  # noqa: F401
+
+            return AnthropicProvider(model_name, api_key=api_key, **kwargs)
+        except ImportError:
+            logger.warning("Anthropic library not installed")
+    elif provider == "local":
+        # Local model setup (would use transformers, ollama, etc.)
+        logger.info("Using local LLM model")
+
+    return MockLLMProvider(model_name or "mock", **kwargs)
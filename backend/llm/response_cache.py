@@ -0,0 +1,406 @@
+"""
+LLM Response Cache
+Reuses answers to repeated clinical questions instead of paying for a new LLM call.
+
+Entries are keyed on the normalized question, the model, and a hash of the
+context the answer was generated from (patient section, retrieved knowledge,
+language). An optional semantic tier reuses an answer when a new question is
+similar enough to a cached one *within the same context*, so answers are never
+shared across patients or knowledge snapshots.
+
+Entries live in a bounded in-memory LRU and can additionally be persisted to
+SQLite or Redis for exact-key lookups across restarts and workers.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from backend.utils.cache_utils import scan_unlink
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+EMBEDDING_DIMENSIONS = 256
+
+
+def normalize_prompt(text: str) -> str:
+    """Normalize a question so trivially different phrasings share a key."""
+    text = _WHITESPACE_RE.sub(" ", (text or "").lower()).strip()
+    return text.rstrip("?.!").strip()
+
+
+def hash_context(*parts: Any) -> str:
+    """Stable hash of the context an answer was generated from."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def hashed_ngram_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """
+    Cheap local embedding: hashed word unigrams/bigrams and character trigrams.
+
+    Good enough to match rephrasings such as "metformin dose" vs "dose of
+    metformin" without loading a transformer model.
+    """
+    vector = [0.0] * dimensions
+    words = _TOKEN_RE.findall(normalize_prompt(text))
+    features = list(words)
+    features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    for feature in features:
+        bucket = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "big")
+        vector[bucket % dimensions] += 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm_a = math.sqrt(sum(x * x for x in a))
+    norm_b = math.sqrt(sum(y * y for y in b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return dot / (norm_a * norm_b)
+
+
+class _SQLiteStore:
+    """Persistent exact-key store backed by a local SQLite file."""
+
+    # Expired rows are deleted at most this often (reads skip them anyway)
+    PRUNE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._next_prune = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires_at "
+                "ON llm_response_cache (expires_at)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits on success and is always closed."""
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+                return None
+            return json.loads(row[0])
+
+    def _set(self, key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(entry, default=str), now + ttl_seconds),
+            )
+            if now >= self._next_prune:
+                self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+                conn.execute("DELETE FROM llm_response_cache WHERE expires_at < ?", (now,))
+
+    def _clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_response_cache")
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        await asyncio.to_thread(self._set, key, entry, ttl_seconds)
+
+    async def clear(self) -> None:
+        await asyncio.to_thread(self._clear)
+
+
+class _RedisStore:
+    """
+    Persistent exact-key store backed by Redis (shared across workers).
+
+    Without an explicit client, the shared client is looked up on each use
+    until one exists: the cache is built with the LLM engine, before
+    ``init_database()`` connects to Redis. Until then the store is empty.
+    """
+
+    KEY_PREFIX = "llm_cache:"
+
+    def __init__(self, redis_client=None) -> None:
+        self.redis = redis_client
+
+    def _client(self):
+        if self.redis is None:
+            from backend.database.connection import get_redis_client
+
+            self.redis = get_redis_client()
+            if self.redis is not None:
+                logger.info("LLM cache using Redis")
+        return self.redis
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        redis = self._client()
+        if redis is None:
+            return None
+        raw = await redis.get(self.KEY_PREFIX + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, entry: Dict[str, Any], ttl_seconds: int) -> None:
+        redis = self._client()
+        if redis is None:
+            return
+        await redis.setex(self.KEY_PREFIX + key, ttl_seconds, json.dumps(entry, default=str))
+
+    async def clear(self) -> None:
+        redis = self._client()
+        if redis is None:
+            return
+        await scan_unlink(redis, self.KEY_PREFIX + "*")
+
+
+class LLMResponseCache:
+    """
+    Bounded TTL cache for LLM answers with an optional semantic tier.
+
+    Usage:
+        cache = LLMResponseCache(similarity_threshold=0.92)
+        context_hash = hash_context(patient_section, rag_content, language)
+        cached = await cache.get(question, model="gpt-4", context_hash=context_hash)
+        if cached is None:
+            ...
+            await cache.set(question, response, model="gpt-4", context_hash=context_hash, usage=usage)
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: int = 3600,
+        max_entries: int = 1000,
+        similarity_threshold: Optional[float] = None,
+        embed_fn: Optional[Callable[[str], Sequence[float]]] = None,
+        store: Optional[Any] = None,
+    ) -> None:
+        """
+        Initialize the response cache
+
+        Args:
+            ttl_seconds: Lifetime of a cached answer
+            max_entries: Maximum in-memory entries (least recently used are evicted)
+            similarity_threshold: Cosine similarity needed for a semantic hit; None disables the tier
+            embed_fn: Text embedding function for the semantic tier
+            store: Optional persistent store (SQLite or Redis)
+        """
+        self.ttl_seconds = max(int(ttl_seconds), 1)
+        self.max_entries = max(int(max_entries), 1)
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn or hashed_ngram_embedding
+        self.store = store
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._scopes: Dict[str, Dict[str, Sequence[float]]] = {}
+        self.stats = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "saved_prompt_tokens": 0,
+            "saved_completion_tokens": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Build a cache from ``LLM_CACHE_*`` environment variables (None when disabled)."""
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() != "true":
+            return None
+
+        threshold_env = os.getenv("LLM_CACHE_SIMILARITY_THRESHOLD", "")
+        similarity_threshold = float(threshold_env) if threshold_env else None
+
+        store = None
+        backend = os.getenv("LLM_CACHE_BACKEND", "memory").lower()
+        if backend == "sqlite":
+            store = _SQLiteStore(os.getenv("LLM_CACHE_SQLITE_PATH", "./data/llm_cache.sqlite3"))
+        elif backend == "redis":
+            # Connects on first use; Redis is not up yet when the engine is built
+            store = _RedisStore()
+
+        return cls(
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", "3600")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000")),
+            similarity_threshold=similarity_threshold,
+            store=store,
+        )
+
+    @staticmethod
+    def make_key(question: str, *, model: str, context_hash: str) -> str:
+        """Exact-match key for a question, model and context"""
+        return hash_context(normalize_prompt(question), model or "", context_hash)
+
+    @staticmethod
+    def _scope(model: str, context_hash: str) -> str:
+        return f"{model or ''}:{context_hash}"
+
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        return entry["expires_at"] < time.time()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        scope_entries = self._scopes.get(entry["scope"])
+        if scope_entries is not None:
+            scope_entries.pop(key, None)
+            if not scope_entries:
+                self._scopes.pop(entry["scope"], None)
+
+    def _record_hit(self, entry: Dict[str, Any], counter: str) -> Dict[str, Any]:
+        self.stats[counter] += 1
+        usage = entry.get("usage") or {}
+        self.stats["saved_prompt_tokens"] += usage.get("prompt_tokens", 0)
+        self.stats["saved_completion_tokens"] += usage.get("completion_tokens", 0)
+        return entry["response"]
+
+    async def get(self, question: str, *, model: str, context_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Returns:
+            The cached response dict, or None on a miss
+        """
+        key = self.make_key(question, model=model, context_hash=context_hash)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not self._is_expired(entry):
+                self._entries.move_to_end(key)
+                return self._record_hit(entry, "hits")
+            self._remove(key)
+
+        if self.similarity_threshold is not None:
+            scope_entries = self._scopes.get(self._scope(model, context_hash))
+            if scope_entries:
+                query_vector = self.embed_fn(normalize_prompt(question))
+                best_key, best_score = None, 0.0
+                for candidate_key, vector in scope_entries.items():
+                    score = _cosine(query_vector, vector)
+                    if score > best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None and best_score >= self.similarity_threshold:
+                    candidate = self._entries.get(best_key)
+                    if candidate is not None and not self._is_expired(candidate):
+                        self._entries.move_to_end(best_key)
+                        return self._record_hit(candidate, "semantic_hits")
+
+        if self.store is not None:
+            try:
+                stored = await self.store.get(key)
+            except Exception as exc:
+                logger.warning("LLM cache store lookup failed: %s", exc)
+                stored = None
+            if stored is not None:
+                self._insert(key, stored)
+                return self._record_hit(stored, "persistent_hits")
+
+        self.stats["misses"] += 1
+        return None
+
+    def _insert(self, key: str, entry: Dict[str, Any]) -> None:
+        self._remove(key)
+        self._entries[key] = entry
+        if self.similarity_threshold is not None:
+            self._scopes.setdefault(entry["scope"], {})[key] = self.embed_fn(entry["question"])
+        while len(self._entries) > self.max_entries:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+    async def set(
+        self,
+        question: str,
+        response: Dict[str, Any],
+        *,
+        model: str,
+        context_hash: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Store a response for a question, model and context"""
+        key = self.make_key(question, model=model, context_hash=context_hash)
+        entry = {
+            "question": normalize_prompt(question),
+            "scope": self._scope(model, context_hash),
+            "response": response,
+            "usage": usage or {},
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        self._insert(key, entry)
+
+        if self.store is not None:
+            try:
+                await self.store.set(key, entry, self.ttl_seconds)
+            except Exception as exc:
+                logger.warning("LLM cache store write failed: %s", exc)
+
+    async def clear(self) -> None:
+        """Remove all cached responses"""
+        self._entries.clear()
+        self._scopes.clear()
+        if self.store is not None:
+            await self.store.clear()
+
+    def get_hit_rate(self) -> float:
+        """Get cache hit rate as percentage."""
+        hits = self.stats["hits"] + self.stats["semantic_hits"] + self.stats["persistent_hits"]
+        lookups = hits + self.stats["misses"]
+        if lookups == 0:
+            return 0.0
+        return (hits / lookups) * 100.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "semantic_enabled": self.similarity_threshold is not None,
+            "persistent_backend": type(self.store).__name__.strip("_") if self.store else None,
+            "hit_rate": self.get_hit_rate(),
+        }
@@ -0,0 +1,273 @@
+"""
+Token Budget Manager
+Keeps LLM prompts within a configurable token budget.
+
+Counts tokens per provider with a local tokenizer (``tiktoken`` for OpenAI
+models when installed, a calibrated word-piece estimate otherwise), ranks
+retrieved knowledge by relevance and trims it to fit, and precomputes compact
+per-patient context summaries that are reused across queries.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_KEYWORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+# Average characters per token for the estimate, by provider
+_CHARS_PER_TOKEN = {"openai": 4.0, "anthropic": 3.5}
+_DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Patient sections in priority order: (context key, heading, line formatter)
+_PATIENT_SECTIONS = (
+    ("conditions", "Active Conditions", lambda item: f"  - {item.get('code')}"),
+    ("medications", "Current Medications", lambda item: f"  - {item.get('medication')}"),
+    (
+        "observations",
+        "Recent Labs/Vitals",
+        lambda item: "  - {}: {}".format(
+            item.get("code"),
+            f"{item.get('value')} {item.get('unit')}" if item.get("value") else "N/A",
+        ),
+    ),
+)
+
+
+class TokenCounter:
+    """Count and truncate text in a provider's tokens without a network call."""
+
+    def __init__(self, provider: str, model_name: Optional[str] = None) -> None:
+        self.provider = provider
+        self.model_name = model_name
+        self.chars_per_token = _CHARS_PER_TOKEN.get(provider, _DEFAULT_CHARS_PER_TOKEN)
+        self._encoding = self._load_encoding()
+
+    def _load_encoding(self):
+        if self.provider != "openai":
+            return None
+        try:
+            import tiktoken
+
+            try:
+                return tiktoken.encoding_for_model(self.model_name or "gpt-4")
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            return None
+        except Exception as exc:
+            logger.warning("Unable to load tiktoken encoding: %s. Using token estimates.", exc)
+            return None
+
+    @property
+    def exact(self) -> bool:
+        """True when counts come from the provider's real tokenizer"""
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        """Number of tokens in ``text``"""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return sum(
+            max(1, math.ceil(len(piece) / self.chars_per_token)) for piece in _WORD_RE.findall(text)
+        )
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Truncate ``text`` to at most ``max_tokens`` tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return self._encoding.decode(tokens[:max_tokens])
+
+        used = 0
+        for match in _WORD_RE.finditer(text):
+            used += max(1, math.ceil(len(match.group(0)) / self.chars_per_token))
+            if used > max_tokens:
+                return text[: match.start()].rstrip()
+        return text
+
+
+class TokenBudgetManager:
+    """
+    Fit patient context and retrieved knowledge into a prompt token budget.
+
+    The budget covers the context part of the user prompt; the patient section
+    may use up to ``patient_share`` of it and retrieved knowledge gets the rest
+    (plus whatever the patient section leaves unused).
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        model_name: Optional[str] = None,
+        *,
+        max_context_tokens: Optional[int] = None,
+        patient_share: float = 0.5,
+        max_items_per_section: int = 10,
+        summary_cache_size: int = 256,
+    ) -> None:
+        """
+        Initialize the token budget manager
+
+        Args:
+            provider: LLM provider name (selects the tokenizer)
+            model_name: Model identifier
+            max_context_tokens: Token budget for patient context plus retrieved knowledge
+            patient_share: Fraction of the budget reserved for the patient section
+            max_items_per_section: Cap on conditions/medications/observations listed
+            summary_cache_size: Number of per-patient summaries kept
+        """
+        self.counter = TokenCounter(provider, model_name)
+        self.max_context_tokens = max_context_tokens or int(
+            os.getenv("LLM_CONTEXT_TOKEN_BUDGET", "3000")
+        )
+        self.patient_share = min(max(patient_share, 0.0), 1.0)
+        self.max_items_per_section = max_items_per_section
+        self.summary_cache_size = summary_cache_size
+        self._summaries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self.stats = {
+            "summary_hits": 0,
+            "summary_misses": 0,
+            "knowledge_items_used": 0,
+            "knowledge_items_dropped": 0,
+            "knowledge_items_truncated": 0,
+        }
+
+    @property
+    def patient_budget(self) -> int:
+        return int(self.max_context_tokens * self.patient_share)
+
+    @staticmethod
+    def fingerprint(patient_context: Dict[str, Any]) -> str:
+        """Stable fingerprint of a patient context"""
+        payload = json.dumps(patient_context, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def patient_summary(
+        self,
+        patient_context: Dict[str, Any],
+        transform: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> Tuple[str, int]:
+        """
+        Compact patient section and its token count, cached per patient fingerprint.
+
+        Sections are filled in priority order (demographics, conditions,
+        medications, observations) until the patient budget is used.
+        ``transform`` (e.g. anonymization) is applied only when the summary is built.
+        """
+        key = self.fingerprint(patient_context) + (":t" if transform else "")
+        cached = self._summaries.get(key)
+        if cached is not None:
+            self._summaries.move_to_end(key)
+            self.stats["summary_hits"] += 1
+            return cached
+
+        self.stats["summary_misses"] += 1
+        if transform is not None:
+            patient_context = transform(patient_context)
+        summary = self._build_patient_summary(patient_context)
+        self._summaries[key] = summary
+        while len(self._summaries) > self.summary_cache_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def _build_patient_summary(self, patient_context: Dict[str, Any]) -> Tuple[str, int]:
+        budget = self.patient_budget
+        lines = ["Patient Context:"]
+        used = self.counter.count(lines[0] + "\n")
+
+        if patient_context.get("patient"):
+            p = patient_context["patient"]
+            for line in (
+                f"- Name: {p.get('name')}, Age: {p.get('birthDate')}",
+                f"- Gender: {p.get('gender')}",
+            ):
+                lines.append(line)
+                used += self.counter.count(line + "\n")
+
+        for key, heading, format_item in _PATIENT_SECTIONS:
+            items = patient_context.get(key) or []
+            if not items:
+                continue
+            header = f"{heading}: {len(items)} found"
+            header_tokens = self.counter.count(header + "\n")
+            if used + header_tokens > budget:
+                break
+            lines.append(header)
+            used += header_tokens
+
+            seen = set()
+            for item in items[: self.max_items_per_section]:
+                line = format_item(item)
+                if line in seen:
+                    continue
+                line_tokens = self.counter.count(line + "\n")
+                if used + line_tokens > budget:
+                    break
+                seen.add(line)
+                lines.append(line)
+                used += line_tokens
+
+        return "\n".join(lines) + "\n", used
+
+    @staticmethod
+    def _relevance(query_terms: set, content: str) -> float:
+        terms = set(_KEYWORD_RE.findall(content.lower()))
+        if not terms or not query_terms:
+            return 0.0
+        return len(query_terms & terms) / math.sqrt(len(terms))
+
+    def select_knowledge(self, query: Optional[str], contents: List[str], budget: int) -> List[str]:
+        """
+        Rank retrieved knowledge by relevance to ``query`` and keep what fits ``budget``.
+
+        Items are added whole in rank order; the first item that does not fit is
+        truncated into the remaining space if enough of it would survive.
+        """
+        query_terms = set(_KEYWORD_RE.findall((query or "").lower()))
+        ranked = sorted(
+            enumerate(contents),
+            key=lambda pair: (-self._relevance(query_terms, pair[1]), pair[0]),
+        )
+
+        selected: List[str] = []
+        used = 0
+        for position, (_, content) in enumerate(ranked):
+            tokens = self.counter.count(content) + 2  # numbering and newline
+            if used + tokens <= budget:
+                selected.append(content)
+                used += tokens
+                continue
+
+            remaining = budget - used - 2
+            if remaining >= 32:
+                selected.append(self.counter.truncate(content, remaining))
+                self.stats["knowledge_items_truncated"] += 1
+                position += 1
+            self.stats["knowledge_items_dropped"] += len(ranked) - position
+            break
+
+        self.stats["knowledge_items_used"] += len(selected)
+        return selected
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get token budget statistics"""
+        return {
+            **self.stats,
+            "max_context_tokens": self.max_context_tokens,
+            "patient_budget": self.patient_budget,
+            "cached_summaries": len(self._summaries),
+            "exact_tokenizer": self.counter.exact,
+        }
@@ -7,7 +7,7 @@ Enforces region-specific data transfer controls for compliance
 
 import logging
 import os
-from typing import Dict, Optional, Any, List
+from typing import AsyncIterator, Dict, Optional, Any, List
 import json
 from datetime import datetime
 
@@ -19,6 +19,10 @@ from backend.config.compliance_policies import (
     is_anonymization_required,
 )
 from backend.utils.anonymization import prepare_data_for_external_service
+from backend.llm.providers import LLMProvider, create_provider
+from backend.llm.response_cache import LLMResponseCache, hash_context
+from backend.llm.token_budget import TokenBudgetManager
+from backend.utils.event_history import EventHistory
 
 logger = logging.getLogger(__name__)
 
@@ -29,19 +33,32 @@ class LLMEngine:
     Supports multiple LLM backends (OpenAI, Anthropic, local models)
     """
     
-    def __init__(self, model_name: str, api_key: str = ""):
+    def __init__(
+        self,
+        model_name: str,
+        api_key: str = "",
+        response_cache: Optional[LLMResponseCache] = None,
+    ):
         """
         Initialize LLM Engine
         
         Args:
             model_name: Model identifier (gpt-4, llama-2-7b, etc.)
             api_key: API key for external services
+            response_cache: Cache for repeated queries (built from LLM_CACHE_* env vars if omitted)
         """
         self.model_name = model_name
         self.api_key = api_key
         self.provider = self._detect_provider(model_name)
         self.client = self._initialize_client()
-        self.query_history = []
+        self.response_cache = response_cache if response_cache is not None else LLMResponseCache.from_env()
+        self.token_budget = TokenBudgetManager(self.provider, model_name)
+        self.query_history = EventHistory(
+            "llm_queries",
+            maxlen=int(os.getenv("EVENT_HISTORY_LIMIT", "1000")),
+            metrics={"answer_length": lambda q: len(q.get("answer") or "")},
+            categories={"cached": lambda q: bool(q.get("cached"))},
+        )
         self.token_usage = {"prompt": 0, "completion": 0}
         
         # Initialize region-specific compliance attributes
@@ -88,6 +105,8 @@ class LLMEngine:
             return "anthropic"
         elif "llama" in model_name.lower() or "mistral" in model_name.lower():
             return "local"
+        elif model_name.lower() == "mock":
+            return "mock"
         else:
             return "openai"  # Default
     
@@ -109,31 +128,13 @@ class LLMEngine:
                     f"External provider '{self.provider}' is not permitted."
                 )
             logger.debug(f"External LLM provider '{self.provider}' allowed in region '{self.region}'")
-        elif self.provider == "local":
+        elif self.provider in ["local", "mock"]:
             # Local provider - always compliant
             logger.debug(f"Local LLM provider is compliant for region '{self.region}'")
     
-    def _initialize_client(self):
-        """Initialize appropriate LLM client based on provider"""
-        if self.provider == "openai":
-            try:
-                import openai
-                openai.api_key = self.api_key
-                return openai
-            except ImportError:
-                logger.warning("OpenAI library not installed")
-                return None
-        elif self.provider == "anthropic":
-            try:
-                import anthropic
-                return anthropic.Anthropic(api_key=self.api_key)
-            except ImportError:
-                logger.warning("Anthropic library not installed")
-                return None
-        else:
-            # Local model setup (would use transformers, ollama, etc.)
-            logger.info("Using local LLM model")
-            return None
+    def _initialize_client(self) -> LLMProvider:
+        """Initialize the async provider for the detected backend"""
+        return create_provider(self.provider, self.model_name, api_key=self.api_key)
     
     async def query_with_rag(
         self,
@@ -142,7 +143,9 @@ class LLMEngine:
         rag_component=None,
         aot_reasoner=None,
         include_reasoning: bool = True,
-        language: str = DEFAULT_LANGUAGE
+        language: str = DEFAULT_LANGUAGE,
+        rag_results: Optional[Dict] = None,
+        reasoning_chain: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process a medical query with RAG and Algorithm of Thought
@@ -154,6 +157,8 @@ class LLMEngine:
             aot_reasoner: Algorithm of Thought reasoning engine
             include_reasoning: Include step-by-step reasoning
             language: Target language for response (e.g., 'en', 'es', 'fr', 'ru', 'zh', etc.)
+            rag_results: Knowledge already retrieved for this question (skips rag_component)
+            reasoning_chain: Reasoning chain already generated for this question (skips aot_reasoner)
             
         Returns:
             Response with answer, reasoning, and sources
@@ -162,35 +167,56 @@ class LLMEngine:
         
         try:
             # 1. Retrieve relevant medical knowledge via RAG
-            rag_results = None
-            if rag_component:
+            if rag_results is None and rag_component:
                 rag_results = await rag_component.retrieve_relevant_knowledge(question)
             
             # 2. Build medical prompt
             system_prompt = self._build_system_prompt(patient_context, language=language)
-            user_prompt = self._build_user_prompt(
-                question=question,
+            context_prompt = self._build_context_prompt(
                 patient_context=patient_context,
                 rag_results=rag_results,
                 include_reasoning=include_reasoning,
                 language=language
             )
+            user_prompt = f"Question: {question}\n\n" + context_prompt
+            
+            # 3. Reuse a cached answer generated from the same context
+            context_hash = None
+            if self.response_cache is not None:
+                context_hash = hash_context(
+                    system_prompt,
+                    context_prompt,
+                    bool((aot_reasoner or reasoning_chain) and include_reasoning),
+                )
+                cached = await self.response_cache.get(
+                    question, model=self.model_name, context_hash=context_hash
+                )
+                if cached is not None:
+                    result = {
+                        **cached,
+                        "cached": True,
+                        "timestamp": datetime.now().isoformat()
+                    }
+                    self.query_history.append(result)
+                    return result
             
-            # 3. Generate response with AoT if available
-            reasoning_chain = None
-            if aot_reasoner and include_reasoning:
+            # 4. Generate response with AoT if available
+            if not include_reasoning:
+                reasoning_chain = None
+            elif reasoning_chain is None and aot_reasoner:
                 reasoning_chain = await aot_reasoner.generate_reasoning_chain(
                     question=question,
                     context=patient_context,
                     rag_results=rag_results
                 )
+            if reasoning_chain:
                 # Enhance prompt with reasoning steps
                 user_prompt += f"\n\nReasoning framework:\n{reasoning_chain}"
             
-            # 4. Call LLM
+            # 5. Call LLM
             response = await self._call_llm(system_prompt, user_prompt)
             
-            # 5. Extract and structure response
+            # 6. Extract and structure response
             result = {
                 "answer": response.get("content"),
                 "reasoning": reasoning_chain if include_reasoning else None,
@@ -200,6 +226,15 @@ class LLMEngine:
                 "timestamp": datetime.now().isoformat()
             }
             
+            if self.response_cache is not None:
+                await self.response_cache.set(
+                    question,
+                    result,
+                    model=self.model_name,
+                    context_hash=context_hash,
+                    usage=response.get("usage"),
+                )
+            
             # Track usage
             self.query_history.append(result)
             if response.get("usage"):
@@ -227,60 +262,61 @@ class LLMEngine:
         )
         
         try:
-            if self.provider == "openai" and self.client:
-                response = self.client.ChatCompletion.create(
-                    model=self.model_name,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.2,  # Lower for medical accuracy
-                    max_tokens=2000,
-                    top_p=0.95,
-                    timeout=30.0,
-                )
-                
-                return {
-                    "content": response.choices[0].message.content,
-                    "usage": {
-                        "prompt_tokens": response.usage.prompt_tokens,
-                        "completion_tokens": response.usage.completion_tokens
-                    },
-                    "confidence": 0.95
-                }
-            
-            elif self.provider == "anthropic" and self.client:
-                response = self.client.messages.create(
-                    model=self.model_name,
-                    max_tokens=2000,
-                    messages=[
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    system=system_prompt
-                )
-                
-                return {
-                    "content": response.content[0].text,
-                    "usage": {
-                        "prompt_tokens": response.usage.input_tokens,
-                        "completion_tokens": response.usage.output_tokens
-                    },
-                    "confidence": 0.95
-                }
-            
-            else:
-                # Fallback mock response for demo
-                logger.warning("No LLM client available, returning mock response")
-                return {
-                    "content": "This is a demo response. Please configure a proper LLM provider.",
-                    "usage": {"prompt_tokens": 0, "completion_tokens": 0},
-                    "confidence": 0.5
-                }
-        
+            return await self.client.complete(system_prompt, user_prompt)
         except Exception as e:
             logger.error(f"Error calling LLM: {str(e)}")
             raise
     
+    async def stream_llm(self, system_prompt: str, user_prompt: str) -> AsyncIterator[str]:
+        """
+        Stream the LLM response as text chunks.
+        
+        Usage:
+            async for chunk in engine.stream_llm(system_prompt, user_prompt):
+                ...
+        """
+        logger.info(
+            f"LLM API stream: provider={self.provider}, "
+            f"region={self.region}, "
+            f"external_allowed={self.external_llm_allowed}, "
+            f"local_required={self.local_llm_required}"
+        )
+        async for chunk in self.client.stream(system_prompt, user_prompt):
+            yield chunk
+    
+    async def stream_query(
+        self,
+        question: str,
+        patient_context: Optional[Dict] = None,
+        rag_component=None,
+        language: str = DEFAULT_LANGUAGE
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer to a medical query as it is generated
+        
+        Builds the same prompts as ``query_with_rag`` (without the AoT
+        framework) and yields answer text chunks from the provider.
+        """
+        rag_results = None
+        if rag_component:
+            rag_results = await rag_component.retrieve_relevant_knowledge(question)
+        
+        system_prompt = self._build_system_prompt(patient_context, language=language)
+        user_prompt = self._build_user_prompt(
+            question=question,
+            patient_context=patient_context,
+            rag_results=rag_results,
+            include_reasoning=False,
+            language=language
+        )
+        
+        async for chunk in self.stream_llm(system_prompt, user_prompt):
+            yield chunk
+    
+    async def aclose(self) -> None:
+        """Release provider resources"""
+        await self.client.aclose()
+    
     def _build_system_prompt(
         self, 
         patient_context: Optional[Dict] = None,
@@ -326,43 +362,48 @@ Important guidelines:
         language: str = DEFAULT_LANGUAGE
     ) -> str:
         """Build user prompt with context, anonymizing if required for external services"""
-        prompt = f"Question: {question}\n\n"
+        return f"Question: {question}\n\n" + self._build_context_prompt(
+            patient_context=patient_context,
+            rag_results=rag_results,
+            include_reasoning=include_reasoning,
+            language=language
+        )
+    
+    def _build_context_prompt(
+        self,
+        patient_context: Optional[Dict] = None,
+        rag_results: Optional[Dict] = None,
+        include_reasoning: bool = True,
+        language: str = DEFAULT_LANGUAGE
+    ) -> str:
+        """Build the question-independent part of the user prompt"""
+        prompt = ""
         
         if patient_context:
             # Anonymize patient context if sending to external LLM and required by region
+            anonymize = None
             if self.provider in ["openai", "anthropic"] and is_anonymization_required():
-                patient_context = prepare_data_for_external_service(
-                    patient_context,
-                    service_type="llm"
-                )
-                logger.debug("Patient context anonymized for external LLM call")
+                def anonymize(context: Dict) -> Dict:
+                    logger.debug("Patient context anonymized for external LLM call")
+                    return prepare_data_for_external_service(context, service_type="llm")
             
-            prompt += "Patient Context:\n"
-            if patient_context.get("patient"):
-                p = patient_context["patient"]
-                prompt += f"- Name: {p.get('name')}, Age: {p.get('birthDate')}\n"
-                prompt += f"- Gender: {p.get('gender')}\n"
-            
-            if patient_context.get("conditions"):
-                prompt += f"Active Conditions: {len(patient_context['conditions'])} found\n"
-                for cond in patient_context["conditions"][:3]:
-                    prompt += f"  - {cond.get('code')}\n"
-            
-            if patient_context.get("medications"):
-                prompt += f"Current Medications: {len(patient_context['medications'])} found\n"
-                for med in patient_context["medications"][:3]:
-                    prompt += f"  - {med.get('medication')}\n"
-            
-            if patient_context.get("observations"):
-                prompt += f"Recent Labs/Vitals: {len(patient_context['observations'])} found\n"
-                for obs in patient_context["observations"][:3]:
-                    value = f"{obs.get('value')} {obs.get('unit')}" if obs.get('value') else "N/A"
-                    prompt += f"  - {obs.get('code')}: {value}\n"
+            patient_section, patient_tokens = self.token_budget.patient_summary(
+                patient_context, transform=anonymize
+            )
+            prompt += patient_section
+        else:
+            patient_tokens = 0
         
         if rag_results and rag_results.get("relevant_content"):
-            prompt += "\n\nRelevant Medical Knowledge:\n"
-            for i, content in enumerate(rag_results.get("relevant_content", [])[:3], 1):
-                prompt += f"{i}. {content}\n"
+            knowledge = self.token_budget.select_knowledge(
+                rag_results.get("query"),
+                rag_results.get("relevant_content", []),
+                budget=self.token_budget.max_context_tokens - patient_tokens,
+            )
+            if knowledge:
+                prompt += "\n\nRelevant Medical Knowledge:\n"
+                for i, content in enumerate(knowledge, 1):
+                    prompt += f"{i}. {content}\n"
         
         if include_reasoning:
             reasoning_text = translate("llm.reasoning_required", language=language)
@@ -375,7 +416,11 @@ Important guidelines:
         return {
             "model": self.model_name,
             "provider": self.provider,
-            "total_queries": len(self.query_history),
+            "total_queries": self.query_history.total,
             "token_usage": self.token_usage,
-            "average_query_length": sum(len(q.get("answer", "")) for q in self.query_history) / max(len(self.query_history), 1)
+            "provider_stats": self.client.get_stats(),
+            "response_cache": self.response_cache.get_stats() if self.response_cache else None,
+            "token_budget": self.token_budget.get_stats(),
+            "average_query_length": self.query_history.metric("answer_length").mean,
+            "history": self.query_history.get_stats()
         }
@@ -12,6 +12,7 @@ if str(_project_root) not in sys.path:
 
 # Load environment variables
 import os
+import secrets
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -21,7 +22,6 @@ from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 import logging
 
-import uuid
 from typing import Any, Dict, Optional
 
 import uvicorn
@@ -33,7 +33,7 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import HTTPAuthorizationCredentials
 
 from backend.middleware import (
@@ -43,6 +43,8 @@ from backend.middleware import (
     PerformanceMonitoringMiddleware,
     InputValidationMiddleware,
     HTTPSEnforcementMiddleware,
+    CorrelationIdMiddleware,
+    get_performance_metrics,
 )
 from backend.audit import AuditMiddleware
 from backend.anomaly_detector.api import router as anomaly_router
@@ -232,6 +234,7 @@ app.add_middleware(
     max_query_length=int(os.getenv("MAX_QUERY_LENGTH", "500")),
     max_path_length=int(os.getenv("MAX_PATH_LENGTH", "2000")),
     strict_mode=os.getenv("INPUT_VALIDATION_STRICT", "false").lower() == "true",
+    max_body_bytes=int(os.getenv("INPUT_VALIDATION_MAX_BODY_BYTES", str(10 * 1024 * 1024))),
 )
 
 # Add performance monitoring middleware (early to track all requests)
@@ -259,6 +262,9 @@ app.add_middleware(
     use_redis=os.getenv("RATE_LIMIT_USE_REDIS", "false").lower() == "true",
     user_requests_per_minute=int(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "0")) or None,
     user_requests_per_hour=int(os.getenv("RATE_LIMIT_USER_PER_HOUR", "0")) or None,
+    algorithm=os.getenv("RATE_LIMIT_ALGORITHM", "sliding_log"),
+    max_tracked_clients=int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000")),
+    local_buckets=int(os.getenv("RATE_LIMIT_LOCAL_BUCKETS", "6")),
 )
 
 # Add CORS middleware
@@ -278,21 +284,8 @@ app.add_middleware(
 )
 
 
-@app.middleware("http")
-async def add_correlation_id(request: Request, call_next):
-    container = getattr(getattr(request.app, "state", None), "container", None)
-    audit_service = getattr(container, "audit_service", None) if container else None
-
-    correlation_id = request.headers.get("X-Correlation-ID")
-    if not correlation_id:
-        correlation_id = (
-            audit_service.new_correlation_id() if audit_service else uuid.uuid4().hex
-        )
-    request.state.correlation_id = correlation_id
-
-    response = await call_next(request)
-    response.headers["X-Correlation-ID"] = correlation_id
-    return response
+# Outermost, so every other layer sees the correlation ID
+app.add_middleware(CorrelationIdMiddleware)
 
 
 # Endpoints migrated to api/v1/endpoints/
@@ -395,6 +388,28 @@ async def root_health():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """
+    Request counts and latency in the Prometheus text format.
+    
+    Disabled unless METRICS_TOKEN is set; scrapers then send it as a bearer
+    token. The peer address is not trusted because a reverse proxy on the
+    same host makes every request look local.
+    """
+    token = os.getenv("METRICS_TOKEN", "")
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if not token or scheme.lower() != "bearer" or not secrets.compare_digest(
+        credentials.strip().encode(), token.encode()
+    ):
+        return PlainTextResponse("Not Found", status_code=404)
+    return PlainTextResponse(
+        get_performance_metrics().prometheus_text(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.websocket("/ws/patient-updates")
 async def patient_updates(websocket: WebSocket):
     """Provide real-time dashboard updates via WebSocket."""
@@ -8,6 +8,7 @@ from .security_headers import SecurityHeadersMiddleware
 from .performance_monitoring import PerformanceMonitoringMiddleware, get_performance_metrics
 from .input_validation import InputValidationMiddleware
 from .https_enforcement import HTTPSEnforcementMiddleware
+from .correlation import CorrelationIdMiddleware
 
 __all__ = [
     "RateLimitMiddleware",
@@ -17,5 +18,6 @@ __all__ = [
     "get_performance_metrics",
     "InputValidationMiddleware",
     "HTTPSEnforcementMiddleware",
+    "CorrelationIdMiddleware",
 ]
 
@@ -0,0 +1,38 @@
+"""
+Correlation ID middleware.
+
+Reuses the caller's ``X-Correlation-ID`` or creates one, stores it on
+``request.state.correlation_id`` and echoes it on the response.
+"""
+
+import uuid
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class CorrelationIdMiddleware:
+    """Tag every HTTP request and response with a correlation ID."""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    def _new_correlation_id(self, scope: Scope) -> str:
+        container = getattr(getattr(scope.get("app"), "state", None), "container", None)
+        audit_service = getattr(container, "audit_service", None) if container else None
+        return audit_service.new_correlation_id() if audit_service else uuid.uuid4().hex
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        correlation_id = Headers(scope=scope).get("X-Correlation-ID") or self._new_correlation_id(scope)
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+        
+        async def send_with_correlation_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Correlation-ID"] = correlation_id
+            await send(message)
+        
+        await self.app(scope, receive, send_with_correlation_id)
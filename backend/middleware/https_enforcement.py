@@ -6,17 +6,16 @@ Enforces HTTPS connections in production environments based on compliance polici
 
 import logging
 import os
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, RedirectResponse
-from typing import Callable
+from starlette.datastructures import URL, Headers
+from starlette.responses import RedirectResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from backend.config.compliance_policies import get_compliance_policy
 
 logger = logging.getLogger(__name__)
 
 
-class HTTPSEnforcementMiddleware(BaseHTTPMiddleware):
+class HTTPSEnforcementMiddleware:
     """
     Middleware to enforce HTTPS connections in production.
     
@@ -28,7 +27,7 @@ class HTTPSEnforcementMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enabled: bool = True,
         production_mode: bool = None,
         **kwargs
@@ -41,7 +40,7 @@ class HTTPSEnforcementMiddleware(BaseHTTPMiddleware):
             enabled: Enable/disable HTTPS enforcement
             production_mode: Whether running in production (auto-detected if None)
         """
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
         
         # Auto-detect production mode if not specified
@@ -60,53 +59,50 @@ class HTTPSEnforcementMiddleware(BaseHTTPMiddleware):
             "/redoc",
         }
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """
-        Enforce HTTPS for requests.
-        
-        Args:
-            request: Incoming request
-            call_next: Next middleware/handler in chain
-            
-        Returns:
-            Response (redirected to HTTPS if needed)
-        """
-        # Skip if disabled
-        if not self.enabled:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Enforce HTTPS for requests, redirecting plain HTTP when required."""
+        # Skip if disabled, and for non-HTTP traffic
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Skip certain paths
-        if request.url.path in self.skip_paths:
-            return await call_next(request)
+        if scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
         
         # Check compliance policy
         policy = get_compliance_policy()
         if not policy.enforce_https:
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Only enforce in production
         if not self.production_mode:
             logger.debug("HTTPS enforcement skipped (not in production mode)")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Check if request is already HTTPS
-        scheme = request.url.scheme.lower()
-        if scheme == "https":
-            return await call_next(request)
+        if scope.get("scheme", "http").lower() == "https":
+            await self.app(scope, receive, send)
+            return
         
         # Check X-Forwarded-Proto header (for reverse proxies)
-        forwarded_proto = request.headers.get("X-Forwarded-Proto", "").lower()
+        forwarded_proto = Headers(scope=scope).get("X-Forwarded-Proto", "").lower()
         if forwarded_proto == "https":
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
         # Redirect HTTP to HTTPS
-        https_url = request.url.replace(scheme="https", port=443)
+        https_url = URL(scope=scope).replace(scheme="https", port=443)
         
         logger.warning(
-            f"HTTPS enforcement: Redirecting HTTP request to HTTPS: {request.url.path}"
+            f"HTTPS enforcement: Redirecting HTTP request to HTTPS: {scope['path']}"
         )
         
-        return RedirectResponse(
+        response = RedirectResponse(
             url=str(https_url),
             status_code=301,  # Permanent redirect
         )
+        await response(scope, receive, send)
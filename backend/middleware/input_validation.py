@@ -1,18 +1,71 @@
 """
 Input validation middleware for automatic request sanitization and validation.
+
+Each family of detection patterns is compiled into one alternation, so a
+value is scanned once rather than once per pattern. Text request bodies
+(JSON, form and text) are scanned as they stream in for markup (tags, event
+handler attributes, javascript: URLs), under a hard size limit. The body is never buffered or
+parsed here. Other content types, such as multipart uploads and binary
+documents, pass through unscanned; the upload endpoints check their name,
+size and content.
 """
 
 import logging
 import re
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
+# XSS patterns: script blocks, iframe/object/embed tags, javascript: URLs and
+# inline event handlers (onclick=, onerror=, ...). Every alternative starts
+# from one character class, which lets the regex engine skip ahead to
+# candidate positions; the lookbehinds pick the alternative.
+_XSS_SOURCE = (
+    r'[<jo]'
+    r'(?:(?<=<)(?:script[^>]*>.*?</script>|(?:iframe|object|embed)[^>]*>)'
+    r'|(?<=j)avascript:'
+    r'|(?<=o)n\w+\s*=)'
+)
+XSS_PATTERN = re.compile(_XSS_SOURCE, re.IGNORECASE | re.DOTALL)
+
+# Bodies carry free text ("concentration = 5", "monitoring=weekly") and form
+# fields, so only markup counts there: script/iframe/object/embed tags, event
+# handler attributes inside a tag, and javascript: URLs
+BODY_XSS_PATTERN = re.compile(
+    rb'[<j]'
+    rb'(?:(?<=<)(?:script\b|(?:iframe|object|embed)\b[^>]*>|[a-z][^<>]*?\son\w+\s*=[^<>]*>)'
+    rb'|(?<=j)avascript:)',
+    re.IGNORECASE,
+)
+
+# SQL injection: a statement keyword anywhere (the gate), together with a
+# keyword as a whole word, a comment marker or a quoting/terminating character
+SQL_PATTERN = re.compile(
+    r"(?P<statement>\b(?:SELECT|INSERT|UPDATE|DELETE|DROP|UNION)\b)"
+    r"|(?P<gate>SELECT|INSERT|UPDATE|DELETE|DROP|UNION)"
+    r"|(?P<signal>\b(?:CREATE|ALTER|EXEC|EXECUTE|OR|AND)\b|--|#|/\*|\*/|'|;|\\|%27|%00)",
+    re.IGNORECASE,
+)
+
+# Body scanning overlaps chunks by this many bytes, so a match split across
+# two chunks is still found (unless the match itself is longer)
+BODY_SCAN_OVERLAP = 1024
+
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
 
-class InputValidationMiddleware(BaseHTTPMiddleware):
+# Content types whose bodies are scanned, matched on the media type
+INSPECTED_CONTENT_TYPES: Tuple[str, ...] = (
+    "application/json",
+    "application/x-www-form-urlencoded",
+    "text/",
+)
+
+
+class InputValidationMiddleware:
     """
     Middleware for automatic input validation and sanitization.
     
@@ -26,11 +79,13 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enabled: bool = True,
         max_query_length: int = 500,
         max_path_length: int = 2000,
         strict_mode: bool = False,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        inspected_content_types: Tuple[str, ...] = INSPECTED_CONTENT_TYPES,
     ):
         """
         Initialize input validation middleware.
@@ -41,29 +96,17 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
             max_query_length: Maximum query string length
             max_path_length: Maximum path length
             strict_mode: If True, reject requests with suspicious patterns instead of sanitizing
+            max_body_bytes: Largest inspected request body accepted (413 above it)
+            inspected_content_types: Media types (or prefixes ending in "/") whose
+                bodies are scanned; "+json" types are always scanned
         """
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
         self.max_query_length = max_query_length
         self.max_path_length = max_path_length
         self.strict_mode = strict_mode
-        
-        # Patterns to detect XSS attempts
-        self.xss_patterns = [
-            re.compile(r'<script[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL),
-            re.compile(r'javascript:', re.IGNORECASE),
-            re.compile(r'on\w+\s*=', re.IGNORECASE),  # onclick=, onerror=, etc.
-            re.compile(r'<iframe[^>]*>', re.IGNORECASE),
-            re.compile(r'<object[^>]*>', re.IGNORECASE),
-            re.compile(r'<embed[^>]*>', re.IGNORECASE),
-        ]
-        
-        # Patterns to detect SQL injection attempts
-        self.sql_patterns = [
-            re.compile(r"(\b(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|EXECUTE|UNION|OR|AND)\b)", re.IGNORECASE),
-            re.compile(r"(--|#|/\*|\*/)", re.IGNORECASE),  # SQL comments
-            re.compile(r"('|(\\')|(;)|(\\)|(\%27)|(\%00))", re.IGNORECASE),  # SQL injection characters
-        ]
+        self.max_body_bytes = max_body_bytes
+        self.inspected_content_types = inspected_content_types
         
         # Paths to skip validation (health checks, static files, etc.)
         self.skip_paths = {
@@ -84,10 +127,7 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         Returns:
             True if XSS pattern detected
         """
-        for pattern in self.xss_patterns:
-            if pattern.search(value):
-                return True
-        return False
+        return XSS_PATTERN.search(value) is not None
     
     def _detect_sql_injection(self, value: str) -> bool:
         """
@@ -99,12 +139,15 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         Returns:
             True if SQL injection pattern detected
         """
-        # Only check if it looks like SQL (has SQL keywords)
-        if not any(keyword in value.upper() for keyword in ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'UNION']):
-            return False
-        
-        for pattern in self.sql_patterns:
-            if pattern.search(value):
+        # Only SQL-looking input (a statement keyword) counts, in one pass
+        gate = signal = False
+        for match in SQL_PATTERN.finditer(value):
+            kind = match.lastgroup
+            if kind == "statement":
+                return True
+            gate = gate or kind == "gate"
+            signal = signal or kind == "signal"
+            if gate and signal:
                 return True
         return False
     
@@ -112,22 +155,16 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         """
         Sanitize a string by removing dangerous patterns.
         
+        Removes script blocks, javascript: protocols, event handlers and
+        iframe/object/embed tags in a single pass.
+        
         Args:
             value: String to sanitize
             
         Returns:
             Sanitized string
         """
-        # Remove script tags
-        value = re.sub(r'<script[^>]*>.*?</script>', '', value, flags=re.IGNORECASE | re.DOTALL)
-        # Remove javascript: protocol
-        value = re.sub(r'javascript:', '', value, flags=re.IGNORECASE)
-        # Remove event handlers
-        value = re.sub(r'on\w+\s*=', '', value, flags=re.IGNORECASE)
-        # Remove iframe, object, embed tags
-        value = re.sub(r'<(iframe|object|embed)[^>]*>', '', value, flags=re.IGNORECASE)
-        
-        return value
+        return XSS_PATTERN.sub('', value)
     
     def _validate_query_params(self, request: Request) -> Optional[JSONResponse]:
         """
@@ -228,27 +265,132 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         
         return None
     
-    async def dispatch(self, request: Request, call_next):
-        """Process request and validate inputs."""
-        
-        if not self.enabled:
-            return await call_next(request)
+    def _inspects_body(self, content_type: str) -> bool:
+        """Whether bodies of this content type are scanned."""
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        if not media_type:
+            return False
+        if media_type.endswith("+json"):
+            return True
+        return any(
+            media_type.startswith(inspected) if inspected.endswith("/") else media_type == inspected
+            for inspected in self.inspected_content_types
+        )
+    
+    def _body_too_large(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            content={
+                "status": "error",
+                "error_type": "ValidationError",
+                "message": f"Request body too large (max {self.max_body_bytes} bytes)"
+            }
+        )
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Validate the request path, query and body before passing it on."""
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Skip validation for certain paths
-        if request.url.path in self.skip_paths:
-            return await call_next(request)
+        if scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
+        
+        # Validate path, then query parameters
+        error = self._validate_path(request) or self._validate_query_params(request)
+        if error:
+            await error(scope, receive, send)
+            return
+        
+        headers = Headers(scope=scope)
+        if not self._inspects_body(headers.get("content-type", "")):
+            await self.app(scope, receive, send)
+            return
+        
+        # Reject oversized bodies before reading them when the size is declared
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await self._body_too_large()(scope, receive, send)
+            return
+        
+        await self._call_with_body_scan(request, scope, receive, send)
+    
+    async def _call_with_body_scan(self, request: Request, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Run the app while scanning body chunks as it reads them.
         
-        # Validate path
-        path_error = self._validate_path(request)
-        if path_error:
-            return path_error
+        A rejection stops the app's read with _BodyRejected; anything the app
+        sends afterwards (such as its own body parsing error) is dropped and
+        the rejection is sent instead.
+        """
+        received = 0
+        tail = b""
+        flagged = False
+        rejection: Optional[JSONResponse] = None
+        response_started = False
         
-        # Validate query parameters
-        query_error = self._validate_query_params(request)
-        if query_error:
-            return query_error
+        async def scanning_receive() -> Message:
+            nonlocal received, tail, flagged, rejection
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > self.max_body_bytes:
+                logger.warning(
+                    "Request body too large: over %d bytes from %s",
+                    self.max_body_bytes,
+                    request.client.host if request.client else "unknown"
+                )
+                rejection = self._body_too_large()
+                raise _BodyRejected()
+            
+            # One pass over the chunk, plus its boundary with the previous one
+            if not flagged and chunk and (
+                BODY_XSS_PATTERN.search(chunk) or BODY_XSS_PATTERN.search(tail + chunk[:BODY_SCAN_OVERLAP])
+            ):
+                flagged = True
+                logger.warning(
+                    "XSS pattern detected in request body from %s",
+                    request.client.host if request.client else "unknown"
+                )
+                if self.strict_mode:
+                    rejection = JSONResponse(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        content={
+                            "status": "error",
+                            "error_type": "ValidationError",
+                            "message": "Invalid characters detected in request body"
+                        }
+                    )
+                    raise _BodyRejected()
+            if len(chunk) >= BODY_SCAN_OVERLAP:
+                tail = chunk[-BODY_SCAN_OVERLAP:]
+            else:
+                tail = (tail + chunk)[-BODY_SCAN_OVERLAP:]
+            return message
         
-        # Process request
-        response = await call_next(request)
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if rejection is not None:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
         
-        return response
+        try:
+            await self.app(scope, scanning_receive, guarded_send)
+        except Exception:
+            if rejection is None:
+                raise
+        if rejection is not None and not response_started:
+            await rejection(scope, receive, send)
+
+
+class _BodyRejected(Exception):
+    """Raised from receive() to stop the app reading a rejected body."""
@@ -1,35 +1,120 @@
 """
 Performance monitoring middleware for tracking request timing, slow queries, and error rates.
+
+Latency is aggregated per route template (``/api/v1/patients/{patient_id}``),
+not per concrete path, with a fixed cap on the number of routes. Each route
+keeps a lifetime Prometheus histogram and fine-grained windowed histograms
+for p50/p90/p99/p999 over the last 1, 5 and 15 minutes. Recording a request is
+O(1) and memory does not grow with traffic.
 """
 
 import time
 import logging
-from typing import Dict, Optional
-from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple
+from collections import Counter, deque
 from datetime import datetime, timezone
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.utils.event_history import (
+    DEFAULT_LATENCY_BUCKETS,
+    PRECISE_LATENCY_BUCKETS,
+    Histogram,
+    WindowedHistogram,
+)
 
 logger = logging.getLogger(__name__)
 
+# Trailing windows for latency percentiles, as (label, seconds)
+LATENCY_WINDOWS: Tuple[Tuple[str, int], ...] = (("1m", 60), ("5m", 300), ("15m", 900))
+LATENCY_QUANTILES: Tuple[float, ...] = (0.5, 0.9, 0.99, 0.999)
+
+# Route label for requests that matched no route (e.g. 404s from scanners)
+UNMATCHED_ROUTE = "<unmatched>"
+# Route label once ``max_endpoints`` distinct routes have been seen
+OVERFLOW_ROUTE = "<other>"
+
+
+def _quantile_label(quantile: float) -> str:
+    return f"p{quantile * 100:g}".replace(".", "")
+
+
+class EndpointStats:
+    """Lifetime and windowed latency of one ``METHOD route``."""
+    
+    __slots__ = ("method", "route", "count", "total", "min", "max", "statuses", "histogram", "windowed")
+    
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.statuses: Counter = Counter()
+        self.histogram = Histogram(DEFAULT_LATENCY_BUCKETS)
+        self.windowed = WindowedHistogram(
+            PRECISE_LATENCY_BUCKETS, interval=60.0, slots=LATENCY_WINDOWS[-1][1] // 60 + 1
+        )
+    
+    def observe(self, duration: float, status_code: int, now: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.min = min(self.min, duration)
+        self.max = max(self.max, duration)
+        self.statuses[status_code] += 1
+        self.histogram.observe(duration)
+        self.windowed.observe(duration, now)
+    
+    def percentiles(self, now: float) -> Dict[str, Dict[str, Optional[float]]]:
+        return _percentiles([self.windowed], now)
+
+
+def _percentiles(windowed: List[WindowedHistogram], now: float) -> Dict[str, Dict[str, Optional[float]]]:
+    result = {}
+    for label, seconds in LATENCY_WINDOWS:
+        merged = Histogram(PRECISE_LATENCY_BUCKETS)
+        for histogram in windowed:
+            merged.merge(histogram.window(seconds, now))
+        result[label] = {"count": merged.count}
+        for quantile in LATENCY_QUANTILES:
+            result[label][_quantile_label(quantile)] = merged.quantile(quantile)
+    return result
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
 
 class PerformanceMetrics:
     """In-memory storage for performance metrics."""
     
-    def __init__(self, max_entries: int = 1000):
+    def __init__(self, max_entries: int = 1000, max_endpoints: int = 200):
         """
         Initialize performance metrics storage.
         
         Args:
-            max_entries: Maximum number of entries to keep per metric type
+            max_entries: Maximum number of slow requests kept for inspection
+            max_endpoints: Maximum number of routes tracked separately
         """
-        self.request_times: deque = deque(maxlen=max_entries)
+        self.max_endpoints = max_endpoints
         self.slow_requests: deque = deque(maxlen=max_entries)
-        self.error_counts: Dict[str, int] = defaultdict(int)
-        self.endpoint_times: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_entries))
+        self.error_counts: Dict[str, int] = Counter()
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.slow_requests_count = 0
         self.slow_query_threshold: float = 1.0  # 1 second default
         
+    def _endpoint(self, method: str, route: str) -> EndpointStats:
+        endpoint = f"{method} {route}"
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            # Past the cap, new routes share one entry per method
+            if len(self.endpoints) >= self.max_endpoints and route != OVERFLOW_ROUTE:
+                return self._endpoint(method, OVERFLOW_ROUTE)
+            stats = self.endpoints[endpoint] = EndpointStats(method, route)
+        return stats
+    
     def record_request(
         self,
         path: str,
@@ -42,27 +127,19 @@ class PerformanceMetrics:
         Record a request metric.
         
         Args:
-            path: Request path
+            path: Route template (or request path)
             method: HTTP method
             duration: Request duration in seconds
             status_code: HTTP status code
             is_error: Whether this was an error response
         """
-        endpoint = f"{method} {path}"
-        
-        # Record all request times
-        self.request_times.append({
-            "endpoint": endpoint,
-            "duration": duration,
-            "status_code": status_code,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
-        
-        # Record endpoint-specific times
-        self.endpoint_times[endpoint].append(duration)
+        stats = self._endpoint(method, path)
+        stats.observe(duration, status_code, time.monotonic())
+        endpoint = f"{method} {stats.route}"
         
         # Track slow requests
         if duration >= self.slow_query_threshold:
+            self.slow_requests_count += 1
             self.slow_requests.append({
                 "endpoint": endpoint,
                 "duration": duration,
@@ -88,57 +165,91 @@ class PerformanceMetrics:
         Returns:
             Dictionary with performance metrics
         """
-        if not self.request_times:
-            return {
-                "total_requests": 0,
-                "average_duration": 0,
-                "slow_requests_count": 0,
-                "error_count": sum(self.error_counts.values()),
-                "endpoint_stats": {}
-            }
-        
-        durations = [r["duration"] for r in self.request_times]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        max_duration = max(durations) if durations else 0
-        min_duration = min(durations) if durations else 0
+        now = time.monotonic()
+        endpoints = list(self.endpoints.values())
+        total_requests = sum(stats.count for stats in endpoints)
         
         # Calculate endpoint-specific stats
         endpoint_stats = {}
-        for endpoint, times in self.endpoint_times.items():
-            if times:
-                endpoint_times_list = list(times)
-                endpoint_stats[endpoint] = {
-                    "count": len(endpoint_times_list),
-                    "average": sum(endpoint_times_list) / len(endpoint_times_list),
-                    "min": min(endpoint_times_list),
-                    "max": max(endpoint_times_list)
-                }
+        for stats in endpoints:
+            endpoint_stats[f"{stats.method} {stats.route}"] = {
+                "count": stats.count,
+                "average": stats.total / stats.count,
+                "min": stats.min,
+                "max": stats.max,
+                "percentiles": stats.percentiles(now),
+            }
         
         return {
-            "total_requests": len(self.request_times),
-            "average_duration": avg_duration,
-            "min_duration": min_duration,
-            "max_duration": max_duration,
-            "slow_requests_count": len(self.slow_requests),
+            "total_requests": total_requests,
+            "average_duration": sum(stats.total for stats in endpoints) / total_requests if total_requests else 0,
+            "min_duration": min((stats.min for stats in endpoints), default=0),
+            "max_duration": max((stats.max for stats in endpoints), default=0),
+            "percentiles": _percentiles([stats.windowed for stats in endpoints], now),
+            "slow_requests_count": self.slow_requests_count,
             "error_count": sum(self.error_counts.values()),
             "error_breakdown": dict(self.error_counts),
             "endpoint_stats": endpoint_stats,
             "slow_requests": list(self.slow_requests)[-10:],  # Last 10 slow requests
         }
     
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        now = time.monotonic()
+        endpoints = sorted(self.endpoints.values(), key=lambda stats: (stats.route, stats.method))
+        
+        lines = [
+            "# HELP http_requests_total HTTP requests handled, by route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for stats in endpoints:
+            labels = f'method="{stats.method}",route="{_label_value(stats.route)}"'
+            for status_code, count in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{{labels},status="{status_code}"}} {count}')
+        
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request duration in seconds.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for stats in endpoints:
+            labels = f'method="{stats.method}",route="{_label_value(stats.route)}"'
+            bounds = [f"{bound:g}" for bound in stats.histogram.bounds] + ["+Inf"]
+            for bound, count in zip(bounds, stats.histogram.cumulative()):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.histogram.count}")
+        
+        lines += [
+            "# HELP http_request_duration_window_seconds HTTP request duration percentiles over trailing windows.",
+            "# TYPE http_request_duration_window_seconds gauge",
+        ]
+        for stats in endpoints:
+            labels = f'method="{stats.method}",route="{_label_value(stats.route)}"'
+            for label, seconds in LATENCY_WINDOWS:
+                window = stats.windowed.window(seconds, now)
+                if not window.count:
+                    continue
+                for quantile in LATENCY_QUANTILES:
+                    lines.append(
+                        f'http_request_duration_window_seconds{{{labels},window="{label}",quantile="{quantile:g}"}} '
+                        f"{window.quantile(quantile)}"
+                    )
+        
+        return "\n".join(lines) + "\n"
+    
     def reset(self) -> None:
         """Reset all metrics."""
-        self.request_times.clear()
         self.slow_requests.clear()
         self.error_counts.clear()
-        self.endpoint_times.clear()
+        self.endpoints.clear()
+        self.slow_requests_count = 0
 
 
 # Global metrics instance
 _metrics = PerformanceMetrics()
 
 
-class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
+class PerformanceMonitoringMiddleware:
     """
     Middleware for monitoring request performance.
     
@@ -165,7 +276,7 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
             slow_request_threshold: Threshold in seconds for slow requests
             track_slow_queries: Whether to track slow database queries
         """
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
         self.metrics = _metrics
         self.metrics.slow_query_threshold = slow_request_threshold
@@ -178,72 +289,100 @@ class PerformanceMonitoringMiddleware(BaseHTTPMiddleware):
             "/docs",
             "/openapi.json",
             "/redoc",
+            "/metrics",
         }
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request and track performance metrics."""
         
-        if not self.enabled:
-            return await call_next(request)
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Skip monitoring for certain paths
-        if request.url.path in self.skip_paths:
-            return await call_next(request)
+        path = scope["path"]
+        if path in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
         
         # Record start time
         start_time = time.time()
+        status_code = 500
+        
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add performance headers (time until the response starts)
+                headers = MutableHeaders(scope=message)
+                headers["X-Request-Duration"] = f"{time.time() - start_time:.3f}"
+                headers["X-Request-Id"] = scope.get("state", {}).get("correlation_id", "")
+            await send(message)
         
         try:
             # Process request
-            response = await call_next(request)
-            
-            # Calculate duration
-            duration = time.time() - start_time
-            
-            # Determine if error
-            is_error = response.status_code >= 400
-            
-            # Record metrics
-            self.metrics.record_request(
-                path=request.url.path,
-                method=request.method,
-                duration=duration,
-                status_code=response.status_code,
-                is_error=is_error
-            )
-            
-            # Add performance headers
-            response.headers["X-Request-Duration"] = f"{duration:.3f}"
-            response.headers["X-Request-Id"] = getattr(request.state, "correlation_id", "")
-            
-            # Log slow requests with structured logging
-            if duration >= self.metrics.slow_query_threshold:
-                from backend.utils.logging_utils import log_structured
-                correlation_id = getattr(request.state, "correlation_id", "")
-                log_structured(
-                    level="warning",
-                    message="Slow request detected",
-                    correlation_id=correlation_id,
-                    request=request,
-                    duration_ms=duration * 1000,
-                    threshold_ms=self.metrics.slow_query_threshold * 1000,
-                    endpoint=f"{request.method} {request.url.path}",
-                    status_code=response.status_code
-                )
-            
-            return response
-            
-        except Exception as e:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
             # Record error even if exception occurs
-            duration = time.time() - start_time
             self.metrics.record_request(
-                path=request.url.path,
-                method=request.method,
-                duration=duration,
+                path=_route_path(scope),
+                method=scope["method"],
+                duration=time.time() - start_time,
                 status_code=500,
                 is_error=True
             )
             raise
+        
+        # Calculate duration, including the response body
+        duration = time.time() - start_time
+        
+        # Record metrics
+        self.metrics.record_request(
+            path=_route_path(scope),
+            method=scope["method"],
+            duration=duration,
+            status_code=status_code,
+            is_error=status_code >= 400
+        )
+        
+        # Log slow requests with structured logging
+        if duration >= self.metrics.slow_query_threshold:
+            from backend.utils.logging_utils import log_structured
+            request = Request(scope)
+            correlation_id = getattr(request.state, "correlation_id", "")
+            log_structured(
+                level="warning",
+                message="Slow request detected",
+                correlation_id=correlation_id,
+                request=request,
+                duration_ms=duration * 1000,
+                threshold_ms=self.metrics.slow_query_threshold * 1000,
+                endpoint=f"{scope['method']} {path}",
+                status_code=status_code
+            )
+
+
+def _route_path(scope: Scope) -> str:
+    """
+    Route template set by the router, so path parameters do not multiply series.
+    
+    Routes reached through ``include_router(prefix=...)`` may carry only their
+    own template, so the prefix is taken from the request path: it is the part
+    before the first "/" from which the route's pattern matches the rest.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    
+    path = scope["path"]
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None or path_regex.match(path):
+        return template
+    for index, char in enumerate(path):
+        if index and char == "/" and path_regex.match(path[index:]):
+            return path[:index] + template
+    return template
 
 
 def get_performance_metrics() -> PerformanceMetrics:
@@ -2,16 +2,24 @@
 Rate limiting middleware to protect API from abuse.
 
 Supports both in-memory and Redis-backed rate limiting for distributed systems.
-Implements per-user and per-IP rate limiting with comprehensive headers.
+The Redis path checks and records each request atomically in one Lua script
+(see ``rate_limit_scripts``). The in-memory path uses fixed-size counters for a
+bounded number of clients (see ``rate_limit_local``). Implements per-user and per-IP rate limiting with
+comprehensive headers.
 """
 
 import logging
+import os
 import time
-from collections import defaultdict
 from typing import Dict, Tuple, Optional, Set
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.utils.route_trie import RouteTrie
+from .rate_limit_local import DEFAULT_BUCKETS, DEFAULT_MAX_CLIENTS, LocalRateLimiter
+from .rate_limit_scripts import SCRIPTS, SLIDING_LOG, RateLimitDecision, RedisRateLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +38,7 @@ class RateLimitConfig:
         self.burst_size = burst_size
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Rate limiting middleware using sliding window algorithm.
     
@@ -40,7 +48,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
         burst_size: int = 10,
@@ -48,6 +56,9 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         use_redis: bool = False,
         user_requests_per_minute: Optional[int] = None,
         user_requests_per_hour: Optional[int] = None,
+        algorithm: str = SLIDING_LOG,
+        max_tracked_clients: int = DEFAULT_MAX_CLIENTS,
+        local_buckets: int = DEFAULT_BUCKETS,
     ):
         """
         Initialize rate limiting middleware.
@@ -61,13 +72,19 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             use_redis: Use Redis for distributed rate limiting (if available)
             user_requests_per_minute: Separate limit for authenticated users (None = same as IP limit)
             user_requests_per_hour: Separate limit for authenticated users (None = same as IP limit)
+            algorithm: Redis algorithm: 'sliding_log', 'sliding_window' or 'gcra'
+            max_tracked_clients: Clients tracked in memory when Redis is not used
+            local_buckets: Counters per window in memory (more is more accurate)
         """
-        super().__init__(app)
+        self.app = app
         self.default_requests_per_minute = requests_per_minute
         self.default_requests_per_hour = requests_per_hour
         self.default_burst_size = burst_size
         self.enabled = enabled
         self.use_redis = use_redis
+        if algorithm not in SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.algorithm = algorithm
         
         # Per-user limits (if different from IP limits)
         self.user_requests_per_minute = user_requests_per_minute or requests_per_minute
@@ -84,29 +101,24 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             "/api/v1/patients": RateLimitConfig(120, 2000, 20),
             "/api/v1/health": RateLimitConfig(300, 10000, 50),
         }
+        # Compiled once: lookups walk path segments instead of scanning every prefix
+        self._endpoint_trie: RouteTrie[RateLimitConfig] = RouteTrie(self._endpoint_limits)
+        self._default_config = RateLimitConfig(
+            self.default_requests_per_minute,
+            self.default_requests_per_hour,
+            self.default_burst_size,
+        )
         
         # Admin roles that bypass rate limiting
         self._admin_roles: Set[str] = {"admin", "system"}
         
-        # Redis client (if available)
+        # Redis client (if available). The shared client is created at startup,
+        # after the middleware stack is built, so it is looked up lazily.
         self._redis_client = None
-        if use_redis:
-            try:
-                from backend.database.connection import get_redis_client
-                self._redis_client = get_redis_client()
-                if self._redis_client:
-                    logger.info("Using Redis for distributed rate limiting")
-                else:
-                    logger.warning("Redis requested but not available, falling back to in-memory")
-                    self.use_redis = False
-            except Exception as e:
-                logger.warning(f"Failed to initialize Redis for rate limiting: {e}, using in-memory")
-                self.use_redis = False
+        self._redis_limiter: Optional[RedisRateLimiter] = None
         
-        # In-memory storage (fallback if Redis not available)
-        self._request_times: Dict[str, list] = defaultdict(list)
-        self._last_cleanup = time.time()
-        self._cleanup_interval = 300  # Clean up every 5 minutes
+        # In-memory limiter (fallback if Redis not available)
+        self._local_limiter = LocalRateLimiter(max_tracked_clients, local_buckets)
         
     def _get_client_id(self, request: Request) -> str:
         """Get unique identifier for rate limiting (IP or user ID)."""
@@ -151,24 +163,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         Returns:
             RateLimitConfig with appropriate limits
         """
-        # Check for exact path match first
-        if path in self._endpoint_limits:
-            base_config = self._endpoint_limits[path]
-        else:
-            # Check for path prefix matches (for parameterized routes)
-            base_config = None
-            for endpoint, config in self._endpoint_limits.items():
-                if path.startswith(endpoint):
-                    base_config = config
-                    break
-            
-            # Return default configuration if no match
-            if not base_config:
-                base_config = RateLimitConfig(
-                    self.default_requests_per_minute,
-                    self.default_requests_per_hour,
-                    self.default_burst_size,
-                )
+        # Exact route or longest route prefix (by path segment), else the default
+        base_config = self._endpoint_trie.match(path) or self._default_config
         
         # Apply per-user limits if authenticated and different from IP limits
         if is_authenticated and (
@@ -183,103 +179,47 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         return base_config
     
-    def _cleanup_old_entries(self):
-        """Remove old request timestamps to prevent memory leak."""
-        current_time = time.time()
-        if current_time - self._last_cleanup < self._cleanup_interval:
-            return
-        
-        cutoff_time = current_time - 3600  # Keep last hour
-        for client_id in list(self._request_times.keys()):
-            self._request_times[client_id] = [
-                ts for ts in self._request_times[client_id] if ts > cutoff_time
-            ]
-            if not self._request_times[client_id]:
-                del self._request_times[client_id]
-        
-        self._last_cleanup = current_time
+    def set_endpoint_limit(self, path: str, config: RateLimitConfig) -> None:
+        """Set the limits for a route (``{param}`` segments match any value)."""
+        self._endpoint_limits[path] = config
+        self._endpoint_trie.insert(path, config)
+    
+    def _get_redis_limiter(self) -> Optional[RedisRateLimiter]:
+        """Script runner for the current Redis client, once one is available."""
+        if self._redis_client is None:
+            try:
+                from backend.database.connection import get_redis_client
+                self._redis_client = get_redis_client()
+            except Exception as e:
+                logger.warning(f"Failed to get Redis client for rate limiting: {e}")
+            if self._redis_client is None:
+                return None
+            logger.info("Using Redis for distributed rate limiting (%s)", self.algorithm)
+        
+        if self._redis_limiter is None or self._redis_limiter.client is not self._redis_client:
+            self._redis_limiter = RedisRateLimiter(self._redis_client, self.algorithm)
+        return self._redis_limiter
     
     async def _check_rate_limit_redis(
         self,
         client_id: str,
         config: RateLimitConfig,
-    ) -> Tuple[bool, Optional[str], int, int]:
+    ) -> RateLimitDecision:
         """
         Check rate limit using Redis (distributed rate limiting).
         
-        Returns:
-            (allowed, error_message, remaining_minute, remaining_hour)
+        One script call checks every window and records the request atomically.
         """
-        if not self._redis_client:
+        limiter = self._get_redis_limiter()
+        if limiter is None:
             # Fallback to in-memory if Redis unavailable
-            return await self._check_rate_limit_memory(client_id, config)
+            return self._local_limiter.check(client_id, config)
         
         try:
-            current_time = int(time.time())
-            current_time_ms = int(time.time() * 1000)
-            
-            # Redis keys
-            key_minute = f"ratelimit:{client_id}:minute"
-            key_hour = f"ratelimit:{client_id}:hour"
-            key_burst = f"ratelimit:{client_id}:burst"
-            
-            # Check burst limit (10 second window)
-            burst_count = await self._redis_client.zcount(
-                key_burst,
-                current_time_ms - 10000,
-                current_time_ms
-            )
-            if burst_count >= config.burst_size:
-                return False, f"Burst limit exceeded: {config.burst_size} requests per 10 seconds", 0, 0
-            
-            # Check per-minute limit
-            minute_count = await self._redis_client.zcount(
-                key_minute,
-                current_time - 60,
-                current_time
-            )
-            remaining_minute = max(0, config.requests_per_minute - minute_count)
-            if minute_count >= config.requests_per_minute:
-                # Get oldest request in window
-                oldest = await self._redis_client.zrange(key_minute, 0, 0, withscores=True)
-                if oldest:
-                    oldest_time = int(oldest[0][1])
-                    remaining = max(1, 60 - (current_time - oldest_time))
-                else:
-                    remaining = 60
-                return False, f"Rate limit exceeded: {config.requests_per_minute} requests per minute. Try again in {remaining} seconds", 0, 0
-            
-            # Check per-hour limit
-            hour_count = await self._redis_client.zcount(
-                key_hour,
-                current_time - 3600,
-                current_time
-            )
-            remaining_hour = max(0, config.requests_per_hour - hour_count)
-            if hour_count >= config.requests_per_hour:
-                oldest = await self._redis_client.zrange(key_hour, 0, 0, withscores=True)
-                if oldest:
-                    oldest_time = int(oldest[0][1])
-                    remaining = max(1, 3600 - (current_time - oldest_time))
-                else:
-                    remaining = 3600
-                return False, f"Rate limit exceeded: {config.requests_per_hour} requests per hour. Try again in {remaining} seconds", 0, 0
-            
-            # Add current request to Redis
-            pipe = self._redis_client.pipeline()
-            pipe.zadd(key_minute, {str(current_time_ms): current_time})
-            pipe.zadd(key_hour, {str(current_time_ms): current_time})
-            pipe.zadd(key_burst, {str(current_time_ms): current_time_ms})
-            pipe.expire(key_minute, 120)  # Keep for 2 minutes
-            pipe.expire(key_hour, 7200)  # Keep for 2 hours
-            pipe.expire(key_burst, 20)  # Keep for 20 seconds
-            await pipe.execute()
-            
-            return True, None, remaining_minute, remaining_hour
-            
+            return await limiter.check(client_id, config)
         except Exception as e:
             logger.warning(f"Redis rate limit check failed: {e}, falling back to in-memory")
-            return await self._check_rate_limit_memory(client_id, config)
+            return self._local_limiter.check(client_id, config)
     
     async def _check_rate_limit_memory(
         self,
@@ -292,35 +232,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         Returns:
             (allowed, error_message, remaining_minute, remaining_hour)
         """
-        current_time = time.time()
-        request_times = self._request_times[client_id]
-        
-        # Remove timestamps older than 1 hour
-        cutoff_time = current_time - 3600
-        request_times[:] = [ts for ts in request_times if ts > cutoff_time]
-        
-        # Check burst limit (last 10 seconds)
-        recent_requests = [ts for ts in request_times if ts > current_time - 10]
-        if len(recent_requests) >= config.burst_size:
-            return False, f"Burst limit exceeded: {config.burst_size} requests per 10 seconds", 0, 0
-        
-        # Check per-minute limit
-        minute_requests = [ts for ts in request_times if ts > current_time - 60]
-        remaining_minute = max(0, config.requests_per_minute - len(minute_requests))
-        if len(minute_requests) >= config.requests_per_minute:
-            remaining = 60 - int(current_time - minute_requests[0])
-            return False, f"Rate limit exceeded: {config.requests_per_minute} requests per minute. Try again in {remaining} seconds", 0, 0
-        
-        # Check per-hour limit
-        hour_requests = [ts for ts in request_times if ts > current_time - 3600]
-        remaining_hour = max(0, config.requests_per_hour - len(hour_requests))
-        if len(hour_requests) >= config.requests_per_hour:
-            remaining = 3600 - int(current_time - hour_requests[0])
-            return False, f"Rate limit exceeded: {config.requests_per_hour} requests per hour. Try again in {remaining} seconds", 0, 0
-        
-        # Add current request timestamp
-        request_times.append(current_time)
-        return True, None, remaining_minute, remaining_hour
+        decision = self._local_limiter.check(client_id, config)
+        return decision.allowed, decision.message, decision.remaining_minute, decision.remaining_hour
     
     async def _check_rate_limit(
         self,
@@ -333,39 +246,47 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         Returns:
             (allowed, error_message, remaining_minute, remaining_hour)
         """
+        decision = await self._evaluate(client_id, config)
+        return decision.allowed, decision.message, decision.remaining_minute, decision.remaining_hour
+    
+    async def _evaluate(self, client_id: str, config: RateLimitConfig) -> RateLimitDecision:
         if not self.enabled:
-            return True, None, config.requests_per_minute, config.requests_per_hour
+            return RateLimitDecision(True, None, config.requests_per_minute, config.requests_per_hour)
         
-        if self.use_redis and self._redis_client:
+        if self.use_redis:
             return await self._check_rate_limit_redis(client_id, config)
-        else:
-            return await self._check_rate_limit_memory(client_id, config)
+        return self._local_limiter.check(client_id, config)
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request with rate limiting."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         # Skip rate limiting for health checks and static files
-        if request.url.path in ["/health", "/api/v1/health", "/docs", "/openapi.json", "/redoc"]:
-            return await call_next(request)
+        path = scope["path"]
+        if path in ["/health", "/api/v1/health", "/docs", "/openapi.json", "/redoc"]:
+            await self.app(scope, receive, send)
+            return
         
         # Skip rate limiting in test environment
-        import os
         if os.getenv("TESTING", "").lower() == "true" or os.getenv("PYTEST_CURRENT_TEST"):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
         
         # Check if user is admin (bypass rate limiting)
         if self._is_admin_user(request):
-            response = await call_next(request)
             # Still add headers for admin users (for monitoring)
-            response.headers["X-RateLimit-Limit"] = "unlimited"
-            response.headers["X-RateLimit-Remaining"] = "unlimited"
-            response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 60)
-            return response
-        
-        # Cleanup old entries periodically
-        self._cleanup_old_entries()
+            await self.app(scope, receive, self._send_with_headers(send, {
+                "X-RateLimit-Limit": "unlimited",
+                "X-RateLimit-Remaining": "unlimited",
+                "X-RateLimit-Reset": str(int(time.time()) + 60),
+            }))
+            return
         
         # Get rate limit configuration for this endpoint
-        path = request.url.path
         is_authenticated = bool(getattr(request.state, "auth", None))
         config = self._get_rate_limit_config(path, is_authenticated)
         
@@ -373,7 +294,15 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         client_id = self._get_client_id(request)
         
         # Check rate limit
-        allowed, error_msg, remaining_minute, remaining_hour = await self._check_rate_limit(client_id, config)
+        decision = await self._evaluate(client_id, config)
+        allowed, error_msg = decision.allowed, decision.message
+        remaining_minute, remaining_hour = decision.remaining_minute, decision.remaining_hour
+        retry_after = decision.retry_after
+        limit_minute = decision.limit_minute or config.requests_per_minute
+        limit_hour = decision.limit_hour or config.requests_per_hour
+        
+        # Calculate reset time
+        reset_time = int(time.time()) + 60  # Reset in 1 minute
         
         if not allowed:
             logger.warning(
@@ -383,20 +312,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 config.requests_per_minute
             )
             
-            # Calculate retry-after time
-            current_time = time.time()
-            request_times = self._request_times[client_id]
-            minute_requests = [ts for ts in request_times if ts > current_time - 60]
-            if minute_requests:
-                retry_after = max(1, 60 - int(current_time - minute_requests[0]))
-            else:
-                retry_after = 60
-            
-            # Calculate reset time
-            current_time = time.time()
-            reset_time = int(current_time) + 60  # Reset in 1 minute
-            
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "status": "error",
@@ -405,28 +321,33 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     "path": path,
                 },
                 headers={
-                    "Retry-After": str(retry_after),
-                    "X-RateLimit-Limit": str(config.requests_per_minute),
+                    "Retry-After": str(retry_after or 60),
+                    "X-RateLimit-Limit": str(limit_minute),
                     "X-RateLimit-Remaining": "0",
                     "X-RateLimit-Reset": str(reset_time),
-                    "X-RateLimit-Limit-Hour": str(config.requests_per_hour),
+                    "X-RateLimit-Limit-Hour": str(limit_hour),
                     "X-RateLimit-Remaining-Hour": "0",
                 }
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
-        
-        # Add comprehensive rate limit headers (RFC 6585 compliant)
-        current_time = time.time()
-        reset_time = int(current_time) + 60  # Reset in 1 minute
-        
-        response.headers["X-RateLimit-Limit"] = str(config.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(remaining_minute)
-        response.headers["X-RateLimit-Reset"] = str(reset_time)
-        response.headers["X-RateLimit-Limit-Hour"] = str(config.requests_per_hour)
-        response.headers["X-RateLimit-Remaining-Hour"] = str(remaining_hour)
-        response.headers["X-RateLimit-Policy"] = f"{config.requests_per_minute};w=60,{config.requests_per_hour};w=3600"
-        
-        return response
-
+        # Process request, adding comprehensive rate limit headers (RFC 6585 compliant)
+        await self.app(scope, receive, self._send_with_headers(send, {
+            "X-RateLimit-Limit": str(limit_minute),
+            "X-RateLimit-Remaining": str(remaining_minute),
+            "X-RateLimit-Reset": str(reset_time),
+            "X-RateLimit-Limit-Hour": str(limit_hour),
+            "X-RateLimit-Remaining-Hour": str(remaining_hour),
+            "X-RateLimit-Policy": f"{config.requests_per_minute};w=60,{config.requests_per_hour};w=3600",
+        }))
+    
+    @staticmethod
+    def _send_with_headers(send: Send, extra_headers: Dict[str, str]) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in extra_headers.items():
+                    headers[name] = value
+            await send(message)
+        return wrapped
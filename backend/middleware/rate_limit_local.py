@@ -0,0 +1,140 @@
+"""
+Memory-bounded in-process rate limiting.
+
+Used when Redis is disabled or unavailable. Each window of a client is a ring
+of fixed-width buckets (``buckets`` per window). The count for a sliding
+window is the sum of the buckets inside it, plus the part of the oldest bucket
+that still overlaps the window. This assumes requests are spread evenly
+within a bucket. More buckets mean a closer approximation and more memory.
+
+Clients live in an LRU table capped at ``max_clients``. When it is full, the
+least recently seen client is dropped, which resets its counts. A client that
+is being limited is also seen recently, so churn from many one-off addresses
+(a scanner) evicts idle clients first.
+
+Memory is about ``max_clients * windows * (buckets + 1)`` counters. Each check
+costs O(windows), since window totals are kept as buckets are added and
+cleared. A denial also scans one ring to compute ``Retry-After``.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from .rate_limit_scripts import BURST_WINDOW_MS, HOUR_MS, MINUTE_MS, RateLimitDecision, denied_message
+
+DEFAULT_MAX_CLIENTS = 10_000
+DEFAULT_BUCKETS = 6
+
+
+class _WindowCounter:
+    """Ring of ``buckets + 1`` counts covering one sliding window."""
+
+    __slots__ = ("counts", "index", "total")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.index = 0  # bucket number of the newest slot
+        self.total = 0
+
+    def advance(self, index: int) -> None:
+        size = len(self.counts)
+        if index <= self.index:
+            return
+        if index - self.index >= size:
+            self.counts[:] = [0] * size
+            self.total = 0
+        else:
+            for bucket in range(self.index + 1, index + 1):
+                self.total -= self.counts[bucket % size]
+                self.counts[bucket % size] = 0
+        self.index = index
+
+    def add(self) -> None:
+        self.counts[self.index % len(self.counts)] += 1
+        self.total += 1
+
+    def estimate(self, oldest_weight: float) -> float:
+        oldest = self.counts[(self.index + 1) % len(self.counts)]
+        return self.total - oldest + oldest * oldest_weight
+
+    def seconds_until_below(self, limit: int, bucket_seconds: float, now: float) -> float:
+        """When the estimate drops below ``limit`` if no more requests are recorded."""
+        size = len(self.counts)
+        remaining = self.total
+        # Bucket ``index - size + 1 + step`` slides out during bucket ``index + step``
+        for step in range(size):
+            count = self.counts[(self.index + 1 + step) % size]
+            remaining -= count
+            if count and remaining < limit:
+                fraction_out = 1 - (limit - remaining) / count
+                return max(0.0, (self.index + step + fraction_out) * bucket_seconds - now)
+        return (self.index + size) * bucket_seconds - now
+
+
+class LocalRateLimiter:
+    """Sliding-window rate limits for at most ``max_clients`` clients."""
+
+    def __init__(self, max_clients: int = DEFAULT_MAX_CLIENTS, buckets: int = DEFAULT_BUCKETS) -> None:
+        if max_clients < 1 or buckets < 1:
+            raise ValueError("max_clients and buckets must be positive")
+        self.max_clients = max_clients
+        self.buckets = buckets
+        self._clients: "OrderedDict[str, List[_WindowCounter]]" = OrderedDict()
+        self.evictions = 0
+
+    @staticmethod
+    def windows(config: Any) -> List[Tuple[int, int]]:
+        """``(window_ms, limit)`` pairs enforced for a config."""
+        return [
+            (BURST_WINDOW_MS, config.burst_size),
+            (MINUTE_MS, config.requests_per_minute),
+            (HOUR_MS, config.requests_per_hour),
+        ]
+
+    def _counters(self, client_id: str, count: int) -> List[_WindowCounter]:
+        counters = self._clients.get(client_id)
+        if counters is None:
+            if len(self._clients) >= self.max_clients:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+            counters = [_WindowCounter(self.buckets + 1) for _ in range(count)]
+            self._clients[client_id] = counters
+        else:
+            self._clients.move_to_end(client_id)
+        return counters
+
+    def check(self, client_id: str, config: Any, now: Optional[float] = None) -> RateLimitDecision:
+        """Check and (if allowed) record one request for ``client_id``."""
+        now = time.time() if now is None else now
+        windows = self.windows(config)
+        counters = self._counters(client_id, len(windows))
+
+        remaining = []
+        for counter, (window_ms, limit) in zip(counters, windows):
+            bucket_seconds = window_ms / 1000 / self.buckets
+            position = now / bucket_seconds
+            index = int(position)
+            counter.advance(index)
+            estimate = counter.estimate(1.0 - (position - index))
+            if estimate >= limit:
+                retry_after = max(1, int(counter.seconds_until_below(limit, bucket_seconds, now) + 0.999))
+                return RateLimitDecision(
+                    False, denied_message(window_ms, limit, limit, retry_after), 0, 0, retry_after
+                )
+            remaining.append(max(0, int(limit - estimate)))
+
+        for counter in counters:
+            counter.add()
+        return RateLimitDecision(True, None, remaining[-2], remaining[-1])
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get_stats(self) -> dict:
+        return {
+            "tracked_clients": len(self._clients),
+            "max_clients": self.max_clients,
+            "buckets_per_window": self.buckets,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,230 @@
+"""
+Atomic Redis rate limiting with Lua scripts.
+
+Each algorithm is a single script. The script checks every window for a
+client and records the request in one ``EVALSHA``, which is one round trip.
+Redis runs scripts one at a time, so concurrent requests cannot both see the
+last free slot.
+
+Algorithms (``RATE_LIMIT_ALGORITHM``):
+
+    sliding_log      Exact. One sorted set per client, holding each accepted
+                     request within the longest window.
+    sliding_window   Approximate. Current and previous fixed-window counts
+                     per window, weighted by overlap. Constant memory per
+                     client.
+    gcra             Token bucket (generic cell rate algorithm). One
+                     theoretical arrival time per window. Smooth rates with
+                     ``burst_size`` of headroom.
+
+All scripts take one key and ``ARGV = now_ms, member, (window_ms, limit,
+burst)...``. They return ``{allowed, denied_window, retry_after_ms,
+remaining...}``. ``remaining`` is counted before this request, like the
+in-memory limiter.
+"""
+
+import itertools
+import logging
+import os
+import time
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SLIDING_LOG = "sliding_log"
+SLIDING_WINDOW = "sliding_window"
+GCRA = "gcra"
+
+BURST_WINDOW_MS = 10_000
+MINUTE_MS = 60_000
+HOUR_MS = 3_600_000
+
+_SLIDING_LOG_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local n = (#ARGV - 2) / 3
+local longest = 0
+for i = 1, n do
+  longest = math.max(longest, tonumber(ARGV[i * 3]))
+end
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - longest)
+
+local result = {1, 0, 0}
+for i = 1, n do
+  local window = tonumber(ARGV[i * 3])
+  local limit = tonumber(ARGV[i * 3 + 1])
+  local start = '(' .. (now - window)
+  local count = redis.call('ZCOUNT', key, start, '+inf')
+  if count >= limit then
+    local oldest = redis.call('ZRANGEBYSCORE', key, start, '+inf', 'WITHSCORES', 'LIMIT', 0, 1)
+    local retry = window
+    if oldest[2] then
+      retry = tonumber(oldest[2]) + window - now
+    end
+    return {0, i, retry}
+  end
+  result[i + 3] = limit - count
+end
+redis.call('ZADD', key, now, ARGV[2])
+redis.call('PEXPIRE', key, longest)
+return result
+"""
+
+_SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local n = (#ARGV - 2) / 3
+local longest = 0
+local updates = {}
+
+local result = {1, 0, 0}
+for i = 1, n do
+  local window = tonumber(ARGV[i * 3])
+  local limit = tonumber(ARGV[i * 3 + 1])
+  longest = math.max(longest, window)
+
+  local index = math.floor(now / window)
+  local state = redis.call('HMGET', key, window .. ':i', window .. ':c', window .. ':p')
+  local stored = tonumber(state[1]) or index
+  local current = tonumber(state[2]) or 0
+  local previous = tonumber(state[3]) or 0
+  if stored == index - 1 then
+    previous, current = current, 0
+  elseif stored < index - 1 then
+    previous, current = 0, 0
+  end
+
+  local offset = now - index * window
+  local estimate = previous * (1 - offset / window) + current
+  if estimate >= limit then
+    local retry = window - offset
+    if current < limit and previous > 0 then
+      -- When enough of the previous window has slid out
+      retry = math.ceil((1 - (limit - current) / previous) * window - offset)
+    end
+    return {0, i, math.max(retry, 1)}
+  end
+  result[i + 3] = math.floor(limit - estimate)
+  table.insert(updates, window .. ':i')
+  table.insert(updates, index)
+  table.insert(updates, window .. ':c')
+  table.insert(updates, current + 1)
+  table.insert(updates, window .. ':p')
+  table.insert(updates, previous)
+end
+redis.call('HSET', key, unpack(updates))
+redis.call('PEXPIRE', key, longest * 2)
+return result
+"""
+
+_GCRA_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local n = (#ARGV - 2) / 3
+local updates = {}
+local expires = 0
+
+local result = {1, 0, 0}
+for i = 1, n do
+  local period = tonumber(ARGV[i * 3])
+  local limit = tonumber(ARGV[i * 3 + 1])
+  local burst = tonumber(ARGV[i * 3 + 2])
+  local interval = period / limit
+  local tolerance = interval * (burst - 1)
+
+  local tat = tonumber(redis.call('HGET', key, period)) or now
+  tat = math.max(tat, now)
+  if tat - tolerance > now then
+    return {0, i, math.ceil(tat - tolerance - now)}
+  end
+  result[i + 3] = math.floor((now + tolerance - tat) / interval) + 1
+  local new_tat = tat + interval
+  expires = math.max(expires, new_tat - now)
+  table.insert(updates, period)
+  table.insert(updates, string.format('%.3f', new_tat))
+end
+redis.call('HSET', key, unpack(updates))
+redis.call('PEXPIRE', key, math.ceil(expires))
+return result
+"""
+
+SCRIPTS = {
+    SLIDING_LOG: _SLIDING_LOG_SCRIPT,
+    SLIDING_WINDOW: _SLIDING_WINDOW_SCRIPT,
+    GCRA: _GCRA_SCRIPT,
+}
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    message: Optional[str]
+    remaining_minute: int
+    remaining_hour: int
+    retry_after: Optional[int] = None  # seconds, when denied
+    # What remaining_minute/remaining_hour count down from, when not the
+    # configured per-minute/per-hour limits (GCRA reports burst headroom)
+    limit_minute: Optional[int] = None
+    limit_hour: Optional[int] = None
+
+
+class RedisRateLimiter:
+    """Runs one rate limit script per request against a shared Redis."""
+
+    def __init__(self, redis_client: Any, algorithm: str = SLIDING_LOG, key_prefix: str = "ratelimit") -> None:
+        if algorithm not in SCRIPTS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm} (expected one of {sorted(SCRIPTS)})")
+        self.client = redis_client
+        self.algorithm = algorithm
+        self.key_prefix = key_prefix
+        # redis-py runs EVALSHA and reloads the script on NOSCRIPT
+        self._script = redis_client.register_script(SCRIPTS[algorithm])
+        self._member_prefix = f"{os.getpid()}:"
+        self._sequence = itertools.count()
+
+    def windows(self, config: Any) -> List[Tuple[int, int, int]]:
+        """``(window_ms, limit, burst)`` triples enforced for a config."""
+        if self.algorithm == GCRA:
+            # Rates with headroom: burst_size per minute, a minute's worth per hour
+            return [
+                (MINUTE_MS, config.requests_per_minute, min(config.burst_size, config.requests_per_minute)),
+                (HOUR_MS, config.requests_per_hour, min(config.requests_per_minute, config.requests_per_hour)),
+            ]
+        return [
+            (BURST_WINDOW_MS, config.burst_size, config.burst_size),
+            (MINUTE_MS, config.requests_per_minute, config.requests_per_minute),
+            (HOUR_MS, config.requests_per_hour, config.requests_per_hour),
+        ]
+
+    async def check(self, client_id: str, config: Any, now: Optional[float] = None) -> RateLimitDecision:
+        """Check and (if allowed) record one request for ``client_id``."""
+        now_ms = int((time.time() if now is None else now) * 1000)
+        windows = self.windows(config)
+        args: List[Any] = [now_ms, f"{self._member_prefix}{now_ms}:{next(self._sequence)}"]
+        for window in windows:
+            args.extend(window)
+
+        result = await self._script(keys=[f"{self.key_prefix}:{self.algorithm}:{client_id}"], args=args)
+        allowed, denied, retry_ms = (int(value) for value in result[:3])
+        # The last two windows are always the minute and the hour. Remaining
+        # counts are out of the burst, which equals the limit except for GCRA.
+        limit_minute, limit_hour = windows[-2][2], windows[-1][2]
+        if allowed:
+            remaining = [int(value) for value in result[3:]]
+            return RateLimitDecision(
+                True, None, max(remaining[-2], 0), max(remaining[-1], 0),
+                limit_minute=limit_minute, limit_hour=limit_hour,
+            )
+
+        window_ms, limit, burst = windows[denied - 1]
+        retry_after = max(1, -(-retry_ms // 1000))
+        return RateLimitDecision(
+            False, denied_message(window_ms, limit, burst, retry_after), 0, 0, retry_after,
+            limit_minute=limit_minute, limit_hour=limit_hour,
+        )
+
+
+def denied_message(window_ms: int, limit: int, burst: int, retry_after: int) -> str:
+    if window_ms == BURST_WINDOW_MS:
+        return f"Burst limit exceeded: {limit} requests per 10 seconds"
+    unit = "minute" if window_ms == MINUTE_MS else "hour"
+    return f"Rate limit exceeded: {limit} requests per {unit}. Try again in {retry_after} seconds"
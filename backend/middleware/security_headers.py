@@ -10,14 +10,14 @@ Implements comprehensive security headers including:
 - Permissions-Policy
 """
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from typing import Callable
+from typing import Dict
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import os
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware:
     """
     Middleware to add security headers to all responses.
     
@@ -27,58 +27,48 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         enabled: bool = True,
         strict_transport_security: bool = True,
         **kwargs
     ):
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
         self.strict_transport_security_enabled = strict_transport_security
         self.strict_transport_security_max_age = os.getenv(
             "HSTS_MAX_AGE", "31536000"  # 1 year default
         )
         self.enable_csp = os.getenv("ENABLE_CSP", "true").lower() == "true"
+        # The headers do not depend on the request, so they are built once
+        self.headers = self._build_headers()
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """
-        Add security headers to the response.
-        
-        Args:
-            request: Incoming request
-            call_next: Next middleware/handler in chain
-            
-        Returns:
-            Response with security headers added
-        """
-        response = await call_next(request)
-        
-        if not self.enabled:
-            return response
+    def _build_headers(self) -> Dict[str, str]:
+        """Security headers added to every response."""
+        headers: Dict[str, str] = {}
         
         # HTTP Strict Transport Security (HSTS)
         # Forces browsers to use HTTPS for future requests
         if self.strict_transport_security_enabled:
-            response.headers["Strict-Transport-Security"] = (
+            headers["Strict-Transport-Security"] = (
                 f"max-age={self.strict_transport_security_max_age}; "
                 "includeSubDomains; preload"
             )
         
         # X-Frame-Options
         # Prevents clickjacking attacks by controlling if page can be embedded in frames
-        response.headers["X-Frame-Options"] = "DENY"
+        headers["X-Frame-Options"] = "DENY"
         
         # X-Content-Type-Options
         # Prevents MIME type sniffing attacks
-        response.headers["X-Content-Type-Options"] = "nosniff"
+        headers["X-Content-Type-Options"] = "nosniff"
         
         # Referrer-Policy
         # Controls how much referrer information is sent with requests
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
         
         # Permissions-Policy (formerly Feature-Policy)
         # Controls which browser features can be used
-        response.headers["Permissions-Policy"] = (
+        headers["Permissions-Policy"] = (
             "geolocation=(), "
             "microphone=(), "
             "camera=(), "
@@ -105,13 +95,27 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
                 "form-action 'self'; "
                 "upgrade-insecure-requests"
             )
-            response.headers["Content-Security-Policy"] = csp_policy
+            headers["Content-Security-Policy"] = csp_policy
         
         # X-XSS-Protection (legacy, but still useful for older browsers)
-        response.headers["X-XSS-Protection"] = "1; mode=block"
+        headers["X-XSS-Protection"] = "1; mode=block"
+        
+        return headers
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Add the security headers when the response starts."""
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Remove server header to avoid information disclosure
-        if "Server" in response.headers:
-            del response.headers["Server"]
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in self.headers.items():
+                    headers[name] = value
+                # Remove server header to avoid information disclosure
+                if "Server" in headers:
+                    del headers["Server"]
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_headers)
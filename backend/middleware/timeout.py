@@ -4,24 +4,28 @@ Request timeout middleware to prevent long-running requests from blocking the se
 
 import logging
 import asyncio
-from typing import Optional
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
+# Python 3.11+: a deadline that runs in the request's own task and can be lifted
+_timeout = getattr(asyncio, "timeout", None)
 
-class TimeoutMiddleware(BaseHTTPMiddleware):
+
+class TimeoutMiddleware:
     """
     Request timeout middleware.
     
-    Automatically cancels requests that exceed the configured timeout.
+    Automatically cancels requests whose response has not started within the
+    configured timeout. Once the response has started (e.g. a streaming body)
+    the deadline no longer applies.
     """
     
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         timeout_seconds: float = 30.0,
         enabled: bool = True,
     ):
@@ -33,7 +37,7 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
             timeout_seconds: Maximum request duration in seconds
             enabled: Enable/disable timeout middleware
         """
-        super().__init__(app)
+        self.app = app
         self.timeout_seconds = timeout_seconds
         self.enabled = enabled
         
@@ -52,54 +56,71 @@ class TimeoutMiddleware(BaseHTTPMiddleware):
                 return timeout
         return self.timeout_seconds
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """Process request with timeout."""
-        if not self.enabled:
-            return await call_next(request)
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Get timeout for this endpoint
-        timeout = self._get_timeout_for_path(request.url.path)
+        path = scope["path"]
         
         # Skip timeout for health checks
-        if request.url.path in ["/health", "/api/v1/health"]:
-            return await call_next(request)
+        if path in ["/health", "/api/v1/health"]:
+            await self.app(scope, receive, send)
+            return
+        
+        # Get timeout for this endpoint
+        timeout = self._get_timeout_for_path(path)
+        response_started = False
+        deadline = None
+        
+        async def send_tracking_start(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if deadline is not None:
+                    deadline.reschedule(None)
+            await send(message)
         
         try:
             # Run request with timeout
-            response = await asyncio.wait_for(
-                call_next(request),
-                timeout=timeout
-            )
-            return response
+            if _timeout is None:
+                await asyncio.wait_for(self.app(scope, receive, send_tracking_start), timeout)
+            else:
+                async with _timeout(timeout) as deadline:
+                    await self.app(scope, receive, send_tracking_start)
             
         except asyncio.TimeoutError:
             logger.warning(
                 "Request timeout for %s %s (timeout: %.1fs)",
-                request.method,
-                request.url.path,
+                scope["method"],
+                path,
                 timeout
             )
+            if response_started:
+                # Too late for a 504; the server closes the connection
+                raise
             
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_504_GATEWAY_TIMEOUT,
                 content={
                     "status": "error",
                     "message": f"Request timeout: operation exceeded {timeout} seconds",
                     "error_type": "timeout",
-                    "path": str(request.url.path),
+                    "path": path,
                     "timeout_seconds": timeout,
                 },
                 headers={
                     "Retry-After": "30",  # Suggest retry after 30 seconds
                 }
             )
+            await response(scope, receive, send)
         
         except Exception as e:
             logger.error(
                 "Error in timeout middleware for %s: %s",
-                request.url.path,
+                path,
                 str(e)
             )
             # Re-raise to let other error handlers deal with it
             raise
-
@@ -4,17 +4,29 @@ Enables continuous learning and adaptation from user feedback
 Implements online learning strategies for personalization
 """
 
+import asyncio
 import logging
+import os
 from itertools import combinations
 from typing import Dict, List, Optional, Any, Hashable
 import json
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict
 
+from backend.feedback_store import FeedbackStore
 from backend.rl_agent import MLCRLAgent
+from backend.utils.event_history import EventHistory
 
 logger = logging.getLogger(__name__)
 
+# Characters that end a user prefix in a query ID (e.g. "dr-smith:q42")
+_QUERY_ID_SEPARATORS = frozenset(":-_/.")
+
+
+def _user_prefixes(query_id: str) -> List[str]:
+    """Prefixes of a query ID that can name a user: each one ending at a separator"""
+    return [query_id[:index] for index, char in enumerate(query_id) if index and char in _QUERY_ID_SEPARATORS]
+
 
 class MLCLearning:
     """
@@ -23,24 +35,37 @@ class MLCLearning:
     Decomposes complex tasks into learned components
     """
     
-    def __init__(self, learning_rate: float = 0.001, feedback_history_path: str = "./data/feedback"):
+    def __init__(self, learning_rate: float = 0.001, feedback_history_path: Optional[str] = None):
         """
         Initialize MLC Learning system
         
         Args:
             learning_rate: Learning rate for model updates
-            feedback_history_path: Path to store feedback history
+            feedback_history_path: Directory of the durable feedback log; feedback
+                is replayed from it at startup (in-memory only when omitted)
         """
         self.learning_rate = learning_rate
         self.feedback_history_path = feedback_history_path
-        self.feedback_history: List[Dict] = []
+        self.feedback_history = EventHistory(
+            "mlc_feedback",
+            maxlen=int(os.getenv("EVENT_HISTORY_LIMIT", "1000")),
+            categories={"feedback_type": lambda f: f.get("feedback_type")},
+        )
         self.learned_components: Dict[str, Dict] = {}
-        self.query_outcomes: Dict[str, List[Dict]] = defaultdict(list)
+        # Lifetime feedback-type counts per component, maintained incrementally
+        self.component_feedback: Dict[str, Counter] = defaultdict(Counter)
+        # Lifetime feedback counts per user prefix of the query ID, maintained incrementally
+        self.user_feedback: Counter = Counter()
         self.personalization_profiles: Dict[str, Dict] = {}
         self._rl_metrics = {
             "cumulative_reward": 0.0,
             "last_update": None,
+            "batched_updates": 0,
         }
+        # Queue RL transitions and apply them in batches off the request path
+        self.rl_batch_updates = os.getenv("MLC_RL_BATCH_UPDATES", "false").lower() == "true"
+        self.rl_batch_size = int(os.getenv("MLC_RL_BATCH_SIZE", "32"))
+        self._rl_training_scheduled = False
 
         self._initialize_components()
         self._initialize_rl_agent()
@@ -49,6 +74,13 @@ class MLCLearning:
         # or component selection before any user feedback arrives.
         self._rl_policy_prior: Optional[Any] = None
 
+        self.feedback_store: Optional[FeedbackStore] = None
+        if feedback_history_path:
+            self.feedback_store = FeedbackStore(
+                feedback_history_path, snapshot_provider=self.export_state
+            )
+            self._restore_from_store()
+
         logger.info("MLC Learning system initialized")
 
     async def record_feedback(self, patient_id: str, analysis: Dict[str, Any]) -> None:
@@ -68,11 +100,12 @@ class MLCLearning:
             "recorded_at": datetime.now().isoformat(),
         }
 
-        self.feedback_history.append(feedback_snapshot)
+        self._append_feedback(feedback_snapshot)
+        self._persist(feedback_snapshot)
         logger.info(
             "Recorded analysis feedback sample | patient_id=%s | total_samples=%d",
             patient_id,
-            len(self.feedback_history),
+            self.feedback_history.total,
         )
 
     def _initialize_components(self):
@@ -146,14 +179,36 @@ class MLCLearning:
                 "processed": False
             }
 
-            self.feedback_history.append(feedback_record)
+            self._append_feedback(feedback_record)
 
-            components_used = components_used or []
-            state = self._build_state_signature(components_used)
-            action = tuple(sorted(components_used))
-            reward = self._compute_reward(feedback_type)
-            self._rl_metrics["cumulative_reward"] += reward
-            self._rl_metrics["last_update"] = datetime.now().isoformat()
+            update_summary = self._apply_feedback(components_used or [], feedback_type)
+            
+            feedback_record["processed"] = True
+            self._persist(feedback_record)
+            
+            return update_summary
+        
+        except Exception as e:
+            logger.error(f"Error processing feedback: {str(e)}")
+            raise
+    
+    def _apply_feedback(
+        self,
+        components_used: List[str],
+        feedback_type: str,
+        replay: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Apply one feedback event to component performance, aggregates and the RL policy
+        
+        Used both for live feedback and when replaying the durable log at startup.
+        """
+        state = self._build_state_signature(components_used)
+        action = tuple(sorted(components_used))
+        reward = self._compute_reward(feedback_type)
+        self._rl_metrics["cumulative_reward"] += reward
+        self._rl_metrics["last_update"] = datetime.now().isoformat()
+        if not replay:
             logger.info(
                 "Computed reward %.2f for feedback '%s' on components %s",
                 reward,
@@ -161,13 +216,17 @@ class MLCLearning:
                 action or "none",
             )
 
-            # Update component performance based on feedback
-            update_summary = await self._update_component_performance(
-                components_used,
-                feedback_type
-            )
-
-            next_state = self._build_state_signature(components_used)
+        # Update component performance based on feedback
+        update_summary = self._adjust_component_performance(components_used, feedback_type)
+        if not replay:
+            for component_id, change in update_summary["performance_changes"].items():
+                logger.info(f"Updated {component_id}: {change['old']:.4f} → {change['new']:.4f}")
+
+        next_state = self._build_state_signature(components_used)
+        if self.rl_batch_updates and not replay:
+            self.rl_agent.observe(state, action, reward, next_state, done=False)
+            self._schedule_rl_training()
+        else:
             self.rl_agent.update_policy(
                 state=state,
                 action=action,
@@ -175,6 +234,7 @@ class MLCLearning:
                 next_state=next_state,
                 done=False,
             )
+        if not replay:
             logger.info(
                 "RL update applied | state=%s | action=%s | reward=%.2f | next_state=%s",
                 state,
@@ -183,21 +243,12 @@ class MLCLearning:
                 next_state,
             )
 
-            # Generate personalization insights
-            if components_used:
-                self.query_outcomes[components_used[0]].append({
-                    "feedback_type": feedback_type,
-                    "timestamp": datetime.now().isoformat()
-                })
-            
-            feedback_record["processed"] = True
-            
-            return update_summary
-        
-        except Exception as e:
-            logger.error(f"Error processing feedback: {str(e)}")
-            raise
-    
+        for component_id in components_used:
+            self.component_feedback[component_id][feedback_type] += 1
+            self.component_feedback[component_id]["total"] += 1
+
+        return update_summary
+
     async def _update_component_performance(
         self,
         components: List[str],
@@ -213,6 +264,13 @@ class MLCLearning:
         Returns:
             Update summary with new performance metrics
         """
+        return self._adjust_component_performance(components, feedback_type)
+
+    def _adjust_component_performance(
+        self,
+        components: List[str],
+        feedback_type: str
+    ) -> Dict[str, Any]:
         update_summary = {
             "updated_components": [],
             "performance_changes": {}
@@ -244,8 +302,6 @@ class MLCLearning:
                     "new": round(new_performance, 4),
                     "change": round(new_performance - old_performance, 4)
                 }
-                
-                logger.info(f"Updated {component_id}: {old_performance:.4f} → {new_performance:.4f}")
         
         return update_summary
     
@@ -333,23 +389,13 @@ class MLCLearning:
         if preferences:
             profile["preferences"].update(preferences)
         
-        # Calculate user-specific component preferences based on feedback
-        profile["feedback_count"] = sum(
-            1 for f in self.feedback_history 
-            if f.get("query_id", "").startswith(user_id)
-        )
+        # Lifetime feedback on this user's queries (IDs prefixed "<user_id>:", "<user_id>-", ...)
+        profile["feedback_count"] = self.user_feedback[user_id]
         
         # Identify preferred components (those with positive feedback)
-        component_feedback = defaultdict(lambda: {"positive": 0, "total": 0})
-        for feedback in self.feedback_history:
-            for comp in feedback.get("components_used", []):
-                component_feedback[comp]["total"] += 1
-                if feedback["feedback_type"] == "positive":
-                    component_feedback[comp]["positive"] += 1
-        
         profile["preferred_components"] = [
-            comp for comp, stats in component_feedback.items()
-            if stats["total"] > 0 and stats["positive"] / stats["total"] > 0.7
+            comp for comp, counts in self.component_feedback.items()
+            if counts["total"] > 0 and counts["positive"] / counts["total"] > 0.7
         ]
         
         profile["last_updated"] = datetime.now().isoformat()
@@ -360,7 +406,7 @@ class MLCLearning:
     async def get_learned_insights(self) -> Dict[str, Any]:
         """Get insights from accumulated learning data"""
         insights = {
-            "total_feedback_samples": len(self.feedback_history),
+            "total_feedback_samples": self.feedback_history.total,
             "component_performance": {},
             "task_performance": {},
             "improvement_rate": 0,
@@ -385,8 +431,8 @@ class MLCLearning:
         insights["most_used_components"] = [comp[0] for comp in sorted_components[:3]]
         
         # Calculate overall improvement rate
-        if len(self.feedback_history) > 10:
-            recent = self.feedback_history[-10:]
+        if self.feedback_history.total > 10:
+            recent = self.feedback_history.recent(10)
             positive_recent = sum(1 for f in recent if f["feedback_type"] == "positive")
             insights["improvement_rate"] = positive_recent / 10
         
@@ -395,22 +441,127 @@ class MLCLearning:
     def get_stats(self) -> Dict:
         """Get MLC system statistics"""
         return {
-            "total_feedback_samples": len(self.feedback_history),
+            "total_feedback_samples": self.feedback_history.total,
             "learned_components": len(self.learned_components),
             "personalized_users": len(self.personalization_profiles),
             "average_component_performance": sum(
                 c.get("performance", 0.8) for c in self.learned_components.values()
             ) / max(len(self.learned_components), 1),
             "learning_rate": self.learning_rate,
+            "feedback_types": self.feedback_history.category_counts("feedback_type"),
             "rl": self.get_rl_stats(),
+            "feedback_store": self.feedback_store.get_stats() if self.feedback_store else None,
         }
 
+    def _schedule_rl_training(self) -> None:
+        if self._rl_training_scheduled or len(self.rl_agent.replay_buffer) < self.rl_batch_size:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.train_rl_from_replay()
+            return
+        self._rl_training_scheduled = True
+        loop.call_soon(self.train_rl_from_replay)
+
+    def train_rl_from_replay(self) -> int:
+        """Apply all queued RL transitions as one vectorized batch"""
+        self._rl_training_scheduled = False
+        applied = self.rl_agent.train_from_replay()
+        if applied:
+            self._rl_metrics["batched_updates"] += applied
+            logger.info("Applied %d queued RL transitions", applied)
+        return applied
+
+    def _append_feedback(self, record: Dict[str, Any]) -> None:
+        self.feedback_history.append(record)
+        for prefix in _user_prefixes(record.get("query_id") or ""):
+            self.user_feedback[prefix] += 1
+
+    def _persist(self, record: Dict[str, Any]) -> None:
+        if self.feedback_store is not None:
+            self.feedback_store.append(record)
+
+    def _restore_from_store(self) -> None:
+        """Rebuild learned state from the last snapshot plus the events logged since"""
+        snapshot = self.feedback_store.load_snapshot()
+        if snapshot:
+            self.import_state(snapshot.get("state") or {})
+
+        replayed = 0
+        for record in self.feedback_store.replay():
+            self._append_feedback(record)
+            if record.get("feedback_type") != "analysis_snapshot":
+                self._apply_feedback(
+                    record.get("components_used") or [], record.get("feedback_type"), replay=True
+                )
+            replayed += 1
+
+        if snapshot or replayed:
+            logger.info(
+                "Restored MLC learning state from %s (%d events replayed)",
+                self.feedback_store.directory,
+                replayed,
+            )
+
+    def export_state(self) -> Dict[str, Any]:
+        """JSON-serializable learned state, used for feedback log compaction"""
+        self.train_rl_from_replay()
+        return {
+            "components": {
+                comp_id: {
+                    "performance": component["performance"],
+                    "usage_count": component["usage_count"],
+                }
+                for comp_id, component in self.learned_components.items()
+            },
+            "component_feedback": {
+                comp_id: dict(counts) for comp_id, counts in self.component_feedback.items()
+            },
+            "rl_metrics": dict(self._rl_metrics),
+            "q_table": self.rl_agent.export_q_values(),
+            "user_feedback": dict(self.user_feedback),
+            "feedback_total": self.feedback_history.total,
+            "recent_feedback": list(self.feedback_history),
+        }
+
+    def import_state(self, state: Dict[str, Any]) -> None:
+        """Load state produced by ``export_state``"""
+        for comp_id, values in (state.get("components") or {}).items():
+            if comp_id in self.learned_components:
+                self.learned_components[comp_id].update(values)
+        for comp_id, counts in (state.get("component_feedback") or {}).items():
+            self.component_feedback[comp_id] = Counter(counts)
+        self._rl_metrics.update(state.get("rl_metrics") or {})
+        self.rl_agent.import_q_values(state.get("q_table") or [])
+
+        if "user_feedback" in state:
+            self.user_feedback.update(state["user_feedback"])
+            for record in state.get("recent_feedback") or []:
+                self.feedback_history.append(record)
+        else:
+            # Snapshots written before the counts were kept: count what was retained
+            for record in state.get("recent_feedback") or []:
+                self._append_feedback(record)
+        self.feedback_history.total = max(
+            int(state.get("feedback_total") or 0), self.feedback_history.total
+        )
+
+    async def aclose(self) -> None:
+        """Apply queued RL updates and flush pending feedback to the durable log"""
+        self.train_rl_from_replay()
+        if self.feedback_store is not None:
+            await self.feedback_store.close()
+
     def get_rl_stats(self) -> Dict[str, Any]:
         """Return reinforcement learning telemetry for monitoring."""
         return {
             "cumulative_reward": round(self._rl_metrics.get("cumulative_reward", 0.0), 4),
             "exploration_rate": getattr(self.rl_agent, "epsilon", None),
             "last_update": self._rl_metrics.get("last_update"),
+            "states": self.rl_agent.num_states,
+            "pending_transitions": len(self.rl_agent.replay_buffer),
+            "batched_updates": self._rl_metrics.get("batched_updates", 0),
         }
 
     def update_policy_from_rl(self, policy: Any) -> None:
@@ -483,3 +634,4 @@ class MLCLearning:
             "correction": -0.5,
         }
         return reward_mapping.get(feedback_type, 0.0)
+
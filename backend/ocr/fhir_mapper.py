@@ -12,6 +12,10 @@ from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever mapping output changes: stored document resources mapped by an
+# older version are re-mapped on next read
+MAPPER_VERSION = "1"
+
 
 # LOINC codes for common lab tests
 LOINC_CODES = {
@@ -55,6 +59,8 @@ SNOMED_CONDITIONS = {
 class FHIRMapper:
     """Mapper for converting parsed medical data to FHIR resources."""
     
+    version = MAPPER_VERSION
+    
     def __init__(self):
         """Initialize FHIR mapper."""
         logger.info("FHIR mapper initialized")
@@ -5,10 +5,12 @@ Combines FHIR data, LLM intelligence, RAG knowledge, S-LoRA adaptation, MLC lear
 """
 
 import logging
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 from .alert_service import AlertService
+from .analysis_history import AnalysisHistoryStore
+from .database.analysis_facts import alert_fields, analysis_patient_name
 from .fhir_connector import FHIRConnectorError
 from .notification_service import NotificationService
 from .patient_data_service import PatientDataService
@@ -94,7 +96,7 @@ class PatientAnalyzer:
 
         self.database_service = database_service
         self.anomaly_service = anomaly_service
-        self.analysis_history: Dict[str, List[Dict]] = {}
+        self.history_store = AnalysisHistoryStore(self.history_limit, self.history_ttl_seconds)
 
         if self.database_service:
             logger.info("PatientAnalyzer initialized with database service")
@@ -191,6 +193,8 @@ class PatientAnalyzer:
         """
         logger.info("Starting analysis for patient %s", patient_id)
         analysis_start = datetime.now(timezone.utc)
+        # Adapters stay resident (not evictable) until this analysis finishes
+        pinned_adapters: List[str] = []
 
         try:
             result = {
@@ -269,7 +273,8 @@ class PatientAnalyzer:
             )
 
             for adapter in selected_adapters[:3]:  # Limit to top 3 for efficiency
-                await self.s_lora_manager.activate_adapter(adapter)
+                if await self.s_lora_manager.activate_adapter(adapter, pin=True):
+                    pinned_adapters.append(adapter)
 
             result["active_specialties"] = [
                 self.s_lora_manager.adapters[a].get("specialty")
@@ -413,6 +418,9 @@ class PatientAnalyzer:
                 "error": str(e),
                 "timestamp": datetime.now(timezone.utc).isoformat(),
             }
+        finally:
+            if pinned_adapters:
+                await self.s_lora_manager.release_adapters(pinned_adapters)
 
     async def _record_for_learning(self, patient_id: str, analysis: Dict[str, Any]):
         """Record analysis for MLC learning and feedback"""
@@ -455,13 +463,10 @@ class PatientAnalyzer:
                 logger.warning("Failed to save analysis to database, falling back to in-memory: %s", str(e))
         
         # Also keep in-memory for backward compatibility and fast access
-        bucket = self.analysis_history.setdefault(patient_id, [])
-        bucket.append(analysis)
-
-        removed = self._prune_history_for_patient(patient_id)
+        removed = self.history_store.add(analysis, patient_id)
         if removed:
             logger.info(
-                "Pruned %s expired analyses for %s after adding new result",
+                "Pruned %s analyses for %s after adding new result",
                 removed,
                 patient_id,
             )
@@ -470,22 +475,37 @@ class PatientAnalyzer:
         if stale_removed:
             logger.info("Pruned %s expired analyses across all patients", stale_removed)
 
+    @property
+    def analysis_history(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Snapshot of cached analyses per patient (assigning replaces the cache)."""
+
+        return self.history_store.as_dict()
+
+    @analysis_history.setter
+    def analysis_history(self, history: Dict[str, List[Dict[str, Any]]]) -> None:
+        self.history_store.clear()
+        for patient_id, bucket in history.items():
+            for analysis in bucket:
+                self.history_store.add(analysis, patient_id)
+
     def clear_history(self) -> None:
         """Remove all cached analyses to reclaim memory."""
 
-        self.analysis_history.clear()
+        self.history_store.clear()
 
     def get_history(self, patient_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Return a copy of the analysis history for a patient or all patients."""
 
         if patient_id is not None:
-            return list(self.analysis_history.get(patient_id, []))
+            return self.history_store.for_patient(patient_id)
+        return self.history_store.all()
 
-        all_entries: List[Dict[str, Any]] = []
-        for bucket in self.analysis_history.values():
-            all_entries.extend(bucket)
+    def get_recent_history(
+        self, limit: int, patient_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` analyses, newest first."""
 
-        return sorted(all_entries, key=self._timestamp_sort_key)
+        return self.history_store.recent(limit, patient_id)
 
     async def get_latest_analysis(self, patient_id: str) -> Optional[Dict[str, Any]]:
         """Return the latest analysis for a specific patient."""
@@ -500,15 +520,49 @@ class PatientAnalyzer:
                 logger.debug("Failed to get analysis from database, using in-memory: %s", str(e))
         
         # Fall back to in-memory
-        bucket = self.analysis_history.get(patient_id) or []
-        if not bucket:
-            return None
-        return bucket[-1]
+        return self.history_store.latest(patient_id)
 
     def total_history_count(self) -> int:
         """Return the total number of cached analyses across all patients."""
 
-        return sum(len(bucket) for bucket in self.analysis_history.values())
+        return len(self.history_store)
+
+    async def get_recent_alerts(
+        self,
+        limit: int,
+        patient_id: Optional[str] = None,
+        roster_lookup: Optional[Dict[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Recent critical and high-severity alerts, queried from the normalized
+        alert table when a database is configured, else from in-memory history.
+        """
+        if self.database_service:
+            try:
+                rows = await self.database_service.get_recent_alerts(
+                    limit=limit, patient_id=patient_id
+                )
+                if rows:
+                    return [
+                        self._alert_feed_item(
+                            alert_id=row["id"],
+                            patient_id=row["patient_id"],
+                            patient_name=row.get("patient_name"),
+                            fields={
+                                "title": row.get("title") or row.get("type"),
+                                "summary": row.get("message"),
+                                "severity": row["severity"],
+                                "timestamp": row.get("raised_at"),
+                            },
+                            analysis_timestamp=row["timestamp"],
+                            roster_lookup=roster_lookup,
+                        )
+                        for row in rows
+                    ]
+            except Exception as e:
+                logger.debug("Failed to query alerts from database, using in-memory: %s", str(e))
+
+        return self.collect_recent_alerts(limit, patient_id=patient_id, roster_lookup=roster_lookup)
 
     def collect_recent_alerts(
         self,
@@ -520,47 +574,27 @@ class PatientAnalyzer:
         Aggregate recent critical and high-severity alerts from analysis history.
         """
         alerts: List[Dict[str, Any]] = []
-        history = self.get_history(patient_id=patient_id)
 
-        for analysis in reversed(history):
+        for analysis in self.history_store.iter_recent(patient_id):
             timestamp = analysis.get("analysis_timestamp") or analysis.get("timestamp")
             analysis_patient_id = analysis.get("patient_id")
-
-            patient_name = (
-                (analysis.get("summary") or {}).get("patient_name")
-                or (analysis.get("patient_data") or {})
-                .get("patient", {})
-                .get("name")
-                or (roster_lookup.get(analysis_patient_id) if roster_lookup else None)
-                or analysis_patient_id
-            )
+            patient_name = analysis_patient_name(analysis)
 
             for idx, alert in enumerate(analysis.get("alerts") or []):
-                normalized = alert if isinstance(alert, dict) else {"summary": str(alert)}
-                severity = (normalized.get("severity") or "").lower()
-
-                if severity not in {"critical", "high"}:
+                fields = alert_fields(alert)
+                if fields["severity"] not in {"critical", "high"}:
                     continue
 
                 alerts.append(
-                    {
-                        "id": normalized.get("id")
+                    self._alert_feed_item(
+                        alert_id=fields["id"]
                         or f"{analysis_patient_id}-{idx}-{timestamp or len(alerts)}",
-                        "patient_id": analysis_patient_id,
-                        "patient_name": patient_name,
-                        "title": normalized.get("title")
-                        or normalized.get("type")
-                        or "Clinical Alert",
-                        "summary": normalized.get("summary")
-                        or normalized.get("description")
-                        or normalized.get("message")
-                        or str(alert),
-                        "severity": normalized.get("severity") or "critical",
-                        "timestamp": normalized.get("timestamp")
-                        or normalized.get("created_at")
-                        or timestamp
-                        or datetime.now(timezone.utc).isoformat(),
-                    }
+                        patient_id=analysis_patient_id,
+                        patient_name=patient_name,
+                        fields=fields,
+                        analysis_timestamp=timestamp,
+                        roster_lookup=roster_lookup,
+                    )
                 )
 
                 if len(alerts) >= limit:
@@ -571,81 +605,41 @@ class PatientAnalyzer:
 
         return sorted(alerts, key=lambda a: a.get("timestamp", ""), reverse=True)[:limit]
 
+    @staticmethod
+    def _alert_feed_item(
+        alert_id: str,
+        patient_id: Optional[str],
+        patient_name: Optional[str],
+        fields: Dict[str, Any],
+        analysis_timestamp: Optional[str],
+        roster_lookup: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """One alert feed entry, built the same way from database rows and in-memory history."""
 
-
-    def get_stats(self) -> Dict:
-        """Get analyzer statistics"""
         return {
-            "total_analyses": self.total_history_count(),
-            "successful_analyses": sum(
-                1
-                for a in self.get_history()
-                if a.get("status") == "completed"
-            ),
-            "average_analysis_time": sum(
-                a.get("analysis_duration_seconds", 0) for a in self.get_history()
-            )
-            / max(self.total_history_count(), 1),
+            "id": alert_id,
+            "patient_id": patient_id,
+            "patient_name": patient_name
+            or (roster_lookup.get(patient_id) if roster_lookup else None)
+            or patient_id,
+            "title": fields.get("title") or "Clinical Alert",
+            "summary": fields.get("summary") or "",
+            "severity": fields.get("severity") or "critical",
+            "timestamp": fields.get("timestamp")
+            or analysis_timestamp
+            or datetime.now(timezone.utc).isoformat(),
         }
 
-    def prune_stale_history(self) -> int:
-        """Prune TTL-expired analyses across all patients."""
 
-        total_removed = 0
-        for patient_id in list(self.analysis_history.keys()):
-            total_removed += self._prune_history_for_patient(patient_id)
-        return total_removed
-
-    def _prune_history_for_patient(self, patient_id: str) -> int:
-        bucket = self.analysis_history.get(patient_id, [])
-        if not bucket:
-            return 0
-
-        removed = self._prune_by_limit(bucket)
-        removed += self._prune_by_ttl(bucket)
-        return removed
-
-    def _prune_by_limit(self, bucket: List[Dict[str, Any]]) -> int:
-        if self.history_limit is None or self.history_limit <= 0:
-            return 0
-        excess = len(bucket) - self.history_limit
-        if excess > 0:
-            del bucket[:excess]
-        return max(excess, 0)
-
-    def _prune_by_ttl(self, bucket: List[Dict[str, Any]]) -> int:
-        if not self.history_ttl_seconds:
-            return 0
-
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.history_ttl_seconds)
-        retained: List[Dict[str, Any]] = []
-        removed = 0
-        for entry in bucket:
-            timestamp = self._parse_timestamp(entry)
-            if timestamp and timestamp < cutoff:
-                removed += 1
-                continue
-            retained.append(entry)
 
-        if removed:
-            bucket[:] = retained
-        return removed
+    def get_stats(self) -> Dict:
+        """Get analyzer statistics"""
+        return self.history_store.get_stats()
 
-    @staticmethod
-    def _parse_timestamp(entry: Dict[str, Any]) -> Optional[datetime]:
-        timestamp_value = entry.get("analysis_timestamp") or entry.get("timestamp")
-        if not timestamp_value:
-            return None
-        try:
-            parsed = datetime.fromisoformat(timestamp_value)
-            if parsed.tzinfo is None:
-                parsed = parsed.replace(tzinfo=timezone.utc)
-            return parsed
-        except (TypeError, ValueError):
-            return None
+    def prune_stale_history(self) -> int:
+        """Prune TTL-expired analyses across all patients."""
 
-    def _timestamp_sort_key(self, entry: Dict[str, Any]) -> datetime:
-        return self._parse_timestamp(entry) or datetime.min.replace(tzinfo=timezone.utc)
+        return self.history_store.prune_expired()
 
     @staticmethod
     def _calculate_age(birth_date_str: Optional[str]) -> Optional[int]:
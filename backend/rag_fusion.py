@@ -12,6 +12,7 @@ import json
 from datetime import datetime
 
 from backend.config.compliance_policies import get_region
+from backend.utils.event_history import EventHistory
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +35,11 @@ class RAGFusion:
         self.embedding_model = embedding_model
         self.embeddings = None
         self.knowledge_index = None
-        self.retrieval_stats = []
+        self.retrieval_stats = EventHistory(
+            "rag_retrievals",
+            maxlen=int(os.getenv("EVENT_HISTORY_LIMIT", "1000")),
+            metrics={"results_count": lambda s: s.get("results_count", 0)},
+        )
         self.region = get_region()  # Get current deployment region
         
         self._initialize_embeddings()
@@ -353,9 +358,7 @@ class RAGFusion:
                 len(self.knowledge_index.get(k, [])) 
                 for k in ["guidelines", "protocols"]
             ) + len(self.knowledge_index.get("conditions", {})) + len(self.knowledge_index.get("drugs", {})),
-            "total_retrievals": len(self.retrieval_stats),
-            "average_results_per_query": (
-                sum(s.get("results_count", 0) for s in self.retrieval_stats) / 
-                max(len(self.retrieval_stats), 1)
-            )
+            "total_retrievals": self.retrieval_stats.total,
+            "average_results_per_query": self.retrieval_stats.metric("results_count").mean,
+            "history": self.retrieval_stats.get_stats()
         }
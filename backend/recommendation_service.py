@@ -1,4 +1,8 @@
+import asyncio
+import json
 import logging
+import os
+import re
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -9,6 +13,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
 
 class RecommendationService:
     """Service for generating clinical recommendations."""
@@ -19,20 +25,36 @@ class RecommendationService:
         rag_fusion: "RAGFusion",
         aot_reasoner: "AoTReasoner",
         mlc_learning: "MLCLearning",
+        *,
+        max_concurrency: Optional[int] = None,
+        time_budget_seconds: Optional[float] = None,
+        pack_queries: Optional[bool] = None,
     ) -> None:
         """
         Initialize RecommendationService.
-        
+
         Args:
             llm_engine: LLM engine for generating recommendations
             rag_fusion: RAG fusion component for knowledge retrieval
             aot_reasoner: Algorithm of Thought reasoner
             mlc_learning: Meta-Learning for Compositionality learning component
+            max_concurrency: Maximum recommendation queries in flight at once
+            time_budget_seconds: Shared deadline for all recommendation queries
+            pack_queries: Send all queries as one multi-part LLM request
         """
         self.llm_engine = llm_engine
         self.rag_fusion = rag_fusion
         self.aot_reasoner = aot_reasoner
         self.mlc_learning = mlc_learning
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("RECOMMENDATION_MAX_CONCURRENCY", "3")
+        )
+        self.time_budget_seconds = time_budget_seconds or float(
+            os.getenv("RECOMMENDATION_TIME_BUDGET_SECONDS", "60")
+        )
+        if pack_queries is None:
+            pack_queries = os.getenv("RECOMMENDATION_PACK_QUERIES", "false").lower() == "true"
+        self.pack_queries = pack_queries
 
     async def generate_recommendations(
         self,
@@ -42,6 +64,7 @@ class RecommendationService:
         risk_scores: Dict[str, Any],
         adapters: List[str],
         focus: Optional[str] = None,
+        language: str = "en",
     ) -> Dict[str, Any]:
         """Generate clinical recommendations using LLM with RAG and AoT."""
 
@@ -64,23 +87,47 @@ class RecommendationService:
                 "What preventive measures would be most impactful for this patient?",
             ]
 
-            for query in queries:
-                reasoning_chain = await self.aot_reasoner.generate_reasoning_chain(
-                    question=query, context=patient_data
+            # Retrieve knowledge once per distinct query and share it with the
+            # reasoning chain and the LLM call.
+            retrieved = await self._retrieve_all(queries)
+
+            reasoning_chains = await asyncio.gather(
+                *(
+                    self.aot_reasoner.generate_reasoning_chain(
+                        question=query, context=patient_data, rag_results=retrieved[query]
+                    )
+                    for query in queries
                 )
-                recommendations["reasoning_chains"].append(reasoning_chain)
+            )
+            recommendations["reasoning_chains"].extend(reasoning_chains)
 
-                await self.rag_fusion.retrieve_relevant_knowledge(query)
+            # One deadline for the LLM phase: a packed attempt that times out
+            # leaves the fallback only what remains of the budget
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.time_budget_seconds
 
-                llm_response = await self.llm_engine.query_with_rag(
-                    question=query,
-                    patient_context=patient_data,
-                    rag_component=self.rag_fusion,
-                    aot_reasoner=self.aot_reasoner,
-                    include_reasoning=True,
-                    language=language,
+            results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+            if self.pack_queries:
+                results = await self._run_packed(
+                    queries, patient_data, retrieved, language, timeout=self.time_budget_seconds
+                )
+
+            pending = [index for index, result in enumerate(results) if result is None]
+            if pending:
+                individual = await self._run_concurrently(
+                    [queries[index] for index in pending],
+                    [reasoning_chains[index] for index in pending],
+                    patient_data,
+                    retrieved,
+                    language,
+                    timeout=max(deadline - loop.time(), 0.0),
                 )
+                for index, result in zip(pending, individual):
+                    results[index] = result
 
+            for query, llm_response in zip(queries, results):
+                if llm_response is None:
+                    continue
                 recommendations["clinical_recommendations"].append(
                     {
                         "query": query,
@@ -90,7 +137,7 @@ class RecommendationService:
                     }
                 )
 
-                recommendations["evidence_citations"].extend(llm_response.get("sources", []))
+                recommendations["evidence_citations"].extend(llm_response.get("sources") or [])
 
             recommendations["priority_actions"] = [
                 {"priority": 1, "action": alert["message"], "severity": alert["severity"]}
@@ -106,3 +153,157 @@ class RecommendationService:
                 "evidence_citations": [],
                 "error": str(exc),
             }
+
+    async def _retrieve_all(self, queries: List[str]) -> Dict[str, Any]:
+        """Retrieve knowledge concurrently, once per distinct query."""
+
+        distinct = list(dict.fromkeys(queries))
+        results = await asyncio.gather(
+            *(self.rag_fusion.retrieve_relevant_knowledge(query) for query in distinct)
+        )
+        return dict(zip(distinct, results))
+
+    async def _run_concurrently(
+        self,
+        queries: List[str],
+        reasoning_chains: List[Any],
+        patient_data: Dict[str, Any],
+        retrieved: Dict[str, Any],
+        language: str,
+        timeout: Optional[float] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Run LLM queries concurrently under the shared concurrency and time budget.
+
+        Queries that fail or miss the deadline (``timeout`` seconds, the full
+        budget by default) are logged and returned as None so the remaining
+        recommendations are still delivered.
+        """
+
+        if timeout is None:
+            timeout = self.time_budget_seconds
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(query: str, reasoning_chain: Any) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.llm_engine.query_with_rag(
+                    question=query,
+                    patient_context=patient_data,
+                    rag_component=self.rag_fusion,
+                    aot_reasoner=self.aot_reasoner,
+                    include_reasoning=True,
+                    language=language,
+                    rag_results=retrieved.get(query),
+                    reasoning_chain=reasoning_chain,
+                )
+
+        tasks = [
+            asyncio.ensure_future(run(query, chain))
+            for query, chain in zip(queries, reasoning_chains)
+        ]
+        done, not_done = await asyncio.wait(tasks, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(
+                "%d recommendation queries exceeded the %.1fs budget",
+                len(not_done),
+                self.time_budget_seconds,
+            )
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for query, task in zip(queries, tasks):
+            if task not in done:
+                results.append(None)
+            elif task.exception() is not None:
+                logger.error("Recommendation query failed (%s): %s", query, task.exception())
+                results.append(None)
+            else:
+                results.append(task.result())
+        return results
+
+    async def _run_packed(
+        self,
+        queries: List[str],
+        patient_data: Dict[str, Any],
+        retrieved: Dict[str, Any],
+        language: str,
+        timeout: Optional[float] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Answer all queries with a single multi-part LLM request.
+
+        Returns one response per query; entries are None when the structured
+        output could not be parsed, so the caller can fall back to per-query calls.
+        """
+
+        numbered = "\n".join(f"{index}. {query}" for index, query in enumerate(queries, 1))
+        question = (
+            "Answer each of the following clinical questions about this patient.\n"
+            f"{numbered}\n\n"
+            'Respond with JSON only: {"answers": [{"id": <question number>, "answer": "<text>"}]}'
+        )
+
+        try:
+            response = await asyncio.wait_for(
+                self.llm_engine.query_with_rag(
+                    question=question,
+                    patient_context=patient_data,
+                    include_reasoning=False,
+                    language=language,
+                    rag_results=self._merge_retrievals(retrieved),
+                ),
+                timeout=self.time_budget_seconds if timeout is None else timeout,
+            )
+        except Exception as exc:
+            logger.warning("Packed recommendation request failed, falling back: %s", exc)
+            return [None] * len(queries)
+
+        answers = self._parse_packed_answers(response.get("answer"), len(queries))
+        return [
+            {
+                "answer": answer,
+                "confidence": response.get("confidence"),
+                "sources": response.get("sources"),
+            }
+            if answer is not None
+            else None
+            for answer in answers
+        ]
+
+    @staticmethod
+    def _merge_retrievals(retrieved: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge per-query retrieval results, dropping duplicate content and sources."""
+
+        content: List[str] = []
+        sources: List[Any] = []
+        for result in retrieved.values():
+            if not isinstance(result, dict):
+                continue
+            content.extend(result.get("relevant_content") or [])
+            sources.extend(result.get("sources") or [])
+        return {
+            "relevant_content": list(dict.fromkeys(content)),
+            "sources": list(dict.fromkeys(sources)),
+        }
+
+    @staticmethod
+    def _parse_packed_answers(text: Optional[str], count: int) -> List[Optional[str]]:
+        """Extract per-question answers from a packed JSON response."""
+
+        answers: List[Optional[str]] = [None] * count
+        match = _JSON_OBJECT_RE.search(text or "")
+        if not match:
+            return answers
+        try:
+            payload = json.loads(match.group(0))
+        except ValueError:
+            return answers
+
+        for item in payload.get("answers", []) if isinstance(payload, dict) else []:
+            try:
+                index = int(item.get("id")) - 1
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if 0 <= index < count and item.get("answer"):
+                answers[index] = str(item["answer"])
+        return answers
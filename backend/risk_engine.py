@@ -0,0 +1,278 @@
+"""
+Columnar risk score engine.
+
+Patient records are reduced once to a row of raw features (age and the
+condition, medication and encounter counts). Every scoring rule is a linear
+combination of derived feature columns plus a clip, so all rules for all
+patients are evaluated with a single matrix product. The engine keeps the
+feature and score matrices for the patients it has seen, so updating one
+patient recomputes only that row.
+"""
+
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RAW_FEATURES = ("age", "condition_count", "medication_count", "encounter_count")
+
+POLYPHARMACY_THRESHOLD = 10
+
+# Initial row capacity of CohortRiskEngine's matrices
+MIN_CAPACITY = 64
+
+# Derived feature columns, computed from the raw feature matrix
+DERIVED_FEATURES = (
+    "age_factor",
+    "condition_load",
+    "encounter_load",
+    "medication_load",
+    "polypharmacy",
+)
+
+# Rule name -> intercept and weights over DERIVED_FEATURES; scores are clipped to [0, 1]
+RISK_RULES: Dict[str, Dict[str, float]] = {
+    # Cardiovascular risk increases with age and condition burden
+    "cardiovascular_risk": {
+        "base": 0.2,
+        "age_factor": 0.4,
+        "condition_load": 0.2,
+        "polypharmacy": 0.1,
+    },
+    # Readmission risk considers encounter history and medication complexity
+    "readmission_risk": {
+        "base": 0.15,
+        "age_factor": 0.25,
+        "encounter_load": 0.2,
+        "polypharmacy": 0.1,
+    },
+    # Medication adherence risk accounts for regimen complexity and age-related challenges
+    "medication_non_adherence_risk": {
+        "base": 0.1,
+        "age_factor": 0.3,
+        "medication_load": 1.0,
+        "polypharmacy": 0.15,
+    },
+}
+
+
+def calculate_age(birth_date_str: Optional[str], today: Optional[date] = None) -> Optional[int]:
+    """Age in whole years from an ISO birth date (None when missing or invalid)."""
+
+    if not birth_date_str:
+        return None
+
+    try:
+        birth_date = date.fromisoformat(birth_date_str[:10])
+    except (TypeError, ValueError):
+        return None
+
+    today = today or date.today()
+    return (
+        today.year
+        - birth_date.year
+        - ((today.month, today.day) < (birth_date.month, birth_date.day))
+    )
+
+
+class CohortRiskEngine:
+    """
+    Vectorized evaluation of the risk rules over many patients.
+
+    Usage:
+        engine = CohortRiskEngine()
+        scores = engine.score_many({"p1": patient_one, "p2": patient_two})
+        engine.upsert("p1", updated_patient_one)   # recomputes one row
+        engine.get("p2")
+    """
+
+    def __init__(self, rules: Optional[Mapping[str, Mapping[str, float]]] = None) -> None:
+        rules = rules or RISK_RULES
+        self.rule_names: List[str] = list(rules)
+        self._intercepts = np.array([rules[name].get("base", 0.0) for name in self.rule_names])
+        self._weights = np.array(
+            [[rules[name].get(feature, 0.0) for name in self.rule_names] for feature in DERIVED_FEATURES]
+        )
+
+        # Rows [0, len(self._ids)) are live; the arrays grow geometrically
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._raw = np.zeros((0, len(RAW_FEATURES)))
+        self._scores = np.zeros((0, len(self.rule_names)))
+        self._polypharmacy = np.zeros(0, dtype=bool)
+        self.stats = {"rows_evaluated": 0, "unchanged_skips": 0}
+
+    @staticmethod
+    def extract(patient_data: Dict[str, Any], today: Optional[date] = None) -> np.ndarray:
+        """Raw feature row for one patient"""
+
+        patient_info = patient_data.get("patient") or {}
+        age = calculate_age(patient_info.get("birthDate"), today) or 0
+        return np.array(
+            [
+                age,
+                len(patient_data.get("conditions") or []),
+                len(patient_data.get("medications") or []),
+                len(patient_data.get("encounters") or []),
+            ],
+            dtype=float,
+        )
+
+    def evaluate(self, raw: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores (patients x rules) and polypharmacy flags for a raw feature matrix"""
+
+        raw = np.atleast_2d(raw)
+        age, conditions, medications, encounters = raw.T
+        polypharmacy = medications >= POLYPHARMACY_THRESHOLD
+        derived = np.column_stack(
+            [
+                np.minimum(1.0, age / 100),
+                np.minimum(1.0, conditions / 5),
+                np.minimum(1.0, encounters / 5),
+                np.minimum(0.35, medications * 0.03),
+                polypharmacy.astype(float),
+            ]
+        )
+        scores = np.clip(self._intercepts + derived @ self._weights, 0.0, 1.0)
+        self.stats["rows_evaluated"] += len(raw)
+        return scores, polypharmacy
+
+    def _result(self, scores: np.ndarray, polypharmacy: bool) -> Dict[str, Any]:
+        result: Dict[str, Any] = dict(zip(self.rule_names, scores.tolist()))
+        # Explicit flags for downstream consumers
+        result["polypharmacy"] = bool(polypharmacy)
+        result["polypharmacy_risk"] = bool(polypharmacy)
+        return result
+
+    def score(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Scores for a single patient without storing them"""
+
+        scores, polypharmacy = self.evaluate(self.extract(patient_data))
+        return self._result(scores[0], polypharmacy[0])
+
+    def score_many(self, patients: Mapping[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Extract, evaluate and store scores for a cohort in one pass"""
+
+        if not patients:
+            return {}
+
+        today = date.today()
+        ids = list(patients)
+        raw = np.stack([self.extract(patients[patient_id], today) for patient_id in ids])
+        scores, polypharmacy = self.evaluate(raw)
+
+        rows = self._rows(ids)
+        self._raw[rows] = raw
+        self._scores[rows] = scores
+        self._polypharmacy[rows] = polypharmacy
+
+        return {
+            patient_id: self._result(scores[position], polypharmacy[position])
+            for position, patient_id in enumerate(ids)
+        }
+
+    def upsert(self, patient_id: str, patient_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Update one patient's inputs, recomputing only that row when they changed"""
+
+        raw = self.extract(patient_data)
+        row = self._index.get(patient_id)
+        if row is not None and np.array_equal(self._raw[row], raw):
+            self.stats["unchanged_skips"] += 1
+            return self._result(self._scores[row], self._polypharmacy[row])
+
+        scores, polypharmacy = self.evaluate(raw)
+        row = self._row(patient_id)
+        self._raw[row] = raw
+        self._scores[row] = scores[0]
+        self._polypharmacy[row] = polypharmacy[0]
+        return self._result(scores[0], polypharmacy[0])
+
+    def get(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        """Stored scores for a patient, if evaluated"""
+
+        row = self._index.get(patient_id)
+        if row is None:
+            return None
+        return self._result(self._scores[row], self._polypharmacy[row])
+
+    def remove(self, patient_id: str) -> bool:
+        """Drop a patient (swaps the last row into its place)"""
+
+        row = self._index.pop(patient_id, None)
+        if row is None:
+            return False
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._index[moved] = row
+            self._raw[row] = self._raw[last]
+            self._scores[row] = self._scores[last]
+            self._polypharmacy[row] = self._polypharmacy[last]
+        self._ids.pop()
+        return True
+
+    def refresh(self, patient_ids: Optional[Iterable[str]] = None) -> None:
+        """Re-evaluate stored rows (e.g. after the rules or the date changed)"""
+
+        if patient_ids is None:
+            rows = np.arange(len(self._ids))
+        else:
+            rows = np.array([self._index[pid] for pid in patient_ids if pid in self._index], dtype=np.intp)
+        if len(rows):
+            self._scores[rows], self._polypharmacy[rows] = self.evaluate(self._raw[rows])
+
+    def summary(self) -> Dict[str, Any]:
+        """Population statistics per rule, computed over the stored score matrix"""
+
+        if not self._ids:
+            return {"patients": 0, "rules": {}}
+        count = len(self._ids)
+        scores = self._scores[:count]
+        return {
+            "patients": count,
+            "polypharmacy_rate": float(self._polypharmacy[:count].mean()),
+            "rules": {
+                name: {
+                    "mean": float(scores[:, column].mean()),
+                    "p90": float(np.percentile(scores[:, column], 90)),
+                    "max": float(scores[:, column].max()),
+                }
+                for column, name in enumerate(self.rule_names)
+            },
+        }
+
+    def _row(self, patient_id: str) -> int:
+        return int(self._rows([patient_id])[0])
+
+    def _rows(self, patient_ids: List[str]) -> np.ndarray:
+        """Row indices for patients, appending rows for new ones"""
+
+        new_ids = [pid for pid in dict.fromkeys(patient_ids) if pid not in self._index]
+        if new_ids:
+            start = len(self._ids)
+            self._reserve(start + len(new_ids))
+            for offset, patient_id in enumerate(new_ids):
+                self._index[patient_id] = start + offset
+            self._ids.extend(new_ids)
+        return np.array([self._index[pid] for pid in patient_ids], dtype=np.intp)
+
+    def _reserve(self, rows: int) -> None:
+        """Make room for ``rows`` patients, at least doubling the capacity (amortized O(1) appends)"""
+
+        capacity = len(self._raw)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity, MIN_CAPACITY)
+        count = len(self._ids)
+        for name in ("_raw", "_scores", "_polypharmacy"):
+            current = getattr(self, name)
+            grown = np.zeros((capacity,) + current.shape[1:], dtype=current.dtype)
+            grown[:count] = current[:count]
+            setattr(self, name, grown)
+
+    def __len__(self) -> int:
+        return len(self._ids)
@@ -1,56 +1,35 @@
 import logging
-from datetime import date
 from typing import Any, Dict, List, Optional
 
+from backend.risk_engine import CohortRiskEngine, calculate_age
+
 logger = logging.getLogger(__name__)
 
 
 class RiskScoringService:
     """Service for computing patient risk scores and medication reviews."""
 
+    def __init__(self, engine: Optional[CohortRiskEngine] = None) -> None:
+        self.engine = engine or CohortRiskEngine()
+
     async def calculate_risk_scores(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
         """Calculate patient risk scores based on demographics and medications."""
 
-        patient_info = patient_data.get("patient", {})
-        age = self._calculate_age(patient_info.get("birthDate")) or 0
-        conditions = patient_data.get("conditions", [])
-        medications = patient_data.get("medications", [])
-        encounters = patient_data.get("encounters", [])
-
-        risk_scores: Dict[str, Any] = {}
-
-        def _normalize(value: float, min_value: float = 0.0, max_value: float = 1.0) -> float:
-            return max(min_value, min(max_value, value))
-
-        age_factor = min(1.0, age / 100)
-        condition_count = len(conditions)
-        medication_count = len(medications)
-        encounter_count = len(encounters)
-        polypharmacy = medication_count >= 10
+        return self.engine.score(patient_data)
 
-        # Cardiovascular risk increases with age and condition burden
-        cardiovascular_risk = 0.2 + (0.4 * age_factor) + (0.2 * min(1.0, condition_count / 5))
-        if polypharmacy:
-            cardiovascular_risk += 0.1
-        risk_scores["cardiovascular_risk"] = _normalize(cardiovascular_risk)
+    async def calculate_cohort_risk_scores(
+        self, patients: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Calculate risk scores for many patients (patient ID -> patient data) at once."""
 
-        # Readmission risk considers encounter history and medication complexity
-        readmit_risk = 0.15 + (0.25 * age_factor) + (0.2 * min(1.0, encounter_count / 5))
-        if polypharmacy:
-            readmit_risk += 0.1
-        risk_scores["readmission_risk"] = _normalize(readmit_risk)
+        return self.engine.score_many(patients)
 
-        # Medication adherence risk accounts for regimen complexity and age-related challenges
-        adherence_risk = 0.1 + (0.3 * age_factor) + min(0.35, medication_count * 0.03)
-        if polypharmacy:
-            adherence_risk += 0.15
-        risk_scores["medication_non_adherence_risk"] = _normalize(adherence_risk)
+    async def update_patient_risk_scores(
+        self, patient_id: str, patient_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Recompute one cohort member's scores after its data changed."""
 
-        # Explicit flags for downstream consumers
-        risk_scores["polypharmacy"] = polypharmacy
-        risk_scores["polypharmacy_risk"] = polypharmacy
-
-        return risk_scores
+        return self.engine.upsert(patient_id, patient_data)
 
     async def review_medications(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
         """Review medications for appropriateness and interactions."""
@@ -99,17 +78,4 @@ class RiskScoringService:
 
     @staticmethod
     def _calculate_age(birth_date_str: Optional[str]) -> Optional[int]:
-        if not birth_date_str:
-            return None
-
-        try:
-            birth_date = date.fromisoformat(birth_date_str[:10])
-        except ValueError:
-            return None
-
-        today = date.today()
-        return (
-            today.year
-            - birth_date.year
-            - ((today.month, today.day) < (birth_date.month, birth_date.day))
-        )
+        return calculate_age(birth_date_str)
@@ -3,18 +3,57 @@ Reinforcement learning agent for Meta-Learning for Compositionality (MLC).
 
 This module provides a lightweight tabular Q-learning implementation with an
 interface that can later be swapped for a policy-gradient method such as PPO.
+
+The Q-table is a dense numpy array indexed through state/action maps, so
+batches of transitions (e.g. drained from the replay buffer, or historical
+feedback replayed offline) are applied with a handful of vectorized operations.
 """
 
 from __future__ import annotations
 
 import logging
 import random
-from collections import defaultdict
-from typing import Dict, Hashable, Iterable, List, Optional
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+class Transition(NamedTuple):
+    """A single observed state-action-reward transition."""
+
+    state: Hashable
+    action: Hashable
+    reward: float
+    next_state: Optional[Hashable] = None
+    done: bool = False
+
+
+class ReplayBuffer:
+    """Bounded FIFO of transitions awaiting (or available for) batched updates."""
+
+    def __init__(self, capacity: int = 10000) -> None:
+        self.capacity = capacity
+        self._transitions: Deque[Transition] = deque(maxlen=capacity)
+
+    def add(self, transition: Transition) -> None:
+        self._transitions.append(transition)
+
+    def drain(self, limit: Optional[int] = None) -> List[Transition]:
+        """Remove and return up to ``limit`` transitions, oldest first."""
+        count = len(self._transitions) if limit is None else min(limit, len(self._transitions))
+        return [self._transitions.popleft() for _ in range(count)]
+
+    def sample(self, batch_size: int) -> List[Transition]:
+        """Random transitions for experience replay (left in the buffer)."""
+        return random.sample(list(self._transitions), min(batch_size, len(self._transitions)))
+
+    def __len__(self) -> int:
+        return len(self._transitions)
+
+
 class MLCRLAgent:
     """Simple tabular Q-learning agent for discrete action spaces.
 
@@ -36,6 +75,7 @@ class MLCRLAgent:
         learning_rate: float = 0.1,
         discount_factor: float = 0.99,
         epsilon: float = 0.1,
+        replay_capacity: int = 10000,
     ) -> None:
         """Initialize the reinforcement learning agent.
 
@@ -44,6 +84,7 @@ class MLCRLAgent:
             learning_rate: Step size for Q-value updates.
             discount_factor: Future reward discount factor (gamma).
             epsilon: Exploration rate for epsilon-greedy policy.
+            replay_capacity: Maximum transitions held in the replay buffer.
         """
         self.actions: List[Hashable] = list(actions)
         if not self.actions:
@@ -53,13 +94,49 @@ class MLCRLAgent:
         self.discount_factor = discount_factor
         self.epsilon = epsilon
 
-        # Default to zero for unseen state-action pairs.
-        self.q_table: Dict[Hashable, Dict[Hashable, float]] = defaultdict(
-            lambda: {action: 0.0 for action in self.actions}
-        )
+        # Rows are states, columns are actions; unseen pairs default to zero.
+        self._action_index: Dict[Hashable, int] = {
+            action: index for index, action in enumerate(self.actions)
+        }
+        self._state_index: Dict[Hashable, int] = {}
+        self._states: List[Hashable] = []
+        self._q = np.zeros((64, len(self.actions)), dtype=np.float64)
+
+        self.replay_buffer = ReplayBuffer(replay_capacity)
 
         logger.info("Initialized MLCRLAgent with %d actions", len(self.actions))
 
+    def _state_row(self, state: Hashable) -> int:
+        row = self._state_index.get(state)
+        if row is None:
+            row = len(self._states)
+            if row == self._q.shape[0]:
+                grown = np.zeros((row * 2, self._q.shape[1]), dtype=self._q.dtype)
+                grown[:row] = self._q
+                self._q = grown
+            self._state_index[state] = row
+            self._states.append(state)
+        return row
+
+    def _action_column(self, action: Hashable) -> int:
+        column = self._action_index.get(action)
+        if column is None:
+            # Allow actions to be extended dynamically.
+            column = len(self.actions)
+            self.actions.append(action)
+            self._action_index[action] = column
+            self._q = np.pad(self._q, ((0, 0), (0, 1)))
+        return column
+
+    @property
+    def q_table(self) -> Dict[Hashable, Dict[Hashable, float]]:
+        """Copy of the Q-table as nested dictionaries (state -> action -> value)."""
+        return {state: self.get_q_values(state) for state in self._states}
+
+    @property
+    def num_states(self) -> int:
+        return len(self._states)
+
     def select_action(self, state: Hashable) -> Hashable:
         """Choose an action using an epsilon-greedy policy.
 
@@ -74,10 +151,9 @@ class MLCRLAgent:
             logger.debug("Selected exploratory action '%s' for state '%s'", action, state)
             return action
 
-        state_actions = self.q_table[state]
-        max_value = max(state_actions.values())
-        best_actions = [act for act, value in state_actions.items() if value == max_value]
-        action = random.choice(best_actions)
+        values = self._q[self._state_row(state)]
+        best_columns = np.flatnonzero(values == values.max())
+        action = self.actions[int(random.choice(best_columns))]
         logger.debug("Selected greedy action '%s' for state '%s'", action, state)
         return action
 
@@ -104,21 +180,19 @@ class MLCRLAgent:
             tabular Q-value updates. The public method signature can remain the
             same to minimize integration changes.
         """
-        if action not in self.q_table[state]:
-            # Allow actions to be extended dynamically.
-            self.q_table[state][action] = 0.0
+        row = self._state_row(state)
+        column = self._action_column(action)
 
-        current_q = self.q_table[state][action]
+        current_q = self._q[row, column]
         next_max = 0.0
 
         if not done and next_state is not None:
-            next_actions = self.q_table[next_state]
-            next_max = max(next_actions.values())
+            next_max = self._q[self._state_row(next_state)].max()
 
         updated_q = current_q + self.learning_rate * (
             reward + self.discount_factor * next_max - current_q
         )
-        self.q_table[state][action] = updated_q
+        self._q[row, column] = updated_q
 
         logger.debug(
             "Updated Q-value for state '%s', action '%s': %.4f -> %.4f",
@@ -128,9 +202,86 @@ class MLCRLAgent:
             updated_q,
         )
 
+    def update_batch(self, transitions: Sequence[Transition]) -> int:
+        """Apply a batch of transitions with vectorized Q-learning updates.
+
+        All targets are computed from the Q-table as it was before the batch;
+        repeated state-action pairs take one step with their mean TD error.
+
+        Returns:
+            Number of transitions applied.
+        """
+        if not transitions:
+            return 0
+
+        rows = np.fromiter((self._state_row(t.state) for t in transitions), dtype=np.intp)
+        columns = np.fromiter((self._action_column(t.action) for t in transitions), dtype=np.intp)
+        rewards = np.fromiter((t.reward for t in transitions), dtype=np.float64)
+        bootstrap = np.fromiter(
+            (not t.done and t.next_state is not None for t in transitions), dtype=bool
+        )
+        next_rows = np.fromiter(
+            (
+                self._state_row(t.next_state) if not t.done and t.next_state is not None else 0
+                for t in transitions
+            ),
+            dtype=np.intp,
+        )
+
+        next_max = np.where(bootstrap, self._q[next_rows].max(axis=1), 0.0)
+        td_error = rewards + self.discount_factor * next_max - self._q[rows, columns]
+
+        # Every copy of a repeated pair sees the same old Q-value, so summing
+        # their errors would scale the step by the number of copies
+        pairs, inverse = np.unique(rows * len(self.actions) + columns, return_inverse=True)
+        mean_error = np.bincount(inverse, weights=td_error) / np.bincount(inverse)
+        pair_rows, pair_columns = np.divmod(pairs, len(self.actions))
+        self._q[pair_rows, pair_columns] += self.learning_rate * mean_error
+
+        logger.debug("Applied batched Q-learning update for %d transitions", len(transitions))
+        return len(transitions)
+
+    def observe(
+        self,
+        state: Hashable,
+        action: Hashable,
+        reward: float,
+        next_state: Optional[Hashable] = None,
+        done: bool = False,
+    ) -> None:
+        """Queue a transition in the replay buffer for a later batched update."""
+        self.replay_buffer.add(Transition(state, action, reward, next_state, done))
+
+    def train_from_replay(self, batch_size: Optional[int] = None) -> int:
+        """Drain queued transitions (oldest first) and apply them as one batch."""
+        return self.update_batch(self.replay_buffer.drain(batch_size))
+
     def get_q_values(self, state: Hashable) -> Dict[Hashable, float]:
         """Return Q-values for a given state."""
-        return dict(self.q_table[state])
+        row = self._state_index.get(state)
+        if row is None:
+            return {action: 0.0 for action in self.actions}
+        return dict(zip(self.actions, self._q[row].tolist()))
+
+    def set_q_value(self, state: Hashable, action: Hashable, value: float) -> None:
+        """Overwrite a single Q-value (used when restoring learned state)."""
+        # Resolve indices first: either lookup may grow and replace the table
+        row = self._state_row(state)
+        column = self._action_column(action)
+        self._q[row, column] = value
+
+    def export_q_values(self) -> List[List[Any]]:
+        """Q-table as JSON-friendly ``[state, [[action, value], ...]]`` entries."""
+        return [
+            [state, [[action, value] for action, value in self.get_q_values(state).items()]]
+            for state in self._states
+        ]
+
+    def import_q_values(self, entries: Iterable[Sequence[Any]]) -> None:
+        """Load entries produced by ``export_q_values`` (JSON lists become tuples)."""
+        for state, actions in entries:
+            for action, value in actions:
+                self.set_q_value(_as_hashable(state), _as_hashable(action), value)
 
     def set_epsilon(self, epsilon: float) -> None:
         """Update the exploration rate (epsilon)."""
@@ -139,4 +290,11 @@ class MLCRLAgent:
         self.epsilon = epsilon
 
 
-__all__ = ["MLCRLAgent"]
+def _as_hashable(value: Any) -> Hashable:
+    """Turn JSON lists back into the tuples used for states and actions."""
+    if isinstance(value, list):
+        return tuple(_as_hashable(item) for item in value)
+    return value
+
+
+__all__ = ["MLCRLAgent", "ReplayBuffer", "Transition"]
@@ -5,12 +5,284 @@ Optimizes attention mechanisms for long medical records
 """
 
 import logging
-from typing import Dict, List, Optional, Any, Set
+import os
+import re
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Any
 import json
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+_MB = 1024 * 1024
+
+# Specialty hints found in condition codes and medication names. Mixed-case
+# entries are acronyms or proper names and only match as whole words.
+CONDITION_SPECIALTY_KEYWORDS = {
+    "cardiology": ["heart", "cardiac", "MI", "hypertension", "arrhythmia"],
+    "oncology": ["cancer", "tumor", "leukemia", "lymphoma"],
+    "neurology": ["seizure", "stroke", "dementia", "Parkinson"],
+    "endocrinology": ["diabetes", "thyroid", "hormone"],
+    "pulmonology": ["asthma", "COPD", "pneumonia", "lung"],
+    "gastroenterology": ["liver", "GI", "Crohn", "colitis"],
+    "nephrology": ["kidney", "renal", "glomerulo", "proteinuria"],
+    "infectious_disease": ["infection", "sepsis", "viral"]
+}
+
+MEDICATION_SPECIALTY_KEYWORDS = {
+    "cardiology": ["beta-blocker", "ACE", "statin", "nitrate"],
+    "endocrinology": ["insulin", "metformin", "GLP-1"],
+    "pulmonology": ["bronchodilator", "corticosteroid"],
+    "psychiatry": ["antidepressant", "antipsychotic", "anxiolytic"]
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class SpecialtyMatcher:
+    """
+    Maps free text to specialties with one precompiled multi-keyword pattern.
+    
+    The keyword table is compiled once into a single alternation scanned in
+    one pass, so matching cost does not grow with the number of specialties.
+    Results are memoized per normalized text.
+    """
+    
+    def __init__(self, keyword_table: Dict[str, List[str]], cache_size: int = 4096):
+        """
+        Initialize the matcher
+        
+        Args:
+            keyword_table: Specialty -> keywords
+            cache_size: Number of normalized texts whose matches are memoized
+        """
+        self.specialties = list(keyword_table)
+        order = {specialty: index for index, specialty in enumerate(self.specialties)}
+        
+        owners: Dict[str, set] = {}
+        alternatives = {}
+        for specialty, keywords in keyword_table.items():
+            for keyword in keywords:
+                normalized = keyword.lower()
+                owners.setdefault(normalized, set()).add(specialty)
+                escaped = re.escape(normalized)
+                if keyword != normalized:
+                    escaped = rf"(?<![a-z0-9]){escaped}(?![a-z0-9])"
+                alternatives[normalized] = escaped
+        
+        # A matched keyword implies every keyword it contains also occurs, so
+        # the longest match at each position is enough.
+        self._specialties_for = {
+            keyword: frozenset().union(
+                *(owners[other] for other in owners if other in keyword)
+            )
+            for keyword in owners
+        }
+        ordered_keywords = sorted(alternatives, key=len, reverse=True)
+        self._pattern = re.compile(
+            "(?=({}))".format("|".join(alternatives[keyword] for keyword in ordered_keywords))
+        )
+        self._order = order
+        self._match = lru_cache(maxsize=cache_size)(self._match_uncached)
+    
+    @staticmethod
+    def normalize(text: Optional[str]) -> str:
+        return _WHITESPACE_RE.sub(" ", (text or "").lower()).strip()
+    
+    def match(self, text: Optional[str]) -> List[str]:
+        """Specialties hinted at by ``text``, in keyword table order"""
+        normalized = self.normalize(text)
+        if not normalized:
+            return []
+        return list(self._match(normalized))
+    
+    def _match_uncached(self, normalized: str) -> tuple:
+        found = set()
+        for match in self._pattern.finditer(normalized):
+            found.update(self._specialties_for[match.group(1)])
+        return tuple(sorted(found, key=self._order.__getitem__))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        info = self._match.cache_info()
+        return {"cache_hits": info.hits, "cache_misses": info.misses, "cached_texts": info.currsize}
+
+
+class AdapterResidencyManager:
+    """
+    Tracks which adapters are resident in memory and decides what to evict.
+    
+    - Byte-based memory budget with per-adapter sizes
+    - LRU (default) or LFU eviction, never touching pinned (in-use) adapters
+    - Demand tracking over recent requests' specialty mix, used for prefetching
+    """
+    
+    def __init__(
+        self,
+        memory_budget_bytes: int,
+        policy: str = "lru",
+        demand_decay: float = 0.9
+    ):
+        """
+        Initialize the residency manager
+        
+        Args:
+            memory_budget_bytes: Total memory available to resident adapters
+            policy: Eviction policy, "lru" or "lfu"
+            demand_decay: Weight kept by past demand on each new request (0-1)
+        """
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.memory_budget_bytes = memory_budget_bytes
+        self.policy = policy
+        self.demand_decay = demand_decay
+        self._resident: "OrderedDict[str, int]" = OrderedDict()  # name -> bytes, LRU first
+        self._frequency: Counter = Counter()
+        self._pins: Counter = Counter()
+        self._demand: Dict[str, float] = {}
+        self._prefetched: set = set()
+        self.used_bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "evictions": 0,
+            "prefetches": 0,
+            "prefetch_hits": 0,
+            "rejected": 0,
+        }
+    
+    @property
+    def resident(self) -> List[str]:
+        """Resident adapters, least recently used first"""
+        return list(self._resident)
+    
+    @property
+    def free_bytes(self) -> int:
+        return self.memory_budget_bytes - self.used_bytes
+    
+    def is_resident(self, name: str) -> bool:
+        return name in self._resident
+    
+    def is_pinned(self, name: str) -> bool:
+        return self._pins[name] > 0
+    
+    def touch(self, name: str) -> bool:
+        """Record a demand access; returns True when the adapter is already resident"""
+        self._frequency[name] += 1
+        if name not in self._resident:
+            self.stats["misses"] += 1
+            return False
+        self.stats["hits"] += 1
+        if name in self._prefetched:
+            self._prefetched.discard(name)
+            self.stats["prefetch_hits"] += 1
+        self._resident.move_to_end(name)
+        return True
+    
+    def admit(self, name: str, size_bytes: int, prefetch: bool = False) -> Optional[List[str]]:
+        """
+        Make an adapter resident, evicting unpinned adapters as needed.
+        
+        Prefetches only use free memory and never evict.
+        
+        Returns:
+            Names of evicted adapters, or None if the adapter cannot fit
+        """
+        if name in self._resident:
+            return []
+        
+        needed = size_bytes - self.free_bytes
+        victims: List[str] = []
+        if needed > 0:
+            if prefetch:
+                return None
+            for victim in self._eviction_order():
+                victims.append(victim)
+                needed -= self._resident[victim]
+                if needed <= 0:
+                    break
+            if needed > 0:
+                self.stats["rejected"] += 1
+                return None
+        
+        for victim in victims:
+            self.remove(victim)
+            self.stats["evictions"] += 1
+        
+        self._resident[name] = size_bytes
+        self.used_bytes += size_bytes
+        self.stats["loads"] += 1
+        if prefetch:
+            self._prefetched.add(name)
+            self.stats["prefetches"] += 1
+        return victims
+    
+    def remove(self, name: str) -> bool:
+        """Drop an adapter from residency"""
+        size = self._resident.pop(name, None)
+        if size is None:
+            return False
+        self.used_bytes -= size
+        self._prefetched.discard(name)
+        self._pins.pop(name, None)
+        return True
+    
+    def _eviction_order(self) -> List[str]:
+        candidates = [name for name in self._resident if not self.is_pinned(name)]
+        if self.policy == "lfu":
+            recency = {name: index for index, name in enumerate(self._resident)}
+            candidates.sort(key=lambda name: (self._frequency[name], recency[name]))
+        return candidates
+    
+    def next_victim(self) -> Optional[str]:
+        """Adapter that would be evicted next, if any"""
+        order = self._eviction_order()
+        return order[0] if order else None
+    
+    def pin(self, name: str) -> None:
+        """Protect a resident adapter from eviction while it is in use"""
+        if name in self._resident:
+            self._pins[name] += 1
+    
+    def unpin(self, name: str) -> None:
+        if self._pins[name] > 1:
+            self._pins[name] -= 1
+        else:
+            self._pins.pop(name, None)
+    
+    def record_demand(self, names: Iterable[str]) -> None:
+        """Fold one request's adapters into the decayed demand estimate"""
+        for name in list(self._demand):
+            self._demand[name] *= self.demand_decay
+            if self._demand[name] < 0.01:
+                del self._demand[name]
+        for name in names:
+            self._demand[name] = self._demand.get(name, 0.0) + 1.0
+    
+    def prefetch_candidates(self, limit: int, exclude: Iterable[str] = ()) -> List[str]:
+        """Non-resident adapters with the highest predicted demand"""
+        excluded = set(exclude)
+        ranked = sorted(self._demand.items(), key=lambda item: item[1], reverse=True)
+        return [
+            name for name, _ in ranked
+            if name not in self._resident and name not in excluded
+        ][:max(limit, 0)]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Residency metrics"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "swaps": self.stats["evictions"],
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "policy": self.policy,
+            "resident": len(self._resident),
+            "pinned": sum(1 for name in self._resident if self.is_pinned(name)),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.memory_budget_bytes,
+        }
+
 
 class SLoRAManager:
     """
@@ -23,21 +295,43 @@ class SLoRAManager:
     - Rapid adaptation to new specialties
     """
     
-    def __init__(self, adapter_path: str, base_model: str):
+    def __init__(
+        self,
+        adapter_path: str,
+        base_model: str,
+        memory_budget_mb: Optional[float] = None,
+        eviction_policy: Optional[str] = None,
+        prefetch_count: Optional[int] = None
+    ):
         """
         Initialize S-LoRA Manager
         
         Args:
             adapter_path: Directory where adapters are stored
             base_model: Base LLM model identifier
+            memory_budget_mb: Memory available to active adapters
+            eviction_policy: "lru" or "lfu"
+            prefetch_count: Adapters prefetched from recent specialty demand (0 disables)
         """
         self.adapter_path = adapter_path
         self.base_model = base_model
         self.adapters: Dict[str, Dict] = {}
-        self.active_adapters: Set[str] = set()
         self.adapter_memory: Dict[str, float] = {}
         self.specialties_map: Dict[str, str] = {}
         
+        memory_budget_mb = memory_budget_mb or float(os.getenv("S_LORA_MEMORY_BUDGET_MB", "2000"))
+        self.prefetch_count = (
+            prefetch_count if prefetch_count is not None
+            else int(os.getenv("S_LORA_PREFETCH_COUNT", "2"))
+        )
+        self.residency = AdapterResidencyManager(
+            memory_budget_bytes=int(memory_budget_mb * _MB),
+            policy=(eviction_policy or os.getenv("S_LORA_EVICTION_POLICY", "lru")).lower(),
+        )
+        
+        self.condition_matcher = SpecialtyMatcher(CONDITION_SPECIALTY_KEYWORDS)
+        self.medication_matcher = SpecialtyMatcher(MEDICATION_SPECIALTY_KEYWORDS)
+        
         self._initialize_adapters()
         
         logger.info(f"S-LoRA Manager initialized with base model: {base_model}")
@@ -77,6 +371,14 @@ class SLoRAManager:
         
         logger.info(f"Initialized {len(self.adapters)} medical specialty adapters")
     
+    @property
+    def active_adapters(self) -> List[str]:
+        """Resident adapters, least recently used first"""
+        return self.residency.resident
+    
+    def _adapter_bytes(self, adapter_name: str) -> int:
+        return int(self.adapter_memory.get(adapter_name, 100) * _MB)
+    
     async def get_status(self) -> Dict[str, Any]:
         """Get current S-LoRA status"""
         total_memory = sum(self.adapter_memory.values()) / 1024  # Convert to GB
@@ -135,60 +437,59 @@ class SLoRAManager:
         # 3. Rank by relevance score
         selected = self._rank_adapters(selected, patient_data)
         
+        # 4. Learn the request mix and warm adapters likely to be needed next
+        self.residency.record_demand(selected)
+        await self.prefetch_adapters(exclude=selected)
+        
         logger.info(f"Selected adapters: {selected}")
         return selected
     
+    async def prefetch_adapters(self, exclude: Iterable[str] = ()) -> List[str]:
+        """
+        Load the adapters most in demand across recent requests into free memory
+        
+        Prefetching never evicts resident adapters.
+        
+        Args:
+            exclude: Adapters the caller is about to activate itself
+            
+        Returns:
+            Names of prefetched adapters
+        """
+        prefetched = []
+        for adapter_name in self.residency.prefetch_candidates(self.prefetch_count, exclude):
+            if self.residency.admit(adapter_name, self._adapter_bytes(adapter_name), prefetch=True) is None:
+                break
+            self._mark_loaded(adapter_name, True)
+            prefetched.append(adapter_name)
+        
+        if prefetched:
+            logger.debug(f"Prefetched adapters: {prefetched}")
+        return prefetched
+    
     async def _infer_specialties(self, patient_data: Dict) -> List[str]:
         """Infer relevant specialties from patient data"""
-        inferred = []
+        inferred: Dict[str, None] = {}
         
         # Analyze conditions for specialty hints
-        if patient_data.get("conditions"):
-            condition_keywords = {
-                "cardiology": ["heart", "cardiac", "MI", "hypertension", "arrhythmia"],
-                "oncology": ["cancer", "tumor", "leukemia", "lymphoma"],
-                "neurology": ["seizure", "stroke", "dementia", "Parkinson"],
-                "endocrinology": ["diabetes", "thyroid", "hormone"],
-                "pulmonology": ["asthma", "COPD", "pneumonia", "lung"],
-                "gastroenterology": ["liver", "GI", "Crohn", "colitis"],
-                "nephrology": ["kidney", "renal", "glomerulo", "proteinuria"],
-                "infectious_disease": ["infection", "sepsis", "viral"]
-            }
-            
-            for condition in patient_data["conditions"]:
-                code = condition.get("code", "").lower()
-                for specialty, keywords in condition_keywords.items():
-                    if any(kw in code for kw in keywords):
-                        if specialty not in inferred:
-                            inferred.append(specialty)
+        for condition in patient_data.get("conditions") or []:
+            inferred.update(dict.fromkeys(self.condition_matcher.match(condition.get("code"))))
         
         # Analyze medications for specialty hints
-        if patient_data.get("medications"):
-            med_keywords = {
-                "cardiology": ["beta-blocker", "ACE", "statin", "nitrate"],
-                "endocrinology": ["insulin", "metformin", "GLP-1"],
-                "pulmonology": ["bronchodilator", "corticosteroid"],
-                "psychiatry": ["antidepressant", "antipsychotic", "anxiolytic"]
-            }
-            
-            for med in patient_data["medications"]:
-                med_name = med.get("medication", "").lower()
-                for specialty, keywords in med_keywords.items():
-                    if any(kw in med_name for kw in keywords):
-                        if specialty not in inferred:
-                            inferred.append(specialty)
+        for med in patient_data.get("medications") or []:
+            inferred.update(dict.fromkeys(self.medication_matcher.match(med.get("medication"))))
         
-        return inferred
+        return list(inferred)
     
     def _rank_adapters(self, adapters: List[str], patient_data: Optional[Dict] = None) -> List[str]:
         """Rank adapters by relevance"""
         scores = {}
         
-        for adapter in adapters:
+        for position, adapter in enumerate(adapters):
             score = self.adapters[adapter].get("accuracy_score", 0.9)
             
             # Boost primary adapters (first in list)
-            if adapters.index(adapter) == 0:
+            if position == 0:
                 score *= 1.2
             
             scores[adapter] = score
@@ -197,13 +498,19 @@ class SLoRAManager:
         ranked = sorted(adapters, key=lambda x: scores[x], reverse=True)
         return ranked
     
-    async def activate_adapter(self, adapter_name: str, specialty: Optional[str] = None) -> bool:
+    async def activate_adapter(
+        self,
+        adapter_name: str,
+        specialty: Optional[str] = None,
+        pin: bool = False
+    ) -> bool:
         """
         Activate a LoRA adapter
         
         Args:
             adapter_name: Name of adapter to activate
             specialty: Optional specialty for context
+            pin: Keep the adapter resident until ``release_adapters`` is called
             
         Returns:
             True if successfully activated
@@ -213,34 +520,41 @@ class SLoRAManager:
                 logger.warning(f"Adapter not found: {adapter_name}")
                 return False
             
-            # Check memory constraint
-            current_memory = sum(
-                self.adapter_memory.get(a, 0) for a in self.active_adapters
-            )
-            adapter_memory = self.adapter_memory.get(adapter_name, 100)
-            
-            if current_memory + adapter_memory > 2000:  # Max 2GB
-                logger.warning("Memory limit exceeded, removing least-used adapter")
-                await self._evict_adapter()
-            
-            self.active_adapters.add(adapter_name)
-            self.adapters[adapter_name]["loaded"] = True
-            self.adapters[adapter_name]["status"] = "active"
+            if not self.residency.touch(adapter_name):
+                # Evict least-recently (or least-frequently) used adapters to fit
+                evicted = self.residency.admit(adapter_name, self._adapter_bytes(adapter_name))
+                if evicted is None:
+                    logger.warning(
+                        f"Memory limit exceeded and all resident adapters are pinned: {adapter_name}"
+                    )
+                    return False
+                for name in evicted:
+                    self._mark_loaded(name, False)
+                    logger.info(f"Evicted adapter: {name}")
+                self._mark_loaded(adapter_name, True)
+                logger.info(f"Activated adapter: {adapter_name}")
             
-            logger.info(f"Activated adapter: {adapter_name}")
+            if pin:
+                self.residency.pin(adapter_name)
             return True
         
         except Exception as e:
             logger.error(f"Error activating adapter: {str(e)}")
             return False
     
+    async def release_adapters(self, adapter_names: Iterable[str]) -> None:
+        """Unpin adapters activated with ``pin=True`` once the caller is done with them"""
+        for adapter_name in adapter_names:
+            self.residency.unpin(adapter_name)
+    
     async def deactivate_adapter(self, adapter_name: str) -> bool:
         """Deactivate a LoRA adapter"""
         try:
-            if adapter_name in self.active_adapters:
-                self.active_adapters.remove(adapter_name)
-                self.adapters[adapter_name]["loaded"] = False
-                self.adapters[adapter_name]["status"] = "available"
+            if self.residency.is_pinned(adapter_name):
+                logger.warning(f"Adapter in use, not deactivating: {adapter_name}")
+                return False
+            if self.residency.remove(adapter_name):
+                self._mark_loaded(adapter_name, False)
                 
                 logger.info(f"Deactivated adapter: {adapter_name}")
                 return True
@@ -250,13 +564,9 @@ class SLoRAManager:
             logger.error(f"Error deactivating adapter: {str(e)}")
             return False
     
-    async def _evict_adapter(self) -> bool:
-        """Evict least-used adapter to free memory"""
-        if self.active_adapters:
-            # Simple strategy: remove first active adapter
-            to_evict = list(self.active_adapters)[0]
-            return await self.deactivate_adapter(to_evict)
-        return False
+    def _mark_loaded(self, adapter_name: str, loaded: bool) -> None:
+        self.adapters[adapter_name]["loaded"] = loaded
+        self.adapters[adapter_name]["status"] = "active" if loaded else "available"
     
     async def compose_adapters(self, adapter_names: List[str], weights: Optional[List[float]] = None) -> Dict:
         """
@@ -303,5 +613,10 @@ class SLoRAManager:
                 sum(self.adapter_memory.get(a, 0) for a in self.active_adapters) / 
                 (loaded * 100) * 100 if loaded > 0 else 0
             ),
-            "specialties_covered": len(self.specialties_map)
+            "specialties_covered": len(self.specialties_map),
+            "residency": self.residency.get_stats(),
+            "specialty_inference": {
+                "conditions": self.condition_matcher.get_stats(),
+                "medications": self.medication_matcher.get_stats(),
+            }
         }
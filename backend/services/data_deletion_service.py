@@ -13,8 +13,12 @@ from sqlalchemy import select, delete, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.database.models import (
+    AnalysisAlert,
+    AnalysisAnomaly,
     AnalysisHistory,
+    AnalysisRiskScore,
     Document,
+    DocumentFHIRResources,
     OCRExtraction,
     UserSession,
     Consent,
@@ -122,12 +126,19 @@ class DataDeletionService:
         user_id: str,
         patient_id: Optional[str] = None,
     ) -> int:
-        """Delete analysis history for user/patient."""
+        """Delete analysis history (and its normalized fact rows) for user/patient."""
         query = delete(AnalysisHistory).where(
             AnalysisHistory.user_id == user_id
         )
+        analysis_ids = select(AnalysisHistory.id).where(AnalysisHistory.user_id == user_id)
         if patient_id:
             query = query.where(AnalysisHistory.patient_id == patient_id)
+            analysis_ids = analysis_ids.where(AnalysisHistory.patient_id == patient_id)
+        
+        for fact_model in (AnalysisAlert, AnalysisRiskScore, AnalysisAnomaly):
+            await session.execute(
+                delete(fact_model).where(fact_model.analysis_id.in_(analysis_ids))
+            )
         
         result = await session.execute(query)
         return result.rowcount
@@ -137,7 +148,14 @@ class DataDeletionService:
         session: AsyncSession,
         patient_id: str,
     ) -> int:
-        """Delete documents for a patient."""
+        """Delete documents (and their mapped FHIR resources) for a patient."""
+        await session.execute(
+            delete(DocumentFHIRResources).where(
+                DocumentFHIRResources.document_id.in_(
+                    select(Document.id).where(Document.patient_id == patient_id)
+                )
+            )
+        )
         query = delete(Document).where(
             Document.patient_id == patient_id
         )
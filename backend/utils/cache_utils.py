@@ -2,12 +2,23 @@
 Cache utility functions for improved caching strategies.
 
 Provides cache warming, batch invalidation, and cache hit rate monitoring.
+
+Patient cache entries are versioned: each patient has a counter key, and cached
+values are stored with the counter value they were computed under. Bumping the
+counter invalidates every cached entry for that patient in O(1); stale entries
+are ignored on read and expire through their TTL. Bulk clears use incremental
+SCAN plus UNLINK so Redis is never blocked by a full keyspace walk (KEYS), and
+leave the version counters in place: resetting a counter would let an entry
+written under an earlier version become current again.
 """
 
+import json
 import logging
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
+from backend.utils.serialization import decode_value, encode_value
+
 logger = logging.getLogger(__name__)
 
 
@@ -60,6 +71,121 @@ def get_cache_metrics() -> CacheMetrics:
     return _cache_metrics
 
 
+# Keys removed per UNLINK call and the SCAN COUNT hint used for bulk clears
+SCAN_BATCH_SIZE = 500
+
+# Version counters outlive any cached value, so an expired counter cannot
+# resurrect entries written under an earlier version
+VERSION_KEY_TTL_SECONDS = 7 * 24 * 60 * 60
+
+_GLOB_CHARS = frozenset("*?[")
+
+VERSION_KEY_SUFFIX = ":version"
+
+
+def patient_version_key(patient_id: str) -> str:
+    """Redis key holding the cache version counter for a patient."""
+    return f"patient:{patient_id}{VERSION_KEY_SUFFIX}"
+
+
+async def get_patient_cache_version(redis_client, patient_id: str) -> int:
+    """Current cache version for a patient (0 before the first invalidation)."""
+    return int(await redis_client.get(patient_version_key(patient_id)) or 0)
+
+
+async def invalidate_patient_cache(redis_client, patient_id: str) -> Optional[int]:
+    """
+    Invalidate every versioned cache entry for a patient in O(1).
+    
+    Returns:
+        The new version, or None when Redis is unavailable or the bump failed
+    """
+    if not redis_client:
+        return None
+    
+    key = patient_version_key(patient_id)
+    try:
+        version = await redis_client.incr(key)
+        await redis_client.expire(key, VERSION_KEY_TTL_SECONDS)
+        return int(version)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cache for patient {patient_id}: {e}")
+        return None
+
+
+async def get_versioned(
+    redis_client,
+    patient_id: str,
+    key: str,
+) -> Tuple[Optional[Any], int]:
+    """
+    Read a versioned cache entry and the patient's current version in one MGET.
+    
+    Returns:
+        (value, version); value is None on a miss or when the entry is stale.
+        Pass the version to ``set_versioned`` when repopulating after a miss.
+    """
+    raw_version, raw_value = await redis_client.mget([patient_version_key(patient_id), key])
+    version = int(raw_version or 0)
+    if not raw_value:
+        return None, version
+    
+    try:
+        # Also reads envelopes written as plain JSON before the compact format
+        envelope = decode_value(raw_value)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Discarding undecodable cache entry {key}: {e}")
+        return None, version
+    if not isinstance(envelope, dict) or envelope.get("v") != version:
+        return None, version
+    return envelope.get("data"), version
+
+
+async def set_versioned(
+    redis_client,
+    patient_id: str,
+    key: str,
+    value: Any,
+    ttl: int,
+    version: Optional[int] = None,
+) -> None:
+    """
+    Cache a value tagged with the patient's cache version.
+    
+    ``version`` should be the one observed before the value was computed, so a
+    concurrent invalidation makes the write stale instead of being overwritten.
+    """
+    if version is None:
+        version = await get_patient_cache_version(redis_client, patient_id)
+    await redis_client.setex(key, ttl, encode_value({"v": version, "data": value}))
+
+
+async def scan_unlink(redis_client, pattern: str, batch_size: int = SCAN_BATCH_SIZE) -> int:
+    """
+    Remove keys matching a pattern without blocking Redis.
+    
+    Uses incremental SCAN and non-blocking UNLINK in batches; a pattern without
+    glob characters is unlinked directly. Version counters matched by a glob
+    are kept (see the module docstring).
+    """
+    if not _GLOB_CHARS.intersection(pattern):
+        return await redis_client.unlink(pattern)
+    
+    removed = 0
+    batch: List[str] = []
+    async for key in redis_client.scan_iter(match=pattern, count=batch_size):
+        name = key.decode() if isinstance(key, bytes) else key
+        if name.endswith(VERSION_KEY_SUFFIX):
+            continue
+        batch.append(key)
+        if len(batch) >= batch_size:
+            removed += await redis_client.unlink(*batch)
+            batch = []
+    if batch:
+        removed += await redis_client.unlink(*batch)
+    return removed
+
+
 async def batch_invalidate_cache(
     redis_client,
     patterns: List[str],
@@ -80,10 +206,7 @@ async def batch_invalidate_cache(
     total_deleted = 0
     for pattern in patterns:
         try:
-            keys = await redis_client.keys(pattern)
-            if keys:
-                deleted = await redis_client.delete(*keys)
-                total_deleted += deleted
+            total_deleted += await scan_unlink(redis_client, pattern)
         except Exception as e:
             logger.warning(f"Failed to invalidate cache pattern {pattern}: {e}")
     
@@ -122,7 +245,6 @@ async def warm_cache(
             # Load and cache
             data = await loader_func(key)
             if data:
-                import json
                 await redis_client.setex(
                     key,
                     ttl,
@@ -0,0 +1,382 @@
+"""
+Bounded event history with streaming aggregates.
+
+Replaces ever-growing ``List[Dict]`` histories. Only the most recent events are
+kept in memory (a ring buffer); counts, means, min/max and percentiles are
+maintained incrementally as events arrive, so statistics cost O(1) no matter
+how long the process has been running. Evicted events can optionally be
+spilled to a JSON Lines file for offline analysis.
+"""
+
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.99)
+
+# Upper bounds (seconds) for latency histograms, from 1ms to 10s
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> Tuple[float, ...]:
+    """``count`` upper bounds growing by ``factor``: constant relative error per bucket."""
+    return tuple(start * factor ** index for index in range(count))
+
+
+# Fine latency bounds for percentiles, 0.5ms to about 60s in 10% steps
+PRECISE_LATENCY_BUCKETS = exponential_buckets(0.0005, 1.1, 124)
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate using the P² algorithm (Jain & Chlamtac, 1985).
+
+    Tracks a single quantile with five markers: O(1) time and memory per sample.
+    """
+
+    def __init__(self, quantile: float) -> None:
+        if not 0.0 < quantile < 1.0:
+            raise ValueError("quantile must be in (0, 1)")
+        self.quantile = quantile
+        self._initial: List[float] = []
+        self._heights: List[float] = []
+        self._positions: List[int] = []
+        self._desired: List[float] = []
+        self._increments: List[float] = []
+
+    def add(self, value: float) -> None:
+        """Add an observation"""
+        if not self._heights:
+            self._initial.append(value)
+            if len(self._initial) == 5:
+                p = self.quantile
+                self._heights = sorted(self._initial)
+                self._positions = [0, 1, 2, 3, 4]
+                self._desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+                self._increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+            return
+
+        q, n = self._heights, self._positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = next(i for i in range(1, 5) if value < q[i]) - 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                step = 1 if d > 0 else -1
+                candidate = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < candidate < q[i + 1]:
+                    q[i] = candidate
+                else:
+                    q[i] = q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+                n[i] += step
+
+    def value(self) -> Optional[float]:
+        """Current quantile estimate (None before any observation)"""
+        if self._heights:
+            return self._heights[2]
+        if not self._initial:
+            return None
+        ordered = sorted(self._initial)
+        index = min(int(round(self.quantile * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+
+class RunningStat:
+    """Incremental count, mean, min, max and percentiles of a numeric series."""
+
+    def __init__(self, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._quantiles = {p: P2Quantile(p) for p in percentiles}
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for estimator in self._quantiles.values():
+            estimator.add(value)
+
+    def summary(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+        }
+        for p, estimator in self._quantiles.items():
+            summary[f"p{p * 100:g}"] = estimator.value()
+        return summary
+
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) per observation, constant memory."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.bounds = tuple(sorted(buckets))
+        # One count per bound plus a final +Inf bucket
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[int]:
+        """Observations ``<=`` each bound (last entry is +Inf, equal to ``count``)"""
+        totals, running = [], 0
+        for bucket_count in self.counts:
+            running += bucket_count
+            totals.append(running)
+        return totals
+
+    def merge(self, other: "Histogram") -> None:
+        """Add another histogram with the same bounds into this one"""
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """
+        Estimated value at ``quantile``, interpolated within its bucket.
+
+        Values above the last bound are reported as the last bound.
+        """
+        if not self.count:
+            return None
+        rank = quantile * self.count
+        running = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and running + bucket_count >= rank:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * max(rank - running, 0) / bucket_count
+            running += bucket_count
+        return self.bounds[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        labels = [f"{bound:g}" for bound in self.bounds] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip(labels, self.cumulative())),
+        }
+
+
+class WindowedHistogram:
+    """
+    Histograms over trailing time windows.
+
+    Observations go into a ring of per-interval histograms, so memory is fixed
+    (``slots`` histograms) and each observation is O(1) apart from the bucket
+    lookup. A window is read by merging the current, partly filled interval
+    with the whole intervals before it. A window therefore covers between
+    ``seconds`` and ``seconds + interval`` of data, and never sits empty just
+    after a rotation.
+
+    Usage:
+        latency = WindowedHistogram(interval=60, slots=16)
+        latency.observe(0.12)
+        latency.window(300).quantile(0.99)   # p99 over the last 5 minutes
+    """
+
+    def __init__(
+        self,
+        buckets: Sequence[float] = PRECISE_LATENCY_BUCKETS,
+        *,
+        interval: float = 60.0,
+        slots: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.buckets = tuple(buckets)
+        self.interval = interval
+        self._clock = clock
+        self._slots = [Histogram(self.buckets) for _ in range(max(int(slots), 2))]
+        self._slot_ids = [-1] * len(self._slots)
+
+    def _current(self, now: float) -> int:
+        return int(now // self.interval)
+
+    def observe(self, value: float, now: Optional[float] = None) -> None:
+        slot_id = self._current(self._clock() if now is None else now)
+        index = slot_id % len(self._slots)
+        if self._slot_ids[index] != slot_id:
+            self._slots[index] = Histogram(self.buckets)
+            self._slot_ids[index] = slot_id
+        self._slots[index].observe(value)
+
+    def window(self, seconds: float, now: Optional[float] = None) -> Histogram:
+        """Observations from the current interval and the whole intervals covering ``seconds``"""
+        current = self._current(self._clock() if now is None else now)
+        oldest = current - min(max(int(-(-seconds // self.interval)), 1), len(self._slots) - 1)
+        merged = Histogram(self.buckets)
+        for slot_id, histogram in zip(self._slot_ids, self._slots):
+            if oldest <= slot_id <= current:
+                merged.merge(histogram)
+        return merged
+
+
+class EventHistory:
+    """
+    Ring buffer of recent events plus lifetime streaming aggregates.
+
+    Usage:
+        history = EventHistory(
+            "rag_retrievals",
+            maxlen=1000,
+            metrics={"results_count": lambda e: e.get("results_count")},
+            categories={"region": lambda e: e.get("region")},
+        )
+        history.append(event)
+        history.total                      # lifetime events, O(1)
+        history.metric("results_count")    # RunningStat with mean/percentiles
+        history.recent(10)                 # last 10 retained events
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        maxlen: int = 1000,
+        metrics: Optional[Dict[str, Callable[[Dict[str, Any]], Optional[float]]]] = None,
+        categories: Optional[Dict[str, Callable[[Dict[str, Any]], Optional[Hashable]]]] = None,
+        spill_path: Optional[str] = None,
+        spill_batch_size: int = 100,
+    ) -> None:
+        """
+        Initialize the event history
+
+        Args:
+            name: History name (used for the default spill file name)
+            maxlen: Number of recent events retained in memory
+            metrics: Numeric fields to aggregate, as name -> extractor
+            categories: Categorical fields to count, as name -> extractor
+            spill_path: JSON Lines file receiving evicted events (defaults to
+                ``$HISTORY_SPILL_DIR/<name>.jsonl`` when that variable is set)
+            spill_batch_size: Evicted events buffered before each disk write
+        """
+        self.name = name
+        self.maxlen = max(int(maxlen), 1)
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=self.maxlen)
+        self._metric_extractors = metrics or {}
+        self._category_extractors = categories or {}
+        self._metrics = {key: RunningStat() for key in self._metric_extractors}
+        self._categories: Dict[str, Counter] = {key: Counter() for key in self._category_extractors}
+        self.total = 0
+
+        spill_dir = os.getenv("HISTORY_SPILL_DIR")
+        if spill_path is None and spill_dir:
+            spill_path = os.path.join(spill_dir, f"{name}.jsonl")
+        self.spill_path = spill_path
+        self.spill_batch_size = max(int(spill_batch_size), 1)
+        self._spill_buffer: List[Dict[str, Any]] = []
+        self.spilled = 0
+
+    def append(self, event: Dict[str, Any]) -> None:
+        """Record an event, updating aggregates and evicting the oldest if full"""
+        if self.spill_path and len(self._events) == self.maxlen:
+            self._spill_buffer.append(self._events[0])
+            if len(self._spill_buffer) >= self.spill_batch_size:
+                self.flush()
+
+        self._events.append(event)
+        self.total += 1
+
+        for key, extractor in self._metric_extractors.items():
+            value = extractor(event)
+            if value is not None:
+                self._metrics[key].add(float(value))
+        for key, extractor in self._category_extractors.items():
+            value = extractor(event)
+            if value is not None:
+                self._categories[key][value] += 1
+
+    def flush(self) -> None:
+        """Write buffered evicted events to the spill file"""
+        if not self.spill_path or not self._spill_buffer:
+            return
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as handle:
+                for event in self._spill_buffer:
+                    handle.write(json.dumps(event, default=str) + "\n")
+            self.spilled += len(self._spill_buffer)
+        except OSError as exc:
+            logger.warning("Failed to spill %s history to %s: %s", self.name, self.spill_path, exc)
+        self._spill_buffer.clear()
+
+    def metric(self, key: str) -> RunningStat:
+        """Aggregates for a numeric field"""
+        return self._metrics[key]
+
+    def category_counts(self, key: str) -> Dict[Hashable, int]:
+        """Lifetime counts for a categorical field"""
+        return dict(self._categories[key])
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """Most recent ``count`` retained events, oldest first"""
+        if count <= 0:
+            return []
+        start = max(len(self._events) - count, 0)
+        return [self._events[i] for i in range(start, len(self._events))]
+
+    def clear(self) -> None:
+        """Drop retained events and reset aggregates"""
+        self.flush()
+        self._events.clear()
+        self._metrics = {key: RunningStat() for key in self._metric_extractors}
+        self._categories = {key: Counter() for key in self._category_extractors}
+        self.total = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregate statistics in O(metrics + categories)"""
+        return {
+            "total": self.total,
+            "retained": len(self._events),
+            "capacity": self.maxlen,
+            "spilled": self.spilled,
+            "metrics": {key: stat.summary() for key, stat in self._metrics.items()},
+            "categories": {key: dict(counter) for key, counter in self._categories.items()},
+        }
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self._events)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self._events[index]
+
+    def __bool__(self) -> bool:
+        return bool(self._events)
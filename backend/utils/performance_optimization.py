@@ -2,6 +2,7 @@
 Performance optimization utilities for database queries and async operations.
 """
 
+import os
 import time
 import asyncio
 import logging
@@ -218,27 +219,69 @@ class AsyncBatchProcessor:
         return results
 
 
+# Share of the server's max_connections handed to application pools; the rest
+# is headroom for migrations, admin sessions and other clients
+CONNECTION_BUDGET_SHARE = 0.9
+
+SQLITE_POOL_SIZE = 5
+
+
 def optimize_connection_pool(
-    pool_size: int = 10,
-    max_overflow: int = 20,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
     pool_recycle: int = 3600,
     pool_pre_ping: bool = True,
+    database_url: Optional[str] = None,
+    workers: Optional[int] = None,
+    max_connections: Optional[int] = None,
+    pool_timeout: float = 30.0,
 ) -> Dict[str, Any]:
     """
-    Get optimized connection pool configuration.
+    Get optimized connection pool configuration for a database backend.
+    
+    SQLite allows a single writer, so its pool stays small and never
+    overflows (WAL mode lets readers run alongside the writer). For other
+    backends the server's connection budget is split across workers, and a
+    worker's pool plus overflow never exceeds its share.
     
     Args:
-        pool_size: Base pool size
-        max_overflow: Maximum overflow connections
+        pool_size: Base pool size (backend default when None)
+        max_overflow: Initial overflow connections (backend default when None)
         pool_recycle: Connection recycle time in seconds
         pool_pre_ping: Enable connection health checks
+        database_url: Database URL, used to pick backend defaults
+        workers: Application worker processes sharing the database
+            (``WEB_CONCURRENCY`` when None)
+        max_connections: Server connection limit (``DB_MAX_CONNECTIONS`` when None)
+        pool_timeout: Seconds to wait for a connection before timing out
         
     Returns:
-        Dictionary with pool configuration
+        Dictionary with pool configuration. ``overflow_limit`` is the largest
+        ``max_overflow`` an adaptive sizer may grow the pool to.
     """
+    if database_url and database_url.startswith("sqlite"):
+        return {
+            "pool_size": pool_size or SQLITE_POOL_SIZE,
+            "max_overflow": 0,
+            "overflow_limit": 0,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+        }
+    
+    workers = max(workers or int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+    max_connections = max_connections or int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+    worker_share = max(int(max_connections * CONNECTION_BUDGET_SHARE) // workers, 1)
+    
+    pool_size = min(pool_size or 10, worker_share)
+    overflow_limit = worker_share - pool_size
+    max_overflow = min(20 if max_overflow is None else max_overflow, overflow_limit)
+    
     return {
         "pool_size": pool_size,
         "max_overflow": max_overflow,
+        "overflow_limit": overflow_limit,
+        "pool_timeout": pool_timeout,
         "pool_recycle": pool_recycle,
         "pool_pre_ping": pool_pre_ping,
     }
@@ -0,0 +1,80 @@
+"""
+Route trie for per-endpoint settings.
+
+Routes are split into path segments once, when the trie is built. A lookup
+walks the request path segment by segment and returns the value of the
+longest matching route. The cost depends on the path depth, not on the
+number of routes. A ``{name}`` segment matches any single segment, and exact
+segments win over parameters.
+
+    trie = RouteTrie({"/api/v1/patients": 1, "/api/v1/patients/{id}/analyze": 2})
+    trie.match("/api/v1/patients/123")          # 1 (prefix)
+    trie.match("/api/v1/patients/123/analyze")  # 2
+"""
+
+from typing import Dict, Generic, List, Mapping, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class _Node:
+    __slots__ = ("children", "param", "value")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.value = _MISSING
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+class RouteTrie(Generic[T]):
+    """Longest-prefix lookup of values by URL path segments."""
+
+    def __init__(self, routes: Optional[Mapping[str, T]] = None) -> None:
+        self._root = _Node()
+        self._size = 0
+        for route, value in (routes or {}).items():
+            self.insert(route, value)
+
+    def insert(self, route: str, value: T) -> None:
+        node = self._root
+        for segment in _segments(route):
+            if segment.startswith("{") and segment.endswith("}"):
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.children.setdefault(segment, _Node())
+        if node.value is _MISSING:
+            self._size += 1
+        node.value = value
+
+    def match(self, path: str) -> Optional[T]:
+        """Value of the longest route that is a segment prefix of ``path``."""
+        _, value = self._match(self._root, _segments(path), 0)
+        return None if value is _MISSING else value
+
+    def _match(self, node: _Node, segments: List[str], index: int) -> Tuple[int, object]:
+        best: Tuple[int, object] = (index, node.value) if node.value is not _MISSING else (-1, _MISSING)
+        if index == len(segments):
+            return best
+
+        child = node.children.get(segments[index])
+        if child is not None:
+            candidate = self._match(child, segments, index + 1)
+            if candidate[0] > best[0]:
+                best = candidate
+        if node.param is not None:
+            candidate = self._match(node.param, segments, index + 1)
+            # Strictly longer only: an exact segment wins a tie
+            if candidate[0] > best[0]:
+                best = candidate
+        return best
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,120 @@
+"""
+Compact serialization for cached analyses and other large JSON-like values.
+
+Values are encoded with orjson (falling back to the standard library) and,
+above a size threshold, compressed with zstd (``zstandard``) or zlib. Encoded
+values carry a short version/codec header so the format can evolve:
+
+    v1:j:<json text>                 small values, stored as-is
+    v1:z:<base64 zstd(json)>         large values, zstandard available
+    v1:d:<base64 zlib(json)>         large values, zlib fallback
+
+The output is always text because the shared Redis client decodes responses
+as UTF-8. Values without a header are legacy JSON written before this format
+existed and are decoded transparently, so old cache entries keep working.
+"""
+
+import base64
+import json
+import logging
+import os
+import zlib
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_HEADER = f"v{FORMAT_VERSION}:"
+
+CODEC_JSON = "j"
+CODEC_ZSTD = "z"
+CODEC_ZLIB = "d"
+
+# Values whose JSON encoding is at least this many bytes are compressed
+COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "2048"))
+COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", "3"))
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps_json(value: Any) -> bytes:
+    """JSON-encode a value to UTF-8 bytes (unknown types become strings)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=_ORJSON_OPTIONS)
+    return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_serializer(value: Any) -> str:
+    """SQLAlchemy ``json_serializer`` hook (JSON columns stay plain JSON)."""
+    return dumps_json(value).decode("utf-8")
+
+
+def encode_value(value: Any, compress_min_bytes: int = COMPRESS_MIN_BYTES) -> str:
+    """Encode a value into the versioned text format."""
+    payload = dumps_json(value)
+    if len(payload) < compress_min_bytes:
+        return f"{_HEADER}{CODEC_JSON}:{payload.decode('utf-8')}"
+
+    if zstandard is not None:
+        codec = CODEC_ZSTD
+        compressed = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(payload)
+    else:
+        codec = CODEC_ZLIB
+        compressed = zlib.compress(payload, COMPRESSION_LEVEL)
+    return f"{_HEADER}{codec}:{base64.b64encode(compressed).decode('ascii')}"
+
+
+def decode_value(data: Union[str, bytes, None]) -> Any:
+    """
+    Decode a value written by ``encode_value`` or legacy plain JSON.
+
+    Raises:
+        ValueError: For an unknown format version or codec, or corrupt data
+    """
+    if data is None:
+        return None
+    if isinstance(data, bytes):
+        data = data.decode("utf-8")
+
+    if not data.startswith("v"):
+        # Legacy entry: plain JSON text
+        return loads_json(data)
+
+    version, _, rest = data.partition(":")
+    codec, _, body = rest.partition(":")
+    if version != f"v{FORMAT_VERSION}":
+        raise ValueError(f"Unsupported serialization version: {version}")
+
+    if codec == CODEC_JSON:
+        return loads_json(body)
+    if codec == CODEC_ZLIB:
+        try:
+            return loads_json(zlib.decompress(base64.b64decode(body)))
+        except zlib.error as exc:
+            raise ValueError(f"Corrupt zlib payload: {exc}") from exc
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Value is zstd-compressed but zstandard is not installed")
+        try:
+            return loads_json(zstandard.ZstdDecompressor().decompress(base64.b64decode(body)))
+        except zstandard.ZstdError as exc:
+            raise ValueError(f"Corrupt zstd payload: {exc}") from exc
+    raise ValueError(f"Unsupported serialization codec: {codec}")
+
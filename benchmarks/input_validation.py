@@ -0,0 +1,148 @@
+"""Benchmark request body validation on FHIR-sized JSON payloads.
+
+Compares the per-field approach (parse the JSON, then run each XSS pattern
+separately over every string value) with the streamed scan in
+``InputValidationMiddleware`` (one compiled pattern over the raw body chunks,
+no parsing), driven over ASGI with 64 KB chunks.
+
+    python benchmarks/input_validation.py
+    python benchmarks/input_validation.py --sizes-kb 10 100 1000 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.middleware import InputValidationMiddleware  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+
+# The previous per-pattern list
+LEGACY_PATTERNS = [
+    re.compile(r'<script[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'javascript:', re.IGNORECASE),
+    re.compile(r'on\w+\s*=', re.IGNORECASE),
+    re.compile(r'<iframe[^>]*>', re.IGNORECASE),
+    re.compile(r'<object[^>]*>', re.IGNORECASE),
+    re.compile(r'<embed[^>]*>', re.IGNORECASE),
+]
+
+
+def synthetic_bundle(size_kb: int, seed: int = 7) -> bytes:
+    """A FHIR searchset Bundle of Observations of roughly ``size_kb``."""
+    rng = random.Random(seed)
+    entries: List[Dict[str, Any]] = []
+    body = b""
+    while len(body) < size_kb * 1024:
+        for _ in range(max(1, size_kb // 4)):
+            idx = len(entries)
+            entries.append({
+                "fullUrl": f"urn:uuid:obs-{idx}",
+                "resource": {
+                    "resourceType": "Observation",
+                    "id": f"obs-{idx}",
+                    "status": "final",
+                    "code": {"coding": [{"system": "http://loinc.org", "code": "8480-6",
+                                         "display": "Systolic blood pressure"}]},
+                    "subject": {"reference": "Patient/patient-123"},
+                    "effectiveDateTime": "2024-05-01T12:00:00+00:00",
+                    "valueQuantity": {"value": rng.randint(90, 180), "unit": "mmHg"},
+                    "note": [{"text": " ".join(rng.choice(["stable", "elevated", "recheck", "on metformin"])
+                                               for _ in range(8))}],
+                },
+            })
+        body = json.dumps({"resourceType": "Bundle", "type": "searchset", "entry": entries}).encode()
+    return body
+
+
+def legacy_scan(body: bytes) -> bool:
+    def strings(value: Any):
+        if isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            for item in value.values():
+                yield from strings(item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from strings(item)
+
+    found = False
+    for text in strings(json.loads(body)):
+        for pattern in LEGACY_PATTERNS:
+            if pattern.search(text):
+                found = True
+    return found
+
+
+def streamed_scan(middleware: InputValidationMiddleware, body: bytes) -> None:
+    chunks = [body[start:start + CHUNK_SIZE] for start in range(0, len(body), CHUNK_SIZE)]
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/v1/fhir/bundle",
+        "raw_path": b"/api/v1/fhir/bundle",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/fhir+json"),
+                    (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+    }
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    async def read_body(scope, receive, send):
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+    middleware = InputValidationMiddleware(read_body, strict_mode=True)
+    # Baseline for the ASGI round trip itself, without any scanning
+    passthrough = InputValidationMiddleware(read_body, enabled=False)
+
+    print(f"{'size KB':>8} {'legacy us':>11} {'streamed us':>12} {'asgi only us':>13} "
+          f"{'legacy MB/s':>12} {'streamed MB/s':>14}")
+    for size_kb in args.sizes_kb:
+        body = synthetic_bundle(size_kb)
+        legacy = _time(lambda: legacy_scan(body), args.repeat)
+        streamed = _time(lambda: streamed_scan(middleware, body), args.repeat)
+        baseline = _time(lambda: streamed_scan(passthrough, body), args.repeat)
+        megabytes = len(body) / 1e6
+        print(
+            f"{len(body) // 1024:>8} {legacy:>11.0f} {streamed:>12.0f} {baseline:>13.0f} "
+            f"{megabytes / (legacy / 1e6):>12.1f} {megabytes / (streamed / 1e6):>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
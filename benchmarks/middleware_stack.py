@@ -0,0 +1,197 @@
+"""Benchmark per-request overhead of the HTTP middleware stack.
+
+Drives the ASGI app directly (no sockets or HTTP client) and reports the mean
+time per request for:
+
+    bare            the route with no middleware
+    base_http x N   N pass-through ``BaseHTTPMiddleware`` layers
+    pure_asgi x N   N pass-through pure ASGI layers
+    stack           the middleware configured in ``backend.main``, same order
+
+It also streams a response in chunks through the full stack and reports when
+the first chunk arrives relative to the last.
+
+    python benchmarks/middleware_stack.py
+    python benchmarks/middleware_stack.py --requests 5000 --layers 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.responses import StreamingResponse  # noqa: E402
+
+from backend.audit import AuditMiddleware  # noqa: E402
+from backend.middleware import (  # noqa: E402
+    CorrelationIdMiddleware,
+    HTTPSEnforcementMiddleware,
+    InputValidationMiddleware,
+    PerformanceMonitoringMiddleware,
+    RateLimitMiddleware,
+    SecurityHeadersMiddleware,
+    TimeoutMiddleware,
+)
+
+STREAM_CHUNKS = 5
+STREAM_DELAY_SECONDS = 0.02
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping() -> Dict[str, Any]:
+        return {"status": "ok", "patient_id": "patient-123"}
+
+    @app.get("/api/v1/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks():
+            for index in range(STREAM_CHUNKS):
+                yield f"chunk {index}\n".encode()
+                await asyncio.sleep(STREAM_DELAY_SECONDS)
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+class _PassThroughHTTP(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+class _PassThroughASGI:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.app(scope, receive, send)
+
+
+def with_layers(layer: type, count: int) -> FastAPI:
+    app = make_app()
+    for _ in range(count):
+        app.add_middleware(layer)
+    return app
+
+
+def with_stack() -> FastAPI:
+    """The middleware from ``backend.main``, added in the same order."""
+    app = make_app()
+    app.add_middleware(HTTPSEnforcementMiddleware, enabled=True)
+    app.add_middleware(SecurityHeadersMiddleware, enabled=True)
+    app.add_middleware(InputValidationMiddleware, enabled=True)
+    app.add_middleware(PerformanceMonitoringMiddleware, enabled=True)
+    app.add_middleware(TimeoutMiddleware, timeout_seconds=30.0)
+    # Limits high enough that the benchmark client is never throttled
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=10**9, requests_per_hour=10**9, burst_size=10**9)
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["*"])
+    app.add_middleware(AuditMiddleware, enabled=True)
+    app.add_middleware(CorrelationIdMiddleware)
+    return app
+
+
+def _scope(path: str) -> Dict[str, Any]:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"include=summary",
+        "headers": [(b"host", b"localhost"), (b"user-agent", b"bench"), (b"accept", b"application/json")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("localhost", 8000),
+    }
+
+
+async def _request(app: Callable, path: str, on_message: Callable[[Dict[str, Any]], None]) -> None:
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    disconnected = asyncio.Event()
+
+    async def receive() -> Dict[str, Any]:
+        if messages:
+            return messages.pop()
+        # Like a server: nothing more until the client goes away
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        on_message(message)
+
+    await app(_scope(path), receive, send)
+
+
+async def time_requests(app: Callable, requests: int) -> float:
+    statuses: List[int] = []
+
+    def on_message(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    for _ in range(min(100, requests)):  # warm up
+        await _request(app, "/api/v1/ping", on_message)
+    statuses.clear()
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await _request(app, "/api/v1/ping", on_message)
+    elapsed = time.perf_counter() - started
+    assert set(statuses) == {200}, f"unexpected statuses {set(statuses)}"
+    return elapsed / requests * 1e6
+
+
+async def time_first_chunk(app: Callable) -> str:
+    started = time.perf_counter()
+    arrivals: List[float] = []
+
+    def on_message(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.body" and message.get("body"):
+            arrivals.append(time.perf_counter() - started)
+
+    await _request(app, "/api/v1/stream", on_message)
+    return f"first chunk {arrivals[0] * 1000:.1f} ms, last {arrivals[-1] * 1000:.1f} ms"
+
+
+async def run(requests: int, layers: int) -> None:
+    cases = [
+        ("bare", make_app()),
+        (f"base_http x {layers}", with_layers(_PassThroughHTTP, layers)),
+        (f"pure_asgi x {layers}", with_layers(_PassThroughASGI, layers)),
+        ("stack", with_stack()),
+    ]
+    baseline = None
+    print(f"{'case':<16} {'us/request':>11} {'overhead us':>12}")
+    for name, app in cases:
+        per_request = await time_requests(app, requests)
+        baseline = per_request if baseline is None else baseline
+        print(f"{name:<16} {per_request:>11.1f} {per_request - baseline:>12.1f}")
+    print(f"stack streaming: {await time_first_chunk(with_stack())}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--layers", type=int, default=8)
+    args = parser.parse_args()
+
+    # The rate limiter is a no-op under tests; make sure it is measured here
+    os.environ.pop("TESTING", None)
+    asyncio.run(run(args.requests, args.layers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Benchmark patient cache invalidation strategies.
+
+Compares the previous pattern-based invalidation (``KEYS`` + ``DEL``) with the
+per-patient version counter (one ``INCR``), and bulk clears via ``KEYS`` with
+incremental ``SCAN`` + ``UNLINK``.
+
+By default the in-memory Redis stand-in from ``tests/mocks`` is used. Like
+Redis, its ``KEYS`` walks the whole keyspace, so it shows how the costs scale.
+Pass ``--redis-url`` to run against a real (disposable!) Redis instance.
+
+    python benchmarks/redis_invalidation.py --patients 1000 10000
+    python benchmarks/redis_invalidation.py --redis-url redis://localhost:6379/15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.cache_utils import invalidate_patient_cache, set_versioned  # noqa: E402
+from tests.mocks.redis_client import MockRedisClient  # noqa: E402
+
+KEYS_PER_PATIENT = ("patient:analysis:{}:latest", "patient:summary:{}")
+
+
+async def _populate(client, patients: int) -> None:
+    for index in range(patients):
+        patient_id = f"p{index}"
+        for template in KEYS_PER_PATIENT:
+            await set_versioned(client, patient_id, template.format(patient_id), {"i": index}, 3600, 0)
+
+
+async def _keys_invalidate(client, patient_id: str) -> None:
+    """The previous approach: KEYS for each pattern, then DEL."""
+    for template in KEYS_PER_PATIENT:
+        keys = await client.keys(template.format(patient_id))
+        if keys:
+            await client.delete(*keys)
+
+
+async def _time_per_call(func, calls: int) -> float:
+    started = time.perf_counter()
+    for index in range(calls):
+        await func(index)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def _bulk_keys(client) -> List[int]:
+    keys = await client.keys("patient:*")
+    if keys:
+        await client.delete(*keys)
+    return [len(keys)]
+
+
+async def _bulk_scan(client, batch_size: int) -> List[int]:
+    batches: List[int] = []
+    batch: List[str] = []
+    async for key in client.scan_iter(match="patient:*", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            await client.unlink(*batch)
+            batches.append(len(batch))
+            batch = []
+    if batch:
+        await client.unlink(*batch)
+        batches.append(len(batch))
+    return batches
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.redis_url:
+        import redis.asyncio as redis
+
+        make_client = lambda: redis.from_url(args.redis_url, decode_responses=True)  # noqa: E731
+    else:
+        make_client = MockRedisClient
+
+    print(f"{'patients':>9} {'KEYS+DEL us/op':>15} {'INCR us/op':>11} "
+          f"{'bulk KEYS s':>12} {'bulk SCAN s':>12} {'max keys/call':>14}")
+    for patients in args.patients:
+        client = make_client()
+        if args.redis_url:
+            await client.flushdb()
+        await _populate(client, patients)
+
+        calls = min(args.calls, patients)
+        keys_us = await _time_per_call(lambda i: _keys_invalidate(client, f"p{i}"), calls)
+        incr_us = await _time_per_call(lambda i: invalidate_patient_cache(client, f"p{i}"), calls)
+
+        await _populate(client, patients)
+        started = time.perf_counter()
+        await _bulk_keys(client)
+        bulk_keys_s = time.perf_counter() - started
+
+        await _populate(client, patients)
+        started = time.perf_counter()
+        batches = await _bulk_scan(client, args.batch_size)
+        bulk_scan_s = time.perf_counter() - started
+
+        print(f"{patients:>9} {keys_us:>15.1f} {incr_us:>11.1f} "
+              f"{bulk_keys_s:>12.3f} {bulk_scan_s:>12.3f} {max(batches or [0]):>14}")
+        if args.redis_url:
+            await client.flushdb()
+            await client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--calls", type=int, default=200, help="Invalidations timed per size")
+    parser.add_argument("--batch-size", type=int, default=500, help="SCAN COUNT / UNLINK batch")
+    parser.add_argument("--redis-url", help="Benchmark a real Redis (the database is flushed!)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark serialization of cached analysis payloads.
+
+Reports encoded size and encode/decode time for the previous stdlib JSON text
+and for the compact cache format (``backend.utils.serialization``), over
+synthetic analyses of increasing size (recommendations, alerts, anomalies).
+
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --sizes 10 100 1000 --repeat 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils import serialization  # noqa: E402
+
+
+def synthetic_analysis(items: int, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    return {
+        "patient_id": "patient-123",
+        "analysis_timestamp": "2024-05-01T12:00:00+00:00",
+        "status": "completed",
+        "summary": {
+            "patient_name": "Jane Doe",
+            "narrative": " ".join(rng.choice(["stable", "elevated", "review", "chronic"]) for _ in range(items * 5)),
+        },
+        "risk_scores": {f"risk_{idx}": rng.random() for idx in range(10)},
+        "alerts": [
+            {"severity": rng.choice(["high", "critical"]), "type": "lab", "message": f"Abnormal lab value {idx}"}
+            for idx in range(items)
+        ],
+        "recommendations": [
+            {
+                "title": f"Recommendation {idx}",
+                "rationale": "Consider guideline-directed therapy and follow-up labs",
+                "confidence": rng.random(),
+                "sources": [f"guideline-{rng.randint(1, 50)}" for _ in range(3)],
+            }
+            for idx in range(items)
+        ],
+        "anomalies": [[rng.random() for _ in range(8)] for _ in range(items)],
+    }
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500, 2000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    codec = "zstd" if serialization.zstandard is not None else "zlib"
+    print(f"orjson: {'yes' if serialization.orjson is not None else 'no'}, compression: {codec}")
+    print(f"{'items':>6} {'json bytes':>11} {'compact bytes':>14} {'ratio':>6} "
+          f"{'json enc us':>12} {'compact enc us':>15} {'json dec us':>12} {'compact dec us':>15}")
+    for items in args.sizes:
+        value = synthetic_analysis(items)
+        legacy = json.dumps(value, default=str)
+        compact = serialization.encode_value(value)
+
+        print(
+            f"{items:>6} {len(legacy):>11} {len(compact):>14} {len(legacy) / len(compact):>6.1f} "
+            f"{_time(lambda: json.dumps(value, default=str), args.repeat):>12.1f} "
+            f"{_time(lambda: serialization.encode_value(value), args.repeat):>15.1f} "
+            f"{_time(lambda: json.loads(legacy), args.repeat):>12.1f} "
+            f"{_time(lambda: serialization.decode_value(compact), args.repeat):>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
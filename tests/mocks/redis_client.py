@@ -65,6 +65,14 @@ class MockRedisClient:
         
         return True
     
+    async def setex(self, key: str, seconds: int, value: Union[str, bytes]) -> bool:
+        """Set a key-value pair with an expiry in seconds."""
+        return await self.set(key, value, ex=seconds)
+    
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[str]]:
+        """Get several values at once."""
+        return [await self.get(key) for key in [*keys, *args]]
+    
     async def delete(self, *keys: str) -> int:
         """Delete one or more keys."""
         count = 0
@@ -75,6 +83,10 @@ class MockRedisClient:
                 count += 1
         return count
     
+    async def unlink(self, *keys: str) -> int:
+        """Delete keys (non-blocking in Redis; identical to delete here)."""
+        return await self.delete(*keys)
+    
     async def exists(self, *keys: str) -> int:
         """Check if keys exist."""
         count = 0
@@ -109,6 +121,34 @@ class MockRedisClient:
         import fnmatch
         return [k for k in self._data.keys() if fnmatch.fnmatch(k, pattern)]
     
+    async def scan(
+        self, cursor: Union[int, str] = 0, match: Optional[str] = None, count: Optional[int] = None
+    ) -> tuple:
+        """
+        Iterate the keyspace incrementally.
+        
+        The cursor is the last key examined, so keys deleted mid-scan do not
+        cause others to be skipped (matching Redis' SCAN guarantee).
+        """
+        import bisect
+        import fnmatch
+        keys = sorted(self._data.keys())
+        start = bisect.bisect_right(keys, cursor) if cursor else 0
+        examined = keys[start:start + (count or 10)]
+        page = [k for k in examined if match is None or fnmatch.fnmatch(k, match)]
+        next_cursor = examined[-1] if examined and start + len(examined) < len(keys) else 0
+        return next_cursor, page
+    
+    async def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        """Yield keys matching pattern using SCAN."""
+        cursor = 0
+        while True:
+            cursor, page = await self.scan(cursor, match=match, count=count)
+            for key in page:
+                yield key
+            if cursor == 0:
+                break
+    
     async def hget(self, name: str, key: str) -> Optional[str]:
         """Get a hash field."""
         hash_data = self._data.get(name, {})
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from backend.alert_service import AlertService
@@ -19,3 +21,74 @@ async def test_identify_alerts_and_highest_severity():
     assert any(alert["severity"] == "critical" for alert in alerts)
     assert any(alert["type"] == "lab" for alert in alerts)
     assert service.highest_alert_severity(alerts) == "critical"
+
+
+def _write_rules(path, **overrides):
+    rules = {
+        "condition_rules": [
+            {"id": "critical_condition", "severity": "critical", "terms": ["sepsis", "septic", "mi"],
+             "message": "Critical condition identified: {code}"},
+            {"id": "septic_shock", "severity": "critical", "terms": ["septic_shock"],
+             "message": "Septic shock: {code}"},
+        ],
+        "lab_rules": [],
+        "threshold_rules": [
+            {"id": "hyperkalemia", "severity": "high", "codes": ["potassium"], "above": 5.5,
+             "message": "Potassium {value} {unit}", "recommendation": "Repeat {code}"},
+            {"id": "hypokalemia", "severity": "medium", "codes": ["Potassium"], "below": 3.0,
+             "message": "Potassium {value} {unit}"},
+        ],
+    }
+    rules.update(overrides)
+    path.write_text(json.dumps(rules))
+    return str(path)
+
+
+@pytest.mark.anyio
+async def test_rules_file_thresholds_and_multi_rule_matching(tmp_path):
+    service = AlertService(rules_path=_write_rules(tmp_path / "rules.json"))
+
+    alerts = await service.identify_alerts(
+        {
+            "conditions": [{"code": "Septic_Shock"}, {"code": "Asthma"}],
+            "observations": [
+                {"code": "potassium", "value": "6.1", "unit": "mmol/L"},
+                {"code": "POTASSIUM", "value": 2.5, "unit": "mmol/L"},
+                {"code": "potassium", "value": 4.0, "unit": "mmol/L"},
+                {"code": "potassium", "value": "n/a"},
+            ],
+        }
+    )
+
+    assert [alert["rule_id"] for alert in alerts] == [
+        "critical_condition",
+        "septic_shock",
+        "hyperkalemia",
+        "hypokalemia",
+    ]
+    assert alerts[2]["message"] == "Potassium 6.1 mmol/L"
+    assert alerts[2]["recommendation"] == "Repeat potassium"
+
+
+@pytest.mark.anyio
+async def test_unchanged_sections_reuse_alerts_and_hits_are_counted():
+    service = AlertService()
+    patient_data = {
+        "patient": {"id": "p1"},
+        "conditions": [{"code": "stroke"}],
+        "observations": [{"code": "LDL", "value": 200, "unit": "mg/dL", "interpretation": "high"}],
+    }
+
+    first = await service.identify_alerts(patient_data)
+    patient_data["observations"][0]["interpretation"] = "normal"
+    second = await service.identify_alerts(patient_data)
+
+    assert len(first) == 2
+    assert [alert["type"] for alert in second] == ["condition"]
+
+    stats = service.get_stats()
+    assert stats["evaluations"] == 2
+    assert stats["sections_reused"] == 1
+    assert stats["sections_evaluated"] == 3
+    assert stats["rule_hits"] == {"critical_condition": 2, "abnormal_lab_interpretation": 1}
+    assert stats["evaluation_ms"]["count"] == 2
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from backend.aot_reasoner import AoTReasoner
+
+
+PATIENT = {
+    "conditions": [{"code": "Type 2 diabetes"}, {"code": "Hypertension"}],
+    "medications": [{"medication": "Metformin"}],
+}
+
+
+@pytest.mark.asyncio
+async def test_reasoning_chain_is_cached_per_context():
+    reasoner = AoTReasoner(reasoning_depth=3)
+
+    first = await reasoner.generate_reasoning_chain("Assess glucose control", context=PATIENT)
+    second = await reasoner.generate_reasoning_chain("Assess glucose control", context=PATIENT)
+    other = await reasoner.generate_reasoning_chain(
+        "Assess glucose control", context={"conditions": [{"code": "Asthma"}]}
+    )
+
+    assert second is first
+    assert other is not first
+    assert reasoner.cache_stats["chain_hits"] == 1
+    assert reasoner.cache_stats["chain_misses"] == 2
+    assert reasoner.reasoning_chains.total == 2
+
+
+@pytest.mark.asyncio
+async def test_steps_are_shared_between_paths():
+    reasoner = AoTReasoner(reasoning_depth=3)
+
+    paths = await reasoner.get_multi_path_reasoning("Chest pain workup", num_paths=3, context=PATIENT)
+
+    assert [path["path_id"] for path in paths] == [1, 2, 3]
+    # Three paths x three steps x (reasoning + finding), computed once per step
+    assert reasoner.cache_stats["step_misses"] == 6
+    assert reasoner.cache_stats["step_hits"] == 12
+
+
+@pytest.mark.asyncio
+async def test_multi_path_stops_at_confidence_threshold():
+    reasoner = AoTReasoner(reasoning_depth=3)
+    original = reasoner._generate_hypothesis
+
+    async def slow_hypothesis(question, variant):
+        if variant > 0:
+            await asyncio.sleep(5)
+        return await original(question, variant)
+
+    reasoner._generate_hypothesis = slow_hypothesis
+
+    paths = await asyncio.wait_for(
+        reasoner.get_multi_path_reasoning(
+            "Chest pain workup", num_paths=3, context=PATIENT, confidence_threshold=0.7
+        ),
+        timeout=2,
+    )
+
+    assert [path["path_id"] for path in paths] == [1]
+    assert reasoner.cache_stats["paths_cancelled"] == 2
+
+
+def test_cache_is_bounded_and_expires():
+    reasoner = AoTReasoner(cache_size=2, cache_ttl_seconds=60)
+    for index in range(3):
+        reasoner._cache_put(reasoner._chain_cache, str(index), index)
+
+    assert list(reasoner._chain_cache) == ["1", "2"]
+
+    reasoner.cache_ttl_seconds = -1
+    assert reasoner._cache_get(reasoner._chain_cache, "2") is None
+    assert reasoner.get_stats()["cache"]["cached_chains"] == 1
@@ -8,9 +8,14 @@ from backend.utils.cache_utils import (
     CacheMetrics,
     get_cache_metrics,
     batch_invalidate_cache,
+    get_versioned,
+    invalidate_patient_cache,
+    scan_unlink,
+    set_versioned,
     warm_cache,
     should_invalidate_cache,
 )
+from tests.mocks.redis_client import MockRedisClient
 from datetime import datetime, timezone, timedelta
 
 
@@ -81,20 +86,32 @@ class TestBatchInvalidateCache:
     
     @pytest.mark.asyncio
     async def test_batch_invalidate_success(self):
-        """Test successful batch cache invalidation."""
-        redis_client = AsyncMock()
-        redis_client.keys = AsyncMock(side_effect=[
-            ["key1", "key2"],
-            ["key3"],
-        ])
-        redis_client.delete = AsyncMock(side_effect=[2, 1])
+        """Test batch invalidation scans and unlinks matching keys."""
+        redis_client = MockRedisClient()
+        for idx in range(25):
+            await redis_client.set(f"pattern1:{idx}", "x")
+        await redis_client.set("pattern2:a", "x")
+        await redis_client.set("other:a", "x")
         
-        patterns = ["pattern1:*", "pattern2:*"]
+        patterns = ["pattern1:*", "pattern2:a"]
         deleted = await batch_invalidate_cache(redis_client, patterns)
         
-        assert deleted == 3
-        assert redis_client.keys.call_count == 2
-        assert redis_client.delete.call_count == 2
+        assert deleted == 26
+        assert await redis_client.keys("*") == ["other:a"]
+    
+    @pytest.mark.asyncio
+    async def test_batch_invalidate_never_uses_keys(self):
+        """Test that invalidation uses SCAN/UNLINK in batches, never KEYS."""
+        redis_client = MockRedisClient()
+        for idx in range(7):
+            await redis_client.set(f"patient:{idx}", "x")
+        redis_client.keys = AsyncMock(side_effect=AssertionError("KEYS used"))
+        redis_client.unlink = AsyncMock(side_effect=lambda *keys: len(keys))
+        
+        deleted = await scan_unlink(redis_client, "patient:*", batch_size=3)
+        
+        assert deleted == 7
+        assert [len(call.args) for call in redis_client.unlink.call_args_list] == [3, 3, 1]
     
     @pytest.mark.asyncio
     async def test_batch_invalidate_no_redis(self):
@@ -105,8 +122,8 @@ class TestBatchInvalidateCache:
     @pytest.mark.asyncio
     async def test_batch_invalidate_error_handling(self):
         """Test error handling during batch invalidation."""
-        redis_client = AsyncMock()
-        redis_client.keys = AsyncMock(side_effect=Exception("Redis error"))
+        redis_client = MagicMock()
+        redis_client.scan_iter = MagicMock(side_effect=Exception("Redis error"))
         
         patterns = ["pattern:*"]
         deleted = await batch_invalidate_cache(redis_client, patterns)
@@ -114,6 +131,54 @@ class TestBatchInvalidateCache:
         assert deleted == 0
 
 
+class TestVersionedCache:
+    """Test per-patient version counters."""
+    
+    @pytest.mark.asyncio
+    async def test_version_bump_invalidates_only_that_patient(self):
+        """Test that bumping a patient's version makes only their entries stale."""
+        redis_client = MockRedisClient()
+        await set_versioned(redis_client, "p1", "patient:summary:p1", {"risk": 1}, ttl=60)
+        await set_versioned(redis_client, "p2", "patient:summary:p2", {"risk": 2}, ttl=60)
+        
+        assert await get_versioned(redis_client, "p1", "patient:summary:p1") == ({"risk": 1}, 0)
+        
+        assert await invalidate_patient_cache(redis_client, "p1") == 1
+        
+        assert await get_versioned(redis_client, "p1", "patient:summary:p1") == (None, 1)
+        assert await get_versioned(redis_client, "p2", "patient:summary:p2") == ({"risk": 2}, 0)
+    
+    @pytest.mark.asyncio
+    async def test_write_with_version_observed_before_invalidation_is_stale(self):
+        """Test that a value computed before a concurrent invalidation is never served."""
+        redis_client = MockRedisClient()
+        _, version = await get_versioned(redis_client, "p1", "patient:analysis:p1:latest")
+        await invalidate_patient_cache(redis_client, "p1")
+        await set_versioned(
+            redis_client, "p1", "patient:analysis:p1:latest", {"old": True}, ttl=60, version=version
+        )
+        
+        cached, current = await get_versioned(redis_client, "p1", "patient:analysis:p1:latest")
+        assert cached is None
+        assert current == 1
+
+    
+    @pytest.mark.asyncio
+    async def test_bulk_clear_keeps_version_counters(self):
+        """Test that a pattern clear cannot bring a stale write back to life."""
+        redis_client = MockRedisClient()
+        await invalidate_patient_cache(redis_client, "p1")
+        _, version = await get_versioned(redis_client, "p1", "patient:analysis:p1:latest")
+        await invalidate_patient_cache(redis_client, "p1")
+        await set_versioned(redis_client, "p1", "patient:summary:p1", {"risk": 1}, ttl=60)
+        
+        assert await batch_invalidate_cache(redis_client, ["patient:*"]) == 1
+        
+        await set_versioned(
+            redis_client, "p1", "patient:analysis:p1:latest", {"old": True}, ttl=60, version=version
+        )
+        assert await get_versioned(redis_client, "p1", "patient:analysis:p1:latest") == (None, 2)
+
 class TestWarmCache:
     """Test cache warming."""
     
@@ -109,3 +109,259 @@ async def test_audit_logging():
     finally:
         await close_database()
 
+
+
+@pytest.fixture
+async def isolated_database(tmp_path, monkeypatch):
+    """A fresh SQLite database with the current schema, without Redis."""
+    from sqlalchemy import create_engine
+    from backend.database.models import Base
+    
+    db_path = tmp_path / "isolated.db"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(sync_engine)
+    sync_engine.dispose()
+    
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{db_path}")
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:1/0")
+    await init_database()
+    yield DatabaseService()
+    await close_database()
+
+
+@pytest.mark.asyncio
+async def test_analysis_facts_are_queryable(isolated_database):
+    """Test that alerts, risk scores and anomalies are stored as queryable fact rows."""
+    db_service = isolated_database
+    for patient_id, severity, risk in (("p1", "critical", 0.4), ("p2", "high", 0.2), ("p1", "critical", 0.6)):
+        await db_service.save_analysis(
+            patient_id=patient_id,
+            analysis_data={
+                "analysis_data": {
+                    "gnn_anomaly_detection": {
+                        "anomalies": [
+                            {"anomaly_type": "medication_anomaly", "anomaly_score": 0.9, "severity": "high"},
+                            {"anomaly_type": "lab_anomaly", "anomaly_score": 0.5},
+                        ]
+                    }
+                },
+                "risk_scores": {"cardiovascular_risk": risk, "polypharmacy": True},
+                "alerts": [{"severity": severity, "type": "condition", "message": "Review"}],
+            },
+        )
+    
+    critical = await db_service.get_patients_with_alerts("critical")
+    assert [(row["patient_id"], row["alert_count"]) for row in critical] == [("p1", 2)]
+    
+    recent = await db_service.get_recent_alerts(limit=2)
+    assert [alert["patient_id"] for alert in recent] == ["p1", "p2"]
+    
+    trend = await db_service.get_risk_score_trend("p1")
+    assert [(point["score_name"], point["score"]) for point in trend] == [
+        ("cardiovascular_risk", 0.4),
+        ("cardiovascular_risk", 0.6),
+    ]
+    
+    timeline = await db_service.get_anomaly_timeline("p2")
+    assert len(timeline) == 1
+    assert timeline[0]["anomaly_count"] == 2
+    assert timeline[0]["anomaly_type_counts"] == {"medication_anomaly": 1, "lab_anomaly": 1}
+
+
+@pytest.mark.asyncio
+async def test_database_alert_feed_matches_in_memory_feed(isolated_database):
+    """Test that /alerts reports the same fields whether it reads the database or history."""
+    from unittest.mock import MagicMock
+    from backend.patient_analyzer import PatientAnalyzer
+    
+    analysis = {
+        "patient_id": "p-feed",
+        "analysis_timestamp": "2026-10-18T08:00:00+00:00",
+        "summary": {"patient_name": "Jordan Rivera"},
+        "alerts": [
+            {
+                "severity": "Critical",
+                "type": "lab",
+                "title": "Potassium critically high",
+                "summary": "K+ 6.8 mmol/L",
+                "timestamp": "2026-10-18T07:55:00+00:00",
+            },
+            {"severity": "low", "message": "Routine follow-up"},
+        ],
+    }
+    await isolated_database.save_analysis(
+        patient_id="p-feed",
+        analysis_data={"analysis_data": analysis, "alerts": analysis["alerts"]},
+    )
+    
+    def analyzer(database_service):
+        instance = PatientAnalyzer(
+            fhir_connector=None,
+            llm_engine=None,
+            rag_fusion=None,
+            s_lora_manager=MagicMock(),
+            aot_reasoner=None,
+            mlc_learning=None,
+            patient_data_service=MagicMock(),
+            risk_scoring_service=MagicMock(),
+            recommendation_service=MagicMock(),
+            alert_service=MagicMock(),
+            notification_service=MagicMock(),
+            database_service=database_service,
+        )
+        instance.history_store.add(analysis)
+        return instance
+    
+    from_database = await analyzer(isolated_database).get_recent_alerts(limit=10)
+    from_memory = await analyzer(None).get_recent_alerts(limit=10)
+    
+    # IDs differ by design: fact rows have their own primary keys
+    strip_id = lambda alerts: [{k: v for k, v in alert.items() if k != "id"} for alert in alerts]
+    assert strip_id(from_database) == strip_id(from_memory) == [
+        {
+            "patient_id": "p-feed",
+            "patient_name": "Jordan Rivera",
+            "title": "Potassium critically high",
+            "summary": "K+ 6.8 mmol/L",
+            "severity": "critical",
+            "timestamp": "2026-10-18T07:55:00+00:00",
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_large_analysis_blobs_are_stored_compactly(isolated_database):
+    """Test that large analysis_data is compressed on disk and legacy JSON rows still read back."""
+    from sqlalchemy import select, text
+    
+    db_service = isolated_database
+    summary = "Stable vitals, continue current medication plan. " * 200
+    await db_service.save_analysis(
+        patient_id="p-large",
+        analysis_data={"analysis_data": {"patient_id": "p-large", "summary": summary}},
+    )
+    
+    async with get_db_session() as session:
+        raw = (await session.execute(text(
+            "SELECT analysis_data FROM analysis_history WHERE patient_id = 'p-large'"
+        ))).scalar_one()
+        assert raw.startswith('"v1:') and len(raw) < len(summary)
+        
+        await session.execute(text(
+            "INSERT INTO analysis_history (id, patient_id, analysis_timestamp, analysis_data) "
+            "VALUES ('legacy', 'p-legacy', '2026-01-01 00:00:00', '{\"summary\": \"Legacy row\"}')"
+        ))
+    
+    latest = await db_service.get_latest_analysis("p-large")
+    assert latest["summary"] == summary
+    
+    async with get_db_session() as session:
+        legacy = (await session.execute(
+            select(AnalysisHistory).where(AnalysisHistory.id == "legacy")
+        )).scalar_one()
+        assert legacy.analysis_data == {"summary": "Legacy row"}
+
+
+@pytest.mark.asyncio
+async def test_ocr_fhir_resources_are_mapped_once_per_mapper_version(isolated_database, monkeypatch):
+    """Test that OCR FHIR resources are stored and only re-mapped for a new mapper version or patient."""
+    from backend.ocr import fhir_mapper
+    
+    db_service = isolated_database
+    await db_service.save_document({
+        "id": "doc-1",
+        "patient_id": "p1",
+        "file_path": "/tmp/doc-1.png",
+        "file_hash": "hash-doc-1",
+    })
+    await db_service.update_document("doc-1", {
+        "extracted_data": {"lab_values": [{"name": "glucose", "value": 110, "unit": "mg/dL"}]},
+        "processed_at": datetime.now(timezone.utc),
+    })
+    
+    calls = []
+    original = fhir_mapper.FHIRMapper.map_parsed_data_to_fhir
+    
+    def counting_map(self, parsed_data, patient_id, document_id=None):
+        calls.append((document_id, patient_id))
+        return original(self, parsed_data, patient_id, document_id)
+    
+    monkeypatch.setattr(fhir_mapper.FHIRMapper, "map_parsed_data_to_fhir", counting_map)
+    
+    first = await db_service.get_ocr_fhir_resources_for_patient("p1")
+    second = await db_service.get_ocr_fhir_resources_for_patient("p1")
+    assert len(first["observations"]) == 1
+    assert second == first
+    assert calls == [("doc-1", "p1")]
+    
+    monkeypatch.setattr(fhir_mapper, "MAPPER_VERSION", "test-next")
+    remapped = await db_service.get_ocr_fhir_resources_for_patient("p1")
+    await db_service.get_ocr_fhir_resources_for_patient("p1")
+    assert len(calls) == 2
+    assert remapped["observations"][0]["id"] != first["observations"][0]["id"]
+    
+    await db_service.update_document("doc-1", {"patient_id": "p2"})
+    assert await db_service.get_ocr_fhir_resources_for_patient("p1") == {
+        "observations": [], "medication_statements": [], "conditions": [],
+    }
+    relinked = await db_service.get_ocr_fhir_resources_for_patient("p2")
+    assert calls[-1] == ("doc-1", "p2")
+    assert relinked["observations"][0]["subject"]["reference"] == "Patient/p2"
+
+
+@pytest.mark.asyncio
+async def test_ocr_fhir_mapping_tolerates_concurrent_store(isolated_database, monkeypatch):
+    """Test that a reader losing the race to store a mapping still returns resources."""
+    from sqlalchemy.exc import IntegrityError
+    
+    db_service = isolated_database
+    await db_service.save_document({
+        "id": "doc-1",
+        "patient_id": "p1",
+        "file_path": "/tmp/doc-1.png",
+        "file_hash": "hash-doc-1",
+    })
+    await db_service.update_document("doc-1", {
+        "extracted_data": {"lab_values": [{"name": "glucose", "value": 110, "unit": "mg/dL"}]},
+        "processed_at": datetime.now(timezone.utc),
+    })
+    
+    async def conflicting_replace(*args, **kwargs):
+        raise IntegrityError("INSERT INTO document_fhir_resources", {}, Exception("uq_document_fhir_version"))
+    
+    monkeypatch.setattr(DatabaseService, "_replace_document_fhir_resources", staticmethod(conflicting_replace))
+    
+    resources = await db_service.get_ocr_fhir_resources_for_patient("p1")
+    assert len(resources["observations"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_document_link_survives_fhir_mapping_failure(isolated_database, tmp_path, monkeypatch):
+    """Test that a mapper error is logged without failing the link, and reads map later."""
+    from backend.document_service import DocumentService
+    from backend.ocr.fhir_mapper import FHIRMapper
+    
+    db_service = isolated_database
+    await db_service.save_document({
+        "id": "doc-1",
+        "file_path": "/tmp/doc-1.png",
+        "file_hash": "hash-doc-1",
+    })
+    await db_service.update_document("doc-1", {
+        "extracted_data": {"lab_values": [{"name": "glucose", "value": 110, "unit": "mg/dL"}]},
+        "processed_at": datetime.now(timezone.utc),
+    })
+    
+    service = DocumentService(database_service=db_service, upload_dir=str(tmp_path))
+    
+    def failing_map(*args, **kwargs):
+        raise ValueError("mapper failure")
+    
+    monkeypatch.setattr(service.fhir_mapper, "map_parsed_data_to_fhir", failing_map)
+    
+    result = await service.link_document_to_patient("doc-1", "p1")
+    assert result["status"] == "linked"
+    assert (await db_service.get_document("doc-1"))["patient_id"] == "p1"
+    
+    resources = await db_service.get_ocr_fhir_resources_for_patient("p1")
+    assert len(resources["observations"]) == 1
@@ -0,0 +1,121 @@
+"""
+Tests for startup schema migrations.
+"""
+
+import asyncio
+
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.database import migrations
+from backend.database.models import Base
+
+
+def _sync_url(path):
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "migrations.db"
+    monkeypatch.setenv("DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    return path
+
+
+@pytest.fixture
+async def engine(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    yield engine
+    await engine.dispose()
+
+
+# Tables added by revisions after 9a872a660cf0
+LATER_TABLES = {"analysis_alerts", "analysis_risk_scores", "analysis_anomalies", "document_fhir_resources"}
+
+
+def _create_tables(path, exclude=()):
+    sync_engine = create_engine(_sync_url(path))
+    tables = [table for name, table in Base.metadata.tables.items() if name not in exclude]
+    Base.metadata.create_all(sync_engine, tables=tables)
+    sync_engine.dispose()
+
+
+def _current_revision(path):
+    sync_engine = create_engine(_sync_url(path))
+    with sync_engine.connect() as conn:
+        revision = migrations._current_revision(conn)
+    sync_engine.dispose()
+    return revision
+
+
+@pytest.mark.asyncio
+async def test_existing_database_is_stamped(db_path, engine):
+    """A database created before Alembic is stamped at head rather than migrated."""
+    _create_tables(db_path)
+
+    assert await migrations.migrate_database(engine) is True
+    assert migrations.is_schema_ready()
+    assert _current_revision(db_path) == migrations.head_revision()
+
+
+@pytest.mark.asyncio
+async def test_upgrade_runs_on_async_engine(db_path, engine):
+    """Pending revisions are applied through the application's async engine."""
+    _create_tables(db_path, exclude=LATER_TABLES)
+    command.stamp(migrations.alembic_config(), "9a872a660cf0")
+
+    assert await migrations.migrate_database(engine) is True
+
+    sync_engine = create_engine(_sync_url(db_path))
+    tables = inspect(sync_engine).get_table_names()
+    sync_engine.dispose()
+    assert LATER_TABLES <= set(tables)
+    assert _current_revision(db_path) == migrations.head_revision()
+
+
+@pytest.mark.asyncio
+async def test_waiting_worker_times_out_without_migrating(db_path, engine, monkeypatch):
+    """A worker that may not migrate only waits, and reports when the schema never arrives."""
+    monkeypatch.setattr(migrations, "SCHEMA_POLL_INTERVAL_SECONDS", 0.01)
+    _create_tables(db_path, exclude=LATER_TABLES)
+    command.stamp(migrations.alembic_config(), "9a872a660cf0")
+
+    assert await migrations.migrate_database(engine, migrate=False, timeout=0.05) is False
+    assert not migrations.is_schema_ready()
+    assert _current_revision(db_path) == "9a872a660cf0"
+
+
+@pytest.mark.asyncio
+async def test_waiting_worker_resumes_when_schema_reaches_head(db_path, engine, monkeypatch):
+    """The wait ends as soon as another process brings the schema to head."""
+    monkeypatch.setattr(migrations, "SCHEMA_POLL_INTERVAL_SECONDS", 0.01)
+    _create_tables(db_path)
+    command.stamp(migrations.alembic_config(), "9a872a660cf0")
+
+    waiter = asyncio.create_task(migrations.migrate_database(engine, migrate=False, timeout=5))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    # In a thread: blocking the loop would stall the waiter's open read and lock SQLite
+    await asyncio.to_thread(command.stamp, migrations.alembic_config(), "head")
+    assert await asyncio.wait_for(waiter, timeout=5) is True
+    assert migrations.is_schema_ready()
+
+
+@pytest.mark.asyncio
+async def test_startup_fails_when_schema_wait_times_out(db_path, monkeypatch):
+    """init_database() refuses to start a worker on an old schema."""
+    from backend.database import connection
+
+    async def timed_out(engine):
+        return False
+
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:1/0")
+    monkeypatch.setattr(migrations, "migrate_database", timed_out)
+    try:
+        with pytest.raises(RuntimeError, match="migration head"):
+            await connection.init_database()
+    finally:
+        await connection.close_database()
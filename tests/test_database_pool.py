@@ -0,0 +1,111 @@
+"""
+Tests for connection pool sizing and telemetry.
+"""
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.database.pool import MonitoredQueuePool, PoolSizer
+from backend.utils.performance_optimization import optimize_connection_pool
+
+
+def test_sqlite_pool_has_no_overflow():
+    options = optimize_connection_pool(database_url="sqlite+aiosqlite:///app.db")
+
+    assert options["max_overflow"] == 0
+    assert options["overflow_limit"] == 0
+    assert options["pool_size"] == 5
+
+
+def test_postgres_pool_fits_worker_share():
+    options = optimize_connection_pool(
+        database_url="postgresql+asyncpg://db/app", workers=4, max_connections=100
+    )
+
+    # 90 usable connections split across 4 workers
+    assert options["pool_size"] + options["overflow_limit"] == 22
+    assert options["pool_size"] == 10
+    assert options["max_overflow"] == 12
+
+
+def test_sizer_grows_on_slow_checkouts_and_shrinks_when_idle():
+    sizer = PoolSizer(min_overflow=2, max_overflow=10, target_wait_seconds=0.05, window=4, step=4)
+
+    for _ in range(3):
+        sizer.observe(0.2, overflow_in_use=2)
+    assert sizer.evaluate(2) is None  # window not complete
+    sizer.observe(0.2, overflow_in_use=2)
+    assert sizer.evaluate(2) == 6
+
+    for _ in range(4):
+        sizer.observe(None, overflow_in_use=6)
+    assert sizer.evaluate(6) == 10
+    for _ in range(4):
+        sizer.observe(None, overflow_in_use=10)
+    assert sizer.evaluate(10) is None  # already at the ceiling
+
+    for _ in range(4):
+        sizer.observe(0.001, overflow_in_use=1)
+    assert sizer.evaluate(10) == 6
+    for _ in range(4):
+        sizer.observe(0.001, overflow_in_use=0)
+    assert sizer.evaluate(6) == 2
+
+
+@pytest.mark.asyncio
+async def test_monitored_pool_records_overflow_and_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=MonitoredQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    pool = engine.sync_engine.pool
+    try:
+        first = await engine.connect()
+        second = await engine.connect()
+        await second.execute(text("SELECT 1"))
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+
+        stats = pool.get_stats()
+        assert stats["checked_out"] == 2
+        assert stats["overflow"] == 1
+        assert stats["checkouts"] == 2
+        assert stats["overflow_events"] == 1
+        assert stats["timeouts"] == 1
+        assert stats["wait_histogram"]["count"] == 2
+
+        await first.close()
+        await second.close()
+        assert pool.get_stats()["checked_out"] == 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sizer_raises_overflow_limit_after_timeouts(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=MonitoredQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    pool = engine.sync_engine.pool
+    pool.sizer = PoolSizer(min_overflow=0, max_overflow=2, window=2, step=1)
+    try:
+        held = await engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+
+        # The window (one checkout, one timeout) is complete: overflow is now allowed
+        assert pool.get_stats()["max_overflow"] == 1
+        extra = await engine.connect()
+        assert pool.get_stats()["overflow_events"] == 1
+        await extra.close()
+        await held.close()
+    finally:
+        await engine.dispose()
@@ -0,0 +1,105 @@
+import json
+import random
+
+import pytest
+
+from backend.utils.event_history import (
+    PRECISE_LATENCY_BUCKETS,
+    EventHistory,
+    Histogram,
+    P2Quantile,
+    WindowedHistogram,
+)
+
+
+def test_p2_quantile_tracks_percentiles():
+    rng = random.Random(7)
+    values = [rng.uniform(0, 1000) for _ in range(5000)]
+    estimators = {p: P2Quantile(p) for p in (0.5, 0.9, 0.99)}
+    for value in values:
+        for estimator in estimators.values():
+            estimator.add(value)
+
+    ordered = sorted(values)
+    for p, estimator in estimators.items():
+        exact = ordered[int(p * (len(ordered) - 1))]
+        assert abs(estimator.value() - exact) < 25
+
+
+def test_p2_quantile_small_samples():
+    estimator = P2Quantile(0.5)
+    assert estimator.value() is None
+    for value in (3, 1, 2):
+        estimator.add(value)
+    assert estimator.value() == 2
+
+
+def test_history_is_bounded_but_aggregates_are_lifetime():
+    history = EventHistory(
+        "test",
+        maxlen=10,
+        metrics={"size": lambda e: e["size"]},
+        categories={"kind": lambda e: e["kind"]},
+    )
+    for i in range(100):
+        history.append({"size": i, "kind": "even" if i % 2 == 0 else "odd"})
+
+    assert len(history) == 10
+    assert history.total == 100
+    assert history[0]["size"] == 90
+    assert [e["size"] for e in history.recent(3)] == [97, 98, 99]
+    assert history.metric("size").mean == 49.5
+    assert history.metric("size").min == 0
+    assert history.metric("size").max == 99
+    assert history.category_counts("kind") == {"even": 50, "odd": 50}
+    assert history.get_stats()["metrics"]["size"]["p50"] is not None
+
+
+def test_history_spills_evicted_events(tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    history = EventHistory("test", maxlen=2, spill_path=str(spill_path), spill_batch_size=2)
+    for i in range(5):
+        history.append({"i": i})
+    history.flush()
+
+    spilled = [json.loads(line) for line in spill_path.read_text().splitlines()]
+    assert spilled == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert history.spilled == 3
+
+
+def test_histogram_counts_are_cumulative():
+    histogram = Histogram((0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.5, 2.0):
+        histogram.observe(value)
+
+    summary = histogram.summary()
+    assert summary["count"] == 5
+    assert summary["sum"] == pytest.approx(2.565)
+    assert summary["buckets"] == {"0.01": 2, "0.1": 3, "1": 4, "+Inf": 5}
+
+
+def test_histogram_quantiles_have_bounded_relative_error():
+    rng = random.Random(3)
+    values = sorted(rng.lognormvariate(-3, 1) for _ in range(20000))
+    histogram = Histogram(PRECISE_LATENCY_BUCKETS)
+    for value in values:
+        histogram.observe(value)
+
+    for quantile in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(quantile * len(values))]
+        assert histogram.quantile(quantile) == pytest.approx(exact, rel=0.1)
+    assert Histogram().quantile(0.5) is None
+
+
+def test_windowed_histogram_forgets_old_intervals():
+    latency = WindowedHistogram((0.1, 1.0, 10.0), interval=60, slots=16)
+    latency.observe(5.0, now=0)
+    for second in range(600, 660):
+        latency.observe(0.05, now=second)
+
+    assert latency.window(60, now=659).count == 60
+    assert latency.window(900, now=659).count == 61
+    assert latency.window(900, now=659).quantile(0.999) > 1.0
+    # Once the slow request is more than 15 intervals old it is gone
+    assert latency.window(900, now=1000).count == 60
+    assert latency.window(60, now=1000).count == 0
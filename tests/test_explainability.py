@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 from typing import Any, Dict
 
 import numpy as np
+import pytest
 from fastapi.testclient import TestClient
 
 from backend.di import get_audit_service, get_patient_analyzer
@@ -114,3 +115,57 @@ def test_explain_endpoint_returns_success():
     finally:
         for key in overrides:
             app.dependency_overrides.pop(key, None)
+
+
+def test_batch_explanations_match_shap_and_are_cached(tmp_path, monkeypatch):
+    shap = pytest.importorskip("shap")
+    from sklearn.linear_model import LogisticRegression
+
+    from backend import explainability
+
+    monkeypatch.setattr(explainability, "_EXPLAINER", None)
+    model_path = tmp_path / "risk.npz"
+    explainer = explainability.load_explainer(EXPECTED_FEATURES, model_path=str(model_path))
+    assert model_path.exists()
+
+    young = _synthetic_patient()
+    young["patient"] = {"birthDate": "1995-06-01"}
+    analyses = [{"patient_data": _synthetic_patient()}, {"patient_data": young}, _synthetic_patient()]
+
+    explanations = explainability.explain_risk_batch(analyses)
+
+    assert explanations[0] == explanations[2]
+    X = np.stack([explainability.extract_features(a)[0] for a in analyses[:2]])
+    model = LogisticRegression()
+    model.classes_ = np.array([0, 1])
+    model.coef_ = explainer.coef.reshape(1, -1)
+    model.intercept_ = np.array([explainer.intercept])
+    background = np.tile(explainer.background_mean, (2, 1))
+    expected = shap.Explainer(model, background)(X)
+    for row in range(2):
+        assert explanations[row]["shap_values"] == pytest.approx(expected.values[row].tolist())
+        assert explanations[row]["base_value"] == pytest.approx(float(expected.base_values[row]))
+        assert explanations[row]["risk_score"] == pytest.approx(model.predict_proba(X)[row][1])
+
+    cached_keys = len(explainability._EXPLANATION_CACHE)
+    assert explain_risk(analyses[1]) == explanations[1]
+    assert len(explainability._EXPLANATION_CACHE) == cached_keys
+
+
+def test_persisted_model_is_loaded_instead_of_retrained(tmp_path, monkeypatch):
+    from backend import explainability
+
+    model_path = tmp_path / "risk.npz"
+    trained = explainability.BaselineRiskExplainer.train(EXPECTED_FEATURES)
+    trained.save(str(model_path))
+
+    monkeypatch.setattr(explainability, "_EXPLAINER", None)
+
+    def fail_training(_names):
+        raise AssertionError("model should be loaded from disk")
+
+    monkeypatch.setattr(explainability.BaselineRiskExplainer, "train", fail_training)
+    loaded = explainability.load_explainer(EXPECTED_FEATURES, model_path=str(model_path))
+
+    assert loaded.coef == pytest.approx(trained.coef)
+    assert loaded.base_value == pytest.approx(trained.base_value)
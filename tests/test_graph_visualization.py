@@ -101,34 +101,26 @@ async def test_get_anomaly_timeline():
     
     # Use recent timestamps (within last 30 days)
     now = datetime.now(timezone.utc)
-    mock_history = [
+    mock_timeline = [
         {
-            'analysis_timestamp': (now - timedelta(days=5)).isoformat(),
-            'analysis_data': {
-                'gnn_anomaly_detection': {
-                    'anomalies': [
-                        {'anomaly_type': 'medication_anomaly', 'anomaly_score': 0.8}
-                    ],
-                    'anomaly_type_counts': {'medication_anomaly': 1}
-                }
-            }
+            'analysis_id': 'analysis-1',
+            'timestamp': (now - timedelta(days=5)).isoformat(),
+            'anomaly_count': 1,
+            'anomaly_type_counts': {'medication_anomaly': 1},
+            'anomalies': [{'type': 'medication_anomaly', 'score': 0.8, 'severity': None}],
         },
         {
-            'analysis_timestamp': (now - timedelta(days=2)).isoformat(),
-            'analysis_data': {
-                'gnn_anomaly_detection': {
-                    'anomalies': [
-                        {'anomaly_type': 'lab_value_anomaly', 'anomaly_score': 0.7}
-                    ],
-                    'anomaly_type_counts': {'lab_value_anomaly': 1}
-                }
-            }
+            'analysis_id': 'analysis-2',
+            'timestamp': (now - timedelta(days=2)).isoformat(),
+            'anomaly_count': 1,
+            'anomaly_type_counts': {'lab_value_anomaly': 1},
+            'anomalies': [{'type': 'lab_value_anomaly', 'score': 0.7, 'severity': None}],
         }
     ]
     
     with patch('backend.api.v1.endpoints.graph_visualization.get_database_service') as mock_get_db:
         mock_db = MagicMock()
-        mock_db.get_analysis_history = AsyncMock(return_value=mock_history)
+        mock_db.get_anomaly_timeline = AsyncMock(return_value=mock_timeline)
         mock_get_db.return_value = mock_db
         
         mock_request = MagicMock()
@@ -201,22 +201,18 @@ def test_get_anomaly_timeline_success(client, auth_token, dependency_overrides_g
     from backend.database.service import DatabaseService
     
     now = datetime.now(timezone.utc)
-    mock_history = [
+    mock_timeline = [
         {
-            'analysis_timestamp': (now - timedelta(days=5)).isoformat(),
-            'analysis_data': {
-                'gnn_anomaly_detection': {
-                    'anomalies': [
-                        {'anomaly_type': 'medication_anomaly', 'anomaly_score': 0.8, 'severity': 'high'}
-                    ],
-                    'anomaly_type_counts': {'medication_anomaly': 1}
-                }
-            }
+            'analysis_id': 'analysis-1',
+            'timestamp': (now - timedelta(days=5)).isoformat(),
+            'anomaly_count': 1,
+            'anomaly_type_counts': {'medication_anomaly': 1},
+            'anomalies': [{'type': 'medication_anomaly', 'score': 0.8, 'severity': 'high'}],
         }
     ]
     
     mock_db = MagicMock(spec=DatabaseService)
-    mock_db.get_analysis_history = AsyncMock(return_value=mock_history)
+    mock_db.get_anomaly_timeline = AsyncMock(return_value=mock_timeline)
     app.dependency_overrides[get_database_service] = lambda: mock_db
     
     response = client.get(
@@ -252,10 +248,8 @@ def test_get_anomaly_timeline_custom_days(client, auth_token, dependency_overrid
     """Test anomaly timeline retrieval with custom days parameter."""
     from backend.database.service import DatabaseService
     
-    mock_history = []
-    
     mock_db = MagicMock(spec=DatabaseService)
-    mock_db.get_analysis_history = AsyncMock(return_value=mock_history)
+    mock_db.get_anomaly_timeline = AsyncMock(return_value=[])
     app.dependency_overrides[get_database_service] = lambda: mock_db
     
     response = client.get(
@@ -0,0 +1,166 @@
+"""
+Tests for the input validation middleware.
+"""
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from backend.middleware import InputValidationMiddleware
+
+
+def _app(**kwargs) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/v1/echo")
+    async def echo(request: Request):
+        body = await request.body()
+        return {"size": len(body)}
+
+    app.add_middleware(InputValidationMiddleware, **kwargs)
+    return app
+
+
+def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+def test_detects_xss_with_single_pattern():
+    middleware = InputValidationMiddleware(FastAPI())
+
+    assert middleware._detect_xss("<SCRIPT src=x>alert(1)</script>")
+    assert middleware._detect_xss("javascript:alert(1)")
+    assert middleware._detect_xss('<img onerror = "x">')
+    assert middleware._detect_xss("<iframe src=evil>")
+    assert not middleware._detect_xss("Blood pressure 120/80, on metformin")
+
+
+def test_detects_sql_injection_in_one_pass():
+    middleware = InputValidationMiddleware(FastAPI())
+
+    assert middleware._detect_sql_injection("1; DROP TABLE patients")
+    assert middleware._detect_sql_injection("x UNION SELECT password")
+    assert middleware._detect_sql_injection("dropped' --")
+    assert not middleware._detect_sql_injection("selected medications")
+    assert not middleware._detect_sql_injection("1' OR 1=1")
+
+
+def test_sanitize_removes_all_patterns():
+    middleware = InputValidationMiddleware(FastAPI())
+
+    sanitized = middleware._sanitize_string(
+        "a<script>x</script>b javascript:c onclick=d <embed src=1>e"
+    )
+
+    assert sanitized == "ab c d e"
+
+
+def test_clean_json_body_reaches_handler():
+    client = TestClient(_app(strict_mode=True))
+
+    response = client.post("/api/v1/echo", json={"note": "stable, review in 3 months"})
+
+    assert response.status_code == 200
+    assert response.json()["size"] > 0
+
+
+def test_strict_mode_rejects_xss_in_body():
+    client = TestClient(_app(strict_mode=True))
+
+    response = client.post("/api/v1/echo", json={"note": "<script>alert(1)</script>"})
+
+    assert response.status_code == 400
+    assert "request body" in response.json()["message"]
+
+
+@pytest.mark.parametrize("body", [
+    {"note": "<img src=x onerror=alert(1)>"},
+    {"link": "JavaScript:alert(1)"},
+    {"note": "<embed src=evil.swf>"},
+])
+def test_strict_mode_rejects_markup_in_body(body):
+    client = TestClient(_app(strict_mode=True))
+
+    assert client.post("/api/v1/echo", json=body).status_code == 400
+
+
+def test_clinical_text_with_equals_passes_strict_mode(caplog):
+    client = TestClient(_app(strict_mode=True))
+
+    json_response = client.post(
+        "/api/v1/echo",
+        json={"note": "Dose adjusted; concentration = 5 mg/L, monitoring=weekly, onset = acute"},
+    )
+    form_response = client.post("/api/v1/echo", data={"response_type": "code", "note": "BP <140, onset=2d"})
+
+    assert json_response.status_code == 200
+    assert form_response.status_code == 200
+    assert "XSS" not in caplog.text
+
+
+def test_non_strict_mode_passes_body_through():
+    client = TestClient(_app())
+
+    response = client.post("/api/v1/echo", json={"note": "<script>alert(1)</script>"})
+
+    assert response.status_code == 200
+
+
+def test_detects_xss_split_across_chunks():
+    client = TestClient(_app(strict_mode=True))
+
+    response = client.post(
+        "/api/v1/echo",
+        content=_chunks(b'{"note": "' + b"x" * 5000 + b"<scr", b'ipt>alert(1)</script>"}'),
+        headers={"Content-Type": "application/json"},
+    )
+
+    assert response.status_code == 400
+
+
+def test_multipart_body_is_not_scanned():
+    client = TestClient(_app(strict_mode=True))
+
+    response = client.post(
+        "/api/v1/echo",
+        files={"file": ("note.html", b"<script>alert(1)</script>", "text/html")},
+    )
+
+    assert response.status_code == 200
+
+
+def test_declared_oversized_body_is_rejected():
+    client = TestClient(_app(max_body_bytes=100))
+
+    response = client.post("/api/v1/echo", json={"note": "x" * 200})
+
+    assert response.status_code == 413
+
+
+def test_streamed_oversized_body_is_rejected():
+    client = TestClient(_app(max_body_bytes=100))
+
+    response = client.post(
+        "/api/v1/echo",
+        content=_chunks(b"x" * 60, b"x" * 60),
+        headers={"Content-Type": "text/plain"},
+    )
+
+    assert response.status_code == 413
+
+
+def test_strict_mode_rejects_xss_in_model_body():
+    """The rejection wins over the handler's own body parsing error."""
+    app = FastAPI()
+
+    @app.post("/api/v1/notes")
+    async def create_note(note: dict):
+        return note
+
+    app.add_middleware(InputValidationMiddleware, strict_mode=True)
+
+    response = TestClient(app).post("/api/v1/notes", json={"text": "<iframe src=x>"})
+
+    assert response.status_code == 400
+    assert response.json()["error_type"] == "ValidationError"
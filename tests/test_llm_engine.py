@@ -53,3 +53,21 @@ def test_build_user_prompt_anonymization(mock_compliance):
         engine._build_user_prompt("Query", patient_context=context)
         
         mock_anon.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_query_with_rag_uses_async_provider(mock_compliance):
+    engine = LLMEngine(model_name="mock")
+    assert engine.provider == "mock"
+
+    result = await engine.query_with_rag("What is the dose?", include_reasoning=False)
+
+    assert result["answer"] == engine.client.response
+    assert engine.get_stats()["provider_stats"]["calls"] == 1
+
+@pytest.mark.asyncio
+async def test_stream_query_yields_chunks(mock_compliance):
+    engine = LLMEngine(model_name="mock")
+
+    chunks = [chunk async for chunk in engine.stream_query("What is the dose?")]
+
+    assert "".join(chunks) == engine.client.response
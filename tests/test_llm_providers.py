@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from backend.llm.providers import (
+    AnthropicProvider,
+    LLMProviderError,
+    MockLLMProvider,
+    OpenAIProvider,
+    close_shared_llm_http_client,
+    create_provider,
+    get_shared_llm_http_client,
+)
+
+
+def test_create_provider_selects_backend():
+    assert isinstance(create_provider("openai", "gpt-4", api_key="sk-test"), OpenAIProvider)
+    assert isinstance(create_provider("anthropic", "claude-3"), AnthropicProvider)
+    assert isinstance(create_provider("local", "llama-2-7b"), MockLLMProvider)
+    assert isinstance(create_provider("mock", "mock"), MockLLMProvider)
+
+
+@pytest.mark.asyncio
+async def test_mock_provider_complete_and_stream():
+    provider = MockLLMProvider(response="take with food")
+
+    result = await provider.complete("system", "user")
+    assert result["content"] == "take with food"
+    assert "usage" in result
+
+    chunks = [chunk async for chunk in provider.stream("system", "user")]
+    assert chunks == ["take", " with", " food"]
+    assert provider.get_stats()["calls"] == 1
+    assert provider.get_stats()["streams"] == 1
+    assert provider.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_provider_enforces_concurrency_limit():
+    provider = MockLLMProvider(latency_seconds=0.05, max_concurrency=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        task = asyncio.ensure_future(provider.complete("s", "u"))
+        await asyncio.sleep(0.01)
+        peak = max(peak, provider.stats["in_flight"])
+        return await task
+
+    await asyncio.gather(*(call() for _ in range(5)))
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_provider_timeout_raises_provider_error():
+    provider = MockLLMProvider(latency_seconds=1.0, timeout_seconds=0.01)
+
+    with pytest.raises(LLMProviderError):
+        await provider.complete("s", "u")
+    assert provider.stats["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_is_reused():
+    first = get_shared_llm_http_client()
+    assert get_shared_llm_http_client() is first
+
+    await close_shared_llm_http_client()
+    assert first.is_closed
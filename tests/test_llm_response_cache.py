@@ -0,0 +1,163 @@
+import pytest
+from unittest.mock import patch
+
+from backend.llm.response_cache import (
+    LLMResponseCache,
+    _SQLiteStore,
+    hash_context,
+    normalize_prompt,
+)
+from backend.llm_engine import LLMEngine
+
+
+def test_normalize_prompt_ignores_case_whitespace_and_trailing_punctuation():
+    assert normalize_prompt("  Metformin   DOSE? ") == normalize_prompt("metformin dose")
+
+
+@pytest.mark.asyncio
+async def test_exact_hit_tracks_saved_tokens():
+    cache = LLMResponseCache()
+    context = hash_context("patient-a", ["guideline"])
+
+    assert await cache.get("Metformin dose?", model="gpt-4", context_hash=context) is None
+    await cache.set(
+        "Metformin dose?",
+        {"answer": "500 mg"},
+        model="gpt-4",
+        context_hash=context,
+        usage={"prompt_tokens": 100, "completion_tokens": 20},
+    )
+
+    assert await cache.get("metformin   dose", model="gpt-4", context_hash=context) == {"answer": "500 mg"}
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["saved_prompt_tokens"] == 100
+    assert stats["hit_rate"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_entries_are_scoped_by_model_and_context():
+    cache = LLMResponseCache(similarity_threshold=0.5)
+    await cache.set("metformin dose", {"answer": "a"}, model="gpt-4", context_hash="patient-a")
+
+    assert await cache.get("metformin dose", model="gpt-4", context_hash="patient-b") is None
+    assert await cache.get("metformin dose", model="claude-3", context_hash="patient-a") is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_reuses_similar_question():
+    cache = LLMResponseCache(similarity_threshold=0.8)
+    await cache.set("what is the metformin dose", {"answer": "a"}, model="gpt-4", context_hash="ctx")
+
+    assert await cache.get("what is the metformin dosage", model="gpt-4", context_hash="ctx") == {"answer": "a"}
+    assert await cache.get("lisinopril side effects", model="gpt-4", context_hash="ctx") is None
+    assert cache.get_stats()["semantic_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_size_bound_and_ttl():
+    cache = LLMResponseCache(max_entries=2)
+    for question in ["q1", "q2", "q3"]:
+        await cache.set(question, {"answer": question}, model="m", context_hash="c")
+
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get_stats()["evictions"] == 1
+    assert await cache.get("q1", model="m", context_hash="c") is None
+
+    with patch("backend.llm.response_cache.time.time", return_value=10**12):
+        assert await cache.get("q3", model="m", context_hash="c") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    first = LLMResponseCache(store=_SQLiteStore(path))
+    await first.set("q", {"answer": "persisted"}, model="m", context_hash="c")
+
+    second = LLMResponseCache(store=_SQLiteStore(path))
+    assert await second.get("q", model="m", context_hash="c") == {"answer": "persisted"}
+    assert second.get_stats()["persistent_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_prunes_expired_rows_periodically(tmp_path):
+    import sqlite3
+
+    store = _SQLiteStore(str(tmp_path / "llm_cache.sqlite3"))
+    with patch("backend.llm.response_cache.time.time", return_value=1000.0):
+        await store.set("old", {"answer": "old"}, ttl_seconds=1)
+    with patch("backend.llm.response_cache.time.time", return_value=1030.0):
+        await store.set("new", {"answer": "new"}, ttl_seconds=3600)
+    with patch("backend.llm.response_cache.time.time", return_value=1100.0):
+        await store.set("newer", {"answer": "newer"}, ttl_seconds=3600)
+
+    conn = sqlite3.connect(store.path)
+    try:
+        keys = [row[0] for row in conn.execute("SELECT key FROM llm_response_cache ORDER BY key")]
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list(llm_response_cache)")]
+    finally:
+        conn.close()
+    # The write at 1030 was within the prune interval, the one at 1100 pruned
+    assert keys == ["new", "newer"]
+    assert "idx_llm_response_cache_expires_at" in indexes
+
+
+@pytest.mark.asyncio
+async def test_query_with_rag_skips_llm_on_cache_hit():
+    with patch("backend.llm_engine.get_region", return_value="US"), \
+         patch("backend.llm_engine.is_external_llm_allowed", return_value=True), \
+         patch("backend.llm_engine.is_local_llm_required", return_value=False):
+        engine = LLMEngine(model_name="mock", response_cache=LLMResponseCache())
+
+    first = await engine.query_with_rag("Metformin dose?", include_reasoning=False)
+    second = await engine.query_with_rag("metformin dose", include_reasoning=False)
+
+    assert second["answer"] == first["answer"]
+    assert second["cached"] is True
+    assert engine.client.get_stats()["calls"] == 1
+    assert engine.get_stats()["response_cache"]["hits"] == 1
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def scan_iter(self, match, count):
+        prefix = match.rstrip("*")
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+    async def unlink(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_connects_after_engine_startup(monkeypatch):
+    """The engine is built before init_database() creates the Redis client."""
+    monkeypatch.setenv("LLM_CACHE_BACKEND", "redis")
+    with patch("backend.database.connection._redis_client", None), \
+         patch("backend.llm_engine.get_region", return_value="US"), \
+         patch("backend.llm_engine.is_external_llm_allowed", return_value=True), \
+         patch("backend.llm_engine.is_local_llm_required", return_value=False):
+        engine = LLMEngine(model_name="mock")
+
+    fake = _FakeRedis()
+    with patch("backend.database.connection._redis_client", fake):
+        await engine.response_cache.set("q", {"answer": "shared"}, model="m", context_hash="c")
+
+        other = LLMResponseCache.from_env()
+        assert await other.get("q", model="m", context_hash="c") == {"answer": "shared"}
+
+    assert any(key.startswith("llm_cache:") for key in fake.data)
+    assert other.get_stats()["persistent_hits"] == 1
+
+    await other.clear()
+    assert not any(key.startswith("llm_cache:") for key in fake.data)
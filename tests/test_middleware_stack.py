@@ -0,0 +1,84 @@
+"""
+Tests for the ASGI middleware stack.
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from backend.audit import AuditMiddleware
+from backend.middleware import (
+    CorrelationIdMiddleware,
+    PerformanceMonitoringMiddleware,
+    SecurityHeadersMiddleware,
+    TimeoutMiddleware,
+)
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/slow")
+    async def slow():
+        await asyncio.sleep(1)
+        return {"ok": True}
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def chunks():
+            for index in range(3):
+                yield f"{index}\n".encode()
+                await asyncio.sleep(0.05)
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/api/v1/state")
+    async def state():
+        return {"ok": True}
+
+    return app
+
+
+def test_timeout_before_response_returns_504():
+    """A handler that has not responded by the deadline gets a 504."""
+    app = _app()
+    app.add_middleware(TimeoutMiddleware, timeout_seconds=0.05)
+
+    response = TestClient(app).get("/api/v1/slow")
+
+    assert response.status_code == 504
+    assert response.json()["error_type"] == "timeout"
+
+
+def test_timeout_does_not_cut_off_started_stream():
+    """Once the response has started, a streaming body may outlast the deadline."""
+    app = _app()
+    app.add_middleware(TimeoutMiddleware, timeout_seconds=0.05)
+
+    response = TestClient(app).get("/api/v1/stream")
+
+    assert response.status_code == 200
+    assert response.text == "0\n1\n2\n"
+
+
+def test_stack_headers_and_correlation_id():
+    """Each layer adds its headers, and inner layers see the correlation ID."""
+    app = _app()
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(PerformanceMonitoringMiddleware)
+    app.add_middleware(AuditMiddleware, enabled=False)
+    app.add_middleware(CorrelationIdMiddleware)
+    client = TestClient(app)
+
+    response = client.get("/api/v1/stream", headers={"X-Correlation-ID": "corr-123"})
+
+    assert response.text == "0\n1\n2\n"
+    assert response.headers["X-Correlation-ID"] == "corr-123"
+    assert response.headers["X-Request-Id"] == "corr-123"
+    assert "X-Request-Duration" in response.headers
+    assert response.headers["X-Frame-Options"] == "DENY"
+
+    generated = client.get("/api/v1/state").headers["X-Correlation-ID"]
+    assert len(generated) == 32
@@ -49,3 +49,93 @@ def test_process_feedback_updates_rl_policy():
     stats = mlc.get_rl_stats()
     assert stats["cumulative_reward"] == pytest.approx(0.0)
     assert stats["last_update"] is not None
+
+
+def _replay_feedback(mlc, count, flush_every=None):
+    async def scenario():
+        for index in range(count):
+            await mlc.process_feedback(
+                query_id=f"user-1-q{index}",
+                feedback_type="positive" if index % 3 else "negative",
+                components_used=["patient_summarization", "risk_detection"],
+            )
+            if flush_every and (index + 1) % flush_every == 0:
+                await mlc.feedback_store.flush()
+        await mlc.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_feedback_log_rebuilds_state_after_restart(tmp_path):
+    mlc = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+    _replay_feedback(mlc, 7)
+
+    restored = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+
+    assert restored.feedback_history.total == 7
+    assert restored.component_feedback["risk_detection"]["total"] == 7
+    for comp_id in ("patient_summarization", "risk_detection"):
+        assert restored.learned_components[comp_id]["performance"] == pytest.approx(
+            mlc.learned_components[comp_id]["performance"]
+        )
+    state = mlc._build_state_signature(["patient_summarization", "risk_detection"])
+    assert restored.rl_agent.get_q_values(state) == pytest.approx(mlc.rl_agent.get_q_values(state))
+
+
+def test_feedback_log_compacts_into_snapshot(tmp_path):
+    mlc = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+    store = mlc.feedback_store
+    store.segment_max_bytes = 1
+    store.compact_after_segments = 2
+    _replay_feedback(mlc, 9, flush_every=2)
+
+    assert store.stats["compactions"] >= 1
+    assert (tmp_path / "snapshot.json").exists()
+    assert len(list(tmp_path.glob("segment-*.jsonl"))) <= 2
+
+    restored = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+
+    assert restored.feedback_history.total == 9
+    assert restored.component_feedback["patient_summarization"] == mlc.component_feedback["patient_summarization"]
+    assert restored.learned_components["risk_detection"]["performance"] == pytest.approx(
+        mlc.learned_components["risk_detection"]["performance"]
+    )
+    assert restored.get_rl_stats()["cumulative_reward"] == mlc.get_rl_stats()["cumulative_reward"]
+
+
+def test_batched_rl_updates_run_off_the_request_path(monkeypatch):
+    monkeypatch.setenv("MLC_RL_BATCH_UPDATES", "true")
+    monkeypatch.setenv("MLC_RL_BATCH_SIZE", "2")
+    mlc = MLCLearning(learning_rate=0.1)
+    components = ["patient_summarization"]
+    state = mlc._build_state_signature(components)
+
+    async def scenario():
+        await mlc.process_feedback(query_id="q1", feedback_type="positive", components_used=components)
+        queued = len(mlc.rl_agent.replay_buffer)
+        await mlc.process_feedback(query_id="q2", feedback_type="positive", components_used=components)
+        await asyncio.sleep(0)
+        return queued
+
+    assert asyncio.run(scenario()) == 1
+    assert mlc.get_rl_stats()["batched_updates"] == 2
+    assert mlc.get_rl_stats()["pending_transitions"] == 0
+    assert mlc.rl_agent.get_q_values(state)[tuple(components)] > 0
+
+
+def test_user_feedback_count_outlives_history_window(tmp_path, monkeypatch):
+    monkeypatch.setenv("EVENT_HISTORY_LIMIT", "5")
+    mlc = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+    mlc.feedback_store.segment_max_bytes = 1
+    mlc.feedback_store.compact_after_segments = 2
+    _replay_feedback(mlc, 12, flush_every=2)
+
+    assert len(mlc.feedback_history) == 5
+    assert asyncio.run(mlc.personalize_for_user("user-1"))["feedback_count"] == 12
+    assert asyncio.run(mlc.personalize_for_user("user"))["feedback_count"] == 12
+    assert asyncio.run(mlc.personalize_for_user("user-2"))["feedback_count"] == 0
+
+    # Restored from the compacted snapshot plus the events logged after it
+    assert mlc.feedback_store.stats["compactions"] >= 1
+    restored = MLCLearning(learning_rate=0.1, feedback_history_path=str(tmp_path))
+    assert asyncio.run(restored.personalize_for_user("user-1"))["feedback_count"] == 12
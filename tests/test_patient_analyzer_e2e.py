@@ -76,7 +76,7 @@ def test_patient_analyzer_e2e_with_mocks(monkeypatch):
     monkeypatch.setattr(slora, "select_adapters", mock_select_adapters)
     
     # Mock S-LoRA activate_adapter
-    async def mock_activate_adapter(adapter_id):
+    async def mock_activate_adapter(adapter_id, pin=False):
         return True
     
     monkeypatch.setattr(slora, "activate_adapter", mock_activate_adapter)
@@ -68,3 +68,61 @@ def test_clear_history_empties_cache():
     analyzer.clear_history()
 
     assert analyzer.total_history_count() == 0
+
+
+def test_history_store_orders_globally_and_prunes_expired_prefix():
+    from backend.analysis_history import AnalysisHistoryStore
+
+    store = AnalysisHistoryStore(limit=3, ttl_seconds=60)
+    now = datetime.now(timezone.utc)
+
+    def at(seconds_ago, **fields):
+        return {"analysis_timestamp": (now - timedelta(seconds=seconds_ago)).isoformat(), **fields}
+
+    store.add(at(10, patient_id="p1", status="completed", analysis_duration_seconds=2.0))
+    store.add(at(120, patient_id="p2", status="completed", analysis_duration_seconds=4.0))
+    store.add({"patient_id": "p3"})
+    store.add(at(5, patient_id="p2", status="failed"))
+
+    assert [a.get("patient_id") for a in store.all()] == ["p3", "p2", "p1", "p2"]
+    assert [a["patient_id"] for a in store.recent(2)] == ["p2", "p1"]
+    assert store.get_stats()["successful_analyses"] == 2
+
+    assert store.prune_expired(now.timestamp()) == 1
+    assert len(store) == 3
+    assert store.for_patient("p2") == [store.latest("p2")]
+    assert store.get_stats() == {
+        "total_analyses": 3,
+        "successful_analyses": 1,
+        "average_analysis_time": pytest.approx(2.0 / 3),
+    }
+
+
+def test_collect_recent_alerts_reads_newest_analyses_first():
+    analyzer = PatientAnalyzer(
+        fhir_connector=None,
+        llm_engine=None,
+        rag_fusion=None,
+        s_lora_manager=_StubAdapterManager(),
+        aot_reasoner=None,
+        mlc_learning=None,
+        patient_data_service=MagicMock(),
+        risk_scoring_service=MagicMock(),
+        recommendation_service=MagicMock(),
+        alert_service=MagicMock(),
+        notification_service=MagicMock(),
+    )
+    base_time = datetime.now(timezone.utc)
+    for minute, patient_id in enumerate(["p1", "p2", "p1"]):
+        analyzer.history_store.add(
+            {
+                "patient_id": patient_id,
+                "analysis_timestamp": (base_time + timedelta(minutes=minute)).isoformat(),
+                "alerts": [{"severity": "critical", "message": f"alert {minute}"}],
+            }
+        )
+
+    alerts = analyzer.collect_recent_alerts(limit=2)
+
+    assert [alert["summary"] for alert in alerts] == ["alert 2", "alert 1"]
+    assert analyzer.get_recent_history(1, patient_id="p1")[0]["alerts"][0]["message"] == "alert 2"
@@ -44,8 +44,17 @@ class DummyAdapterManager:
     async def select_adapters(self, specialties, patient_data):
         return ["cardio"]
 
-    async def activate_adapter(self, adapter):
-        return None
+    def __init__(self):
+        self.pinned = []
+
+    async def activate_adapter(self, adapter, pin=False):
+        if pin:
+            self.pinned.append(adapter)
+        return True
+
+    async def release_adapters(self, adapters):
+        for adapter in adapters:
+            self.pinned.remove(adapter)
 
 
 def test_patient_analyzer_orchestrates_services():
@@ -101,3 +110,42 @@ def test_patient_analyzer_orchestrates_services():
     assert result["highest_alert_severity"] == "critical"
     assert result["polypharmacy_risk"] is False
     assert result["risk_scores"]["polypharmacy"] is False
+
+
+def test_adapters_stay_pinned_until_analysis_finishes():
+    adapter_manager = DummyAdapterManager()
+    pinned_during_analysis = []
+
+    async def fail_recommendations(*args, **kwargs):
+        pinned_during_analysis.extend(adapter_manager.pinned)
+        raise RuntimeError("recommendation failure")
+
+    patient_data_service = AsyncMock()
+    patient_data_service.fetch_patient_data.return_value = {"patient": {"id": "p1"}}
+    risk_service = AsyncMock()
+    risk_service.calculate_risk_scores.return_value = {}
+    risk_service.derive_overall_risk_score = lambda scores: 0.0
+    alert_service = AsyncMock()
+    alert_service.identify_alerts.return_value = []
+    recommendation_service = AsyncMock()
+    recommendation_service.generate_recommendations.side_effect = fail_recommendations
+
+    analyzer = PatientAnalyzer(
+        fhir_connector=None,
+        llm_engine=None,
+        rag_fusion=None,
+        s_lora_manager=adapter_manager,
+        aot_reasoner=None,
+        mlc_learning=None,
+        patient_data_service=patient_data_service,
+        risk_scoring_service=risk_service,
+        recommendation_service=recommendation_service,
+        alert_service=alert_service,
+        notification_service=AsyncMock(),
+    )
+
+    result = asyncio.run(analyzer.analyze("p1"))
+
+    assert result["status"] == "error"
+    assert pinned_during_analysis == ["cardio"]
+    assert adapter_manager.pinned == []
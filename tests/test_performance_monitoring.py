@@ -0,0 +1,120 @@
+"""
+Tests for request latency metrics and the Prometheus endpoint.
+"""
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from backend.middleware.performance_monitoring import (
+    OVERFLOW_ROUTE,
+    UNMATCHED_ROUTE,
+    PerformanceMetrics,
+    PerformanceMonitoringMiddleware,
+    get_performance_metrics,
+    reset_performance_metrics,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    reset_performance_metrics()
+    yield
+    reset_performance_metrics()
+
+
+def test_requests_are_grouped_by_route_template():
+    """Path parameters do not create a series per patient."""
+    app = FastAPI()
+
+    @app.get("/api/v1/patients/{patient_id}")
+    async def patient(patient_id: str):
+        return {"id": patient_id}
+
+    app.add_middleware(PerformanceMonitoringMiddleware)
+    client = TestClient(app)
+    for patient_id in ("p1", "p2", "p3"):
+        client.get(f"/api/v1/patients/{patient_id}")
+    client.get("/not-a-route")
+
+    stats = get_performance_metrics().get_stats()
+    route = stats["endpoint_stats"]["GET /api/v1/patients/{patient_id}"]
+    assert route["count"] == 3
+    assert route["percentiles"]["1m"]["count"] == 3
+    assert set(route["percentiles"]["5m"]) == {"count", "p50", "p90", "p99", "p999"}
+    assert stats["endpoint_stats"][f"GET {UNMATCHED_ROUTE}"]["count"] == 1
+    assert stats["total_requests"] == 4
+    assert stats["error_breakdown"] == {f"GET {UNMATCHED_ROUTE}:404": 1}
+
+
+def test_included_router_routes_keep_their_prefix():
+    """Routes under include_router(prefix=...) are labeled with the full template."""
+    auth = APIRouter(prefix="/auth")
+    files = APIRouter()
+
+    @auth.post("/login")
+    async def login():
+        return {}
+
+    @files.get("/files/{file_path:path}")
+    async def read_file(file_path: str):
+        return {"path": file_path}
+
+    api = APIRouter()
+    api.include_router(auth)
+    api.include_router(files, prefix="/documents")
+    app = FastAPI()
+    app.include_router(api, prefix="/api/v1")
+    app.add_middleware(PerformanceMonitoringMiddleware)
+    client = TestClient(app)
+
+    client.post("/api/v1/auth/login")
+    client.get("/api/v1/documents/files/a/files/b")
+
+    assert set(get_performance_metrics().get_stats()["endpoint_stats"]) == {
+        "POST /api/v1/auth/login",
+        "GET /api/v1/documents/files/{file_path:path}",
+    }
+
+
+def test_route_count_is_capped():
+    metrics = PerformanceMetrics(max_endpoints=2)
+    for index in range(5):
+        metrics.record_request(f"/route/{index}", "GET", 0.01, 200)
+
+    assert set(metrics.endpoints) == {"GET /route/0", "GET /route/1", f"GET {OVERFLOW_ROUTE}"}
+    assert metrics.endpoints[f"GET {OVERFLOW_ROUTE}"].count == 3
+
+
+def test_prometheus_text_exposition():
+    metrics = PerformanceMetrics()
+    metrics.record_request("/api/v1/query", "POST", 0.02, 200)
+    metrics.record_request("/api/v1/query", "POST", 0.3, 500, is_error=True)
+
+    text = metrics.prometheus_text()
+
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_requests_total{method="POST",route="/api/v1/query",status="500"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/api/v1/query",le="0.025"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/api/v1/query",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/query"} 2' in text
+    assert 'window="15m",quantile="0.999"' in text
+    assert text.endswith("\n")
+
+
+def test_metrics_endpoint_requires_token(monkeypatch):
+    from backend.main import app
+
+    client = TestClient(app, client=("127.0.0.1", 50000))
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    assert client.get("/metrics").status_code == 404
+
+    # A loopback peer (e.g. a same-host reverse proxy) is not enough on its own
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE http_requests_total counter" in response.text
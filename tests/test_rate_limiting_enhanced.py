@@ -10,6 +10,7 @@ from fastapi.testclient import TestClient
 from starlette.responses import Response
 
 from backend.middleware.rate_limit import RateLimitMiddleware, RateLimitConfig
+from backend.middleware.rate_limit_local import LocalRateLimiter
 
 
 class TestRateLimitConfig:
@@ -30,6 +31,50 @@ class TestRateLimitConfig:
         assert config.burst_size == 5
 
 
+class TestLocalRateLimiter:
+    """Test the memory-bounded in-process limiter."""
+    
+    def test_sliding_window_releases_gradually(self):
+        """Test old requests stop counting as their buckets slide out of the window."""
+        limiter = LocalRateLimiter(buckets=6)
+        config = RateLimitConfig(requests_per_minute=6, requests_per_hour=100, burst_size=10)
+        
+        # One request every 10 seconds fills the minute (one per bucket)
+        for i in range(6):
+            assert limiter.check("client", config, now=600.0 + 10 * i).allowed
+        denied = limiter.check("client", config, now=655.0)
+        assert denied.allowed is False
+        assert "6 requests per minute" in denied.message
+        assert denied.retry_after == 5  # the first bucket starts leaving the window at t=660
+        
+        assert limiter.check("client", config, now=661.0).allowed
+    
+    def test_denial_does_not_consume(self):
+        """Test denied requests are not recorded."""
+        limiter = LocalRateLimiter()
+        config = RateLimitConfig(requests_per_minute=60, requests_per_hour=1000, burst_size=2)
+        
+        assert limiter.check("client", config, now=100.0).remaining_minute == 60
+        assert limiter.check("client", config, now=100.0).remaining_minute == 59
+        assert limiter.check("client", config, now=100.0).message.startswith("Burst limit exceeded")
+        # Two requests recorded, not three
+        assert limiter.check("client", config, now=115.0).remaining_minute == 58
+    
+    def test_client_table_is_bounded(self):
+        """Test unique clients beyond the cap evict the least recently seen."""
+        limiter = LocalRateLimiter(max_clients=3)
+        config = RateLimitConfig(requests_per_minute=1, requests_per_hour=100, burst_size=10)
+        
+        assert limiter.check("abuser", config, now=100.0).allowed
+        for i in range(10):
+            limiter.check(f"scanner-{i}", config, now=100.0)
+            # Still limited, and still tracked because it was just seen
+            assert limiter.check("abuser", config, now=100.0).allowed is False
+        
+        assert len(limiter) == 3
+        assert limiter.get_stats()["evictions"] == 8
+
+
 class TestRateLimitMiddleware:
     """Test rate limiting middleware."""
     
@@ -185,9 +230,10 @@ class TestRateLimitMiddleware:
         client_id = "test_client"
         config = RateLimitConfig(10, 100, 3)
         
-        allowed, error_msg, remaining_minute, remaining_hour = await middleware._check_rate_limit(
-            client_id, config
-        )
+        with patch("backend.database.connection.get_redis_client", return_value=None):
+            allowed, error_msg, remaining_minute, remaining_hour = await middleware._check_rate_limit(
+                client_id, config
+            )
         
         # Should fall back to memory and succeed
         assert allowed is True
@@ -197,16 +243,10 @@ class TestRateLimitMiddleware:
     async def test_check_rate_limit_redis_success(self, middleware):
         """Test Redis rate limit when Redis is available."""
         middleware.use_redis = True
-        mock_redis = AsyncMock()
-        mock_redis.zcount = AsyncMock(return_value=0)
-        mock_redis.zrange = AsyncMock(return_value=[])
-        
-        # Create a proper pipeline mock
-        mock_pipeline = MagicMock()
-        mock_pipeline.zadd = MagicMock()
-        mock_pipeline.expire = MagicMock()
-        mock_pipeline.execute = AsyncMock()
-        mock_redis.pipeline = MagicMock(return_value=mock_pipeline)
+        # One script call: allowed, no denied window, remaining burst/minute/hour
+        mock_script = AsyncMock(return_value=[1, 0, 0, 3, 10, 100])
+        mock_redis = MagicMock()
+        mock_redis.register_script = MagicMock(return_value=mock_script)
         middleware._redis_client = mock_redis
         
         client_id = "test_client"
@@ -220,18 +260,123 @@ class TestRateLimitMiddleware:
         assert error_msg is None
         assert remaining_minute == 10
         assert remaining_hour == 100
+        mock_script.assert_awaited_once()
+        assert mock_script.call_args.kwargs["keys"] == ["ratelimit:sliding_log:test_client"]
+    
+    @pytest.mark.asyncio
+    async def test_check_rate_limit_redis_denied(self, middleware):
+        """Test a denial from the Redis script maps to the window that was exceeded."""
+        middleware.use_redis = True
+        mock_redis = MagicMock()
+        # Denied by the second window (per minute), retry in 12.5 seconds
+        mock_redis.register_script = MagicMock(return_value=AsyncMock(return_value=[0, 2, 12500]))
+        middleware._redis_client = mock_redis
+        
+        decision = await middleware._evaluate("test_client", RateLimitConfig(10, 100, 3))
+        
+        assert decision.allowed is False
+        assert decision.retry_after == 13
+        assert decision.message == "Rate limit exceeded: 10 requests per minute. Try again in 13 seconds"
+    
+    @pytest.mark.asyncio
+    async def test_check_rate_limit_redis_error_falls_back(self, middleware):
+        """Test a failing Redis script falls back to the in-memory limiter."""
+        middleware.use_redis = True
+        mock_redis = MagicMock()
+        mock_redis.register_script = MagicMock(return_value=AsyncMock(side_effect=ConnectionError("down")))
+        middleware._redis_client = mock_redis
+        
+        allowed, error_msg, _, _ = await middleware._check_rate_limit("test_client", RateLimitConfig(10, 100, 3))
+        
+        assert allowed is True
+        assert len(middleware._local_limiter) == 1
+    
+    def test_gcra_windows(self, mock_app):
+        """Test GCRA enforces minute and hour rates with burst headroom."""
+        middleware = RateLimitMiddleware(mock_app, algorithm="gcra")
+        middleware._redis_client = MagicMock()
+        limiter = middleware._get_redis_limiter()
+        
+        assert limiter.windows(RateLimitConfig(30, 500, 5)) == [(60_000, 30, 5), (3_600_000, 500, 30)]
+    
+    def test_gcra_headers_report_burst_headroom(self, monkeypatch):
+        """Test GCRA advertises the burst it counts remaining requests against."""
+        from fastapi import FastAPI
+        
+        monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+        monkeypatch.delenv("TESTING", raising=False)
+        mock_redis = MagicMock()
+        # Allowed; 4 of 5 burst left this minute, 29 of 30 this hour
+        mock_redis.register_script = MagicMock(return_value=AsyncMock(return_value=[1, 0, 0, 4, 29]))
+        monkeypatch.setattr("backend.database.connection.get_redis_client", lambda: mock_redis)
+        app = FastAPI()
+        
+        @app.get("/api/v1/items")
+        async def items():
+            return {"ok": True}
+        
+        app.add_middleware(
+            RateLimitMiddleware, requests_per_minute=30, requests_per_hour=500, burst_size=5,
+            use_redis=True, algorithm="gcra",
+        )
+        response = TestClient(app).get("/api/v1/items")
+        
+        assert response.headers["X-RateLimit-Limit"] == "5"
+        assert response.headers["X-RateLimit-Remaining"] == "4"
+        assert response.headers["X-RateLimit-Limit-Hour"] == "30"
+        assert response.headers["X-RateLimit-Remaining-Hour"] == "29"
+        assert response.headers["X-RateLimit-Policy"] == "30;w=60,500;w=3600"
+    
+    def test_unknown_algorithm_rejected(self, mock_app):
+        """Test an unknown algorithm name fails at startup."""
+        with pytest.raises(ValueError):
+            RateLimitMiddleware(mock_app, algorithm="leaky")
+    
+    def test_endpoint_limits_match_by_segment(self, middleware):
+        """Test endpoint limits match whole path segments, longest route first."""
+        middleware.set_endpoint_limit("/api/v1/patients/{patient_id}/analyze", RateLimitConfig(5, 50, 1))
+        
+        assert middleware._get_rate_limit_config("/api/v1/patients/p1").requests_per_minute == 120
+        assert middleware._get_rate_limit_config("/api/v1/patients/p1/analyze").requests_per_minute == 5
+        # A shared string prefix is not a route prefix
+        assert middleware._get_rate_limit_config("/api/v1/patients-export").requests_per_minute == 10
     
     @pytest.mark.asyncio
     async def test_dispatch_skips_health_check(self, middleware):
         """Test that health check endpoints skip rate limiting."""
-        request = MagicMock(spec=Request)
-        request.url.path = "/api/v1/health"
-        call_next = AsyncMock(return_value=Response())
+        middleware.app = AsyncMock()
+        middleware._evaluate = AsyncMock()
+        scope = {"type": "http", "path": "/api/v1/health", "method": "GET", "headers": []}
+        
+        await middleware(scope, AsyncMock(), AsyncMock())
+        
+        middleware.app.assert_awaited_once()
+        middleware._evaluate.assert_not_called()
+    
+    def test_limited_requests_get_429_with_headers(self, monkeypatch):
+        """Test the middleware adds limit headers and rejects requests over the limit."""
+        from fastapi import FastAPI
+        
+        monkeypatch.delenv("PYTEST_CURRENT_TEST", raising=False)
+        monkeypatch.delenv("TESTING", raising=False)
+        app = FastAPI()
+        
+        @app.get("/api/v1/items")
+        async def items():
+            return {"ok": True}
+        
+        app.add_middleware(RateLimitMiddleware, requests_per_minute=5, requests_per_hour=100, burst_size=1)
+        client = TestClient(app)
         
-        response = await middleware.dispatch(request, call_next)
+        first = client.get("/api/v1/items")
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "5"
+        assert first.headers["X-RateLimit-Remaining"] == "5"
         
-        call_next.assert_called_once()
-        assert response is not None
+        second = client.get("/api/v1/items")
+        assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(second.headers["Retry-After"]) >= 1
+        assert second.json()["error_type"] == "rate_limit_exceeded"
     
     def test_rate_limit_headers_format(self, middleware):
         """Test that rate limit headers follow correct format."""
@@ -1,3 +1,5 @@
+import asyncio
+import time
 from unittest.mock import AsyncMock
 
 import pytest
@@ -40,3 +42,77 @@ async def test_recommendations_use_llm_and_reasoning_components():
     assert recommendations["priority_actions"][0]["action"] == "alert"
     assert llm_engine.query_with_rag.await_count == 3
     mlc_learning.compose_for_task.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_recommendations_share_retrieval_and_reasoning():
+    llm_engine = AsyncMock()
+    llm_engine.query_with_rag.return_value = {"answer": "ok", "confidence": 0.8, "sources": []}
+    rag_fusion = AsyncMock()
+    rag_fusion.retrieve_relevant_knowledge.return_value = {"relevant_content": ["doc"], "sources": ["src"]}
+    aot_reasoner = AsyncMock()
+    aot_reasoner.generate_reasoning_chain.return_value = "chain"
+    mlc_learning = AsyncMock()
+
+    service = RecommendationService(llm_engine, rag_fusion, aot_reasoner, mlc_learning)
+    await service.generate_recommendations(
+        patient_data={}, summary={}, alerts=[], risk_scores={}, adapters=[]
+    )
+
+    assert rag_fusion.retrieve_relevant_knowledge.await_count == 3
+    assert aot_reasoner.generate_reasoning_chain.await_count == 3
+    for call in llm_engine.query_with_rag.await_args_list:
+        assert call.kwargs["rag_results"] == {"relevant_content": ["doc"], "sources": ["src"]}
+        assert call.kwargs["reasoning_chain"] == "chain"
+
+
+@pytest.mark.anyio
+async def test_packed_recommendations_use_single_llm_call():
+    llm_engine = AsyncMock()
+    llm_engine.query_with_rag.return_value = {
+        "answer": '```json\n{"answers": [{"id": 1, "answer": "a"}, {"id": 2, "answer": "b"}, {"id": 3, "answer": "c"}]}\n```',
+        "confidence": 0.9,
+        "sources": ["guideline"],
+    }
+    rag_fusion = AsyncMock()
+    rag_fusion.retrieve_relevant_knowledge.return_value = {"relevant_content": ["doc"], "sources": ["src"]}
+
+    service = RecommendationService(
+        llm_engine, rag_fusion, AsyncMock(), AsyncMock(), pack_queries=True
+    )
+    recommendations = await service.generate_recommendations(
+        patient_data={}, summary={}, alerts=[], risk_scores={}, adapters=[]
+    )
+
+    assert [r["recommendation"] for r in recommendations["clinical_recommendations"]] == ["a", "b", "c"]
+    assert llm_engine.query_with_rag.await_count == 1
+
+
+def test_parse_packed_answers_tolerates_partial_output():
+    answers = RecommendationService._parse_packed_answers('{"answers": [{"id": 2, "answer": "b"}]}', 3)
+    assert answers == [None, "b", None]
+    assert RecommendationService._parse_packed_answers("not json", 2) == [None, None]
+
+
+@pytest.mark.anyio
+async def test_packed_timeout_leaves_fallback_only_the_remaining_budget():
+    async def slow_query(**kwargs):
+        await asyncio.sleep(1)
+        return {"answer": "late", "confidence": 0.5, "sources": []}
+
+    llm_engine = AsyncMock()
+    llm_engine.query_with_rag.side_effect = slow_query
+    rag_fusion = AsyncMock()
+    rag_fusion.retrieve_relevant_knowledge.return_value = {"relevant_content": [], "sources": []}
+
+    service = RecommendationService(
+        llm_engine, rag_fusion, AsyncMock(), AsyncMock(), pack_queries=True, time_budget_seconds=0.2
+    )
+    started = time.monotonic()
+    recommendations = await service.generate_recommendations(
+        patient_data={}, summary={}, alerts=[], risk_scores={}, adapters=[]
+    )
+
+    # Two full budgets would take 0.4s
+    assert time.monotonic() - started < 0.38
+    assert recommendations["clinical_recommendations"] == []
@@ -57,3 +57,78 @@ def test_risk_scores_include_age_and_medication_load():
     assert young_scores["cardiovascular_risk"] < senior_scores["cardiovascular_risk"]
     assert senior_scores["readmission_risk"] > 0.2
     assert senior_scores["polypharmacy_risk"] is True
+
+
+def _patient(birth_date, conditions=0, medications=0, encounters=0):
+    return {
+        "patient": {"birthDate": birth_date},
+        "conditions": [{"code": f"C{i}"} for i in range(conditions)],
+        "medications": [{"medication": f"M{i}"} for i in range(medications)],
+        "encounters": [{"status": "finished"} for _ in range(encounters)],
+    }
+
+
+def test_cohort_scores_match_single_patient_scores():
+    service = RiskScoringService()
+    cohort = {
+        "young": _patient("2005-01-01"),
+        "senior": _patient("1950-01-01", conditions=2, medications=15, encounters=3),
+        "unknown-age": _patient(None, conditions=7, medications=4, encounters=9),
+    }
+
+    cohort_scores = asyncio.run(service.calculate_cohort_risk_scores(cohort))
+
+    for patient_id, patient_data in cohort.items():
+        single = asyncio.run(service.calculate_risk_scores(patient_data))
+        assert cohort_scores[patient_id].keys() == single.keys()
+        for key, value in single.items():
+            assert cohort_scores[patient_id][key] == pytest.approx(value)
+    assert cohort_scores["senior"]["polypharmacy_risk"] is True
+    assert cohort_scores["unknown-age"]["readmission_risk"] == pytest.approx(0.35)
+
+
+def test_incremental_update_recomputes_only_changed_patient():
+    service = RiskScoringService()
+    asyncio.run(
+        service.calculate_cohort_risk_scores(
+            {"a": _patient("1960-05-05", medications=2), "b": _patient("1990-05-05")}
+        )
+    )
+    evaluated = service.engine.stats["rows_evaluated"]
+
+    unchanged = asyncio.run(service.update_patient_risk_scores("b", _patient("1990-05-05")))
+    assert service.engine.stats["rows_evaluated"] == evaluated
+    assert unchanged == service.engine.get("b")
+
+    updated = asyncio.run(
+        service.update_patient_risk_scores("a", _patient("1960-05-05", medications=12))
+    )
+    assert service.engine.stats["rows_evaluated"] == evaluated + 1
+    assert updated["polypharmacy"] is True
+    assert service.engine.get("a") == updated
+
+    assert service.engine.remove("a") is True
+    assert service.engine.get("a") is None
+    assert service.engine.get("b") == unchanged
+    assert service.engine.summary()["patients"] == 1
+
+
+def test_upserts_grow_the_cohort_matrices_geometrically():
+    from backend.risk_engine import CohortRiskEngine
+
+    engine = CohortRiskEngine()
+    buffers = set()
+    for index in range(1000):
+        engine.upsert(f"p{index}", _patient("1950-01-01", medications=index % 20))
+        buffers.add(id(engine._raw))
+
+    # 64 -> 128 -> ... -> 1024: a handful of reallocations, not one per patient
+    assert len(buffers) <= 6
+    assert len(engine) == 1000
+    assert engine.get("p999") == engine.score(_patient("1950-01-01", medications=19))
+
+    for index in range(500, 1000):
+        engine.remove(f"p{index}")
+    summary = engine.summary()
+    assert summary["patients"] == 500
+    assert summary["polypharmacy_rate"] == pytest.approx(0.5)
@@ -1,6 +1,8 @@
+import json
+
 import pytest
 
-from backend.rl_agent import MLCRLAgent
+from backend.rl_agent import MLCRLAgent, Transition
 
 
 def test_q_values_update_across_feedback_sequence():
@@ -22,3 +24,55 @@ def test_q_values_update_across_feedback_sequence():
 
     assert updated_q == pytest.approx(0.7)
     assert updated_q > first_q
+
+
+def test_batched_updates_match_sequential_updates_for_distinct_pairs():
+    sequential = MLCRLAgent(actions=["a", "b"], learning_rate=0.5, discount_factor=0.9)
+    batched = MLCRLAgent(actions=["a", "b"], learning_rate=0.5, discount_factor=0.9)
+    transitions = [
+        Transition("s1", "a", 1.0, "s2"),
+        Transition("s2", "b", 2.0, None, True),
+        Transition("s3", "c", -1.0, "s1"),
+    ]
+
+    for transition in transitions:
+        sequential.update_policy(*transition)
+    for transition in transitions:
+        batched.observe(*transition)
+
+    assert batched.train_from_replay() == 3
+    assert len(batched.replay_buffer) == 0
+    # Batch targets use the pre-batch table, so s3 does not yet see s1's update
+    assert batched.get_q_values("s1") == pytest.approx(sequential.get_q_values("s1"))
+    assert batched.get_q_values("s2") == pytest.approx(sequential.get_q_values("s2"))
+    assert batched.get_q_values("s3")["c"] == pytest.approx(-0.5)
+    assert "c" in batched.actions
+
+
+def test_q_table_grows_and_round_trips_through_export():
+    agent = MLCRLAgent(actions=[("a",), ("a", "b")], learning_rate=0.5)
+    for index in range(100):
+        agent.update_policy(state=(("a",), index), action=("a", "b"), reward=1.0, done=True)
+
+    restored = MLCRLAgent(actions=[("a",), ("a", "b")])
+    restored.import_q_values(json.loads(json.dumps(agent.export_q_values())))
+
+    assert restored.num_states == 100
+    assert restored.get_q_values((("a",), 42)) == {("a",): 0.0, ("a", "b"): pytest.approx(0.5)}
+    assert restored.q_table == agent.q_table
+
+
+def test_repeated_pairs_in_a_batch_take_one_averaged_step():
+    agent = MLCRLAgent(actions=["a", "b"], learning_rate=0.1)
+    transition = Transition("s", "a", 1.0, None, True)
+
+    values = []
+    for _ in range(4):
+        agent.update_batch([transition] * 32)
+        values.append(agent.get_q_values("s")["a"])
+
+    # Same as one update per batch: 0.1, 0.19, 0.271, 0.3439 toward 1.0
+    assert values == pytest.approx([0.1, 0.19, 0.271, 0.3439])
+
+    agent.update_batch([Transition("t", "a", 1.0, None, True), Transition("t", "a", 0.0, None, True)])
+    assert agent.get_q_values("t")["a"] == pytest.approx(0.05)
@@ -25,3 +25,112 @@ def test_activate_deactivate_adapter():
     # Deactivate
     ok2 = asyncio.run(mgr.deactivate_adapter(adapter))
     assert ok2 is True
+
+
+def test_eviction_is_least_recently_used():
+    mgr = SLoRAManager(
+        adapter_path=ADAPTER_PATH, base_model=BASE_MODEL, memory_budget_mb=200, prefetch_count=0
+    )
+
+    async def scenario():
+        await mgr.activate_adapter("adapter_cardiology")
+        await mgr.activate_adapter("adapter_oncology")
+        await mgr.activate_adapter("adapter_cardiology")  # refresh recency
+        await mgr.activate_adapter("adapter_neurology")
+
+    asyncio.run(scenario())
+
+    assert mgr.active_adapters == ["adapter_cardiology", "adapter_neurology"]
+    assert mgr.adapters["adapter_oncology"]["loaded"] is False
+    stats = mgr.get_stats()["residency"]
+    assert stats["hits"] == 1
+    assert stats["swaps"] == 1
+    assert stats["used_bytes"] == 200 * 1024 * 1024
+
+
+def test_lfu_policy_keeps_frequently_used_adapter():
+    mgr = SLoRAManager(
+        adapter_path=ADAPTER_PATH,
+        base_model=BASE_MODEL,
+        memory_budget_mb=200,
+        eviction_policy="lfu",
+        prefetch_count=0,
+    )
+
+    async def scenario():
+        for _ in range(3):
+            await mgr.activate_adapter("adapter_cardiology")
+        await mgr.activate_adapter("adapter_oncology")
+        await mgr.activate_adapter("adapter_neurology")
+
+    asyncio.run(scenario())
+
+    assert "adapter_cardiology" in mgr.active_adapters
+    assert "adapter_oncology" not in mgr.active_adapters
+
+
+def test_pinned_adapters_are_not_evicted():
+    mgr = SLoRAManager(
+        adapter_path=ADAPTER_PATH, base_model=BASE_MODEL, memory_budget_mb=100, prefetch_count=0
+    )
+
+    async def scenario():
+        assert await mgr.activate_adapter("adapter_cardiology", pin=True)
+        assert await mgr.activate_adapter("adapter_oncology") is False
+        assert await mgr.deactivate_adapter("adapter_cardiology") is False
+        await mgr.release_adapters(["adapter_cardiology"])
+        assert await mgr.activate_adapter("adapter_oncology") is True
+
+    asyncio.run(scenario())
+
+    assert mgr.active_adapters == ["adapter_oncology"]
+
+
+def test_prefetch_follows_request_mix():
+    mgr = SLoRAManager(
+        adapter_path=ADAPTER_PATH, base_model=BASE_MODEL, memory_budget_mb=1000, prefetch_count=1
+    )
+
+    async def scenario():
+        await mgr.select_adapters(["cardiology"])
+        # Next request for another specialty warms the recently demanded one
+        await mgr.select_adapters(["oncology"])
+        return await mgr.activate_adapter("adapter_cardiology")
+
+    assert asyncio.run(scenario()) is True
+
+    stats = mgr.get_stats()["residency"]
+    assert stats["prefetches"] == 1
+    assert stats["prefetch_hits"] == 1
+
+
+def test_specialty_inference_uses_compiled_matcher():
+    mgr = SLoRAManager(adapter_path=ADAPTER_PATH, base_model=BASE_MODEL)
+    patient = {
+        "conditions": [
+            {"code": "Essential  Hypertension"},
+            {"code": "Type 2 diabetes with chronic kidney disease"},
+            {"code": "Family history noted"},  # "mi" inside a word is not MI
+            {"code": "Acute MI"},
+        ],
+        "medications": [{"medication": "Metformin 500mg"}, {"medication": "Surface cream"}],
+    }
+
+    inferred = asyncio.run(mgr._infer_specialties(patient))
+
+    assert inferred == ["cardiology", "endocrinology", "nephrology"]
+    asyncio.run(mgr._infer_specialties(patient))
+    stats = mgr.get_stats()["specialty_inference"]["conditions"]
+    assert stats["cache_hits"] == 4
+    assert stats["cached_texts"] == 4
+
+
+def test_specialty_matcher_reports_nested_keywords():
+    from backend.s_lora_manager import SpecialtyMatcher
+
+    matcher = SpecialtyMatcher({"a": ["heart failure"], "b": ["heart"], "c": ["COPD"]})
+
+    assert matcher.match("Chronic heart failure") == ["a", "b"]
+    assert matcher.match("copd exacerbation") == ["c"]
+    assert matcher.match("copdx") == []
+    assert matcher.match(None) == []
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from backend.utils import serialization
+from backend.utils.serialization import decode_value, encode_value
+
+
+ANALYSIS = {
+    "patient_id": "p1",
+    "summary": {"patient_name": "Jane Doe", "conditions": ["hypertension"] * 50},
+    "recommendations": [{"title": f"Recommendation {idx}", "confidence": 0.5} for idx in range(100)],
+}
+
+
+def test_small_values_are_stored_as_plain_json_text():
+    encoded = encode_value({"v": 1, "data": {"risk": 0.4}})
+
+    assert encoded.startswith("v1:j:")
+    assert decode_value(encoded) == {"v": 1, "data": {"risk": 0.4}}
+
+
+def test_large_values_are_compressed_and_round_trip():
+    encoded = encode_value(ANALYSIS, compress_min_bytes=256)
+
+    assert encoded[:5] in {"v1:z:", "v1:d:"}
+    assert len(encoded) < len(json.dumps(ANALYSIS)) / 3
+    assert decode_value(encoded) == ANALYSIS
+
+
+def test_zlib_fallback_and_legacy_json_are_readable(monkeypatch):
+    monkeypatch.setattr(serialization, "zstandard", None)
+    encoded = encode_value(ANALYSIS, compress_min_bytes=0)
+
+    assert encoded.startswith("v1:d:")
+    assert decode_value(encoded) == ANALYSIS
+    assert decode_value(json.dumps(ANALYSIS)) == ANALYSIS
+    assert decode_value(json.dumps(ANALYSIS).encode()) == ANALYSIS
+
+
+@pytest.mark.parametrize("value", ["v2:j:{}", "v1:x:{}", "v1:d:bm90IHpsaWI="])
+def test_unknown_or_corrupt_formats_raise_value_error(value):
+    with pytest.raises(ValueError):
+        decode_value(value)
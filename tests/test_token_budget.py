@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock
+
+from backend.llm.token_budget import TokenBudgetManager, TokenCounter
+
+
+def test_token_counter_estimates_and_truncates():
+    counter = TokenCounter("anthropic")
+    text = "Metformin is first-line therapy for type 2 diabetes " * 20
+
+    assert counter.count("") == 0
+    assert counter.count(text) > counter.count("Metformin")
+    truncated = counter.truncate(text, 10)
+    assert counter.count(truncated) <= 10
+    assert text.startswith(truncated)
+
+
+def test_patient_summary_respects_budget_and_is_cached():
+    manager = TokenBudgetManager("anthropic", max_context_tokens=120, patient_share=0.5)
+    context = {
+        "patient": {"name": "PAT-1", "birthDate": "1960", "gender": "female"},
+        "conditions": [{"code": f"Condition number {i}"} for i in range(50)],
+        "medications": [{"medication": "Lisinopril"}],
+    }
+    transform = MagicMock(side_effect=lambda ctx: ctx)
+
+    summary, tokens = manager.patient_summary(context, transform=transform)
+    again, _ = manager.patient_summary(context, transform=transform)
+
+    assert summary is again
+    assert tokens <= manager.patient_budget
+    assert summary.startswith("Patient Context:")
+    assert "Active Conditions: 50 found" in summary
+    transform.assert_called_once()
+    assert manager.get_stats()["summary_hits"] == 1
+
+
+def test_select_knowledge_ranks_by_relevance_and_trims():
+    manager = TokenBudgetManager("anthropic")
+    contents = [
+        "Protocol (Sepsis Management): Blood cultures, antibiotics",
+        "Drug (metformin): biguanide for type 2 diabetes, check eGFR",
+        "Guideline (ADA 2024): metformin first-line for diabetes " + "detail " * 200,
+    ]
+
+    selected = manager.select_knowledge("metformin dose in diabetes", contents, budget=60)
+
+    assert selected[0].startswith("Drug (metformin)")
+    assert all(not item.startswith("Protocol") for item in selected)
+    assert sum(manager.counter.count(item) + 2 for item in selected) <= 60
+    assert manager.get_stats()["knowledge_items_dropped"] >= 1